@@ -25,25 +25,58 @@ __build_platform__ = 'n/a'
 __all__ = ["gui", "misc", "visual", "core",
            "event", "data", "sound", "microphone"]
 
+# subpackages (and modules) are imported when first used, so they don't all
+# have to be loaded by `import psychopy`
+_lazyLoading = sys.version_info >= (3, 7)
+
+
 # for developers the following allows access to the current git sha from
 # their repository
-if __git_sha__ == 'n/a':
-    import subprocess
+def _getGitSha():
+    from subprocess import check_output, PIPE
     # see if we're in a git repo and fetch from there
     try:
         thisFileLoc = os.path.split(__file__)[0]
-        output = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
-                                         cwd=thisFileLoc, stderr=subprocess.PIPE)
+        output = check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                              cwd=thisFileLoc, stderr=PIPE)
     except Exception:
         output = False
     if output:
-        __git_sha__ = output.strip()  # remove final linefeed
+        return output.strip()  # remove final linefeed
+    return 'n/a'
+
+
+if __git_sha__ == 'n/a':
+    if _lazyLoading:
+        del __git_sha__  # found by __getattr__ when first used
+    else:
+        __git_sha__ = _getGitSha()
+
+
+# get the attributes of the package that are loaded when first used
+# (Python 3.7+), e.g. `psychopy.visual` without `import psychopy.visual`
+def __getattr__(name):
+    if name == '__git_sha__':
+        globals()['__git_sha__'] = sha = _getGitSha()
+        return sha
+    if name in ('useVersion', 'ensureMinimal'):
+        from psychopy.tools import versionchooser
+        return getattr(versionchooser, name)
+    if not name.startswith('_'):
+        thisFileLoc = os.path.split(__file__)[0]
+        if (os.path.isdir(os.path.join(thisFileLoc, name)) or
+                os.path.isfile(os.path.join(thisFileLoc, name + '.py'))):
+            import importlib
+            return importlib.import_module('psychopy.' + name)
+    raise AttributeError("module {!r} has no attribute {!r}"
+                         .format(__name__, name))
+
 
 # update preferences and the user paths
 if 'installing' not in locals():
     from psychopy.preferences import prefs
     for pathName in prefs.general['paths']:
         sys.path.append(pathName)
-    
-    from psychopy.tools.versionchooser import useVersion, ensureMinimal
 
+    if not _lazyLoading:
+        from psychopy.tools.versionchooser import useVersion, ensureMinimal
@@ -23,11 +23,16 @@ from pkg_resources import parse_version
 
 try:
     import pyglet
+    # events for sounds/video should run independently of wait() in newer
+    # versions of pyglet
+    _dispatchMediaEvents = (
+        parse_version(pyglet.version) < parse_version('1.2'))
 except ImportError:
     pass  # pyglet is not installed
 
 from psychopy.constants import STARTED, NOT_STARTED, FINISHED, PY3
-import psychopy.logging  # Absolute import to work around circularity
+# NB psychopy.logging imports this module (for its default clock), so it is
+# only imported here where it is used, or `import psychopy.clock` would fail
 
 
 # set the default timing mechanism
@@ -270,30 +275,198 @@ class StaticPeriod(object):
         :return: 1 for success, 0 for fail (the period overran)
         """
         self.status = FINISHED
-        timeRemaining = self.countdown.getTime()
+        # the countdown is zero at this (absolute) time
+        deadline = self.countdown.getLastResetTime()
+        timeRemaining = deadline - getTime()
         if self.win:
             self.win.recordFrameIntervals = self._winWasRecordingIntervals
         if timeRemaining < 0:
             msg = ('We overshot the intended duration of %s by %.4fs. The '
                    'intervening code took too long to execute.')
             vals = self.name, abs(timeRemaining)
-            psychopy.logging.warn(msg % vals)
+            from psychopy import logging
+            logging.warn(msg % vals)
             return 0
         else:
-            wait(timeRemaining)
+            waitUntil(deadline)
             return 1
 
 
-def wait(secs, hogCPUperiod=0.2):
-    """Wait for a given time period.
+class PrecisionPeriod(StaticPeriod):
+    """A :class:`StaticPeriod` that keeps track of how precisely each
+    period was completed.
+
+    Every call to :meth:`complete` records the wake-up error, i.e. the time
+    at which the wait actually returned minus the time it was meant to
+    (positive values are late), so the precision achieved on the current
+    machine can be reported at the end of a run::
+
+        ISI = PrecisionPeriod(screenHz=60, name='ISI')
+        for trial in trials:
+            ISI.start(0.5)
+            stim.image = trial['image']
+            ISI.complete()
+            ...
+        print(ISI.getStats())
+
+    Periods that overran (the intervening code took longer than the period)
+    are counted separately and are not included in the wake-up errors.
+    """
+    def __init__(self, screenHz=None, win=None, name='PrecisionPeriod'):
+        super(PrecisionPeriod, self).__init__(
+            screenHz=screenHz, win=win, name=name)
+        self.errors = []
+        self.overruns = []
+
+    def complete(self):
+        """Completes the period, as :meth:`StaticPeriod.complete`, and
+        records the wake-up error.
 
-    If secs=10 and hogCPU=0.2 then for 9.8s python's time.sleep function
-    will be used, which is not especially precise, but allows the cpu to
-    perform housekeeping. In the final hogCPUperiod the more precise
-    method of constantly polling the clock is used for greater precision.
+        :return: 1 for success, 0 for fail (the period overran)
+        """
+        deadline = self.countdown.getLastResetTime()
+        result = super(PrecisionPeriod, self).complete()
+        error = getTime() - deadline
+        if result:
+            self.errors.append(error)
+        else:
+            self.overruns.append(error)
+        return result
 
-    If you want to obtain key-presses during the wait, be sure to use
-    pyglet and to hogCPU for the entire time, and then call
+    @property
+    def lastError(self):
+        """The wake-up error (in secs) of the last completed period, or
+        None if no period has completed on time yet.
+        """
+        if self.errors:
+            return self.errors[-1]
+
+    def getStats(self):
+        """Summarise the precision achieved so far.
+
+        :return: a dict with the number of periods completed on time
+            (`count`) and the number that overran (`overruns`), and the
+            `mean`, `median`, `max` and `sd` of the wake-up errors in secs
+            (None if there are no errors yet).
+        """
+        errors = sorted(self.errors)
+        n = len(errors)
+        stats = {'count': n, 'overruns': len(self.overruns),
+                 'mean': None, 'median': None, 'max': None, 'sd': None}
+        if n:
+            mean = sum(errors) / n
+            stats['mean'] = mean
+            stats['median'] = (errors[(n - 1) // 2] + errors[n // 2]) / 2
+            stats['max'] = errors[-1]
+            if n > 1:
+                stats['sd'] = (sum((e - mean) ** 2 for e in errors) /
+                               (n - 1)) ** 0.5
+        return stats
+
+    def reset(self):
+        """Discard the errors recorded so far."""
+        self.errors = []
+        self.overruns = []
+
+
+# how late time.sleep() wakes up on this machine; measured by calibrateSleep
+_sleepGuard = None
+# limits for the guard band, in secs
+MIN_SLEEP_GUARD = 0.0002
+MAX_SLEEP_GUARD = 0.02
+# minimum time between checks for window events while waiting, in secs
+pumpEventsInterval = 0.005
+
+
+def calibrateSleep(nSamples=50, duration=0.001, percentile=99.0):
+    """Measure how late `time.sleep()` wakes up on this machine and set the
+    guard band used by :func:`wait`.
+
+    :func:`wait` sleeps until the time remaining is less than the guard band
+    and only checks the clock continuously for the remainder, so the guard
+    band should cover almost all of the overshoot of the OS sleep. This is
+    called automatically when the first Window is created, or failing that
+    by the first :func:`wait` before it works out its deadline, but can be
+    called again (e.g. after changing the process priority with
+    :func:`~psychopy.core.rush`) to re-measure. It takes around 50 ms, so
+    call it before any timed section that uses :func:`waitUntil` without a
+    Window.
+
+    :param nSamples: number of sleeps to measure
+    :param duration: the duration of each sleep, in secs
+    :param percentile: the percentile of the overshoot to use as the guard
+        band (then limited to `MIN_SLEEP_GUARD`..`MAX_SLEEP_GUARD`)
+    :return: the new guard band, in secs
+    """
+    global _sleepGuard
+    overshoots = []
+    for i in range(nSamples):
+        t0 = getTime()
+        time.sleep(duration)
+        overshoots.append(getTime() - t0 - duration)
+    overshoots.sort()
+    index = int(round((nSamples - 1) * percentile / 100.0))
+    _sleepGuard = min(max(overshoots[index], MIN_SLEEP_GUARD),
+                      MAX_SLEEP_GUARD)
+    from psychopy import logging
+    logging.debug(
+        'time.sleep() overshoot: median %.3f ms, %g%% %.3f ms, max %.3f ms; '
+        'wait() guard band %.3f ms' % (
+            overshoots[nSamples // 2] * 1000, percentile,
+            overshoots[index] * 1000, overshoots[-1] * 1000,
+            _sleepGuard * 1000))
+    return _sleepGuard
+
+
+def getSleepGuard():
+    """Returns the time (in secs) before a deadline at which :func:`wait`
+    stops sleeping and starts checking the clock continuously, measuring it
+    with :func:`calibrateSleep` if that has not been done yet.
+    """
+    if _sleepGuard is None:
+        return calibrateSleep()
+    return _sleepGuard
+
+
+def _pumpEvents(core):
+    """Let pyglet windows (and old pyglet media players) handle any events
+    collected in the meantime.
+    """
+    try:
+        # this takes focus away from command line terminal window:
+        if _dispatchMediaEvents:
+            pyglet.media.dispatch_events()
+    except AttributeError:
+        # see http://www.pyglet.org/doc/api/pyglet.media-module.html#dispatch_events
+        # Deprecated: Since pyglet 1.1, Player objects schedule themselves
+        # on the default clock automatically. Applications should not call
+        # pyglet.media.dispatch_events().
+        pass
+    for winWeakRef in core.openWindows:
+        win = winWeakRef()
+        if (win is not None and win.winType == "pyglet" and
+                hasattr(win.winHandle, "dispatch_events")):
+            win.winHandle.dispatch_events()  # pump events
+
+
+def wait(secs, hogCPUperiod=None):
+    """Wait for a given time period.
+
+    Most of the period is spent in python's time.sleep function, which is
+    not especially precise, but allows the cpu to perform housekeeping. The
+    sleep is done in slices that shrink as the end of the period approaches,
+    until only a short guard band remains, and for that the more precise
+    method of constantly polling the clock is used. By default the guard
+    band is measured once, before the first period starts (see
+    :func:`calibrateSleep`), to cover how late time.sleep wakes up on this
+    machine, which is typically well below a millisecond. If hogCPUperiod
+    is given then at least the final
+    hogCPUperiod secs are spent polling the clock instead (e.g. secs=10 and
+    hogCPUperiod=0.2 sleeps for 9.8s).
+
+    Window events are handled at most every `clock.pumpEventsInterval` secs
+    throughout the wait (not just while polling the clock). If you want to
+    obtain key-presses during the wait, be sure to use pyglet, and then call
     :func:`psychopy.event.getKeys()` after calling
     :func:`~.psychopy.core.wait()`
 
@@ -308,35 +481,49 @@ def wait(secs, hogCPUperiod=0.2):
 
     This will preserve terminal-window focus during command line usage.
     """
+    # calibrate, and import core for waitUntil(), before the period starts
+    # as either can take several ms the first time
+    if hogCPUperiod is None:
+        getSleepGuard()
     from . import core
+    waitUntil(getTime() + secs, hogCPUperiod)
 
-    # initial relaxed period, using sleep (better for system resources etc)
-    if secs > hogCPUperiod:
-        time.sleep(secs - hogCPUperiod)
-        secs = hogCPUperiod  # only this much is now left
-
-    # hog the cpu, checking time
-    t0 = getTime()
-    while (getTime() - t0) < secs:
-        if not (core.havePyglet and core.checkPygletDuringWait):
-            continue
-        # let's see if pyglet collected any event in meantime
-        try:
-            # this takes focus away from command line terminal window:
-            if parse_version(pyglet.version) < parse_version('1.2'):
-                # events for sounds/video should run independently of wait()
-                pyglet.media.dispatch_events()
-        except AttributeError:
-            # see http://www.pyglet.org/doc/api/pyglet.media-module.html#dispatch_events
-            # Deprecated: Since pyglet 1.1, Player objects schedule themselves
-            # on the default clock automatically. Applications should not call
-            # pyglet.media.dispatch_events().
-            pass
-        for winWeakRef in core.openWindows:
-            win = winWeakRef()
-            if (win.winType == "pyglet" and
-                    hasattr(win.winHandle, "dispatch_events")):
-                win.winHandle.dispatch_events()  # pump events
+
+def waitUntil(deadline, hogCPUperiod=None):
+    """Wait until the time base (:func:`getTime`) reaches `deadline`, as
+    :func:`wait`.
+
+    Waiting for an absolute time rather than a duration avoids adding the
+    time taken to work out the duration to the wait, e.g. when waiting for
+    the next of a series of regularly scheduled events.
+    """
+    from . import core
+
+    if hogCPUperiod is None:
+        guard = getSleepGuard()
+    else:
+        guard = hogCPUperiod
+    pumpEvents = core.havePyglet and core.checkPygletDuringWait
+    lastPump = -pumpEventsInterval
+
+    # relaxed period, using sleep (better for system resources etc)
+    now = getTime()
+    while deadline - now > guard:
+        if pumpEvents:
+            if now - lastPump >= pumpEventsInterval:
+                _pumpEvents(core)
+                lastPump = now
+            time.sleep(min(deadline - now - guard, pumpEventsInterval))
+        else:
+            time.sleep(deadline - now - guard)
+        now = getTime()
+
+    # hog the cpu for the rest, checking time
+    while now < deadline:
+        if pumpEvents and now - lastPump >= pumpEventsInterval:
+            _pumpEvents(core)
+            lastPump = now
+        now = getTime()
 
 
 def getAbsTime():
@@ -18,8 +18,8 @@ import locale
 
 # some things are imported just to be accessible within core's namespace
 from psychopy.clock import (MonotonicClock, Clock, CountdownTimer,
-                            wait, monotonicClock, getAbsTime,
-                            StaticPeriod)  # pylint: disable=W0611
+                            wait, waitUntil, monotonicClock, getAbsTime,
+                            StaticPeriod, PrecisionPeriod)  # pylint: disable=W0611
 
 # always safe to call rush, even if its not going to do anything for a
 # particular OS
@@ -63,6 +63,7 @@ if havePyglet:
 
 import psychopy.core
 from psychopy.tools.monitorunittools import cm2pix, deg2pix, pix2cm, pix2deg
+from psychopy.tools.mousetools import TrajectoryRecorder
 from psychopy import logging
 from psychopy.constants import NOT_STARTED
 
@@ -305,14 +306,27 @@ def _onPygletMouseWheel(x, y, scroll_x, scroll_y):
     logging.data(msg % (scroll_x, scroll_y, x, y))
 
 
-# will this work? how are pyglet event handlers defined?
-def _onPygletMouseMotion(x, y, dx, dy):
+# recorders of Mouse objects currently recording their trajectory, fed with
+# every motion event
+_trajectoryRecorders = []
+
+
+def _onPygletMouseMotion(x, y, dx, dy, buttons=0):
     global mouseMove
     # mouseMove is a core.Clock() that is reset when the mouse moves
     # default is None, but start and stopMoveClock() create and remove it,
     # mouseMove.reset() resets it by hand
     if mouseMove:
         mouseMove.reset()
+    if _trajectoryRecorders:
+        now = psychopy.clock.getTime()
+        for recorder in _trajectoryRecorders:
+            recorder.append(x, y, buttons, now)
+
+
+def _onPygletMouseDrag(x, y, dx, dy, buttons, modifiers):
+    """Mouse motion with buttons held down"""
+    _onPygletMouseMotion(x, y, dx, dy, buttons)
 
 
 def startMoveClock():
@@ -595,6 +609,7 @@ class Mouse(object):
         self.status = None
         self.mouseClock = psychopy.core.Clock()
         self.movedistance = 0.0
+        self._trajectory = None
         # if pygame isn't initialised then we must use pyglet
         global usePygame
         if havePygame and not pygame.display.get_init():
@@ -640,6 +655,85 @@ class Mouse(object):
                 msg = 'mouse position could not be set (pyglet %s)'
                 logging.error(msg % pyglet.version)
 
+    def startTrajectory(self, clear=True):
+        """Start recording the position of the mouse for every motion event
+        the window receives (not just once per frame), starting with its
+        current position.
+
+        Motion events are timestamped when they are handled, which happens
+        whenever the window events are dispatched (e.g. on each flip and
+        during :func:`~psychopy.core.wait`). Only available with pyglet
+        and glfw windows.
+
+        :Parameters:
+            clear : **True** or False
+                discard any trajectory that was recorded previously
+        """
+        if usePygame:
+            raise NotImplementedError('Mouse trajectories can only be '
+                                      'recorded with pyglet or glfw windows')
+        if self._trajectory is None:
+            self._trajectory = TrajectoryRecorder()
+        elif clear:
+            self._trajectory.clear()
+        if self._trajectory not in _trajectoryRecorders:
+            _trajectoryRecorders.append(self._trajectory)
+        x, y = self._getBackendPos()
+        buttons = mouseButtons[0] | mouseButtons[1] << 1 | mouseButtons[2] << 2
+        self._trajectory.append(x, y, buttons)
+
+    def stopTrajectory(self):
+        """Stop recording the position of the mouse on motion events (the
+        trajectory so far is kept, see :meth:`getTrajectory`)
+        """
+        if self._trajectory in _trajectoryRecorders:
+            _trajectoryRecorders.remove(self._trajectory)
+
+    def getTrajectory(self, clock=None, clear=False):
+        """Returns the trajectory recorded since :meth:`startTrajectory`.
+
+        :Parameters:
+            clock : **None** or a :class:`~psychopy.core.Clock`
+                the clock the times are relative to (by default
+                `mouse.mouseClock`)
+            clear : True or **False**
+                discard the trajectory returned, so the next call returns
+                only subsequent motion
+
+        :Returns:
+            a numpy structured array with a record per motion event and the
+            fields `time`, `x`, `y` (in the units of the window),
+            `leftButton`, `midButton` and `rightButton`
+        """
+        if self._trajectory is None:
+            records = TrajectoryRecorder(1).getRecords()
+        else:
+            records = self._trajectory.getRecords(clear=clear)
+        if clock is None:
+            clock = self.mouseClock
+        pos = numpy.column_stack([records['x'], records['y']])
+        size = numpy.array(self.win.size, dtype=float)
+        if self.win.winType == 'glfw':
+            # glfw cursor positions are relative to the top left
+            pos[:, 1] = size[1] / self._backendScale() - pos[:, 1]
+        # set (0,0) to centre
+        pos = pos * self._backendScale() - size / 2
+        if len(pos):
+            pos = self._pix2windowUnits(pos)
+        return TrajectoryRecorder.makeTrajectory(
+            records['t'] - clock.getLastResetTime(), pos, records['buttons'])
+
+    def _backendScale(self):
+        # window pixels per pixel in the coordinates of mouse events
+        return 2 if self.win.useRetina else 1
+
+    def _getBackendPos(self):
+        """The current position, as given by the backend in mouse events"""
+        if self.win.winType == 'glfw':
+            return glfw.get_cursor_pos(self.win.winHandle)
+        w = self.win.winHandle
+        return w._mouse_x, w._mouse_y
+
     def getPos(self):
         """Returns the current position of the mouse,
         in the same units as the :class:`~visual.Window` (0,0) is at centre
@@ -1256,6 +1350,21 @@ def _onGLFWMouseButton(*args, **kwargs):
             mouseButtons[2] = 0
 
 
+def _onGLFWMouseMove(*args, **kwargs):
+    """Callback for cursor motion events.
+
+    """
+    global mouseMove
+    if mouseMove:
+        mouseMove.reset()
+    if _trajectoryRecorders:
+        now = psychopy.core.getTime()
+        win_ptr, x, y = args
+        buttons = mouseButtons[0] | mouseButtons[1] << 1 | mouseButtons[2] << 2
+        for recorder in _trajectoryRecorders:
+            recorder.append(x, y, buttons, now)
+
+
 def _onGLFWMouseScroll(*args, **kwargs):
     """Callback for mouse scrolling events. For most computer mice with scroll
     wheels, only the vertical (Y-offset) is relevant.
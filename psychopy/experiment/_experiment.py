@@ -22,9 +22,11 @@ from past.builtins import basestring
 from builtins import object
 import os
 import codecs
+import hashlib
+import stat
 import xml.etree.ElementTree as xml
 from xml.dom import minidom
-from copy import deepcopy
+from multiprocessing.pool import ThreadPool
 
 import psychopy
 from psychopy import data, __version__, logging
@@ -47,6 +49,62 @@ RequiredImport = namedtuple('RequiredImport',
                             field_names=('importName',
                                          'importFrom',
                                          'importAs'))
+_missing = object()
+
+# the string values in each conditions file searched for resources, as
+# {path: ((mtime, size), values)}
+_conditionsCache = {}
+# number of paths to check before doing so in a pool of threads
+statPoolThreshold = 256
+statPoolThreads = 16
+
+
+def _fileSignature(path):
+    """Returns (mtime, size) of the file at `path`, or None if it is not a
+    file.
+    """
+    try:
+        info = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    if not stat.S_ISREG(info.st_mode):
+        return None
+    return info.st_mtime, info.st_size
+
+
+def _findFiles(paths):
+    """Returns a dict of whether each of `paths` is a file, checking each
+    path once, in a pool of threads when there are many (stat is slow on
+    network drives)
+    """
+    paths = list(OrderedDict.fromkeys(paths))
+    if len(paths) >= statPoolThreshold:
+        pool = ThreadPool(statPoolThreads)
+        try:
+            signatures = pool.map(_fileSignature, paths)
+        finally:
+            pool.close()
+    else:
+        signatures = [_fileSignature(path) for path in paths]
+    return {path: signature is not None
+            for path, signature in zip(paths, signatures)}
+
+
+def _conditionsValues(fileName):
+    """Returns the (non-empty) string values in a conditions file, loading
+    it again only when it has changed since last time
+    """
+    signature = _fileSignature(fileName)
+    cached = _conditionsCache.get(fileName)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    values = []
+    for thisCond in data.importConditions(fileName):  # thisCond is a dict
+        for param, val in list(thisCond.items()):
+            if isinstance(val, basestring) and len(val):
+                values.append(val)
+    _conditionsCache[fileName] = (signature, values)
+    return values
 
 
 class Experiment(object):
@@ -85,6 +143,7 @@ class Experiment(object):
         self.requireImport(importName='keyboard',
                            importFrom='psychopy.hardware')
         self._runOnce = []
+        self._fragmentCache = {}  # code written for each Routine
 
         _settingsComp = getComponents(fetchIcons=False)['SettingsComponent']
         self.settings = _settingsComp(parentName='', exp=self)
@@ -186,84 +245,249 @@ class Experiment(object):
         else:
             localDateTime = data.getDateStr(format="%B %d, %Y, at %H:%M")
 
-        # Remove disabled components, but leave original experiment unchanged.
-        self_copy = deepcopy(self)
-        for _, routine in list(self_copy.routines.items()):  # PY2/3 compat
-            for component in routine:
-                try:
-                    if component.params['disabled'].val:
-                        routine.removeComponent(component)
-                except KeyError:
-                    pass
-
-        if target == "PsychoPy":
-            self_copy.settings.writeInitCode(script, self_copy.psychopyVersion,
-                                             localDateTime)
-            # present info, make logfile
-            self_copy.settings.writeStartCode(script, self_copy.psychopyVersion)
-            # writes any components with a writeStartCode()
-            self_copy.flow.writeStartCode(script)
-            self_copy.settings.writeWindowCode(script)  # create our visual.Window()
-            # for JS the routine begin/frame/end code are funcs so write here
-
-            # write the rest of the code for the components
-            self_copy.flow.writeBody(script)
-            self_copy.settings.writeEndCode(script)  # close log file
-            script = script.getvalue()
-        elif target == "PsychoJS":
-            script.oneIndent = "  "  # use 2 spaces rather than python 4
-            self_copy.settings.writeInitCodeJS(script,self_copy.psychopyVersion,
-                                               localDateTime, modular)
-            self_copy.flow.writeFlowSchedulerJS(script)
-            self_copy.settings.writeExpSetupCodeJS(script,
-                                                   self_copy.psychopyVersion)
-
-            # initialise the components for all Routines in a single function
-            script.writeIndentedLines("\nfunction experimentInit() {")
-            script.setIndentLevel(1, relative=True)
-
-            # routine init sections
-            for entry in self_copy.flow:
-                # NB each entry is a routine or LoopInitiator/Terminator
-                self_copy._currentRoutine = entry
-                if hasattr(entry, 'writeInitCodeJS'):
-                    entry.writeInitCodeJS(script)
-
-            # create globalClock etc
-            code = ("// Create some handy timers\n"
-                    "globalClock = new util.Clock();"
-                    "  // to track the time since experiment started\n"
-                    "routineTimer = new util.CountdownTimer();"
-                    "  // to track time remaining of each (non-slip) routine\n"
-                    "\nreturn Scheduler.Event.NEXT;")
-            script.writeIndentedLines(code)
-            script.setIndentLevel(-1, relative=True)
-            script.writeIndentedLines("}\n")
-
-            # This differs to the Python script. We can loop through all
-            # Routines once (whether or not they get used) because we're using
-            # functions that may or may not get called later.
-            # Do the Routines of the experiment first
-            routinesToWrite = list(self_copy.routines)
-            for thisItem in self_copy.flow:
-                if thisItem.getType() in ['LoopInitiator', 'LoopTerminator']:
-                    self_copy.flow.writeLoopHandlerJS(script, modular)
-                elif thisItem.name in routinesToWrite:
-                    self_copy._currentRoutine = self_copy.routines[thisItem.name]
-                    self_copy._currentRoutine.writeRoutineBeginCodeJS(script, modular)
-                    self_copy._currentRoutine.writeEachFrameCodeJS(script, modular)
-                    self_copy._currentRoutine.writeRoutineEndCodeJS(script, modular)
-                    routinesToWrite.remove(thisItem.name)
-            self_copy.settings.writeEndCodeJS(script)
-
-            # Add JS variable declarations e.g., var msg;
-            script = py2js.addVariableDeclarations(script.getvalue(), fileName=self.expPath)
-
+        # Remove disabled components while the script is written. Writing
+        # the code can change some params too, so restore the experiment
+        # afterwards rather than writing from a (slow) deep copy of it
+        savedParams = self._saveParams()
+        savedRoutines = self._removeDisabledComponents()
+        self.flow._loopList = []
+        try:
+            if target == "PsychoPy":
+                self.settings.writeInitCode(script, self.psychopyVersion,
+                                            localDateTime)
+                # present info, make logfile
+                self.settings.writeStartCode(script, self.psychopyVersion)
+                # writes any components with a writeStartCode()
+                self.flow.writeStartCode(script)
+                self.settings.writeWindowCode(script)  # create our visual.Window()
+                # for JS the routine begin/frame/end code are funcs so write here
+
+                # write the rest of the code for the components
+                self.flow.writeBody(script)
+                self.settings.writeEndCode(script)  # close log file
+                script = script.getvalue()
+            elif target == "PsychoJS":
+                script.oneIndent = "  "  # use 2 spaces rather than python 4
+                self.settings.writeInitCodeJS(script, self.psychopyVersion,
+                                              localDateTime, modular)
+                self.flow.writeFlowSchedulerJS(script)
+                self.settings.writeExpSetupCodeJS(script,
+                                                  self.psychopyVersion)
+                # positions at which the script can be split into complete
+                # statements, to add the variable declarations for each part
+                segmentStarts = [0, script.tell()]
+
+                # initialise the components for all Routines in a single function
+                script.writeIndentedLines("\nfunction experimentInit() {")
+                script.setIndentLevel(1, relative=True)
+
+                # routine init sections
+                for entry in self.flow:
+                    # NB each entry is a routine or LoopInitiator/Terminator
+                    self._currentRoutine = entry
+                    if hasattr(entry, 'writeInitCodeJS'):
+                        self._writeFragment(script, entry, 'writeInitCodeJS')
+
+                # create globalClock etc
+                code = ("// Create some handy timers\n"
+                        "globalClock = new util.Clock();"
+                        "  // to track the time since experiment started\n"
+                        "routineTimer = new util.CountdownTimer();"
+                        "  // to track time remaining of each (non-slip) routine\n"
+                        "\nreturn Scheduler.Event.NEXT;")
+                script.writeIndentedLines(code)
+                script.setIndentLevel(-1, relative=True)
+                script.writeIndentedLines("}\n")
+                segmentStarts.append(script.tell())
+
+                # This differs to the Python script. We can loop through all
+                # Routines once (whether or not they get used) because we're using
+                # functions that may or may not get called later.
+                # Do the Routines of the experiment first
+                routinesToWrite = list(self.routines)
+                for thisItem in self.flow:
+                    if thisItem.getType() in ['LoopInitiator', 'LoopTerminator']:
+                        self.flow.writeLoopHandlerJS(script, modular)
+                    elif thisItem.name in routinesToWrite:
+                        self._currentRoutine = self.routines[thisItem.name]
+                        for methodName in ('writeRoutineBeginCodeJS',
+                                           'writeEachFrameCodeJS',
+                                           'writeRoutineEndCodeJS'):
+                            self._writeFragment(script, self._currentRoutine,
+                                                methodName, modular)
+                        routinesToWrite.remove(thisItem.name)
+                    segmentStarts.append(script.tell())
+                self.settings.writeEndCodeJS(script)
+
+                # Add JS variable declarations e.g., var msg;
+                script = script.getvalue()
+                segments = [script[start:end] for start, end in
+                            zip(segmentStarts, segmentStarts[1:] + [None])]
+                script = py2js.addVariableDeclarations(segments, fileName=self.expPath)
+        finally:
+            for routine, components in savedRoutines:
+                routine[:] = components
+            self._restoreParams(savedParams)
+            self.flow._loopList = []
             # Reset loop controller ready for next call to writeScript
-            self_copy.flow._resetLoopController()
+            self.flow._resetLoopController()
 
         return script
 
+    def _removeDisabledComponents(self):
+        """Remove disabled components from all Routines, returning a list of
+        (routine, components) to restore the Routines from
+        """
+        savedRoutines = []
+        for routine in list(self.routines.values()):
+            enabled = [component for component in routine
+                       if not ('disabled' in component.params and
+                               component.params['disabled'].val)]
+            if len(enabled) < len(routine):
+                savedRoutines.append((routine, list(routine)))
+                routine[:] = enabled
+        return savedRoutines
+
+    def _paramOwners(self):
+        """All the objects with params that are used to write the script
+        """
+        owners = [self.settings, self._expHandler]
+        for routine in self.routines.values():
+            owners.extend(routine)
+        for entry in self.flow:
+            if entry.getType() == 'LoopInitiator':
+                owners.append(entry.loop)
+        return owners
+
+    def _saveParams(self):
+        """Save the params (and their values) of the experiment, so they can
+        be restored by `_restoreParams()`
+        """
+        saved = []
+        for owner in self._paramOwners():
+            values = [(param, param.val, param.valType, param.updates)
+                      for param in owner.params.values()
+                      if isinstance(param, Param)]
+            saved.append((owner.params, owner.params.copy(), values))
+        return saved
+
+    def _restoreParams(self, saved):
+        for params, savedParams, values in saved:
+            if len(params) != len(savedParams) or \
+                    any(params.get(name) is not param
+                        for name, param in savedParams.items()):
+                params.clear()
+                params.update(savedParams)
+            for param, val, valType, updates in values:
+                param.val = val
+                param.valType = valType
+                param.updates = updates
+
+    def transpileParams(self, processes=None):
+        """Convert the python code in all the params of the experiment to JS
+        in one call, so writing the PsychoJS script only needs to look up
+        the translations (see `py2js.expressions2js`).
+
+        This is optional: writeScript() doesn't call it, and translates each
+        expression as it is written. It is worth calling before writing the
+        PsychoJS script of a very large experiment (with at least
+        `py2js.poolThreshold` expressions that aren't cached yet) to use a
+        pool of `processes` to translate them. It also translates params
+        that may not be used by the script, and logs any that fail.
+
+        Returns the number of expressions translated.
+        """
+        expressions = []
+        for owner in self._paramOwners():
+            for name, param in owner.params.items():
+                if not isinstance(param, Param):
+                    continue
+                expressions.extend(param.getExpressionsJS())
+                # values converted by getInitVals
+                if isinstance(param.val, basestring) and name != 'text':
+                    val = param.val.strip()
+                    if val.startswith("(") and val.endswith(")"):
+                        expressions.append(param.val)
+        py2js.expressions2js(expressions, processes=processes)
+        return len(expressions)
+
+    def _fragmentKey(self, buff, routine, methodName, args):
+        """A hash of everything the code written by
+        `routine.<methodName>(buff, *args)` depends on
+        """
+        def paramsKey(params):
+            return [(name, repr(getattr(param, 'val', param)),
+                     getattr(param, 'valType', None),
+                     getattr(param, 'updates', None))
+                    for name, param in params.items()]
+
+        key = [methodName, args, utils.scriptTarget, buff.indentLevel,
+               buff.oneIndent, self.expPath, self.htmlFolder,
+               paramsKey(self.settings.params)]
+        # the loops this routine is in
+        for loop in self.flow._loopList:
+            key.append((loop.getType(), paramsKey(loop.params)))
+        for component in routine:
+            key.append((component.getType(), paramsKey(component.params)))
+            # Static components write updates for other components
+            for update in getattr(component, 'updatesList', ()):
+                compName = update['compName']
+                if hasattr(compName, 'params'):
+                    prms = compName.params
+                else:
+                    comp = self.getComponentFromName(str(compName))
+                    prms = comp.params if comp is not None else {}
+                key.append((update['routine'], str(compName),
+                            update['fieldName'], paramsKey(prms)))
+        return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+    def _writeFragment(self, buff, entry, methodName, *args):
+        """Write the code from `entry.<methodName>(buff, *args)`.
+
+        The code written for each Routine is cached, along with any values
+        the code writers set on the Routine, its Components and their params,
+        and reused until the Routine, the loops it is in or the experiment
+        settings change. So recompiling an experiment only writes the code
+        for Routines that were edited. Loops keep track of the flow as they
+        are written, so their code is always written afresh.
+        """
+        if not isinstance(entry, Routine):
+            getattr(entry, methodName)(buff, *args)
+            return
+        slot = (entry.name, methodName, args)
+        key = self._fragmentKey(buff, entry, methodName, args)
+        cached = self._fragmentCache.get(slot)
+        if cached is not None and cached[0] == key:
+            key, text, indentChange, changes = cached
+            for obj, attrib, val in changes:
+                setattr(obj, attrib, val)
+        else:
+            objs = [entry]
+            for component in entry:
+                objs.append(component)
+                objs.extend(param for param in component.params.values()
+                            if isinstance(param, Param))
+            before = [dict(vars(obj)) for obj in objs]
+            fragment = IndentingBuffer(u'')
+            fragment.oneIndent = buff.oneIndent
+            fragment.indentLevel = buff.indentLevel
+            getattr(entry, methodName)(fragment, *args)
+            text = fragment.getvalue()
+            indentChange = fragment.indentLevel - buff.indentLevel
+            changes = [(obj, attrib, val)
+                       for obj, attribs in zip(objs, before)
+                       for attrib, val in vars(obj).items()
+                       if attribs.get(attrib, _missing) is not val]
+            self._fragmentCache[slot] = (key, text, indentChange, changes)
+        buff.write(text)
+        buff.setIndentLevel(indentChange, relative=True)
+
+    def clearFragmentCache(self):
+        """Clear the code cached for each Routine by `writeScript()`, so
+        the whole script is written afresh next time.
+        """
+        self._fragmentCache = {}
+
     def saveToXML(self, filename):
         self.psychopyVersion = psychopy.__version__  # make sure is current
         # create the dom object
@@ -737,29 +961,53 @@ class Experiment(object):
     def getResourceFiles(self):
         """Returns a list of known files needed for the experiment
         Interrogates each loop looking for conditions files and each
+        component param for paths to files (each listed once, in the order
+        they are found).
 
+        Potential paths are checked in batches (in a pool of threads when
+        there are many of them) and the values in each conditions file are
+        cached until the file is changed, so listing the resources again
+        (e.g. for each script compiled) only needs to stat the files.
         """
         join = os.path.join
-        abspath = os.path.abspath
         srcRoot = os.path.split(self.filename)[0]
 
-        def getPaths(filePath):
+        # the paths checked during this search, as {filePath: abs path}
+        # and {abs path: whether it is a file}
+        absPaths = {}
+        isFile = {}
+
+        def getPaths(filePaths):
             """Helper to return absolute and relative paths (or None)
 
-            :param filePath: str to a potential file path (rel or abs)
-            :return: dict of 'asb' and 'rel' paths or None
+            :param filePaths: list of str to potential file paths (rel or abs)
+            :return: list of dicts of 'abs' and 'rel' paths or None
             """
-            thisFile = {}
-            if len(filePath) > 2 and (filePath[0] == "/" or filePath[1] == ":")\
-                    and os.path.isfile(filePath):
-                thisFile['abs'] = filePath
-                thisFile['rel'] = os.path.relpath(filePath, srcRoot)
-                return thisFile
-            else:
-                thisFile['rel'] = filePath
-                thisFile['abs'] = os.path.normpath(join(srcRoot, filePath))
-                if os.path.isfile(thisFile['abs']):
-                    return thisFile
+            candidates = []
+            for filePath in filePaths:
+                if filePath in absPaths:
+                    continue
+                absPaths[filePath] = os.path.normpath(join(srcRoot, filePath))
+                if len(filePath) > 2 and (filePath[0] == "/" or
+                                          filePath[1] == ":"):
+                    candidates.append(filePath)
+                candidates.append(absPaths[filePath])
+            isFile.update(_findFiles(
+                [path for path in candidates if path not in isFile]))
+            paths = []
+            for filePath in filePaths:
+                if isFile.get(filePath) and (len(filePath) > 2 and (
+                        filePath[0] == "/" or filePath[1] == ":")):
+                    paths.append({'abs': filePath,
+                                  'rel': os.path.relpath(filePath, srcRoot)})
+                elif isFile[absPaths[filePath]]:
+                    paths.append({'rel': filePath,
+                                  'abs': absPaths[filePath]})
+                else:
+                    paths.append(None)
+            return paths
+
+        visited = set()  # conditions files already searched
 
         def findPathsInFile(filePath):
             """Recursively search a conditions file (xlsx or csv)
@@ -781,37 +1029,30 @@ class Experiment(object):
                         expPath = self.expPath
                         if 'html' in self.expPath:  # Get resources from parent directory i.e, original exp path
                             expPath = self.expPath.split('html')[0]
-                        fileList = (
-                        [getPaths(condFile) for condFile in os.listdir(expPath)
-                         if len(condFile.split('.')) > 1
-                         and condFile.split('.')[1] in ['xlsx', 'xls', 'csv']])
-                        return fileList
+                        fileList = getPaths(
+                            [condFile for condFile in os.listdir(expPath)
+                             if len(condFile.split('.')) > 1
+                             and condFile.split('.')[1] in ['xlsx', 'xls', 'csv']])
+                        return [thisFile for thisFile in fileList if thisFile]
             paths = []
             # does it look at all like an excel file?
             if (not isinstance(filePath, basestring)
                     or not os.path.splitext(filePath)[1] in ['.csv', '.xlsx',
                                                              '.xls']):
                 return paths
-            thisFile = getPaths(filePath)
-            # does it exist?
-            if not thisFile:
+            thisFile = getPaths([filePath])[0]
+            # does it exist (and has it not been searched already)?
+            if not thisFile or (thisFile['rel'], thisFile['abs']) in visited:
                 return paths
-            # this file itself is valid so add to resources if not already
-            if thisFile not in paths:
-                paths.append(thisFile)
-            conds = data.importConditions(thisFile['abs'])  # load the abs path
-            for thisCond in conds:  # thisCond is a dict
-                for param, val in list(thisCond.items()):
-                    if isinstance(val, basestring) and len(val):
-                        subFile = getPaths(val)
-                    else:
-                        subFile = None
-                    if subFile:
-                        paths.append(subFile)
-                        # if it's a possible conditions file then recursive
-                        if thisFile['abs'][-4:] in ["xlsx", ".xls", ".csv"]:
-                            contained = findPathsInFile(subFile['abs'])
-                            paths.extend(contained)
+            visited.add((thisFile['rel'], thisFile['abs']))
+            paths.append(thisFile)
+            values = _conditionsValues(thisFile['abs'])  # load the abs path
+            for subFile in getPaths(values):
+                if subFile:
+                    paths.append(subFile)
+                    # if it's a possible conditions file then recursive
+                    contained = findPathsInFile(subFile['abs'])
+                    paths.extend(contained)
             return paths
 
         resources = []
@@ -824,19 +1065,26 @@ class Experiment(object):
                     resources.extend(condsPaths)
             elif thisEntry.getType() == 'Routine':
                 # find all params of all compons and check if valid filename
+                values = []
                 for thisComp in thisEntry:
                     for paramName in thisComp.params:
                         thisParam = thisComp.params[paramName]
-                        thisFile = ''
                         if isinstance(thisParam, basestring):
-                            thisFile = getPaths(thisParam)
+                            values.append(thisParam)
                         elif isinstance(thisParam.val, basestring):
-                            thisFile = getPaths(thisParam.val)
-                        # then check if it's a valid path
-                        if thisFile:
-                            resources.append(thisFile)
-
-        return resources
+                            values.append(thisParam.val)
+                # then check which are valid paths
+                resources.extend(thisFile for thisFile in getPaths(values)
+                                 if thisFile)
+
+        # list each file once
+        uniqueResources = []
+        found = set()
+        for thisFile in resources:
+            if (thisFile['rel'], thisFile['abs']) not in found:
+                found.add((thisFile['rel'], thisFile['abs']))
+                uniqueResources.append(thisFile)
+        return uniqueResources
 
 
 class ExpFile(list):
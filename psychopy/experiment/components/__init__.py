@@ -15,14 +15,23 @@ from past.builtins import basestring
 import os
 import glob
 import copy
+import io
+import json
 import shutil
+from collections import OrderedDict
 from os.path import join, dirname, abspath, split
 from importlib import import_module  # helps python 2.7 -> 3.x migration
 from ._base import BaseVisualComponent, BaseComponent
 from ..params import Param
+from psychopy import prefs, logging, __version__
 from psychopy.localization import _translate
 from psychopy.experiment import py2js
 
+try:
+    from collections.abc import MutableMapping
+except ImportError:  # python 2
+    from collections import MutableMapping
+
 
 excludeComponents = ['BaseComponent', 'BaseVisualComponent',  # templates only
                      'EyetrackerComponent']  # this one isn't ready yet
@@ -41,8 +50,8 @@ for filename in pycFiles:
 def getAllCategories(folderList=()):
     allComps = getAllComponents(folderList)
     allCats = ['Stimuli', 'Responses', 'Custom']
-    for name, thisComp in list(allComps.items()):
-        for thisCat in thisComp.categories:
+    for name in allComps:
+        for thisCat in allComps.getCategories(name):
             if thisCat not in allCats:
                 allCats.append(thisCat)
     return allCats
@@ -58,16 +67,178 @@ def getAllComponents(folderList=(), fetchIcons=True):
     components = getComponents(fetchIcons=fetchIcons)  # get the built-ins
     for folder in folderList:
         userComps = getComponents(folder)
-        for thisKey in userComps:
-            components[thisKey] = userComps[thisKey]
+        components.merge(userComps)
     return components
 
 
+class ComponentsDict(MutableMapping):
+    """A dict of Component classes, which imports the module of each
+    Component when it is first used.
+
+    The names, modules, categories and icon files of the Components in each
+    folder are kept in an index, so only the Components used by an
+    experiment need to be imported to load and compile it.
+    """
+    def __init__(self):
+        self._components = OrderedDict()  # name: class or index entry
+
+    def __getitem__(self, name):
+        component = self._components[name]
+        if isinstance(component, dict):  # an index entry not yet imported
+            component = self._components[name] = _importComponent(
+                component['module'], name)
+        return component
+
+    def __setitem__(self, name, component):
+        self._components[name] = component
+
+    def __delitem__(self, name):
+        del self._components[name]
+
+    def __contains__(self, name):
+        return name in self._components
+
+    def __iter__(self):
+        return iter(self._components)
+
+    def __len__(self):
+        return len(self._components)
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, list(self._components))
+
+    def getCategories(self, name):
+        """Returns the categories of a Component (without importing it)
+        """
+        component = self._components[name]
+        if isinstance(component, dict):
+            return component['categories']
+        return getattr(component, 'categories', ['Custom'])
+
+    def merge(self, other):
+        """Add the Components of another ComponentsDict (replacing those with
+        the same names), without importing them
+        """
+        for name in other:
+            self._components[name] = other._components[name]
+
+
+def _importComponent(moduleName, name):
+    """Import the Component class `name` from its module
+    """
+    module = import_module(moduleName)
+    # give a default category
+    if not hasattr(module, 'categories'):
+        module.categories = ['Custom']
+    component = getattr(module, name)
+    # skip if this class was imported, not defined here
+    if module.__name__ == component.__module__:
+        if hasattr(module, 'tooltip'):
+            tooltips[name] = module.tooltip
+        if hasattr(module, 'iconFile'):
+            iconFiles[name] = module.iconFile
+        # assign the module categories to the Component
+        if not hasattr(component, 'categories'):
+            component.categories = ['Custom']
+    return component
+
+
+class ComponentsIndex(object):
+    """The Components found in each components folder, saved to a file so
+    that they can be listed without importing their modules.
+
+    Each folder is searched again (importing its modules) when the modified
+    times or sizes of its files have changed.
+    """
+    version = __version__
+
+    def __init__(self, fileName=None):
+        self.fileName = fileName
+        self._folders = {}
+        self._loaded = False
+
+    def get(self, folder, signature):
+        """Returns the index entries of the Components in `folder`, or None if
+        the folder has changed (or not been searched)
+        """
+        if not self._loaded:
+            self.load()
+        saved = self._folders.get(folder)
+        if saved is None or saved['signature'] != signature:
+            return None
+        return saved['components']
+
+    def put(self, folder, signature, entries):
+        self._folders[folder] = {'signature': signature,
+                                 'components': entries}
+        self.save()
+
+    def clear(self):
+        self._folders = {}
+        self._loaded = True
+
+    def load(self):
+        """Load the index saved to file (if there is one)
+        """
+        self._loaded = True
+        if not self.fileName or not os.path.isfile(self.fileName):
+            return
+        try:
+            with io.open(self.fileName, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (IOError, OSError, ValueError) as err:
+            logging.warning("Couldn't load the components index from {}: {}"
+                            .format(self.fileName, err))
+            return
+        if saved.get('version') == self.version:
+            saved['folders'].update(self._folders)
+            self._folders = saved['folders']
+
+    def save(self):
+        """Save the index to its file
+        """
+        if not self.fileName:
+            return
+        saved = {'version': self.version, 'folders': self._folders}
+        try:
+            with io.open(self.fileName, 'w', encoding='utf-8') as f:
+                f.write(u"{}".format(json.dumps(saved)))
+        except (IOError, OSError) as err:
+            logging.warning("Couldn't save the components index to {}: {}"
+                            .format(self.fileName, err))
+
+
+componentsIndex = ComponentsIndex(
+    fileName=join(prefs.paths['userPrefsDir'], 'componentsIndex.json'))
+
+
+def _folderSignature(folder, cmpfiles):
+    """Returns the names, modified times and sizes of the files of the
+    components in a folder (and the components excluded), as a list
+    """
+    signature = [list(excludeComponents)]
+    for cmpfile in cmpfiles:
+        fullPath = join(folder, cmpfile)
+        if os.path.isdir(fullPath):
+            files = sorted(glob.glob(join(fullPath, '*.py')))
+        else:
+            files = [fullPath]
+        for thisFile in files:
+            try:
+                info = os.stat(thisFile)
+            except OSError:
+                continue
+            signature.append([thisFile, info.st_mtime, info.st_size])
+    return signature
+
+
 def getComponents(folder=None, fetchIcons=True):
     """Get a dictionary of available components for the Builder experiments.
 
-    If folder is None then the built-in components will be imported and
+    If folder is None then the built-in components will be found and
     returned, otherwise the components found in the folder provided will be.
+    Each component is imported when it is first used from the returned
+    dictionary (see `ComponentsDict`).
 
     Changed v1.84.00:
     The Builder preference "components folders" should be of the form:
@@ -100,7 +271,7 @@ def getComponents(folder=None, fetchIcons=True):
     else:
         # default shared location is often not actually a folder
         if not os.path.isdir(folder):
-            return {}
+            return ComponentsDict()
         pth = folder = folder.rstrip(os.sep)
         pkg = os.path.basename(folder)
         if not folder.endswith(join(pkg, pkg)):
@@ -124,17 +295,26 @@ def getComponents(folder=None, fetchIcons=True):
     if not pth in os.sys.path:
         os.sys.path.insert(0, pth)
 
-    components = {}
-
     # go through components in directory
     cfiles = glob.glob(os.path.join(folder, '*.py'))  # old-style: just comp.py
     # new-style: directories w/ __init__.py
     dfiles = [d for d in os.listdir(folder)
               if os.path.isdir(os.path.join(folder, d))]
-    for cmpfile in cfiles + dfiles:
-        cmpfile = os.path.split(cmpfile)[1]
-        if cmpfile[0] in '_0123456789':  # __init__.py, _base.py, leading digit
-            continue
+    cmpfiles = [os.path.split(cmpfile)[1] for cmpfile in cfiles + dfiles]
+    # __init__.py, _base.py, leading digit
+    cmpfiles = [cmpfile for cmpfile in cmpfiles
+                if cmpfile[0] not in '_0123456789']
+
+    components = ComponentsDict()
+    signature = _folderSignature(folder, cmpfiles)
+    entries = componentsIndex.get(folder, signature)
+    if entries is not None:
+        for entry in entries:
+            components[entry['name']] = entry
+        return components
+
+    entries = OrderedDict()
+    for cmpfile in cmpfiles:
         # can't use imp - breaks py2app:
         # module = imp.load_source(file[:-3], fullPath)
         # v1.83.00 used exec(implicit-relative), no go for python3:
@@ -153,33 +333,28 @@ def getComponents(folder=None, fetchIcons=True):
         if hasattr(module, '__file__') and module.__file__.endswith('.pyc'):
             if not os.path.isfile(module.__file__[:-1]):
                 continue  # looks like an orphaned pyc file
-        # give a default category
-        if not hasattr(module, 'categories'):
-            module.categories = ['Custom']
         # check if module contains a component
         for attrib in dir(module):
-            name = None
             # fetch the attribs that end with 'Component'
             if (attrib.endswith('omponent') and
                     attrib not in excludeComponents):
-                name = attrib
-                components[attrib] = getattr(module, attrib)
-
-                # skip if this class was imported, not defined here
-                if module.__name__ != components[attrib].__module__:
-                    continue  # class was defined in different module
-
-                if hasattr(module, 'tooltip'):
-                    tooltips[name] = module.tooltip
-                if hasattr(module, 'iconFile'):
-                    iconFiles[name] = module.iconFile
-                # assign the module categories to the Component
-                if not hasattr(components[attrib], 'categories'):
-                    components[attrib].categories = ['Custom']
+                components[attrib] = _importComponent(module.__name__,
+                                                       attrib)
+                # index the module defining the class (if it was imported
+                # from another one) so only that is imported when used
+                moduleName = components[attrib].__module__
+                if getattr(os.sys.modules.get(moduleName), attrib,
+                           None) is not components[attrib]:
+                    moduleName = module.__name__
+                entries[attrib] = {
+                    'name': attrib,
+                    'module': moduleName,
+                    'categories': list(components.getCategories(attrib)),
+                    'iconFile': iconFiles.get(attrib)}
+    componentsIndex.put(folder, signature, list(entries.values()))
     return components
 
 
-
 def getInitVals(params, target="PsychoPy"):
     """Works out a suitable initial value for a parameter (e.g. to go into the
     __init__ of a stimulus object, avoiding using a variable name if possible
@@ -58,11 +58,12 @@ class MouseComponent(BaseComponent):
         # params
         msg = _translate(
             "How often should the mouse state (x,y,buttons) be stored? "
-            "On every video frame, every click or just at the end of the "
-            "Routine?")
+            "On every video frame, every click, every movement of the mouse "
+            "(trajectory) or just at the end of the Routine?")
         self.params['saveMouseState'] = Param(
             save, valType='str',
-            allowedVals=['final', 'on click', 'every frame', 'never'],
+            allowedVals=['final', 'on click', 'every frame', 'trajectory',
+                         'never'],
             hint=msg,
             label=_localized['saveMouseState'])
 
@@ -120,6 +121,14 @@ class MouseComponent(BaseComponent):
             label=_localized['Store params for clicked'])
 
 
+    @property
+    def _saveMouseStateJS(self):
+        # PsychoJS doesn't record trajectories so they are sampled every frame
+        store = self.params['saveMouseState'].val
+        if store == 'trajectory':
+            return 'every frame'
+        return store
+
     @property
     def _clickableParamsList(self):
         # convert clickableParams (str) to a list
@@ -209,7 +218,7 @@ class MouseComponent(BaseComponent):
         """Write the code that will be called at the start of the routine"""
 
         code = ("// setup some python lists for storing info about the %(name)s\n")
-        if self.params['saveMouseState'].val in ['every frame', 'on click']:
+        if self._saveMouseStateJS in ['every frame', 'on click']:
             code += ("// current position of the mouse:\n"
                      "%(name)s.x = [];\n"
                      "%(name)s.y = [];\n"
@@ -245,7 +254,8 @@ class MouseComponent(BaseComponent):
 
         # might not be saving clicks, but want it to force end of trial
         if (self.params['saveMouseState'].val not in
-                ['every frame', 'on click'] and forceEnd == 'never'):
+                ['every frame', 'on click', 'trajectory'] and
+                forceEnd == 'never'):
             return
 
         buff.writeIndented("# *%s* updates\n" % self.params['name'])
@@ -255,6 +265,8 @@ class MouseComponent(BaseComponent):
         code = ("%(name)s.status = STARTED\n")
         if self.params['timeRelativeTo'].val.lower() == 'mouse onset':
             code += "%(name)s.mouseClock.reset()\n"
+        if self.params['saveMouseState'].val == 'trajectory':
+            code += "%(name)s.startTrajectory()\n"
 
         if self.params['newClicksOnly']:
             code += (
@@ -274,6 +286,9 @@ class MouseComponent(BaseComponent):
             # writes an if statement to determine whether to draw etc
             self.writeStopTestCode(buff)
             buff.writeIndented("%(name)s.status = FINISHED\n" % self.params)
+            if self.params['saveMouseState'].val == 'trajectory':
+                buff.writeIndented("%(name)s.stopTrajectory()\n"
+                                   % self.params)
             # to get out of the if statement
             buff.setIndentLevel(-2, relative=True)
 
@@ -371,7 +386,7 @@ class MouseComponent(BaseComponent):
         # frame or each click)
 
         # might not be saving clicks, but want it to force end of trial
-        if (self.params['saveMouseState'].val not in
+        if (self._saveMouseStateJS not in
                 ['every frame', 'on click'] and forceEnd == 'never'):
             return
         buff.writeIndented("// *%s* updates\n" % self.params['name'])
@@ -413,7 +428,7 @@ class MouseComponent(BaseComponent):
         dedentAtEnd = 1  # keep track of how far to dedent later
 
         # write param checking code
-        if (self.params['saveMouseState'].val == 'on click'
+        if (self._saveMouseStateJS == 'on click'
                 or forceEnd in ['any click', 'valid click']):
             code = ("let buttons = %(name)s.getPressed();\n")
             buff.writeIndentedLines(code % self.params)
@@ -429,12 +444,12 @@ class MouseComponent(BaseComponent):
             buff.setIndentLevel(1, relative=True)
             dedentAtEnd += 1
 
-        elif self.params['saveMouseState'].val == 'every frame':
+        elif self._saveMouseStateJS == 'every frame':
             code = "let buttons = %(name)s.getPressed();\n" % self.params
             buff.writeIndented(code)
 
         # only do this if buttons were pressed
-        if self.params['saveMouseState'].val in ['on click', 'every frame']:
+        if self._saveMouseStateJS in ['on click', 'every frame']:
             code = ("const xys = %(name)s.getPos();\n"
                     "%(name)s.x.push(xys[0]);\n"
                     "%(name)s.y.push(xys[1]);\n"
@@ -527,6 +542,27 @@ class MouseComponent(BaseComponent):
                                         name=name,
                                         param=paramName))
 
+        elif store == 'trajectory':
+            if self.params['timeRelativeTo'].val.lower() == 'experiment':
+                clockStr = 'globalClock'
+            else:
+                clockStr = '%s.mouseClock' % name
+            # the whole trajectory is retrieved as arrays at the end
+            code = ("{name}.stopTrajectory()\n"
+                    "{name}.trajectory = {name}.getTrajectory(clock={clock})\n")
+            for property in ['x', 'y', 'leftButton', 'midButton',
+                             'rightButton', 'time']:
+                code += ("{loopName}.addData('{name}.%s', "
+                         "{name}.trajectory['%s'].tolist())\n"
+                         % (property, property))
+            if self.params['clickable'].val:
+                for paramName in self._clickableParamsList:
+                    code += ("{loopName}.addData('{name}.clicked_%s', "
+                             "{name}.clicked_%s)\n" % (paramName, paramName))
+            buff.writeIndentedLines(
+                code.format(loopName=currLoop.params['name'], name=name,
+                            clock=clockStr))
+
         elif store != 'never':
             # buff.writeIndented("# save %(name)s data\n" %(self.params))
             mouseDataProps = ['x', 'y', 'leftButton', 'midButton',
@@ -562,7 +598,7 @@ class MouseComponent(BaseComponent):
         # some shortcuts
         name = self.params['name']
         # do this because the param itself is not a string!
-        store = self.params['saveMouseState'].val
+        store = self._saveMouseStateJS
         if store == 'nothing':
             return
 
@@ -522,6 +522,13 @@ class SettingsComponent(object):
             dstFolder = os.path.split(dstAbs)[0]
             if not os.path.isdir(dstFolder):
                 os.makedirs(dstFolder)
+            # copy2 keeps the modified time, so skip files already copied
+            if os.path.isfile(dstAbs):
+                srcStat = os.stat(srcFile['abs'])
+                dstStat = os.stat(dstAbs)
+                if (srcStat.st_size == dstStat.st_size and
+                        srcStat.st_mtime == dstStat.st_mtime):
+                    continue
             shutil.copy2(srcFile['abs'], dstAbs)
 
     def writeInitCodeJS(self, buff, version, localDateTime, modular=True):
@@ -213,7 +213,7 @@ class Flow(list):
             self._currentRoutine = entry
             # very few components need writeStartCode:
             if hasattr(entry, 'writeStartCode'):
-                entry.writeStartCode(script)
+                self.exp._writeFragment(script, entry, 'writeStartCode')
 
     def writeBody(self, script):
         """Write the rest of the code
@@ -222,7 +222,7 @@ class Flow(list):
         for entry in self:
             # NB each entry is a routine or LoopInitiator/Terminator
             self._currentRoutine = entry
-            entry.writeInitCode(script)
+            self.exp._writeFragment(script, entry, 'writeInitCode')
         # create clocks (after initialising stimuli)
         code = ("\n# Create some handy timers\n"
                 "globalClock = core.Clock()  # to track the "
@@ -233,11 +233,11 @@ class Flow(list):
         # run-time code
         for entry in self:
             self._currentRoutine = entry
-            entry.writeMainCode(script)
+            self.exp._writeFragment(script, entry, 'writeMainCode')
         # tear-down code (very few components need this)
         for entry in self:
             self._currentRoutine = entry
-            entry.writeExperimentEndCode(script)
+            self.exp._writeFragment(script, entry, 'writeExperimentEndCode')
 
 
     def writeFlowSchedulerJS(self, script):
@@ -172,17 +172,7 @@ class Param(object):
                     return s
             return repr(self.val)
         elif self.valType in ['code', 'extendedCode']:
-            isStr = isinstance(self.val, basestring)
-            if isStr and self.val.startswith("$"):
-                # a $ in a code parameter is unnecessary so remove it
-                val = "%s" % self.val[1:]
-            elif isStr and self.val.startswith("\$"):
-                # the user actually wanted just the $
-                val = "%s" % self.val[1:]
-            elif isStr:
-                val = "%s" % self.val
-            else:  # if val was a tuple it needs converting to a string first
-                val = "%s" % repr(self.val)
+            val = self._codeVal()
             if utils.scriptTarget == "PsychoJS":
                 if self.valType == 'code':
                     valJS = py2js.expression2js(val)
@@ -203,6 +193,36 @@ class Param(object):
             raise TypeError("Can't represent a Param of type %s" %
                             self.valType)
 
+    def _codeVal(self):
+        """The python code for a param of valType 'code' or 'extendedCode'
+        """
+        isStr = isinstance(self.val, basestring)
+        if isStr and self.val.startswith("$"):
+            # a $ in a code parameter is unnecessary so remove it
+            val = "%s" % self.val[1:]
+        elif isStr and self.val.startswith("\$"):
+            # the user actually wanted just the $
+            val = "%s" % self.val[1:]
+        elif isStr:
+            val = "%s" % self.val
+        else:  # if val was a tuple it needs converting to a string first
+            val = "%s" % repr(self.val)
+        return val
+
+    def getExpressionsJS(self):
+        """Return a list of the python expressions in this param that are
+        converted to JS (by `py2js.expression2js`) when the param is
+        written to a PsychoJS script
+        """
+        if self.valType == 'code':
+            return [self._codeVal()]
+        elif self.valType == 'str' and isinstance(self.val, basestring):
+            if utils.unescapedDollarSign_re.search(self.val):
+                return [_codeFromParamStr(self.val)]
+        elif self.valType == 'list' and isinstance(self.val, basestring):
+            return [self.val.strip()]
+        return []
+
     def __eq__(self, other):
         """Test for equivalence is needed for Params because what really
         typically want to test is whether the val is the same
@@ -227,15 +247,19 @@ def getCodeFromParamStr(val):
     """Convert a Param.val string to its intended python code
     (as triggered by special char $)
     """
-    tmp = re.sub(r"^(\$)+", '', val)  # remove leading $, if any
-    # remove all nonescaped $, squash $$$$$
-    tmp2 = re.sub(r"([^\\])(\$)+", r"\1", tmp)
-    out = re.sub(r"[\\]\$", '$', tmp2)  # remove \ from all \$
+    out = _codeFromParamStr(val)
     if utils.scriptTarget=='PsychoJS':
         out = py2js.expression2js(out)
     return out
 
 
+def _codeFromParamStr(val):
+    tmp = re.sub(r"^(\$)+", '', val)  # remove leading $, if any
+    # remove all nonescaped $, squash $$$$$
+    tmp2 = re.sub(r"([^\\])(\$)+", r"\1", tmp)
+    return re.sub(r"[\\]\$", '$', tmp2)  # remove \ from all \$
+
+
 def toList(val):
     """
 
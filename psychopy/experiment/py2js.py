@@ -11,10 +11,17 @@ to JS (ES6/PsychoJS)
 
 import ast
 import astunparse
+import atexit
 import esprima
+import io
+import json
+import multiprocessing
+import os
+from collections import OrderedDict
 from os import path
+from past.builtins import basestring
 from psychopy.constants import PY3
-from psychopy import logging
+from psychopy import logging, prefs, __version__
 
 if PY3:
     from past.builtins import unicode
@@ -71,8 +78,167 @@ def unparse(tree):
     return v.getvalue()
 
 
+class TranspilerCache(object):
+    """A least-recently-used cache of code translated from Python to JS.
+
+    The cache can be saved to a file (as it is when Python exits), so the
+    translations are shared between sessions. Saved translations are only
+    used with the version of PsychoPy that made them.
+
+    Parameters
+    ----------
+    maxSize : int
+        The maximum number of translations kept.
+    fileName : str or None
+        The file the cache is loaded from (on first use) and saved to.
+        If None, the cache isn't saved.
+    """
+    version = __version__
+
+    def __init__(self, maxSize=10000, fileName=None):
+        self.maxSize = maxSize
+        self.fileName = fileName
+        self._entries = OrderedDict()
+        self._loaded = False
+        self._dirty = False
+
+    def get(self, kind, source):
+        """Return the translation of `source` (by the translator called
+        `kind`), or None if it isn't cached.
+        """
+        if not self._loaded:
+            self.load()
+        key = (kind, source)
+        try:
+            translation = self._entries.pop(key)
+        except KeyError:
+            return None
+        self._entries[key] = translation  # now the most recently used
+        return translation
+
+    def put(self, kind, source, translation):
+        """Add the translation of `source` by the translator `kind`
+        """
+        if not self._loaded:
+            self.load()
+        self._entries.pop((kind, source), None)
+        self._entries[(kind, source)] = translation
+        while len(self._entries) > self.maxSize:
+            self._entries.popitem(last=False)
+        self._dirty = True
+
+    def clear(self):
+        self._entries.clear()
+        self._dirty = True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self):
+        """Add the translations saved in the cache file (if there is one)
+        to those in memory.
+        """
+        self._loaded = True
+        if not self.fileName or not path.isfile(self.fileName):
+            return
+        try:
+            with io.open(self.fileName, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (IOError, OSError, ValueError) as err:
+            logging.warning("Couldn't load the py2js cache from {}: {}"
+                            .format(self.fileName, err))
+            return
+        if saved.get('version') != self.version:
+            return
+        entries = OrderedDict(((kind, source), translation)
+                              for kind, source, translation
+                              in saved.get('entries', []))
+        # translations made in this session are more recent
+        entries.update(self._entries)
+        self._entries = entries
+        while len(self._entries) > self.maxSize:
+            self._entries.popitem(last=False)
+
+    def save(self):
+        """Save the cache to its file, if anything has been added to it
+        """
+        if not self.fileName or not self._dirty:
+            return
+        saved = {'version': self.version,
+                 'entries': [[kind, source, translation]
+                             for (kind, source), translation
+                             in self._entries.items()]}
+        try:
+            with io.open(self.fileName, 'w', encoding='utf-8') as f:
+                f.write(u"{}".format(json.dumps(saved)))
+            self._dirty = False
+        except (IOError, OSError) as err:
+            logging.warning("Couldn't save the py2js cache to {}: {}"
+                            .format(self.fileName, err))
+
+
+transpilerCache = TranspilerCache(
+    fileName=path.join(prefs.paths['userPrefsDir'], 'py2jsCache.json'))
+atexit.register(transpilerCache.save)
+
+# the number of (uncached) expressions for expressions2js to use a process
+# pool, below which starting the processes takes longer than the translation
+poolThreshold = 2000
+
+
 def expression2js(expr):
-    """Convert a short expression (e.g. a Component Parameter) Python to JS"""
+    """Convert a short expression (e.g. a Component Parameter) Python to JS
+
+    Translations are cached in `transpilerCache`.
+    """
+    if not isinstance(expr, basestring):
+        return _expression2js(expr)
+    jsStr = transpilerCache.get('expression', expr)
+    if jsStr is None:
+        jsStr = _expression2js(expr)
+        if jsStr is not None:
+            transpilerCache.put('expression', expr, jsStr)
+    return jsStr
+
+
+def expressions2js(expressions, processes=None):
+    """Convert a sequence of short expressions from Python to JS in one
+    call, returning a list of the translations (as `expression2js()`).
+
+    If there are at least `poolThreshold` expressions that aren't in the
+    cache already, they are translated by a pool of `processes` worker
+    processes (by default one for each CPU).
+    """
+    translations = {}
+    toTranslate = []
+    for expr in expressions:
+        if not isinstance(expr, basestring) or expr in translations:
+            continue
+        translations[expr] = transpilerCache.get('expression', expr)
+        if translations[expr] is None:
+            toTranslate.append(expr)
+
+    if len(toTranslate) >= poolThreshold:
+        processes = processes or multiprocessing.cpu_count()
+        pool = multiprocessing.Pool(processes)
+        try:
+            chunkSize = max(1, len(toTranslate) // (processes * 4))
+            results = pool.map(_expression2js, toTranslate, chunkSize)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_expression2js(expr) for expr in toTranslate]
+
+    for expr, jsStr in zip(toTranslate, results):
+        translations[expr] = jsStr
+        if jsStr is not None:
+            transpilerCache.put('expression', expr, jsStr)
+    return [translations[expr] if isinstance(expr, basestring)
+            else _expression2js(expr) for expr in expressions]
+
+
+def _expression2js(expr):
 
     # if the code contains a tuple (anywhere), convert parenths to be list.
     # This now works for compounds like `(2*(4, 5))` where the inner
@@ -115,66 +281,120 @@ def findUndeclaredVariables(ast, allUndeclaredVariables):
     """Detect undeclared variables
     """
     undeclaredVariables = []
+    # a set of the variables found so far, for quick look-ups
+    if isinstance(allUndeclaredVariables, set):
+        found = allUndeclaredVariables
+    else:
+        found = set(allUndeclaredVariables)
+
+    for variableName in _assignedVariables(ast):
+        if variableName not in found:
+            undeclaredVariables.append(variableName)
+            found.add(variableName)
+            if found is not allUndeclaredVariables:
+                allUndeclaredVariables.append(variableName)
+    return undeclaredVariables
 
+
+def _assignedVariables(ast):
+    """Yield the names of variables assigned to (in order, possibly more
+    than once) by the statements of a function
+    """
     for expression in ast:
         if expression.type == 'ExpressionStatement':
             expression = expression.expression
             if expression.type == 'AssignmentExpression' and expression.operator == '=' and expression.left.type == 'Identifier':
-                variableName = expression.left.name
-                if variableName not in allUndeclaredVariables:
-                    undeclaredVariables.append(variableName)
-                    allUndeclaredVariables.append(variableName)
+                yield expression.left.name
         elif expression.type == 'IfStatement':
             if expression.consequent.body is None:
-                consequentVariables = findUndeclaredVariables(
-                        [expression.consequent], allUndeclaredVariables)
+                for name in _assignedVariables([expression.consequent]):
+                    yield name
             else:
-                consequentVariables = findUndeclaredVariables(
-                    expression.consequent.body, allUndeclaredVariables)
-            undeclaredVariables.extend(consequentVariables)
+                for name in _assignedVariables(expression.consequent.body):
+                    yield name
         elif expression.type == "ReturnStatement":
             if expression.argument.type == "FunctionExpression":
-                consequentVariables = findUndeclaredVariables(
-                    expression.argument.body.body, allUndeclaredVariables)
-                undeclaredVariables.extend(consequentVariables)
-    return undeclaredVariables
+                for name in _assignedVariables(
+                        expression.argument.body.body):
+                    yield name
+
+
+# the functions declared in segments of programs, by the code of the segment
+_functionsCache = {}
+_functionsCacheSize = 256
+
+
+def _findFunctions(program):
+    """Parse a program, returning the start index of each function declared
+    at the top level and the variables assigned to by the function.
+    """
+    if program in _functionsCache:
+        return _functionsCache[program]
+    ast = esprima.parseScript(program, {'range': True, 'tolerant': True})
+    functions = [(expression.range[0],
+                  list(_assignedVariables(expression.body.body)))
+                 for expression in ast.body
+                 if expression.type == 'FunctionDeclaration']
+    if len(_functionsCache) >= _functionsCacheSize:
+        _functionsCache.clear()
+    _functionsCache[program] = functions
+    return functions
 
 
 def addVariableDeclarations(inputProgram, fileName):
     """Transform the input program by adding just before each function
     a declaration for its undeclared variables
+
+    The program can be given as a list of segments, each a sequence of
+    complete statements (e.g. the functions for one Routine). The segments
+    are parsed separately, and the functions found in a segment are cached,
+    so a segment that is unchanged from a previous call isn't parsed again.
     """
+    if isinstance(inputProgram, (list, tuple)):
+        segments = inputProgram
+        inputProgram = ''.join(segments)
+    else:
+        segments = [inputProgram]
 
     # parse Javascript code into abstract syntax tree:
     # NB: esprima: https://media.readthedocs.org/pdf/esprima/4.0/esprima.pdf
+    functions = []
     try:
-        ast = esprima.parseScript(inputProgram, {'range': True, 'tolerant': True})
+        offset = 0
+        for segment in segments:
+            functions.extend((start + offset, variables)
+                             for start, variables in _findFunctions(segment))
+            offset += len(segment)
     except esprima.error_handler.Error as err:
+        if len(segments) > 1:
+            # report the error for the whole program
+            return addVariableDeclarations(inputProgram, fileName)
         logging.error("{0} in {1}".format(err, path.split(fileName)[1]))
         return inputProgram  # So JS can be written to file
 
     # find undeclared vars in functions and declare them before the function
-    outputProgram = inputProgram
-    offset = 0
-    allUndeclaredVariables = []
-
-    for expression in ast.body:
-        if expression.type == 'FunctionDeclaration':
-            # find all undeclared variables:
-            undeclaredVariables = findUndeclaredVariables(expression.body.body,
-                                                          allUndeclaredVariables)
-
-            # add declarations (var) just before the function:
-            funSpacing = ['', '\n'][len(undeclaredVariables) > 0]  # for consistent function spacing
-            declaration = funSpacing + '\n'.join(['var ' + variable + ';' for variable in
-                                     undeclaredVariables]) + '\n'
-            startIndex = expression.range[0] + offset
-            outputProgram = outputProgram[
-                            :startIndex] + declaration + outputProgram[
-                                                         startIndex:]
-            offset += len(declaration)
-
-    return outputProgram
+    outputProgram = []
+    lastIndex = 0
+    allUndeclaredVariables = set()
+
+    for startIndex, variables in functions:
+        # find all undeclared variables:
+        undeclaredVariables = []
+        for variableName in variables:
+            if variableName not in allUndeclaredVariables:
+                undeclaredVariables.append(variableName)
+                allUndeclaredVariables.add(variableName)
+
+        # add declarations (var) just before the function:
+        funSpacing = ['', '\n'][len(undeclaredVariables) > 0]  # for consistent function spacing
+        declaration = funSpacing + '\n'.join(['var ' + variable + ';' for variable in
+                                 undeclaredVariables]) + '\n'
+        outputProgram.append(inputProgram[lastIndex:startIndex])
+        outputProgram.append(declaration)
+        lastIndex = startIndex
+    outputProgram.append(inputProgram[lastIndex:])
+
+    return ''.join(outputProgram)
 
 
 if __name__ == '__main__':
@@ -16,6 +16,8 @@ except ImportError:
 
 import astunparse
 
+from psychopy.experiment.py2js import transpilerCache
+
 
 class psychoJSTransformer(ast.NodeTransformer):
     """PsychoJS-specific AST transformer
@@ -342,6 +344,8 @@ def transformPsychoJsCode(psychoJsCode, addons):
 def translatePythonToJavaScript(psychoPyCode):
     """Translate PsychoPy python code into PsychoJS JavaScript code.
 
+	Translations are cached in `psychopy.experiment.py2js.transpilerCache`.
+
 	Args:
 		psychoPyCode (str): the input PsychoPy python code
 
@@ -351,6 +355,14 @@ def translatePythonToJavaScript(psychoPyCode):
 	Raises:
 		(Exception): whenever a step of the translation process failed
 	"""
+    psychoJsCode = transpilerCache.get('code', psychoPyCode)
+    if psychoJsCode is None:
+        psychoJsCode = _translatePythonToJavaScript(psychoPyCode)
+        transpilerCache.put('code', psychoPyCode, psychoJsCode)
+    return psychoJsCode
+
+
+def _translatePythonToJavaScript(psychoPyCode):
 
     # get the Abstract Syntax Tree (AST)
     # this checks that the code is valid python
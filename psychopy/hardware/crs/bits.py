@@ -38,6 +38,8 @@ else:
 from . import shaders
 from psychopy import logging, core
 from .. import serialdevice
+from .devicelog import (StatusLog, TouchLog, RecordList, extractStatusEvents,
+                        extractTouchEvents)
 import threading
 try:
     import Queue
@@ -157,6 +159,21 @@ class status(dict):
     
     def __setstate__(self,value):
         for k,v in value.items(): self[k]=v
+
+    @classmethod
+    def fromRecord(cls, record):
+        """Makes a status from a record of a
+        psychopy.hardware.crs.devicelog.StatusLog
+        """
+        value = cls()
+        value['sample'] = int(record['sample'])
+        value['time'] = float(record['time'])
+        value['trigIn'] = int(record['trigIn'])
+        value['DIN'] = record['DIN'].tolist()
+        value['DWORD'] = int(record['DWORD'])
+        value['IR'] = record['IR'].tolist()
+        value['ADC'] = record['ADC'].tolist()
+        return value
         
 class event(dict):
     """clever dict like object or object like dict 
@@ -195,6 +212,15 @@ class event(dict):
     
     def __setstate__(self,value):
         for k,v in value.items(): self[k]=v
+
+    @classmethod
+    def fromRecord(cls, record):
+        """Makes an event from a record returned by
+        psychopy.hardware.crs.devicelog.extractStatusEvents
+        """
+        return cls(source=str(record['source']), t=float(record['time']),
+                   input=int(record['input']),
+                   direction=str(record['dir']))
         
 class touch(dict):
     """clever dict like object or object like dict 
@@ -230,6 +256,18 @@ class touch(dict):
     def __setstate__(self,value):
         for k,v in value.items(): self[k]=v
 
+    @classmethod
+    def fromRecord(cls, record):
+        """Makes a touch from a record of a
+        psychopy.hardware.crs.devicelog.TouchLog
+        """
+        if record['touched']:
+            direction = 'touched'
+        else:
+            direction = 'released'
+        return cls(t=float(record['time']), x=int(record['x']),
+                   y=int(record['y']), direction=direction)
+
 
 
 
@@ -1350,6 +1388,9 @@ class BitsSharp(BitsPlusPlus, serialdevice.SerialDevice):
         
         # members for storing status logs and reports
         self.statusQ=Queue.Queue(70000) # sets up a queue in which to store bits status events
+        # parses status reports into a ring buffer while logging
+        self.statusLog = StatusLog()
+        self.statusRecords = self.statusLog.getRecords() # status values as a numpy array
         self.statusValues=[] # full list of values recorded while logging the Bits# status
         self.status_nValues = 0 #number of status values recorded
         self.statusEvents=[] # list of meaningful events extracted from log
@@ -3477,7 +3518,9 @@ class BitsSharp(BitsPlusPlus, serialdevice.SerialDevice):
             Starts data logging in its own thread.
             
             Will run for t seconds, defrault 60 or until 
-            stopStatusLog() is called.
+            stopStatusLog() is called. If t is None it will run until
+            stopStatusLog() is called, keeping the most recent
+            bits.statusLog.maxRecords status values.
             
         Example:
             bits.startStatusLog()
@@ -3525,6 +3568,10 @@ class BitsSharp(BitsPlusPlus, serialdevice.SerialDevice):
             They can be accessed as statusValues[i]['sample'] or 
             statusValues[i].sample, statusValues[x].ADC[j].
             
+            The same values are in statusRecords as a numpy structured
+            array, e.g. statusRecords['time'] or statusRecords['DIN'][:, j],
+            which is much faster for long logs.
+            
             StatusEvents will end up containing dict like objects of
             the following style:
                 source, input, direction, time.
@@ -3947,63 +3994,37 @@ class BitsSharp(BitsPlusPlus, serialdevice.SerialDevice):
         
         args specifies the time over which to record status events.
         The minimum time is 10ms, less than this results in recording stopping after 
-        about 1 status report has been read.
+        about 1 status report has been read. If args is None recording continues
+        until self.stopStatusLog() is called.
         
-        Puts its results into a Queue.
+        Parses the reports into self.statusLog as they arrive.
         
         This function is normally run in its own thread so actions can be asynchronous.
         """
 
         t = args   # Get the time to run for
-        if t < 0.01: # But if very short treat as a 1-shot read.
+        if t is None: # Run until stopped
+            oneshot = False
+        elif t < 0.01: # But if very short treat as a 1-shot read.
             oneshot = True
             t = 0.01
         else:
             oneshot = False
         sT=clock() # start time
-        msg=""
         # Continue reading data until sample time is up or status.End is set
         # Note when used in thread statusEnd canbe set from outside this function.
-        while (clock() - sT < t) and (self.statusEnd == False):
+        while ((t is None or clock() - sT < t)
+                and (self.statusEnd == False)):
             smsg=self.read(timeout=0.1)
-            # Compile message strings
-            if smsg:
-                msg=msg + smsg.decode("utf-8")
+            # Parse any complete status reports
+            self.statusLog.feed(smsg)
             # Stop if we have 1 whole status string in one shot mode
-            if len(msg) > self._statusSize and oneshot:
+            if oneshot and len(self.statusLog):
                 self.statusEnd = True
         # Send stop signal to CRS device to shut it up.
         self._statusDisable() # Send stop signal to CRS device to shut it up.
         self.statusEnd = True # Confirm that data logging has ended.
-        if msg: # If we actually have a message
-            lines = msg.split('\r') # Split message into status lines marked by CR
-            N = len(lines) 
-            values = [status() for  i in range(N-1)] # ignore last line as likely to be error
-            for i in range(N-1): # for each status line
-                v=lines[i].split(';') # split line into compoment parts marked by ;
-                if v[0] == '#sample': # Check we have read a status line
-                    # Now strip out statsu values into a structure.
-                    values[i].sample = int(float(v[1]))
-                    values[i].time = float(v[2])
-                    values[i].trigIn = int(float(v[3]))
-                    dword = 0;
-                    for j in range(10): #10 digital inputs
-                        values[i].DIN[j] = int(float(v[4+j]))
-                        dword=dword + (2**j) * values[i].DIN[j]
-                    values[i].DWORD = dword
-                    for j in range(6): # 6 IR buttons
-                        values[i].IR[j] = int(float(v[14+j]))
-                    for j in range(6): # 6 Analog inputs
-                        values[i].ADC[j] = float(v[20+j])
-                    # Put the structure onto the cue.
-                    self.statusQ.put(values[i])
-                elif v[0] == '$touch': # We've read a screen touch event by mistake.
-                    warning = ("_statusLog found touch" 
-                            " data on input so skipping that")
-                    logging.warning(warning)
-                else: # We've read something we can't interpret.
-                    warning = ("_statusLog found unknown data"
-                            " on input so skipping that")
+        self.statusLog.finish() # ignore last line as likely to be error
 
 
 
@@ -4020,16 +4041,15 @@ class BitsSharp(BitsPlusPlus, serialdevice.SerialDevice):
         They can be accessed as statusValues[i]['sample'] 
         or statusValues[i].sample, statusValues[i].ADC[j]
         
-        Also sets status_nValues to the number of values recorded.
+        Also sets status_nValues to the number of values recorded, and
+        statusRecords to the values as a numpy structured array.
         """
 
-        if not(self.statusQ.empty()):
-            # emply statusValues of correct size
-            self.statusValues = [
-                        status() for  i in range(self.statusQ.qsize())]
-            # Take the status values off the queue
-            for index in range(0,self.statusQ.qsize()):
-                self.statusValues[index] = self.statusQ.get()
+        if len(self.statusLog):
+            # Take the status values out of the log
+            self.statusRecords = self.statusLog.takeRecords()
+            self.statusValues = RecordList(self.statusRecords,
+                                           status.fromRecord)
             self.status_nValues = len(self.statusValues)
         else:
             self.status_nValues = 0
@@ -4062,129 +4082,15 @@ class BitsSharp(BitsPlusPlus, serialdevice.SerialDevice):
         
         """
         
-        DIN_baseAll = [0]*10
-        IR_baseAll = [0]*6
-        ADC_baseAll = [self.statusADCBase]*6
-        # Interpret statusDINBase and statusIRBase statusADCBase into lists.
-        for i in range(10):
-            mask = 2**i
-            if mask & self.statusDINBase:
-                DIN_baseAll[i] = 1
-        for i in range(6):
-            mask = 2**i
-            if mask & self.statusIRBase:
-                IR_baseAll[i] = 1
-       
-        Trig_base = self.statusTrigInBase
-        N = len(self.statusValues)
-
-        self.statusEvents = []
-        nEvents = 0
-        for i in range(N):
-            DIN = self.statusValues[i].DIN 
-            IR = self.statusValues[i].IR
-            Trig = self.statusValues[i].trigIn
-            ADC = self.statusValues[i].ADC
-            # For 10 digital inputs
-            for j in range(10):
-                # Has input changed high to low and is that direction being recorded?
-                if (DIN[j] == 0) and (DIN_baseAll[j] == 1): 
-                    if ('down' in self.statusMode
-                        or 'Down' in self.statusMode):
-                        self.statusEvents.append(event())
-                        self.statusEvents[nEvents].source = 'DIN'
-                        self.statusEvents[nEvents].input = j
-                        self.statusEvents[nEvents].dir = 'down'
-                        self.statusEvents[nEvents].time = self.statusValues[i].time
-                        nEvents = nEvents + 1
-                    DIN_baseAll[j] = 0  # Set to the current input state
-                # Has input changed low to high and is that direction being recorded?
-                if (DIN[j] == 1) and (DIN_baseAll[j] == 0):
-                    if ('up' in self.statusMode
-                        or 'Up' in self.statusMode):
-                        self.statusEvents.append(event())
-                        self.statusEvents[nEvents].source = 'DIN'
-                        self.statusEvents[nEvents].input = j
-                        self.statusEvents[nEvents].dir = 'up'
-                        self.statusEvents[nEvents].time = self.statusValues[i].time
-                        nEvents = nEvents + 1
-                    DIN_baseAll[j] = 1 # Set to the current input state
-                    
-            # For 6 IR buttons
-            for j in range(6):
-                # Has button changed high to low and is that direction being recorded?
-                if (IR[j] == 0) and (IR_baseAll[j] == 1):
-                    if ('down' in self.statusMode
-                        or 'Down' in self.statusMode):
-                        self.statusEvents.append(event())
-                        self.statusEvents[nEvents].source = 'IR'
-                        self.statusEvents[nEvents].input = j
-                        self.statusEvents[nEvents].dir = 'down'
-                        self.statusEvents[nEvents].time = self.statusValues[i].time
-                        nEvents = nEvents + 1
-                    IR_baseAll[j] = 0 # Set to the current input state
-                    
-                # Has button changed low to high and is that direction being recorded?
-                if (IR[j] == 1) and (IR_baseAll[j]==0):
-                    if ('up' in self.statusMode
-                        or 'Up' in self.statusMode):
-                        self.statusEvents.append(event())
-                        self.statusEvents[nEvents].source = 'IR'
-                        self.statusEvents[nEvents].input = j
-                        self.statusEvents[nEvents].dir = 'up'
-                        self.statusEvents[nEvents].time = self.statusValues[i].time
-                        nEvents = nEvents + 1
-                    IR_baseAll[j] = 1 # Set to the current input state
-            for j in range(6):
-                # Has analog input changed high to low and is that direction being recorded?
-                if ADC_baseAll[j] - ADC[j] > self.statusThreshold:
-                    if ('down' in self.statusMode
-                        or 'Down' in self.statusMode):
-                        self.statusEvents.append(event())
-                        self.statusEvents[nEvents].source = 'ADC'
-                        self.statusEvents[nEvents].input = j
-                        self.statusEvents[nEvents].dir = 'down'
-                        self.statusEvents[nEvents].time = self.statusValues[i].time
-                        nEvents = nEvents + 1
-                    ADC_baseAll[j] = ADC[j]
-                    
-                # Has analog input changed low to high and is that direction being recorded?
-                if ADC[j] - ADC_baseAll[j]  > self.statusThreshold:
-                    if ('up' in self.statusMode
-                        or 'Up' in self.statusMode):
-                        self.statusEvents.append(event())
-                        self.statusEvents[nEvents].source = 'ADC'
-                        self.statusEvents[nEvents].input = j
-                        self.statusEvents[nEvents].dir = 'up'
-                        self.statusEvents[nEvents].time = self.statusValues[i].time
-                        nEvents = nEvents + 1
-                    ADC_baseAll[j] = ADC[j]
-                    
-            # Has trigger changed high to low and is that direction being recorded?
-            if Trig == 0 and Trig_base == 1:
-                if ('down' in self.statusMode
-                    or 'Down' in self.statusMode):
-                    self.statusEvents.append(event())
-                    self.statusEvents[nEvents].source='Trigger'
-                    self.statusEvents[nEvents].input=0
-                    self.statusEvents[nEvents].dir='down'
-                    self.statusEvents[nEvents].time=self.statusValues[i].time
-                    nEvents=nEvents+1
-                Trig_base = 0 # Set to the current input state
-                
-            # Has trigger changed low to high and is that direction being recorded?
-            if Trig == 1 and Trig_base == 0:
-                if ('up' in self.statusMode
-                    or 'Up' in self.statusMode):
-                    self.statusEvents.append(event())
-                    self.statusEvents[nEvents].source = 'Trigger'
-                    self.statusEvents[nEvents].input = 0
-                    self.statusEvents[nEvents].dir = 'up'
-                    self.statusEvents[nEvents].time = self.statusValues[i].time
-                    nEvents = nEvents + 1
-                Trig_base = 1 # Set to the current input state
-                
-        self.status_nEvents=nEvents
+        events = extractStatusEvents(self.statusRecords,
+                                     DINBase=self.statusDINBase,
+                                     IRBase=self.statusIRBase,
+                                     TrigInBase=self.statusTrigInBase,
+                                     ADCBase=self.statusADCBase,
+                                     threshold=self.statusThreshold,
+                                     mode=self.statusMode)
+        self.statusEvents = [event.fromRecord(e) for e in events]
+        self.status_nEvents = len(self.statusEvents)
 
 
 
@@ -4397,8 +4303,9 @@ class DisplayPlusPlusTouch(DisplayPlusPlus):
         self.touch_nEvents=0
         self.touchValues=[] 
         self.touchEvents=[]
-        # Set up a queue in which to store touch screen events.
-        self.touchQ = Queue.Queue(70000) 
+        # Parses touch screen events into a ring buffer while logging.
+        self.touchLog = TouchLog()
+        self.touchRecords = self.touchLog.getRecords() # touchValues as a numpy array
 
     def __del__(self):
         super(DisplayPlusPlusTouch,self).__del__()
@@ -4846,6 +4753,9 @@ class DisplayPlusPlusTouch(DisplayPlusPlus):
         """ Start logging data from the touch screen.
         Truns on the troch screen.
         
+        Logs for t seconds or, if t is None, until stopTouchLog() is
+        called, keeping the most recent bits.touchLog.maxRecords touches.
+        
         Example:
             bits.startTouchLog()
             while not event:
@@ -4936,21 +4846,26 @@ class DisplayPlusPlusTouch(DisplayPlusPlus):
         
         Will get all the screen touches without checking for errors.
         
+        The same touches are in bits.touchRecords as a numpy structured
+        array (time, x, y, touched), which can be divided into down, move and
+        up events with psychopy.hardware.crs.devicelog.segmentTouches().
+        
         """
         if checkTime!=None:
             self.checkTime = checkTime
         
-        number = self.touchQ.qsize()
-        if not(self.touchQ.empty()):
-            self.touchValues=[touch() for  i in range(self.touchQ.qsize())]
-            for index in range(0,self.touchQ.qsize()):
-                self.touchValues[index]=self.touchQ.get()
+        number = len(self.touchLog)
+        if number:
+            records = self.touchLog.takeRecords()
                 
             #Display++ can sometimes issue a spurious touch event left over
             #from a previous series of touches. The following code should detect
             #and correct the error
             
-            lastTouch = self.touchValues[number-1].dir
+            if records['touched'][-1]:
+                lastTouch = 'touched'
+            else:
+                lastTouch = 'released'
             
             #No need to worry if only one touch recorded or the user is happy
             #to forgo checks.
@@ -4960,8 +4875,8 @@ class DisplayPlusPlusTouch(DisplayPlusPlus):
                 #Detects if first timestamp is after second
                 #Works if Display++ clock has  been reset between touch 
                 #data collection sessions.
-                if self.touchValues[0].time > self.touchValues[1].time:
-                    del self.touchValues[0]
+                if records['time'][0] > records['time'][1]:
+                    records = records[1:]
                     warning=("getTouchLog: Deleted first touch as recorded " 
                               "after second. This corrects an error in "
                               "the Display++")
@@ -4973,7 +4888,7 @@ class DisplayPlusPlusTouch(DisplayPlusPlus):
                 #error from the last run of an experiment that uses the 
                 #touch screen
                 elif self.lastTouch == 'touched':
-                    del self.touchValues[0]
+                    records = records[1:]
                     warning=("getTouchLog: Deleted first touch as the "
                              "last previously recorded touch event "
                              "was not a release and this can indicate an "
@@ -4989,14 +4904,14 @@ class DisplayPlusPlusTouch(DisplayPlusPlus):
                 #and if the other two tests failed and this is not
                 #the first call to this function the chances are it a good
                 #touch - hence just a warning in that case.
-                elif (self.touchValues[1].time 
-                       - self.touchValues[0].time) > self.checkTime:
+                elif (records['time'][1] 
+                       - records['time'][0]) > self.checkTime:
                     warning=("getTouchLog: Gap between first and second "
                              "touches is large normally finger jitter means "
                              "it is quite short.")
                     logging.warning(warning)
                     if self.touchFirstTime == False:
-                        del self.touchValues[0]
+                        records = records[1:]
                         warning=("getTouchLog: Deleted first touch as "
                                  "the gap between first "
                                  "and second touches is large "
@@ -5006,6 +4921,8 @@ class DisplayPlusPlusTouch(DisplayPlusPlus):
                         logging.warning(warning)
             self.lastTouch = lastTouch
             self.touchFirstTime = False
+            self.touchRecords = records
+            self.touchValues = RecordList(records, touch.fromRecord)
             self.touch_nValues=len(self.touchValues)
             return self.touchValues
         else:
@@ -5020,50 +4937,23 @@ class DisplayPlusPlusTouch(DisplayPlusPlus):
     #===============================================#
             
     def _touchLog(self, args=(60,)):
-        """ Gets raw touch screen events and put them in a Queue
+        """ Gets raw touch screen events and parses them into self.touchLog
             Not normally needed by the user.
+            If args is None logs until self.stopTouchLog() is called.
         """
         
         t = args # Get the time to run for
         sT = clock() # start time
-        msg = ""
         # While not timed out and until touchLogEnd is true
         # When run in a thread touchLogEnd can be set from outside this function.
-        while (clock() - sT < t) and (self.touchLogEnd == False):
-            # Complie the message
-            smsg = self.read(timeout = 0.1)
-            if smsg:
-                msg = msg+smsg.decode("utf-8")
+        while ((t is None or clock() - sT < t)
+                and (self.touchLogEnd == False)):
+            # Parse any complete touch events
+            self.touchLog.feed(self.read(timeout = 0.1))
         self.touchDisable() # Turn off touch screen.
         self.touchLogEnd=True # Make sure this function marked as ending.
         self.flush()
-        if msg:
-            lines = msg.split('\r') # Split message into lines with CR
-            N = len(lines)
-
-            values=[touch() for  i in range(N)]
-            #for all the touches
-            for i in range(N):
-                v = lines[i].split(';') # Split line into components at ;
-                # If we have read a touch event.
-                if '$touch' in v[0]:
-                    #Grab the details of the event into a structure.
-                    values[i].time = float(v[1])
-                    values[i].x = int(float(v[2]))
-                    values[i].y = int(float(v[3]))
-                    if int(float(v[4])) == 1:
-                        values[i].dir = 'touched'
-                    else:
-                        values[i].dir = 'released'
-                    self.touchQ.put(values[i])
-                elif '#status' in v[0]: # GOt a status event by mistake
-                    warning=("_touchLog found" 
-                            " status on input so skipping that")
-                    logging.warning(warning)
-                else: # Have picked up some other stuff on the input
-                    warning=("_touchLog found"
-                            " unknown data on input so skipping that")
-                    logging.warning(warning)
+        self.touchLog.finish()
 
 
     #============================================================#
@@ -5130,38 +5020,18 @@ class DisplayPlusPlusTouch(DisplayPlusPlus):
             
         """
         self.setTouchEventParams(distance,t,type)
-        N=len(self.touchValues)
-        self.touchEvents = []
-        nEvents = 0
-        rT = -999999
-        rX = -999999
-        rY = -999999
-        rType = 'None'
-        nEvents = 0
-        for i in range(N):
-            dist=(((self.touchValues[i].x - rX)**2.0)
-                  +((self.touchValues[i].y - rY)**2.0))**0.5
-            T = self.touchValues[i].time - rT
-            
-            # Only include events that are sufficiently far from
-            # last recorded event in time and distance, or if
-            # the direction of touch has changed and the new
-            # direction is in the looked for type descriptor.
-            if ((dist > self.touchDistance 
-                    and T > self.touchTime) 
-                or (rType != self.touchValues[i].dir 
-                    and self.touchValues[i].dir in self.touchType)):
-                self.touchEvents.append(touch())
-                self.touchEvents[nEvents].time = self.touchValues[i].time
-                self.touchEvents[nEvents].x = self.touchValues[i].x
-                self.touchEvents[nEvents].y = self.touchValues[i].y
-                self.touchEvents[nEvents].dir = self.touchValues[i].dir
-                rT = self.touchValues[i].time
-                rX = self.touchValues[i].x
-                rY = self.touchValues[i].y
-                rType = self.touchValues[i].dir
-                nEvents = nEvents + 1
-                self.touch_nEvents = nEvents
+        # Only include events that are sufficiently far from
+        # last recorded event in time and distance, or if
+        # the direction of touch has changed and the new
+        # direction is in the looked for type descriptor.
+        indices = extractTouchEvents(self.touchRecords,
+                                     distance=self.touchDistance,
+                                     t=self.touchTime,
+                                     types=self.touchType)
+        self.touchEvents = [touch.fromRecord(record)
+                            for record in self.touchRecords[indices]]
+        if len(self.touchEvents):
+            self.touch_nEvents = len(self.touchEvents)
         return self.touchEvents
 
 
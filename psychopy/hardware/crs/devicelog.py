@@ -0,0 +1,572 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Part of the PsychoPy library
+# Copyright (C) 2002-2018 Jonathan Peirce (C) 2019 Open Science Tools Ltd.
+# Distributed under the terms of the GNU General Public License (GPL).
+
+"""Parsers and buffers for the data streamed back by Bits# and Display++
+devices while logging their status.
+
+Serial input is parsed incrementally as it arrives into a preallocated NumPy
+structured array, used as a ring buffer so that logging can run for any
+length of time in bounded memory, and events are extracted from the whole
+log at once with array operations.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+from builtins import range
+from builtins import object
+
+import threading
+
+import numpy as np
+
+from psychopy import logging
+
+__all__ = ['STATUS_DTYPE', 'STATUS_EVENT_DTYPE', 'TOUCH_DTYPE',
+           'TOUCH_EVENT_DTYPE', 'StatusLog', 'TouchLog', 'RecordList',
+           'parseStatusLines', 'parseTouchLines', 'extractStatusEvents',
+           'extractTouchEvents', 'segmentTouches']
+
+# one status report: sample, time, trigIn, DIN[10], DWORD, IR[6], ADC[6]
+STATUS_DTYPE = np.dtype([('sample', np.int64),
+                         ('time', np.float64),
+                         ('trigIn', np.uint8),
+                         ('DIN', np.uint8, (10,)),
+                         ('DWORD', np.uint16),
+                         ('IR', np.uint8, (6,)),
+                         ('ADC', np.float64, (6,))])
+
+STATUS_EVENT_DTYPE = np.dtype([('source', 'U7'),
+                               ('input', np.uint8),
+                               ('dir', 'U4'),
+                               ('time', np.float64)])
+
+# one touch screen report
+TOUCH_DTYPE = np.dtype([('time', np.float64),
+                        ('x', np.int32),
+                        ('y', np.int32),
+                        ('touched', np.bool_)])
+
+# a touch screen report and the kind of event it is
+TOUCH_EVENT_DTYPE = np.dtype(TOUCH_DTYPE.descr + [('type', 'U4')])
+
+# the number of ;-separated values in a status report after '#sample'
+_nStatusFields = 25
+
+
+class _LineReader(object):
+    """Splits a stream of serial input into CR terminated lines, keeping any
+    incomplete line until the rest of it arrives."""
+
+    def __init__(self):
+        self._partial = b''
+
+    def readLines(self, data):
+        """Returns the complete lines in data (bytes), after any partial
+        line left from the previous call."""
+        lines = (self._partial + data).split(b'\r')
+        self._partial = lines.pop()
+        return lines
+
+    def clear(self):
+        """Discards any partial line (e.g. the last report when logging
+        stops, which can be bogus)."""
+        self._partial = b''
+
+    def takePartial(self):
+        """Returns any partial line (bytes), discarding it from the
+        reader."""
+        partial = self._partial
+        self._partial = b''
+        return partial
+
+
+class _RingBuffer(object):
+    """Preallocated structured array keeping the most recent maxRecords
+    records, in the order they were added."""
+
+    def __init__(self, dtype, maxRecords):
+        self._records = np.zeros(int(maxRecords), dtype=dtype)
+        self.count = 0  # total number of records ever added
+
+    @property
+    def maxRecords(self):
+        return len(self._records)
+
+    def __len__(self):
+        return min(self.count, len(self._records))
+
+    def extend(self, records):
+        size = len(self._records)
+        if len(records) >= size:
+            self._records[:] = records[-size:]
+            self._records = np.roll(self._records, self.count + len(records))
+        else:
+            start = self.count % size
+            end = start + len(records)
+            if end <= size:
+                self._records[start:end] = records
+            else:
+                split = size - start
+                self._records[start:] = records[:split]
+                self._records[:end - size] = records[split:]
+        self.count += len(records)
+
+    def getRecords(self):
+        """Returns a copy of the records, oldest first."""
+        size = len(self._records)
+        if self.count <= size:
+            return self._records[:self.count].copy()
+        start = self.count % size
+        return np.concatenate((self._records[start:],
+                               self._records[:start]))
+
+    def clear(self):
+        self.count = 0
+
+
+class _StreamLog(object):
+    """Base class for logs that parse lines of serial input as they arrive
+    into a ring buffer of records."""
+
+    dtype = None
+
+    def __init__(self, maxRecords=2**17):
+        self._lines = _LineReader()
+        self._buffer = _RingBuffer(self.dtype, maxRecords)
+        self.nSkipped = 0  # lines that could not be parsed
+        # feed() is normally called from the logging thread while the
+        # records are read from the main thread
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    @property
+    def count(self):
+        """Total number of records parsed, including any that have been
+        overwritten in the ring buffer."""
+        return self._buffer.count
+
+    @property
+    def maxRecords(self):
+        return self._buffer.maxRecords
+
+    def _parseLines(self, lines):
+        raise NotImplementedError
+
+    def feed(self, data):
+        """Parses the lines completed by data (bytes read from the device),
+        returning the number of records added."""
+        if not data:
+            return 0
+        with self._lock:
+            return self._addLines(self._lines.readLines(data))
+
+    def _addLines(self, lines):
+        records = self._parseLines(lines)
+        if len(records):
+            self._buffer.extend(records)
+        return len(records)
+
+    def finish(self):
+        """Discards any incomplete line at the end of the input."""
+        with self._lock:
+            self._lines.clear()
+
+    def getRecords(self):
+        """Returns the records in the buffer as an array with the log's
+        dtype, oldest first."""
+        with self._lock:
+            return self._buffer.getRecords()
+
+    def takeRecords(self):
+        """Returns the records in the buffer, as getRecords(), and empties
+        the buffer without losing any records fed in the meantime."""
+        with self._lock:
+            records = self._buffer.getRecords()
+            self._buffer.clear()
+        return records
+
+    def clear(self):
+        """Empties the log."""
+        with self._lock:
+            self._lines.clear()
+            self._buffer.clear()
+            self.nSkipped = 0
+
+
+class StatusLog(_StreamLog):
+    """Parses the status reports of a Bits# or Display++ as they are read
+    from the serial port.
+
+    Each report is a line like `#sample;n;time;trigIn;DIN0;...;DIN9;IR0;
+    ...;IR5;ADC0;...;ADC5;` terminated by CR. Pass the data read from the
+    device, in chunks of any size, to :meth:`feed`. Reports are stored in a
+    ring buffer of `maxRecords` records with the dtype
+    :data:`STATUS_DTYPE`; when it is full the oldest reports are
+    overwritten, so logging can continue indefinitely. Call
+    :meth:`finish` when logging stops, to discard the last report, which
+    can be bogus.
+
+    Example::
+
+        statusLog = StatusLog()
+        while logging:
+            statusLog.feed(bits.read(timeout=0.1))
+        statusLog.finish()
+        values = statusLog.getRecords()
+        print(values['time'], values['DIN'][:, 0])
+
+    """
+
+    dtype = STATUS_DTYPE
+
+    def _parseLines(self, lines):
+        return parseStatusLines(lines, self)
+
+
+class TouchLog(_StreamLog):
+    """Parses the touch screen reports of a Display++ as they are read from
+    the serial port.
+
+    Each report is a line like `$touch;time;x;y;touched` terminated by CR.
+    As for :class:`StatusLog`, pass the data read from the device to
+    :meth:`feed`; the reports are stored in a ring buffer with the dtype
+    :data:`TOUCH_DTYPE`.
+    """
+
+    dtype = TOUCH_DTYPE
+
+    def _parseLines(self, lines):
+        return parseTouchLines(lines, self)
+
+    def finish(self):
+        """Parses any report at the end of the input that wasn't
+        terminated."""
+        with self._lock:
+            partial = self._lines.takePartial()
+            if partial:
+                self._addLines([partial])
+
+
+def parseStatusLines(lines, log=None):
+    """Parses a list of status report lines (bytes, without the CR) into an
+    array with the dtype :data:`STATUS_DTYPE`.
+
+    Lines that are not status reports are skipped with a warning (and
+    counted in `log.nSkipped` if a :class:`StatusLog` is given).
+    """
+    fields = []
+    for line in lines:
+        values = line.split(b';')
+        if values[0] == b'#sample' and len(values) > _nStatusFields:
+            fields.extend(values[1:_nStatusFields + 1])
+        elif not line:
+            continue
+        else:
+            if log is not None:
+                log.nSkipped += 1
+            if values[0] == b'$touch':
+                # We've read a screen touch event by mistake.
+                logging.warning("_statusLog found touch"
+                                " data on input so skipping that")
+            else:
+                logging.warning("_statusLog found unknown data"
+                                " on input so skipping that")
+    nRecords = len(fields) // _nStatusFields
+    records = np.zeros(nRecords, dtype=STATUS_DTYPE)
+    if not nRecords:
+        return records
+    try:
+        values = np.array(fields).astype(np.float64)
+    except ValueError:
+        # a report garbled in transmission; parse them one at a time
+        return _parseStatusLinesSlowly(fields, log)
+    values = values.reshape(nRecords, _nStatusFields)
+    records['sample'] = values[:, 0]
+    records['time'] = values[:, 1]
+    records['trigIn'] = values[:, 2]
+    records['DIN'] = values[:, 3:13]
+    records['DWORD'] = np.dot(records['DIN'].astype(np.uint16),
+                              2 ** np.arange(10, dtype=np.uint16))
+    records['IR'] = values[:, 13:19]
+    records['ADC'] = values[:, 19:25]
+    return records
+
+
+def _parseStatusLinesSlowly(fields, log):
+    lines = []
+    for i in range(0, len(fields), _nStatusFields):
+        reportFields = fields[i:i + _nStatusFields]
+        try:
+            [float(value) for value in reportFields]
+        except ValueError:
+            if log is not None:
+                log.nSkipped += 1
+            logging.warning("_statusLog found unknown data"
+                            " on input so skipping that")
+            continue
+        lines.append(b';'.join([b'#sample'] + reportFields + [b'']))
+    return parseStatusLines(lines, log)
+
+
+def _isMode(mode, direction):
+    return direction in mode or direction.capitalize() in mode
+
+
+def _binaryEvents(states, base, source, mode):
+    """Events (sample, input, isUp) for changes in binary inputs, given the
+    states (nSamples x nInputs) and the initial state of each input."""
+    states = np.asarray(states, dtype=np.int8)
+    previous = np.vstack((np.asarray(base, dtype=np.int8)[np.newaxis, :],
+                          states[:-1]))
+    events = []
+    for direction, change in (('down', (states == 0) & (previous == 1)),
+                              ('up', (states == 1) & (previous == 0))):
+        if _isMode(mode, direction):
+            samples, inputs = np.nonzero(change)
+            events.append((samples, inputs, source, direction))
+    return events
+
+
+def _analogEvents(adc, base, threshold, mode, blockSize=4096):
+    """Events for analog inputs changing by more than threshold from the
+    value at the previous event (or the base value)."""
+    events = []
+    for j in range(adc.shape[1]):
+        values = adc[:, j]
+        reference = base
+        start = 0
+        size = 16
+        samples = []
+        directions = []
+        while start < len(values):
+            # search blocks that grow while there are no events, so that
+            # neither frequent nor rare events make this slow
+            block = values[start:start + size] - reference
+            changed = np.flatnonzero(np.abs(block) > threshold)
+            if not len(changed):
+                start += size
+                size = min(size * 2, blockSize)
+                continue
+            sample = start + changed[0]
+            samples.append(sample)
+            directions.append('up' if block[changed[0]] > 0 else 'down')
+            reference = values[sample]
+            start = sample + 1
+            size = 16
+        samples = np.asarray(samples, dtype=np.intp)
+        directions = np.asarray(directions)
+        for direction in ('down', 'up'):
+            if _isMode(mode, direction):
+                isDirection = directions == direction
+                events.append((samples[isDirection],
+                               np.full(isDirection.sum(), j, np.intp),
+                               'ADC', direction))
+    return events
+
+
+def extractStatusEvents(records, DINBase=0b1111111111, IRBase=0b111111,
+                        TrigInBase=0, ADCBase=0, threshold=9999.99,
+                        mode=('up', 'down')):
+    """Finds the events (changes of the inputs) in status reports.
+
+    The arguments are as for BitsSharp.setStatusEventParams(): the initial
+    states of the digital inputs, CB6 IR buttons and trigger input, the
+    initial analog input value, the change in an analog input that counts as
+    an event and the directions of the events to report.
+
+    Returns an array with the dtype :data:`STATUS_EVENT_DTYPE` (source,
+    input, dir, time), in time order and, for events in the same report, in
+    the order DIN, IR, ADC, Trigger, by input.
+    """
+    events = []
+    if len(records):
+        DINBaseAll = [(DINBase >> i) & 1 for i in range(10)]
+        IRBaseAll = [(IRBase >> i) & 1 for i in range(6)]
+        events += _binaryEvents(records['DIN'], DINBaseAll, 'DIN', mode)
+        events += _binaryEvents(records['IR'], IRBaseAll, 'IR', mode)
+        events += _analogEvents(records['ADC'], ADCBase, threshold, mode)
+        events += _binaryEvents(records['trigIn'][:, np.newaxis],
+                                [TrigInBase], 'Trigger', mode)
+    nEvents = sum(len(samples) for samples, _, _, _ in events)
+    out = np.zeros(nEvents, dtype=STATUS_EVENT_DTYPE)
+    if not nEvents:
+        return out
+    sourceOrder = ('DIN', 'IR', 'ADC', 'Trigger')
+    samples = np.concatenate([e[0] for e in events])
+    inputs = np.concatenate([e[1] for e in events])
+    order = np.concatenate([np.full(len(e[0]), sourceOrder.index(e[2]))
+                            for e in events])
+    out['source'] = np.concatenate([np.full(len(e[0]), e[2], 'U7')
+                                    for e in events])
+    out['dir'] = np.concatenate([np.full(len(e[0]), e[3], 'U4')
+                                 for e in events])
+    out['input'] = inputs
+    out['time'] = records['time'][samples]
+    return out[np.lexsort((inputs, order, samples))]
+
+
+def parseTouchLines(lines, log=None):
+    """Parses a list of touch screen report lines (bytes, without the CR)
+    into an array with the dtype :data:`TOUCH_DTYPE`.
+
+    Lines that are not touch reports are skipped with a warning (and counted
+    in `log.nSkipped` if a :class:`TouchLog` is given).
+    """
+    fields = []
+    for line in lines:
+        values = line.split(b';')
+        if b'$touch' in values[0] and len(values) >= 5:
+            fields.append(values[1:5])
+        elif not line:
+            continue
+        else:
+            if log is not None:
+                log.nSkipped += 1
+            if b'#status' in values[0]:
+                # Got a status report by mistake
+                logging.warning("_touchLog found"
+                                " status on input so skipping that")
+            else:
+                logging.warning("_touchLog found"
+                                " unknown data on input so skipping that")
+    records = np.zeros(len(fields), dtype=TOUCH_DTYPE)
+    if not fields:
+        return records
+    try:
+        values = np.array(fields).astype(np.float64)
+    except ValueError:
+        # a report garbled in transmission; parse them one at a time
+        good = []
+        for reportFields in fields:
+            try:
+                good.append([float(value) for value in reportFields])
+            except ValueError:
+                if log is not None:
+                    log.nSkipped += 1
+                logging.warning("_touchLog found"
+                                " unknown data on input so skipping that")
+        records = np.zeros(len(good), dtype=TOUCH_DTYPE)
+        if not good:
+            return records
+        values = np.array(good)
+    records['time'] = values[:, 0]
+    records['x'] = values[:, 1]
+    records['y'] = values[:, 2]
+    records['touched'] = values[:, 3].astype(np.int64) == 1
+    return records
+
+
+def extractTouchEvents(records, distance=10, t=0.1,
+                       types=('touched', 'released'), blockSize=4096):
+    """Finds the touch reports that count as separate events, as
+    DisplayPlusPlusTouch.getTouchEvents() does.
+
+    A report is an event if it is more than `distance` pixels and `t`
+    seconds from the previous event, or if its direction ('touched' or
+    'released') differs from that of the previous event and is one of
+    `types`.
+
+    Returns the indices of the reports that are events. Each event depends
+    on the previous one, so the reports are searched from one event to the
+    next: the few reports after an event one at a time (events are often
+    close together) and then in blocks that grow (up to blockSize reports)
+    while no event is found.
+    """
+    nReports = len(records)
+    times = records['time']
+    x = records['x'].astype(np.float64)
+    y = records['y'].astype(np.float64)
+    touched = records['touched']
+    isType = np.zeros(nReports, dtype=bool)
+    if 'touched' in types:
+        isType |= touched
+    if 'released' in types:
+        isType |= ~touched
+    timesList, xList, yList = times.tolist(), x.tolist(), y.tolist()
+    touchedList, isTypeList = touched.tolist(), isType.tolist()
+    nScalar = 8
+    # no previous event: every report is far enough away
+    refT = refX = refY = -999999
+    refTouched = None
+    events = []
+    start = 0
+    while start < nReports:
+        index = None
+        for i in range(start, min(start + nScalar, nReports)):
+            dist = ((xList[i] - refX) ** 2.0 + (yList[i] - refY) ** 2.0) ** 0.5
+            if ((dist > distance and timesList[i] - refT > t) or
+                    (isTypeList[i] and touchedList[i] != refTouched)):
+                index = i
+                break
+        start += nScalar
+        size = 16
+        while index is None and start < nReports:
+            end = start + size
+            dist = np.sqrt((x[start:end] - refX) ** 2 +
+                           (y[start:end] - refY) ** 2)
+            isEvent = (dist > distance) & (times[start:end] - refT > t)
+            isEvent |= isType[start:end] & (touched[start:end] != refTouched)
+            found = np.flatnonzero(isEvent)
+            if len(found):
+                index = start + found[0]
+            else:
+                start = end
+                size = min(size * 2, blockSize)
+        if index is None:
+            break
+        events.append(index)
+        refT, refX, refY = timesList[index], xList[index], yList[index]
+        refTouched = touchedList[index]
+        start = index + 1
+    return np.asarray(events, dtype=np.intp)
+
+
+def segmentTouches(records, distance=0):
+    """Divides touch reports into 'down', 'move' and 'up' events.
+
+    A 'down' event is the first report of each touch, 'up' is the release
+    that ends it and 'move' is any other report during a touch that is more
+    than `distance` pixels from the report before it. Reports that are not
+    events are dropped.
+
+    Returns an array with the dtype :data:`TOUCH_EVENT_DTYPE`.
+    """
+    touched = records['touched']
+    previous = np.concatenate(([False], touched[:-1]))
+    down = touched & ~previous
+    up = ~touched & previous
+    moved = np.zeros(len(records), dtype=bool)
+    if len(records) > 1:
+        dist = np.hypot(np.diff(records['x'].astype(np.float64)),
+                        np.diff(records['y'].astype(np.float64)))
+        moved[1:] = dist > distance
+    move = touched & previous & moved
+    isEvent = down | up | move
+    events = np.zeros(isEvent.sum(), dtype=TOUCH_EVENT_DTYPE)
+    for name in TOUCH_DTYPE.names:
+        events[name] = records[name][isEvent]
+    eventType = np.full(len(records), 'move', dtype='U4')
+    eventType[down] = 'down'
+    eventType[up] = 'up'
+    events['type'] = eventType[isEvent]
+    return events
+
+
+class RecordList(list):
+    """List of the records of a structured array converted by `factory`
+    (e.g. to the dict-like objects that BitsSharp has always returned).
+
+    This is an ordinary list, so it can be changed like the lists of values
+    BitsSharp used to make, and the array it was made from is kept as
+    `records`.
+    """
+
+    def __init__(self, records, factory):
+        list.__init__(self, (factory(record) for record in records))
+        self.records = records
@@ -64,7 +64,10 @@ from __future__ import absolute_import, division, print_function
 
 from collections import deque
 import sys
-import copy
+
+from past.builtins import basestring
+
+import numpy as np
 
 import psychopy.core
 import psychopy.clock
@@ -212,9 +215,9 @@ class Keyboard:
         keys = []
         if havePTB:
             for buffer in self._buffers.values():
-                for origKey in buffer.getKeys(keyList, waitRelease, clear):
+                # the buffer creates new KeyPress objects on each call
+                for thisKey in buffer.getKeys(keyList, waitRelease, clear):
                     # calculate rt from time and self.timer
-                    thisKey = copy.copy(origKey)  # don't alter the original
                     thisKey.rt = thisKey.tDown - self.clock.getLastResetTime()
                     keys.append(thisKey)
         else:
@@ -234,9 +237,7 @@ class Keyboard:
         if havePTB:
             for buffer in self._buffers.values():
                 buffer.flush()  # flush the device events to the soft buffer
-                buffer._evts.clear()
-                buffer._keys.clear()
-                buffer._keysStillDown.clear()
+                buffer.clear()
         else:
             event.clearEvents(eventType)
 
@@ -314,25 +315,40 @@ class _KeyBuffer(object):
 
     It stores events from a single physical device
 
-    It's built on a collections.deque which is like a more efficient list
-    that also supports a max length
+    Key presses are stored in a ring buffer of preallocated arrays (key code,
+    tDown and duration, which is NaN until the key is released) so that
+    polling every frame doesn't create any objects. Only the presses between
+    the oldest one not yet returned and the newest are looked at by
+    getKeys(), and KeyPress objects are only created for the keys returned.
+    When the buffer is full the oldest presses are dropped.
     """
 
-    def __init__(self, bufferSize, kb_id):
+    def __init__(self, bufferSize, kb_id, dev=None):
         self.bufferSize = bufferSize
-        self._evts = deque()
-
-        # create the PTB keyboard object and corresponding queue
-        allInds, names, keyboards = hid.get_keyboard_indices()
-
-        self._keys = []
-        self._keysStillDown = []
-
-        if kb_id == -1:
-            self.dev = hid.Keyboard()  # a PTB keyboard object
-        else:
-            self.dev = hid.Keyboard(kb_id)  # a PTB keyboard object
-        self.dev._create_queue(bufferSize)
+        self._codes = np.zeros(bufferSize, dtype=np.int32)
+        self._tDown = np.zeros(bufferSize, dtype=np.float64)
+        self._durations = np.zeros(bufferSize, dtype=np.float64)
+        self._returned = np.zeros(bufferSize, dtype=bool)
+        # presses are numbered from 0, the one numbered n is stored at
+        # n % bufferSize. Presses before self._first have all been returned
+        self._first = 0
+        self._next = 0
+        # press numbers of keys still down, by key code (oldest first)
+        self._keysStillDown = {}
+        self._keyMasks = {}
+        # the number of events processed, and the call that last found no
+        # keys at that point (so the same call can return straight away)
+        self._nEvts = 0
+        self._lastEmptyCall = None
+
+        if dev is None:
+            # create the PTB keyboard object and corresponding queue
+            if kb_id == -1:
+                dev = hid.Keyboard()  # a PTB keyboard object
+            else:
+                dev = hid.Keyboard(kb_id)  # a PTB keyboard object
+            dev._create_queue(bufferSize)
+        self.dev = dev
 
     def flush(self):
         """Flushes and processes events from the device to this software buffer
@@ -340,21 +356,36 @@ class _KeyBuffer(object):
         self._processEvts()
 
     def _flushEvts(self):
-        ptb.WaitSecs('YieldSecs', 0.00001)
+        if havePTB:
+            ptb.WaitSecs('YieldSecs', 0.00001)
+        evts = []
         while self.dev.flush():
             evt, remaining = self.dev.queue_get_event()
-            key = {}
-            key['keycode'] = int(evt['Keycode'])
-            key['down'] = bool(evt['Pressed'])
-            key['time'] = evt['Time']
-            self._evts.append(key)
+            evts.append(evt)
+        return evts
+
+    def _keyMask(self, keyList):
+        """Returns a boolean array, indexed by key code, that is True for the
+        codes of the keys named in keyList (cached for each keyList)
+        """
+        keyList = tuple(keyList)
+        mask = self._keyMasks.get(keyList)
+        if mask is None:
+            mask = np.zeros(max(max(keyNames), 255) + 2, dtype=bool)
+            for code, name in keyNames.items():
+                if name in keyList:
+                    mask[code] = True
+            # unknown key codes are all stored in the final element
+            mask[-1] = 'unknown' in keyList
+            self._keyMasks[keyList] = mask
+        return mask
 
     def getKeys(self, keyList=[], waitRelease=True, clear=True):
         """Return the KeyPress objects from the software buffer
 
         Parameters
         ----------
-        keyList : list of key(name)s of interest
+        keyList : list of key(name)s of interest (or the name of one key)
         waitRelease : if True then only process keys that are also released
         clear : clear any keys (that have been returned in this call)
 
@@ -362,33 +393,52 @@ class _KeyBuffer(object):
         -------
         A deque (like a list) of keys
         """
+        if isinstance(keyList, basestring):
+            keyList = [keyList]  # not the characters of the name
         self._processEvts()
-        # if no conditions then no need to loop through
-        if not keyList and not waitRelease:
-            keyPresses = deque(self._keys)
-            if clear:
-                self._keys = deque()
-                self._keysStillDown = deque()
-            return keyPresses
-
-        # otherwise loop through and check each key
         keyPresses = deque()
-        for keyPress in self._keys:
-            if waitRelease and not keyPress.duration:
-                continue
-            if keyList and keyPress.name not in keyList:
-                continue
+        if self._first == self._next:
+            return keyPresses  # nothing in the buffer
+        thisCall = (self._nEvts, waitRelease, keyList and tuple(keyList))
+        if thisCall == self._lastEmptyCall:
+            return keyPresses  # nothing has changed since
+
+        inds = np.arange(self._first, self._next) % self.bufferSize
+        wanted = ~self._returned[inds]
+        if waitRelease:
+            wanted &= ~np.isnan(self._durations[inds])
+        if keyList:
+            mask = self._keyMask(keyList)
+            codes = self._codes[inds]
+            codes[(codes < 0) | (codes >= len(mask))] = len(mask) - 1
+            wanted &= mask[codes]
+        inds = inds[wanted]
+        if not len(inds):
+            self._lastEmptyCall = thisCall
+
+        for ind in inds.tolist():
+            keyPress = KeyPress(code=int(self._codes[ind]),
+                                tDown=float(self._tDown[ind]))
+            duration = self._durations[ind]
+            if not np.isnan(duration):
+                keyPress.duration = float(duration)
             keyPresses.append(keyPress)
 
-        # clear keys in a second step (not during iteration)
-        if clear:
-            for key in keyPresses:
-                self._keys.remove(key)
+        if clear and len(inds):
+            self._returned[inds] = True
+            # skip over the presses that have all been returned
+            first = self._first
+            while (first < self._next and
+                   self._returned[first % self.bufferSize]):
+                first += 1
+            self._first = first
 
         return keyPresses
 
-    def _clearEvents(self):
-        self._evts.clear()
+    def clear(self):
+        """Remove all the key presses from the buffer"""
+        self._first = self._next
+        self._keysStillDown.clear()
 
     def start(self):
         self.dev.queue_start()
@@ -399,23 +449,29 @@ class _KeyBuffer(object):
     def _processEvts(self):
         """Take a list of events and convert to a list of keyPresses with
         tDown and duration"""
-        self._flushEvts()
-        evts = deque(self._evts)
-        self._clearEvents()
-        for evt in evts:
-            if evt['down']:
-                newKey = KeyPress(code=evt['keycode'], tDown=evt['time'])
-                self._keys.append(newKey)
-                self._keysStillDown.append(newKey)
+        for evt in self._flushEvts():
+            self._nEvts += 1
+            code = int(evt['Keycode'])
+            if evt['Pressed']:
+                n = self._next
+                if n - self._first == self.bufferSize:
+                    self._first += 1  # full so drop the oldest press
+                ind = n % self.bufferSize
+                self._codes[ind] = code
+                self._tDown[ind] = evt['Time']
+                self._durations[ind] = np.nan
+                self._returned[ind] = False
+                self._next = n + 1
+                self._keysStillDown.setdefault(code, deque()).append(n)
             else:
-                for key in self._keysStillDown:
-                    if key.code == evt['keycode']:
-                        key.duration = evt['time'] - key.tDown
-                        self._keysStillDown.remove(key)
-                        break  # this key is done
-                    else:
-                        # we found a key that was first pressed before reading
-                        pass
+                stillDown = self._keysStillDown.get(code)
+                if not stillDown:
+                    # the key was first pressed before reading
+                    continue
+                n = stillDown.popleft()
+                if n >= self._next - self.bufferSize:  # not overwritten
+                    ind = n % self.bufferSize
+                    self._durations[ind] = evt['Time'] - self._tDown[ind]
 
 
 _keyBuffers = _KeyBuffers()
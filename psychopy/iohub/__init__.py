@@ -30,7 +30,14 @@ if IOHUB_DIRECTORY.find('psychopy') >= 0:
 
 _DATA_STORE_AVAILABLE = False
 try:
-    import tables # pylint: disable=wrong-import-position, wrong-import-order
+    if sys.version_info >= (3, 4):
+        # check pytables is installed without importing it (which is slow),
+        # as it is only used by the ioHub Server process when saving data
+        import importlib.util
+        if importlib.util.find_spec('tables') is None:
+            raise ImportError('No module named tables')
+    else:
+        import tables # pylint: disable=wrong-import-position, wrong-import-order
     _DATA_STORE_AVAILABLE = True
 except ImportError:
     print2err('WARNING: pytables package not found. ',
@@ -38,7 +45,17 @@ except ImportError:
 except Exception: # pylint: disable=broad-except
     printExceptionDetailsToStdErr()
 
-from .client.expruntime import ioHubExperimentRuntime
+if sys.version_info >= (3, 7):
+    # the experiment runtime is imported when first used
+    def __getattr__(name):
+        if name == 'ioHubExperimentRuntime':
+            from .client.expruntime import ioHubExperimentRuntime
+            globals()[name] = ioHubExperimentRuntime
+            return ioHubExperimentRuntime
+        raise AttributeError("module {!r} has no attribute {!r}"
+                             .format(__name__, name))
+else:
+    from .client.expruntime import ioHubExperimentRuntime
 
 lazyImports = """
 from {pkgroot}.client.connect import launchHubServer
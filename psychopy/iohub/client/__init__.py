@@ -661,6 +661,38 @@ class ioHubConnection(object):
         r = self._sendToHubServer(cvt_rpc)
         return r[2]
 
+    def addTimeSyncMetrics(self, metrics):
+        """Saves time sync accuracy metrics, as returned by
+        psychopy.iohub.net.TimeSyncState.addProbes(), to the time_sync table
+        of the iohub data file. metrics can be a dict or a list of dicts.
+
+        Can be used as the metrics_callback of an ioHubTimeSyncService.
+
+        :param metrics: dict or list of dicts
+        :return: True if the metrics were saved.
+
+        """
+        if isinstance(metrics, dict):
+            metrics = [metrics, ]
+        metrics = [dict((k, float(v)) for k, v in m.items()) for m in metrics]
+        r = self._sendToHubServer(('RPC', 'addTimeSyncMetrics', (metrics,)))
+        return r[2]
+
+    def getDeviceMonitorStats(self, reset=False):
+        """Returns the polling statistics of each polled iohub device as a
+        list of dicts: the number of polls and events, the current event
+        rate and the poll cost (time taken by each poll) and latency (time
+        each poll started after it was scheduled) histograms. The
+        histogram_edges value gives the upper edge, in sec.msec, of each
+        histogram bin except the last.
+
+        :param reset: (bool) If True, reset the statistics after reading.
+        :return: list of dicts
+
+        """
+        r = self._sendToHubServer(('RPC', 'getDeviceMonitorStats', (reset,)))
+        return r[2]
+
     def registerWindowHandles(self, *winHandles):
         """
         Sends 1 - n Window handles to iohub so it can determine if kb or
@@ -13,8 +13,10 @@ from builtins import str
 from builtins import object
 from pkg_resources import parse_version
 from ..server import DeviceEvent
+from ..net import TIME_SYNC_METRICS_DTYPE
 from ..constants import EventConstants
 from ..errors import ioHubError, printExceptionDetailsToStdErr, print2err
+from .util import indexEventTables
 
 
 import tables
@@ -65,6 +67,10 @@ FILE_VERSION = '0.8.1.1'
 SCHEMA_AUTHORS = 'Sol Simpson'
 SCHEMA_MODIFIED_DATE = 'November 24th, 2016'
 
+TIME_SYNC_TABLE_DTYPE = np.dtype([('experiment_id', 'u4'),
+                                  ('session_id', 'u4')] +
+                                 TIME_SYNC_METRICS_DTYPE.descr)
+
 
 class DataStoreFile(object):
     def __init__(self, fileName, folderPath, fmode='a', iohub_settings=None):
@@ -81,6 +87,7 @@ class DataStoreFile(object):
         self.active_session_id = None
 
         self.flushCounter = self.settings.get('flush_interval', 32)
+        self.createIndexes = self.settings.get('create_indexes', True)
         self._eventCounter = 0
 
         self.TABLES = dict()
@@ -207,6 +214,9 @@ class DataStoreFile(object):
                         self.flush()
                     except tables.NodeError:
                         self.TABLES[event_table_label] = self.groupNodeForEvent(event_cls)._f_get_child(self.eventTableLabel2ClassName(event_table_label))
+                        # Do not update the indexes of a previous session on
+                        # every flush; they are rebuilt when the file is closed.
+                        self.TABLES[event_table_label].autoindex = False
                     except Exception as e:
                         print2err('---------------ERROR------------------')
                         print2err(
@@ -361,6 +371,38 @@ class DataStoreFile(object):
                 printExceptionDetailsToStdErr()
         return False
 
+    def addTimeSyncMetrics(self, metrics):
+        """Append time sync accuracy metrics, a list of dicts with the
+        TIME_SYNC_METRICS_DTYPE fields, to the data_collection/time_sync
+        table, creating the table if needed."""
+        if not self.emrtFile:
+            return False
+        try:
+            tstable = self.TABLES.get('TIME_SYNC')
+            if tstable is None:
+                try:
+                    tstable = getattr(self.emrtFile.root.data_collection,
+                                      _f_get_child)('time_sync')
+                except NoSuchNodeError:
+                    tstable = getattr(self.emrtFile, create_table)(
+                        self.emrtFile.root.data_collection, 'time_sync',
+                        TIME_SYNC_TABLE_DTYPE,
+                        title='ioHub Time Sync Accuracy Metrics.')
+                self.TABLES['TIME_SYNC'] = tstable
+            if isinstance(metrics, dict):
+                metrics = [metrics, ]
+            rows = np.zeros(len(metrics), dtype=TIME_SYNC_TABLE_DTYPE)
+            rows['experiment_id'] = self.active_experiment_id or 0
+            rows['session_id'] = self.active_session_id or 0
+            for name in TIME_SYNC_METRICS_DTYPE.names:
+                rows[name] = [m[name] for m in metrics]
+            tstable.append(rows)
+            self.bufferedFlush()
+            return True
+        except Exception:
+            printExceptionDetailsToStdErr()
+        return False
+
     def addMetaDataToFile(self, metaData):
         pass
 
@@ -455,6 +497,12 @@ class DataStoreFile(object):
 
     def close(self):
         self.flush()
+        if self.createIndexes and self.emrtFile.isopen:
+            try:
+                indexEventTables(self.emrtFile)
+            except Exception:
+                print2err('Error creating DataStore event table indexes:')
+                printExceptionDetailsToStdErr()
         self._activeRunTimeConditionVariableTable = None
         self.emrtFile.close()
 
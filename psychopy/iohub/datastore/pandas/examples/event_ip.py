@@ -64,6 +64,15 @@ print()
 print(ip_events_find.head(20))
 
 
+# label() keeps every event, adding the ip_id_num of the IP each event
+# occurred within (NaN for events outside of all IPs).
+ip_events_label = ip.label(exp_data.KEYBOARD_PRESS)
+
+print('** KEYBOARD_PRESS events labelled with the IP they occurred in')
+print()
+print(ip_events_label.head(20))
+
+
 def using_filter():
     ip.filter(exp_data.KEYBOARD_PRESS)
 
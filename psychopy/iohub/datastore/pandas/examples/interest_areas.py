@@ -9,7 +9,7 @@ s
 """
 from __future__ import print_function
 from psychopy.iohub.datastore.pandas import ioHubPandasDataView
-from psychopy.iohub.datastore.pandas.interestarea import Circle, Ellipse, Rectangle
+from psychopy.iohub.datastore.pandas.interestarea import Circle, Ellipse, Rectangle, InterestAreaSet
 
 
 exp_data = ioHubPandasDataView('io_stroop.hdf5')
@@ -43,4 +43,12 @@ print('* MOUSE_MOVE events within Ellipse IAs:')
 print(ellipse.filter(exp_data.MOUSE_BUTTON_PRESS).head(25))
 print()
 
+# An InterestAreaSet classifies all events against all of its areas in one
+# pass, adding ia_id and ia_name columns (the first area containing the
+# position wins).
+print('* MOUSE_MOVE events labelled by InterestAreaSet:')
+ia_set = InterestAreaSet([spot, ellipse, rect, circle])
+print(ia_set.label(exp_data.MOUSE_MOVE).head(25))
+print()
+
 exp_data.close()
@@ -16,18 +16,43 @@ except ImportError:
     from ...errors import print2err
     print2err("iohub.datastore.pandas.interestarea requires 'shapely' package.")
 
+try:
+    from shapely.vectorized import contains as _vectorized_contains
+except ImportError:
+    _vectorized_contains = None
+
 from weakref import proxy
 
+import numpy as np
+
+# InterestAreaSet uses a spatial grid index when it holds at least this many
+# areas.
+GRID_INDEX_MIN_AREAS = 16
+
+
+def _pointsInRing(ring, x, y):
+    """Even-odd rule point in polygon test of the points x, y against the
+    closed coordinate sequence ring. Returns a boolean array."""
+    coords = np.asarray(ring)
+    xi, yi = coords[:-1, 0], coords[:-1, 1]
+    xj, yj = coords[1:, 0], coords[1:, 1]
+    inside = np.zeros(x.shape, dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for x1, y1, x2, y2 in zip(xi, yi, xj, yj):
+            crosses = (y1 > y) != (y2 > y)
+            inside ^= crosses & (x < (x2 - x1) * (y - y1) / (y2 - y1) + x1)
+    return inside
+
 
 class Polygon(shapely.geometry.Polygon):
     _next_id = 1
 
     def __init__(self, name, points):
-        self._ia_id = self.__class__._next_id
-        self.__class__._next_id += 1
+        self._ia_id = Polygon._next_id
+        Polygon._next_id += 1
         self._name = name
         if name is None:
-            self.name = self.__class__.__name__ + '_' + str(self._ia_id)
+            self._name = self.__class__.__name__ + '_' + str(self._ia_id)
         self._last_target_df = None
         shapely.geometry.Polygon.__init__(self, points)
 
@@ -43,12 +68,35 @@ class Polygon(shapely.geometry.Polygon):
         return shapely.geometry.Polygon.contains(
             self, spy.geometry.Point(v[0], v[1]))
 
+    def containsPoints(self, x, y):
+        """Return a boolean array which is True for each of the points x, y
+        that is within the interest area. Points outside of the bounding box
+        of the area are rejected before the point in polygon test is done
+        on the remaining points."""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        minx, miny, maxx, maxy = self.bounds
+        result = (x >= minx) & (x <= maxx) & (y >= miny) & (y <= maxy)
+        candidates = np.flatnonzero(result)
+        if len(candidates) == 0:
+            return result
+        cx, cy = x.ravel()[candidates], y.ravel()[candidates]
+        if _vectorized_contains is not None:
+            inside = _vectorized_contains(self, cx, cy)
+        else:
+            inside = _pointsInRing(self.exterior.coords, cx, cy)
+            for interior in self.interiors:
+                inside &= ~_pointsInRing(interior.coords, cx, cy)
+        result.ravel()[candidates] = inside
+        return result
+
     def filter(self, target_df, x_col='x_position', y_col='y_position'):
         if self._last_target_df is not target_df:
             self._last_target_df = proxy(target_df)
             self._ia_df = None
             self._ia_df = target_df[
-                target_df[[x_col, y_col]].apply(self.contains, axis=1)]
+                self.containsPoints(target_df[x_col].values,
+                                    target_df[y_col].values)].copy()
             self._ia_df['ia_name'] = self.name
             self._ia_df['ia_id'] = self.ia_id
             self._ia_df['ia_name'] = self.name
@@ -100,3 +148,126 @@ class Rectangle(Polygon):
         if not ccw:
             coords = coords[::-1]
         Polygon.__init__(self, name, coords)
+
+
+class InterestAreaSet(object):
+    """A group of interest areas that sample positions can be classified
+    against in one vectorised pass.
+
+    Each point is assigned the ia_id of the first area in the set, in the
+    order given, that contains it, or 0 if no area contains it. When the set
+    holds many areas a uniform grid over the bounding box of all areas is
+    used as a spatial index, so that each point is only tested against the
+    areas whose bounding box overlaps the grid cell the point is in.
+
+    Args:
+        areas (list): The Polygon, Circle, Ellipse or Rectangle areas.
+        grid_size (int): Number of grid index cells along each axis. If None,
+            a grid is used once the set has GRID_INDEX_MIN_AREAS areas. 0
+            disables the grid index.
+    """
+
+    def __init__(self, areas, grid_size=None):
+        self._areas = list(areas)
+        # Lookup tables from the 1 based position of an area in the set,
+        # with 0 meaning no area, to the area id and name.
+        self._ids = np.asarray([0] + [a.ia_id for a in self._areas],
+                               dtype=np.int32)
+        self._names = np.asarray([None] + [a.name for a in self._areas],
+                                 dtype=object)
+        if grid_size is None:
+            grid_size = 0
+            if len(self._areas) >= GRID_INDEX_MIN_AREAS:
+                grid_size = int(np.ceil(np.sqrt(len(self._areas))))
+        self._grid_size = grid_size
+        self._grid_cells = None
+        if grid_size > 0 and len(self._areas) > 0:
+            self._buildGridIndex()
+
+    @property
+    def areas(self):
+        return list(self._areas)
+
+    def _buildGridIndex(self):
+        bounds = np.asarray([a.bounds for a in self._areas])
+        self._grid_origin = bounds[:, :2].min(axis=0)
+        extent = bounds[:, 2:].max(axis=0) - self._grid_origin
+        self._grid_cell_size = np.maximum(extent, 1e-12) / self._grid_size
+        lo = self._cellIndex(bounds[:, 0], bounds[:, 1])
+        hi = self._cellIndex(bounds[:, 2], bounds[:, 3])
+        self._grid_cells = dict()
+        for ai in range(len(self._areas)):
+            for cx in range(lo[0][ai], hi[0][ai] + 1):
+                for cy in range(lo[1][ai], hi[1][ai] + 1):
+                    self._grid_cells.setdefault(
+                        cx * self._grid_size + cy, []).append(ai)
+
+    def _cellIndex(self, x, y):
+        n = self._grid_size
+        cx = np.floor((x - self._grid_origin[0]) / self._grid_cell_size[0])
+        cy = np.floor((y - self._grid_origin[1]) / self._grid_cell_size[1])
+        return (np.clip(cx, 0, n - 1).astype(np.int64),
+                np.clip(cy, 0, n - 1).astype(np.int64))
+
+    def _classifyPoints(self, x, y, area_indices, result):
+        for ai in area_indices:
+            unassigned = np.flatnonzero(result == 0)
+            if len(unassigned) == 0:
+                break
+            inside = self._areas[ai].containsPoints(x[unassigned],
+                                                    y[unassigned])
+            result[unassigned[inside]] = ai + 1
+
+    def classify(self, x, y):
+        """Return an int array holding the ia_id of the area that contains
+        each of the points x, y, or 0 for points outside of every area."""
+        return self._ids[self._areaPositions(x, y)]
+
+    def _areaPositions(self, x, y):
+        """Return the 1 based position in the set of the area containing
+        each point, or 0."""
+        x = np.asarray(x, dtype=np.float64).ravel()
+        y = np.asarray(y, dtype=np.float64).ravel()
+        result = np.zeros(x.shape, dtype=np.int32)
+        if self._grid_cells is None:
+            self._classifyPoints(x, y, range(len(self._areas)), result)
+            return result
+
+        # Points outside the grid are outside of every area.
+        minx, miny = self._grid_origin
+        maxx, maxy = self._grid_origin + self._grid_cell_size * self._grid_size
+        in_grid = np.flatnonzero((x >= minx) & (x <= maxx) &
+                                 (y >= miny) & (y <= maxy))
+        cx, cy = self._cellIndex(x[in_grid], y[in_grid])
+        cells = cx * self._grid_size + cy
+        order = np.argsort(cells, kind='mergesort')
+        cells = cells[order]
+        points = in_grid[order]
+        starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+        ends = np.r_[starts[1:], len(cells)]
+        for si, ei in zip(starts, ends):
+            area_indices = self._grid_cells.get(cells[si])
+            if area_indices:
+                cell_points = points[si:ei]
+                cell_result = np.zeros(len(cell_points), dtype=np.int32)
+                self._classifyPoints(x[cell_points], y[cell_points],
+                                     area_indices, cell_result)
+                result[cell_points] = cell_result
+        return result
+
+    def label(self, target_df, x_col='x_position', y_col='y_position'):
+        """Return a copy of target_df with an 'ia_id' column holding the id
+        of the area each row's position is within (0 if none) and an
+        'ia_name' column holding the area name (None if none)."""
+        positions = self._areaPositions(target_df[x_col].values,
+                                        target_df[y_col].values)
+        labelled_df = target_df.copy()
+        labelled_df['ia_id'] = self._ids[positions]
+        labelled_df['ia_name'] = self._names[positions]
+        return labelled_df
+
+    def filter(self, target_df, x_col='x_position', y_col='y_position'):
+        """Return the rows of target_df that are within any of the areas,
+        labelled as done by label()."""
+        labelled_df = self.label(target_df, x_col, y_col)
+        return labelled_df[labelled_df['ia_id'] > 0]
@@ -7,6 +7,7 @@
 # Distributed under the terms of the GNU General Public License (GPL).
 from __future__ import division, absolute_import, print_function
 
+from past.builtins import basestring
 import numpy as np
 import pandas as pd
 
@@ -37,68 +38,122 @@ class InterestPeriodDefinition(object):
         return self._ipid
 
     def find(self, target, ip_cols=None):
-        df = target[:]
-        df['ip_id_num'] = np.nan
+        """Return the rows of target that occurred within each interest
+        period, with ip_id_num, ip_id and ip_name columns added. A row is
+        repeated for each interest period it is within, so overlapping
+        interest periods are supported."""
+        target_rows, ip_rows = self._ip_rows(target)
+        df = target.iloc[target_rows].copy()
+        df['ip_id_num'] = self.ip_df['ip_id_num'].values[ip_rows]
         df['ip_id'] = self.ipid
         df['ip_name'] = self.name
-        df = df.groupby(level=[0, 1], group_keys=False).apply(self.__find)
 
         if ip_cols is not None:
             df = self._merge_ip_cols(df, ip_cols)
 
         return df
 
-    def __find(self, target_group):
-        group_id = target_group.index[0]
-        group_ips = self.ip_df.ix[group_id]
-        if len(group_ips) > 0:
-            overlapping = []
-            for index, ip in group_ips.iterrows():
-                in_ip = ((target_group['time'] >= ip['start_time']) &
-                         (target_group['time'] <= ip['end_time']))
-                target_in_ip = target_group[in_ip]
-                target_in_ip['ip_id_num'] = ip['ip_id_num']
-                overlapping += [target_in_ip]
-            target_filtered = pd.concat(overlapping)
-        else:
-            target_filtered = target_group[[False] * len(target_group)]
-        return target_filtered
-
     def filter(self, target, ip_cols=None):
-        df = target[:]
-        df['ip_id'] = self.ipid
-        df['ip_name'] = self.name
-        df = target.groupby(
-            level=[
-                0, 1], group_keys=False).apply(
-            self.__filter)
+        """Return the rows of target that occurred within an interest period,
+        with ip_id_num, ip_id and ip_name columns added. The interest periods
+        of a session are assumed to not overlap; use find() if they do."""
+        df = self.label(target)
+        df = df[df['ip_id_num'].notnull()]
 
         if ip_cols is not None:
             df = self._merge_ip_cols(df, ip_cols)
 
         return df
 
-    def __filter(self, group):
+    def label(self, target):
+        """Return a copy of target with an ip_id_num column holding the
+        ip_id_num of the interest period each row occurred within, or NaN,
+        plus ip_id and ip_name columns.
+
+        The interest periods of all sessions are attached to the target rows
+        in a single pandas.merge_asof call, matching each row to the last
+        interest period of the same experiment and session that started at
+        or before the row time. The interest periods of a session are
+        assumed to not overlap.
         """
-        HT http://stackoverflow.com/a/21370058/2506078
+        ips = self.ip_df
+        target_codes, ip_codes = self._group_codes(target.index, ips.index)
+
+        left = pd.DataFrame({'_ip_time': target['time'].values,
+                             '_ip_group': target_codes,
+                             '_ip_row': np.arange(len(target))})
+        right = pd.DataFrame({'_ip_start': ips['start_time'].values,
+                              '_ip_end': ips['end_time'].values,
+                              '_ip_num': ips['ip_id_num'].values,
+                              '_ip_group': ip_codes})
+        merged = pd.merge_asof(left.sort_values('_ip_time', kind='mergesort'),
+                               right.sort_values('_ip_start', kind='mergesort'),
+                               left_on='_ip_time', right_on='_ip_start',
+                               by='_ip_group')
+        in_ip = (merged['_ip_time'] <= merged['_ip_end']).values
+        ip_id_num = np.full(len(target), np.nan)
+        ip_id_num[merged['_ip_row'].values[in_ip]] = \
+            merged['_ip_num'].values[in_ip]
+
+        df = target.copy()
+        df['ip_id_num'] = ip_id_num
+        df['ip_id'] = self.ipid
+        df['ip_name'] = self.name
+        return df
+
+    @staticmethod
+    def _group_codes(target_index, ip_index):
+        """Return integer codes for the (experiment_id, session_id) index
+        values of the target and ip rows, shared between the two so that rows
+        of the same session have the same code."""
+        codes = pd.factorize(target_index.append(ip_index), sort=True)[0]
+        return codes[:len(target_index)], codes[len(target_index):]
+
+    def _ip_rows(self, target):
+        """Return the target row positions and matching ip_df row positions
+        of every (target row, interest period) pair where the row time is
+        within the interest period, found for all sessions in one pass.
+
+        Row times and interest period start and end times are ranked
+        together, so that the (session, time) of each can be searched for as
+        a single int64 key with numpy.searchsorted.
         """
-        ips = self.ip_df.ix[group.index[0]]
-        start_idx = np.searchsorted(ips['start_time'], group['time']) - 1
-        end_idx = np.searchsorted(ips['end_time'], group['time'])
-        mask = (start_idx == end_idx)
-        group['ip_id_num'] = np.nan
-        group['ip_id_num'][mask] = start_idx
-        return group[mask]
+        ips = self.ip_df
+        target_codes, ip_codes = self._group_codes(target.index, ips.index)
+        times = target['time'].values
+        n, m = len(times), len(ips)
+        ranks = np.unique(np.concatenate([times, ips['start_time'].values,
+                                          ips['end_time'].values]),
+                          return_inverse=True)[1].astype(np.int64)
+        nranks = ranks.max() + 1 if len(ranks) else 1
+        target_keys = target_codes * nranks + ranks[:n]
+        start_keys = ip_codes * nranks + ranks[n:n + m]
+        end_keys = ip_codes * nranks + ranks[n + m:]
+
+        order = np.argsort(target_keys, kind='mergesort')
+        sorted_keys = target_keys[order]
+        lo = np.searchsorted(sorted_keys, start_keys, side='left')
+        hi = np.searchsorted(sorted_keys, end_keys, side='right')
+        counts = np.maximum(hi - lo, 0)
+
+        ip_rows = np.repeat(np.arange(m), counts)
+        offsets = (np.arange(counts.sum()) -
+                   np.repeat(np.cumsum(counts) - counts, counts))
+        target_rows = order[np.repeat(lo, counts) + offsets]
+
+        # Order the result by session, then interest period.
+        result_order = np.lexsort((ip_rows, ip_codes[ip_rows]))
+        return target_rows[result_order], ip_rows[result_order]
 
     def _merge_ip_cols(self, target, cols):
         if not isinstance(cols, dict):
-            if not hasattr(cols, '__iter__'):
+            if isinstance(cols, basestring) or not hasattr(cols, '__iter__'):
                 cols = [cols]
             cols = dict(zip(cols, cols))
 
         temp_target = target.set_index('ip_id_num', append=True)
         temp_ips = self.ip_df.set_index('ip_id_num', append=True)
-        temp_ips = temp_ips[cols.keys()]
+        temp_ips = temp_ips[list(cols.keys())]
 
         temp_target = temp_target.merge(
             temp_ips, left_index=True, right_index=True)
@@ -123,14 +178,12 @@ class InterestPeriodDefinition(object):
 
         return matches
 
-    def __enumerate_ips(self, group):
-        group['ip_id_num'] = range(len(group))
-        return group
-
     def _ip_zipper(self, start, end, temp_index='ip_id_num'):
         # TODO: make sure the two dfs "zip" nicely
-        _start = start.groupby(level=[0, 1]).apply(self.__enumerate_ips)
-        _end = end.groupby(level=[0, 1]).apply(self.__enumerate_ips)
+        _start = start.copy()
+        _end = end.copy()
+        _start[temp_index] = start.groupby(level=[0, 1]).cumcount().values
+        _end[temp_index] = end.groupby(level=[0, 1]).cumcount().values
 
         _start.set_index(temp_index, append=True, inplace=True)
         _end.set_index(temp_index, append=True, inplace=True)
@@ -165,7 +218,9 @@ class EventBasedIP(InterestPeriodDefinition):
         InterestPeriodDefinition.__init__(self, name)
 
         self._start_source_df = start_source_df
-        self._end_source_df = end_source_df or start_source_df[:]
+        self._end_source_df = end_source_df
+        if end_source_df is None:
+            self._end_source_df = start_source_df
         self._start_criteria = start_criteria
         self._end_criteria = end_criteria
         self._exact = exact
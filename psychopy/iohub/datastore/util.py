@@ -12,6 +12,7 @@ from builtins import object
 import numbers  # numbers.Integral is like (int, long) but supports Py3
 from tables import *
 import os
+import numpy as np
 from collections import namedtuple
 import json
 
@@ -25,12 +26,26 @@ if parse_version(tables.__version__) < parse_version('3'):
     list_nodes = "listNodes"
     get_node = "getNode"
     read_where = "readWhere"
+    read_sorted = "readSorted"
+    walk_nodes = "walkNodes"
+    create_csindex = "createCSIndex"
+    remove_index = "removeIndex"
+    reindex_dirty = "reIndexDirty"
 else:
     from tables import open_file
     walk_groups = "walk_groups"
     list_nodes = "list_nodes"
     get_node = "get_node"
     read_where = "read_where"
+    read_sorted = "read_sorted"
+    walk_nodes = "walk_nodes"
+    create_csindex = "create_csindex"
+    remove_index = "remove_index"
+    reindex_dirty = "reindex_dirty"
+
+# Event table columns that get a completely sorted index (CSI) so that
+# time range, session and event type queries can use it.
+INDEXED_EVENT_COLUMNS = ('time', 'session_id', 'type')
 
 
 _hubFiles = []
@@ -45,6 +60,49 @@ def openHubFile(filepath, filename, mode):
     return hubFile
 
 
+def indexEventTables(hubFile, columns=INDEXED_EVENT_COLUMNS):
+    """
+    Create a completely sorted index (CSI) on each of the given columns of
+    every non empty event table in an ioHub DataStore file. Existing
+    indexes that are not CSI are rebuilt and dirty indexes are refreshed.
+
+    The file must be open in a writable mode.
+
+    Args:
+        hubFile: open pytables File object for the DataStore file.
+        columns (tuple): names of the event table columns to index.
+
+    Returns:
+        list: table path, column name tuples for the columns that were
+        (re)indexed.
+    """
+    indexed = []
+    try:
+        events_group = hubFile.root.data_collection.events
+    except tables.NoSuchNodeError:
+        return indexed
+    for table in getattr(hubFile, walk_nodes)(events_group, classname='Table'):
+        if table.nrows == 0:
+            continue
+        for cname in columns:
+            if cname not in table.colnames:
+                continue
+            col = getattr(table.cols, cname)
+            if col.is_indexed:
+                dirty = col.index.dirty
+                if dirty:
+                    getattr(col, reindex_dirty)()
+                if col.index.is_csi:
+                    if dirty:
+                        indexed.append((table._v_pathname, cname))
+                    continue
+                getattr(col, remove_index)()
+            getattr(col, create_csindex)()
+            indexed.append((table._v_pathname, cname))
+        table.flush()
+    return indexed
+
+
 def displayDataFileSelectionDialog(starting_dir=None):
     """Shows a FileDialog and lets you select a .hdf5 file to open for
     processing."""
@@ -253,21 +311,23 @@ class ExperimentDataAccessUtility(object):
                     event_column = 'class_name'
                     event_value = event_type
                 else:
+                    event_column = 'class_name'
                     event_value = ''
                     tokens = event_type.split('_')
                     for t in tokens:
                         event_value += t[0].upper()+t[1:].lower()
-                    event_value = event_type+'Event'
+                    event_value = event_value+'Event'
+                where_cls = '(%s == b"%s") & (class_type_id == 1)'%(event_column, event_value)
             elif isinstance(event_type, numbers.Integral):
                 event_column = 'class_id'
                 event_value = event_type
+                where_cls = '(%s == %d) & (class_type_id == 1)'%(event_column, event_value)
             else:
                 print2err(
                     'getEventTable error: event_type arguement must be a string or and int')
                 return None
 
             result = []
-            where_cls = '(%s == b"%s") & (class_type_id == 1)'%(event_column, event_value)
             for row in klassTables.where(where_cls):
                 result.append(row.fetch_all_fields())
 
@@ -461,6 +521,9 @@ class ExperimentDataAccessUtility(object):
                         (deviceEventTable.title, event_attribute_names))
 
             resultSetList = []
+            # Condition variable rows from the same session usually resolve
+            # to the same where clause; read each distinct clause only once.
+            queryCache = dict()
 
             csier = list(event_attribute_names)
             csier.append('query_string')
@@ -496,8 +559,10 @@ class ExperimentDataAccessUtility(object):
 
                         resultSetList.append([])
 
+                        events = self._readWhereCached(deviceEventTable,
+                                                       wclause, queryCache)
                         for ename in event_attribute_names:
-                            resultSetList[-1].append(getattr(deviceEventTable, read_where)(wclause, field=ename))
+                            resultSetList[-1].append(events[ename].copy())
                         resultSetList[-1].append(wclause)
                         resultSetList[-1].append(cv)
 
@@ -543,8 +608,10 @@ class ExperimentDataAccessUtility(object):
                         wclause=wclause[:-3]
                         wclause += ' ) '
 
+                    events = self._readWhereCached(deviceEventTable,
+                                                   wclause, queryCache)
                     for ename in event_attribute_names:
-                        resultSetList[-1].append(getattr(deviceEventTable, read_where)(wclause, field=ename))
+                        resultSetList[-1].append(events[ename].copy())
                     resultSetList[-1].append(wclause)
                     resultSetList[-1].append(cv)
 
@@ -556,6 +623,156 @@ class ExperimentDataAccessUtility(object):
 
             return None
 
+    def _readWhereCached(self, table, wclause, queryCache):
+        """Read all columns of the table rows matching wclause, reusing the
+        result of an earlier identical query from queryCache."""
+        if wclause not in queryCache:
+            queryCache[wclause] = getattr(table, read_where)(wclause)
+        return queryCache[wclause]
+
+    def getEventsForIntervals(
+            self,
+            event_type,
+            start_times,
+            end_times,
+            session_ids,
+            event_attribute_names=None,
+            filter_id=None):
+        """
+        Returns the events of the given type that occurred within each of
+        the given time intervals. Intervals are half open, [start, end).
+
+        The event table is read once; events are sorted by session and time
+        and the events for every interval are located using
+        numpy.searchsorted on the interval start and end times, instead of
+        running one where query per interval.
+
+        Args:
+            event_type (str or int): The event class name or event type id.
+            start_times (array like): The start time of each interval.
+            end_times (array like): The end time of each interval.
+            session_ids (int or array like): The session id of each interval, or one session id used for all intervals.
+            event_attribute_names (list): Event columns to return. All columns are returned if None.
+            filter_id (int): If given, only events with this filter_id are returned.
+
+        Returns:
+            list: A numpy structured array of events for each interval.
+        """
+        deviceEventTable = self.getEventTable(event_type)
+        if deviceEventTable is None:
+            raise ExperimentDataAccessException(
+                'getEventsForIntervals: no event table found for event type {0}'.format(event_type))
+
+        start_times = np.asarray(start_times, dtype=np.float64)
+        end_times = np.asarray(end_times, dtype=np.float64)
+        if start_times.shape != end_times.shape:
+            raise ExperimentDataAccessException(
+                'getEventsForIntervals: start_times and end_times must have the same length.')
+        session_ids = np.broadcast_to(np.asarray(session_ids), start_times.shape)
+
+        if event_attribute_names is not None:
+            for ename in event_attribute_names:
+                if ename not in deviceEventTable.colnames:
+                    raise ExperimentDataAccessException(
+                        'getEventsForIntervals: %s does not have a column named %s' %
+                        (deviceEventTable.title, ename))
+
+        unique_sessions = np.unique(session_ids)
+        wclause = '( experiment_id == {0} )'.format(self._experimentID)
+        if len(unique_sessions) == 1:
+            wclause += ' & ( session_id == {0} )'.format(unique_sessions[0])
+        if filter_id is not None:
+            wclause += ' & ( filter_id == {0} )'.format(filter_id)
+        events = getattr(deviceEventTable, read_where)(wclause)
+
+        events = events[np.lexsort((events['time'], events['session_id']))]
+        event_sessions = events['session_id']
+        event_times = events['time']
+        if event_attribute_names is not None:
+            events = events[list(event_attribute_names)]
+
+        results = [None] * len(start_times)
+        for sid in unique_sessions:
+            s0 = np.searchsorted(event_sessions, sid, side='left')
+            s1 = np.searchsorted(event_sessions, sid, side='right')
+            session_times = event_times[s0:s1]
+            in_session = np.flatnonzero(session_ids == sid)
+            starts = s0 + np.searchsorted(session_times,
+                                          start_times[in_session], side='left')
+            ends = s0 + np.searchsorted(session_times,
+                                        end_times[in_session], side='left')
+            for i, si, ei in zip(in_session, starts, ends):
+                results[i] = events[si:max(si, ei)]
+        return results
+
+    def getTrialEvents(
+            self,
+            event_type,
+            startVariable,
+            endVariable,
+            event_attribute_names=None,
+            filter_id=None,
+            conditionVariablesFilter=None):
+        """
+        Returns the events of the given type that occurred during each trial
+        saved in the condition variables table. Trial start and end times are
+        read from the startVariable and endVariable condition variable
+        columns, and all trials are extracted in one pass using
+        getEventsForIntervals.
+
+        Args:
+            event_type (str or int): The event class name or event type id.
+            startVariable (str): Name of the condition variable holding the trial start time.
+            endVariable (str): Name of the condition variable holding the trial end time.
+            event_attribute_names (list): Event columns to return. All columns are returned if None.
+            filter_id (int): If given, only events with this filter_id are returned.
+            conditionVariablesFilter (dict): Filter passed to getConditionVariables.
+
+        Returns:
+            list: A TrialEvents(events, condition_set) namedtuple for each condition variable row.
+        """
+        if conditionVariablesFilter is None:
+            cvrows = self.getConditionVariables()
+        else:
+            cvrows = self.getConditionVariables(conditionVariablesFilter)
+        if not cvrows:
+            return []
+
+        cvNames = self.getConditionVariableNames()
+        for vname in (startVariable, endVariable):
+            if vname not in cvNames:
+                raise ExperimentDataAccessException(
+                    'getTrialEvents: {0} is not a valid attribute name in {1}'.format(
+                        vname, cvNames))
+        session_field = [n for n in cvNames if n.lower() == 'session_id'][0]
+
+        start_times = [getattr(cv, startVariable) for cv in cvrows]
+        end_times = [getattr(cv, endVariable) for cv in cvrows]
+        session_ids = [getattr(cv, session_field) for cv in cvrows]
+        trial_events = self.getEventsForIntervals(event_type, start_times,
+                                                  end_times, session_ids,
+                                                  event_attribute_names,
+                                                  filter_id)
+        return [TrialEvents(events, cv) for events, cv in zip(trial_events, cvrows)]
+
+    def createIndexes(self, columns=INDEXED_EVENT_COLUMNS):
+        """
+        Create completely sorted indexes on the given columns of each event
+        table, so that where queries on them (for example by session_id, type
+        or time range) do not need to scan the whole table. The
+        ExperimentDataAccessUtility must have been created with mode 'a'.
+
+        Args:
+            columns (tuple): The event table columns to index.
+
+        Returns:
+            list: table path, column name tuples for the columns that were (re)indexed.
+        """
+        if self.mode == 'r':
+            raise ExperimentDataAccessException(
+                'createIndexes: the DataStore file must be opened with mode "a".')
+        return indexEventTables(self.hdfFile, columns)
+
     def getEventIterator(self, event_type):
         """
         **Docstr TBC.**
@@ -589,5 +806,28 @@ class ExperimentDataAccessUtility(object):
             pass
 
 
+TrialEvents = namedtuple('TrialEvents', ['events', 'condition_set'])
+
+
 class ExperimentDataAccessException(Exception):
     pass
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Create completely sorted indexes on the event tables of '
+                    'ioHub DataStore HDF5 files.')
+    parser.add_argument('files', nargs='+', help='HDF5 files to index.')
+    parser.add_argument('--columns', nargs='+',
+                        default=list(INDEXED_EVENT_COLUMNS),
+                        help='Event table columns to index.')
+    args = parser.parse_args()
+    for hdfPath in args.files:
+        hubFile = openHubFile(*os.path.split(os.path.abspath(hdfPath)), mode='a')
+        try:
+            for tpath, cname in indexEventTables(hubFile, args.columns):
+                print('%s: indexed %s.%s' % (hdfPath, tpath, cname))
+        finally:
+            _hubFiles.remove(hubFile)
+            hubFile.close()
@@ -9,7 +9,6 @@ from __future__ import division, absolute_import, print_function
 from builtins import zip
 from builtins import object
 import collections
-import copy
 import os
 from collections import deque
 from operator import itemgetter
@@ -224,6 +223,7 @@ class Device(ioObject):
     __slots__ = [e[0] for e in _newDataTypes] + ['_hw_interface_status',
                                                  '_hw_error_str',
                                                  '_native_event_buffer',
+                                                 '_native_event_count',
                                                  '_event_listeners',
                                                  '_iohub_event_buffer',
                                                  '_last_poll_time',
@@ -294,6 +294,7 @@ class Device(ioObject):
         self._last_poll_time = 0
         self._last_callback_time = 0
         self._native_event_buffer = deque(maxlen=self.event_buffer_length)
+        self._native_event_count = 0
         self._filters = dict()
         self._hw_interface_status = self.HW_STAT_UNDEFINED
         self._hw_error_str = u''
@@ -560,7 +561,9 @@ class Device(ioObject):
                     evt_filter_ids = event_filter.input_event_types.get(
                         event_type_id, [])
                     if input_evt_filter_id in evt_filter_ids:
-                        event_filter._addInputEvent(copy.deepcopy(e))
+                        # Event fields are filtered in place, so each filter
+                        # gets its own copy of the event list.
+                        event_filter._addInputEvent(list(e))
 
     def _getNativeEventBuffer(self):
         return self._native_event_buffer
@@ -568,6 +571,18 @@ class Device(ioObject):
     def _addNativeEventToBuffer(self, e):
         if self.isReportingEvents():
             self._native_event_buffer.append(e)
+            self._native_event_count += 1
+
+    def _getPollFileDescriptor(self):
+        """Devices that use polling and read their native events from a
+        selectable file descriptor (a serial port or socket for example) can
+        return it here, so the ioHub Server polls the device as soon as new
+        data is available rather than only after each device_timer interval.
+
+        Returns:
+            int or None: the file descriptor, or None (the default).
+        """
+        return None
 
     def _addEventListener(self, l, eventTypeIDs):
         for ei in eventTypeIDs:
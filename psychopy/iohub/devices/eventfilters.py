@@ -8,6 +8,7 @@ from __future__ import print_function
 from past.builtins import basestring
 from builtins import object
 import numpy as np
+from bisect import bisect_left, insort
 from collections import deque
 
 from ..util import NumPyRingBuffer
@@ -103,6 +104,8 @@ class DeviceEventFilter(object):
         #
         # The events returned by getInputEvents() are copies of the
         # original event lists, so it is fine to filter in place if desired.
+        # They are shallow copies, so list valued fields must not be
+        # changed in place.
         #
         # Each event passed to addOutputEvent() will have it's event_id and
         # filter_id updated appropriately; this is done for you.
@@ -128,6 +131,15 @@ class DeviceEventFilter(object):
 ####################### Device Event Field Filter Types ##################
 
 
+def _slidingWindows(values, length):
+    """Return a read only (len(values) - length + 1, length) view of all
+    windows of the given length in the 1D array values."""
+    stride = values.strides[0]
+    return np.lib.stride_tricks.as_strided(
+        values, shape=(len(values) - length + 1, length),
+        strides=(stride, stride), writeable=False)
+
+
 class MovingWindowFilter(object):
     """Maintains a moving window of size 'length', for a specific event field
     value, given by 'event_field_name'. knot_pos defines where in the window
@@ -143,10 +155,18 @@ class MovingWindowFilter(object):
     None is returned until the MovingWindow is full.
 
     The base class implements a moving window averaging filter, no weights.
+    The window sum is updated as each value is added, so the cost of adding
+    a value does not depend on the window length.
+
     To change the filter used, extend this class and replace the filteredValue
-    method.
+    method. Sub classes that keep running state for filteredValue update it
+    in _addValue and _resetRunningState. filterWindows can be replaced with
+    a vectorised version of filteredValue, which is used by filterValues.
 
     """
+    # the running window sum is recalculated from the window values after
+    # this many values have been added, so rounding errors can not build up.
+    RUNNING_SUM_SYNC_INTERVAL = 4096
 
     def __init__(self, **kwargs):
         self._inplace = kwargs.get('inplace')
@@ -181,6 +201,38 @@ class MovingWindowFilter(object):
             self._events = deque(maxlen=length)
 
         self._filtering_buffer = NumPyRingBuffer(length)
+        self._resetRunningState()
+
+    def _resetRunningState(self):
+        """Recalculate any running state used by filteredValue from the
+        values currently in the window."""
+        values = self._filtering_buffer.getElements()
+        finite = np.isfinite(values)
+        # the running sum is of the finite values only, so a NaN or inf
+        # value does not affect the filtered values once it leaves the window
+        self._window_sum = float(np.sum(values[finite], dtype=np.float64))
+        self._nonfinite_count = len(values) - int(np.count_nonzero(finite))
+        self._values_since_sync = 0
+
+    def _addValue(self, value):
+        """Add a value to the window, updating the running state used by
+        filteredValue."""
+        removed = self._filtering_buffer.append(value)
+        # use the float32 value as stored in the window.
+        value = float(np.float32(value))
+        if np.isfinite(value):
+            self._window_sum += value
+        else:
+            self._nonfinite_count += 1
+        if removed is not None:
+            removed = float(removed)
+            if np.isfinite(removed):
+                self._window_sum -= removed
+            else:
+                self._nonfinite_count -= 1
+        self._values_since_sync += 1
+        if self._values_since_sync >= self.RUNNING_SUM_SYNC_INTERVAL:
+            self._resetRunningState()
 
     def filteredValue(self):
         """Returns a filtered value based on the data in the window.
@@ -191,7 +243,15 @@ class MovingWindowFilter(object):
         types can be created.
 
         """
-        return self._filtering_buffer.mean()
+        if self._nonfinite_count:
+            return np.float32(np.mean(self._filtering_buffer.getElements()))
+        return np.float32(self._window_sum / len(self._filtering_buffer))
+
+    def filterWindows(self, windows):
+        """Returns the filtered value for each row of the 2D array windows,
+        where each row holds the values of a full window, oldest value first.
+        """
+        return windows.mean(axis=1)
 
     def add(self, event):
         """Add the given iohub event ( in list form ) to the moving window. The
@@ -204,59 +264,119 @@ class MovingWindowFilter(object):
 
         """
         if isinstance(event, (list, tuple)):
-            self._filtering_buffer.append(event[self._event_field_index])
+            self._addValue(event[self._event_field_index])
             self._events.append(event)
             if self.isFull():
+                filtered_value = self.filteredValue()
                 if self._inplace:
                     self._events[
                         self._active_index][
-                        self._event_field_index] = self.filteredValue()
-                return self._events[self._active_index], self.filteredValue()
+                        self._event_field_index] = filtered_value
+                return self._events[self._active_index], filtered_value
         else:
-            self._filtering_buffer.append(event)
+            self._addValue(event)
             if self.isFull():
                 return None, self.filteredValue()
 
+    def filterValues(self, values):
+        """Add a chunk of values (not events) to the moving window, returning
+        a numpy array with the filtered value of each added value that
+        completes a full window. The filtered values are the same as those
+        returned by calling add() for each value, but are calculated for the
+        whole chunk at once.
+        """
+        values = np.asarray(values, dtype=np.float32)
+        length = self._filtering_buffer.max_size
+        history = self._filtering_buffer.getElements()
+        window_values = np.concatenate(
+            (history[max(0, len(history) - length + 1):], values))
+        if len(window_values) >= length:
+            filtered = self.filterWindows(
+                _slidingWindows(window_values, length))
+        else:
+            filtered = np.empty(0, dtype=np.float32)
+        self._filtering_buffer.extend(values)
+        self._resetRunningState()
+        return filtered
+
     def isFull(self):
         return self._filtering_buffer.isFull()
 
     def clear(self):
         self._filtering_buffer.clear()
+        self._resetRunningState()
         if self._events:
             self._events.clear()
 # ------
 
 
 class PassThroughFilter(MovingWindowFilter):
-    """Returns the median value of the moving window.
-
-    Length must be odd.
-
-    """
+    """Returns the value added to the window; no filtering is done."""
 
     def __init__(self, **kwargs):
         kwargs['length'] = 1
         kwargs['knot_pos'] = 0
         MovingWindowFilter.__init__(self, **kwargs)
 
+    def _resetRunningState(self):
+        pass
+
+    def _addValue(self, value):
+        self._filtering_buffer.append(value)
+
     def filteredValue(self):
         return self._filtering_buffer[0]
 
+    def filterWindows(self, windows):
+        return windows[:, 0]
+
 # ------
 
 
 class MedianFilter(MovingWindowFilter):
     """Returns the median value of the moving window.
 
-    Length must be odd.
+    Length must be odd. A sorted copy of the window values is updated as
+    each value is added, so the median is found without sorting the window.
 
     """
 
     def __init__(self, **kwargs):
         MovingWindowFilter.__init__(self, **kwargs)
 
+    def _resetRunningState(self):
+        values = self._filtering_buffer.getElements()
+        not_nan = ~np.isnan(values)
+        self._sorted_values = sorted(values[not_nan].tolist())
+        self._nan_count = len(values) - len(self._sorted_values)
+
+    def _addValue(self, value):
+        value = float(np.float32(value))
+        removed = self._filtering_buffer.append(value)
+        if removed is not None:
+            removed = float(removed)
+            if removed != removed:
+                self._nan_count -= 1
+            else:
+                del self._sorted_values[bisect_left(self._sorted_values,
+                                                    removed)]
+        if value != value:
+            self._nan_count += 1
+        else:
+            insort(self._sorted_values, value)
+
     def filteredValue(self):
-        return np.median(self._filtering_buffer.getElements())
+        if self._nan_count:
+            return np.float32(np.nan)
+        sorted_values = self._sorted_values
+        middle = len(sorted_values) // 2
+        if len(sorted_values) % 2:
+            return np.float32(sorted_values[middle])
+        return np.float32((sorted_values[middle - 1] +
+                           sorted_values[middle]) / 2.0)
+
+    def filterWindows(self, windows):
+        return np.median(windows, axis=1)
 
 # ------
 
@@ -268,7 +388,8 @@ class WeightedAverageFilter(MovingWindowFilter):
 
     weights = weights / numpy.sum(weights)
 
-    before being used by the filter.
+    The filtered value is the convolution of the window values with the
+    weights, so the newest window value is multiplied by weights[0].
     """
 
     def __init__(self, **kwargs):
@@ -276,15 +397,157 @@ class WeightedAverageFilter(MovingWindowFilter):
         length = len(weights)
         kwargs['length'] = length
         MovingWindowFilter.__init__(self, **kwargs)
-        weights = np.asanyarray(weights)
+        weights = np.asanyarray(weights, dtype=np.float64)
         self._weights = weights / np.sum(weights)
+        # window values are oldest first
+        self._window_weights = self._weights[::-1].copy()
+
+    def _resetRunningState(self):
+        pass
+
+    def _addValue(self, value):
+        self._filtering_buffer.append(value)
 
     def filteredValue(self):
-        return np.convolve(
-            self._filtering_buffer.getElements(),
-            self._weights,
-            'valid')
+        return np.dot(self._filtering_buffer.getElements(),
+                      self._window_weights)
 
+    def filterWindows(self, windows):
+        return windows.dot(self._window_weights)
+
+# ------
+
+
+class SavitzkyGolayFilter(WeightedAverageFilter):
+    """
+    Savitzky-Golay smoothing filter. A polynomial of order 'polyorder' is
+    fit, by least squares, to the window values and the filtered value is the
+    value of the polynomial at knot_pos. The fit is the same for every window,
+    so it is implemented as a WeightedAverageFilter using the
+    Savitzky-Golay coefficients as the weights.
+
+    Parameters:
+        * length: The size of the moving window in samples; must be greater
+          than polyorder.
+        * polyorder: The order of the fitted polynomial. Default is 2.
+        * knot_pos: As for MovingWindowFilter. Default is 'center'.
+    """
+
+    def __init__(self, **kwargs):
+        length = kwargs.get('length')
+        polyorder = kwargs.get('polyorder', 2)
+        knot_pos = kwargs.setdefault('knot_pos', 'center')
+        if polyorder >= length:
+            raise ValueError(
+                'SavitzkyGolayFilter polyorder must be less than length.')
+        if knot_pos == 'center':
+            knot = length // 2
+        elif knot_pos == 'latest':
+            knot = 0
+        elif knot_pos == 'oldest':
+            knot = length - 1
+        else:
+            knot = knot_pos
+        # window positions relative to the knot, oldest value first.
+        positions = np.arange(length, dtype=np.float64) - knot
+        # row 0 of the pseudo inverse gives the fitted polynomial's value at
+        # position 0 as a weighted sum of the window values.
+        coefficients = np.linalg.pinv(
+            np.vander(positions, polyorder + 1, increasing=True))[0]
+        # WeightedAverageFilter weights are newest value first.
+        kwargs['weights'] = coefficients[::-1]
+        WeightedAverageFilter.__init__(self, **kwargs)
+
+# ------
+
+
+class OneEuroFilter(MovingWindowFilter):
+    """
+    The 1 Euro Filter (Casiez, Roussel & Vogel, CHI 2012). An adaptive low
+    pass filter whose cutoff frequency increases with the speed of change of
+    the filtered value, so slow changes are smoothed while fast changes are
+    followed with little lag. A filtered value is returned for every value
+    added.
+
+    Parameters:
+        * min_cutoff: Minimum cutoff frequency in Hz. Default is 1.0.
+        * beta: Speed coefficient; increase to reduce lag when the value is
+          changing quickly. Default is 0.0.
+        * d_cutoff: Cutoff frequency in Hz used to smooth the speed. Default
+          is 1.0.
+        * rate: Sampling rate in Hz. Used for the time between values when
+          values, rather than events, are added, or when event times are not
+          increasing. Default is 1000.0.
+
+    When events are added, the event time is used to calculate the time
+    between values.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['length'] = 1
+        kwargs['knot_pos'] = 0
+        MovingWindowFilter.__init__(self, **kwargs)
+        self._min_cutoff = kwargs.get('min_cutoff', 1.0)
+        self._beta = kwargs.get('beta', 0.0)
+        self._d_cutoff = kwargs.get('d_cutoff', 1.0)
+        self._rate = kwargs.get('rate', 1000.0)
+
+    def _resetRunningState(self):
+        self._last_value = None
+        self._last_dvalue = 0.0
+        self._last_time = None
+        self._filtered_value = None
+
+    @staticmethod
+    def _smoothingFactor(cutoff, dt):
+        r = 2.0 * np.pi * cutoff * dt
+        return r / (r + 1.0)
+
+    def _filterValue(self, value, time=None):
+        value = float(value)
+        if self._last_value is None:
+            self._last_value = value
+            self._last_time = time
+            self._filtered_value = value
+            return value
+        if time is not None and self._last_time is not None and \
+                time > self._last_time:
+            dt = time - self._last_time
+        else:
+            dt = 1.0 / self._rate
+        dvalue = (value - self._last_value) / dt
+        dvalue = self._last_dvalue + self._smoothingFactor(
+            self._d_cutoff, dt) * (dvalue - self._last_dvalue)
+        cutoff = self._min_cutoff + self._beta * abs(dvalue)
+        value = self._last_value + self._smoothingFactor(cutoff, dt) * (
+            value - self._last_value)
+        self._last_value = value
+        self._last_dvalue = dvalue
+        self._last_time = time
+        self._filtered_value = value
+        return value
+
+    def filteredValue(self):
+        return self._filtered_value
+
+    def add(self, event):
+        if isinstance(event, (list, tuple)):
+            self._filtering_buffer.append(event[self._event_field_index])
+            self._events.append(event)
+            filtered_value = self._filterValue(
+                event[self._event_field_index],
+                event[DeviceEvent.EVENT_HUB_TIME_INDEX])
+            if self._inplace:
+                event[self._event_field_index] = filtered_value
+            return event, filtered_value
+        self._filtering_buffer.append(event)
+        return None, self._filterValue(event)
+
+    def filterValues(self, values):
+        filtered = np.asarray([self._filterValue(v) for v in values],
+                              dtype=np.float64)
+        self._filtering_buffer.extend(np.asarray(values, dtype=np.float32))
+        return filtered
 
 # ------
 
@@ -332,6 +595,10 @@ class StampFilter(MovingWindowFilter):
                 self._events.append(event)
         return MovingWindowFilter.add(self, event)
 
+    def filterValues(self, values):
+        results = [self.add(v) for v in values]
+        return np.asarray([r[1] for r in results if r], dtype=np.float32)
+
 # ------
 
 #################### TEST ###############################
@@ -25,6 +25,10 @@ for a sample, the positions are averaged together. If only one of the two eyes
 has valid data, then that eye data is used for the sample. So the only case
 where a sample will be tagged as missing data is when both eyes do not have
 valid eye position / pupil size data.
+* EyeTrackerBlockEventParser processes blocks of samples using numpy arrays
+instead of one sample at a time, and gives the same output events as
+EyeTrackerEventParser. parseEyeSamples() uses it to parse sample arrays
+read from an iohub DataStore file offline.
 
 POSITION_FILTER and VELOCITY_FILTER can be set to one of the following event
 field filter types. Example values for any input arguments are given. The filter
@@ -131,10 +135,13 @@ Data is filtered once, similar to what a 'normal' filter level would be in the
   eyelink<tm> system. Level = 2 would be similar to the 'extra' filter level
   setting of eyelink<tm>.
 """
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
 from ....constants import EventConstants
 from ....errors import print2err
 from ... import DeviceEvent, eventfilters
-from collections import OrderedDict
 from ....util.visualangle import VisualAngleCalc
 
 MONOCULAR_EYE_SAMPLE = EventConstants.MONOCULAR_EYE_SAMPLE
@@ -151,6 +158,18 @@ LEFT_EYE = 1
 RIGHT_EYE = 2
 BOTH_EYE = 3
 
+# Summary values of the samples that make up a parsed eye event, used to
+# fill in the average and peak fields of end events.
+EventSampleStats = namedtuple('EventSampleStats', ['average_gaze_x',
+                                                   'average_gaze_y',
+                                                   'average_pupil_measure1',
+                                                   'average_velocity_x',
+                                                   'average_velocity_y',
+                                                   'average_velocity_xy',
+                                                   'peak_velocity_x',
+                                                   'peak_velocity_y',
+                                                   'peak_velocity_xy'])
+
 
 class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
 
@@ -174,28 +193,26 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
         sampling_rate = kwargs.get('sampling_rate')
 
         if position_filter:
-            pos_filter_class_name = position_filter.get(
+            pos_filter_kwargs = dict(position_filter)
+            pos_filter_class_name = pos_filter_kwargs.pop(
                 'name', 'PassThroughFilter')
             pos_filter_class = getattr(eventfilters, pos_filter_class_name)
-            del position_filter['name']
-            pos_filter_kwargs = position_filter
         else:
             pos_filter_class, pos_filter_kwargs = eventfilters.PassThroughFilter, {}
 
         if velocity_filter:
-            vel_filter_class_name = position_filter.get(
+            vel_filter_kwargs = dict(velocity_filter)
+            vel_filter_class_name = vel_filter_kwargs.pop(
                 'name', 'PassThroughFilter')
             vel_filter_class = getattr(eventfilters, vel_filter_class_name)
-            del velocity_filter['name']
-            vel_filter_kwargs = velocity_filter
         else:
             vel_filter_class, vel_filter_kwargs = eventfilters.PassThroughFilter, {}
 
         self.adaptive_x_vthresh_buffer = np.zeros(
-            self.vel_thresh_history_dur * sampling_rate)
+            int(self.vel_thresh_history_dur * sampling_rate))
         self.x_vthresh_buffer_index = 0
         self.adaptive_y_vthresh_buffer = np.zeros(
-            self.vel_thresh_history_dur * sampling_rate)
+            int(self.vel_thresh_history_dur * sampling_rate))
         self.y_vthresh_buffer_index = 0
 
         pos_filter_kwargs['event_type'] = MONOCULAR_EYE_SAMPLE
@@ -336,7 +353,8 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
 
             if existing_start_event:
                 end_event = self.createBlinkEndEventArray(
-                    last_sample, existing_start_event, evt_samples)
+                    last_sample, existing_start_event,
+                    self.getEventSampleStats(evt_samples))
                 del self.open_parser_events['MIS']
             else:
                 # print2err("PARSER Warning: Blink Start Event not found; Blink End event being dropped: ", end_event)
@@ -349,7 +367,8 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
                 del self.open_parser_events['FIX_SAMPLES']
             if existing_start_event:
                 end_event = self.createFixationEndEventArray(
-                    last_sample, existing_start_event, evt_samples)
+                    last_sample, existing_start_event,
+                    self.getEventSampleStats(evt_samples))
                 del self.open_parser_events['FIX']
             else:
                 # print2err("PARSER Warning: Fixation Start Event not found; Fixation End event being dropped: ", end_event)
@@ -362,7 +381,8 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
                 del self.open_parser_events['SAC_SAMPLES']
             if existing_start_event:
                 end_event = self.createSaccadeEndEventArray(
-                    last_sample, existing_start_event, evt_samples)
+                    last_sample, existing_start_event,
+                    self.getEventSampleStats(evt_samples))
                 del self.open_parser_events['SAC']
             else:
                 # print2err("PARSER Warning: Saccade Start Event not found; Saccade End event being dropped: ", end_event)
@@ -532,12 +552,12 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
     def _addVelocity(self, prev_event, current_event):
         io_ix = self.io_event_ix
 
-        dx = np_abs(
+        dx = np.abs(
             current_event[
                 io_ix('angle_x')] -
             prev_event[
                 io_ix('angle_x')])
-        dy = np_abs(
+        dy = np.abs(
             current_event[
                 io_ix('angle_y')] -
             prev_event[
@@ -550,9 +570,10 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
 
     def _convertMonoFields(self, prev_event, current_event):
         if self.isValidSample(current_event):
-            self._convertPosToAngles(self, current_event)
+            self._convertPosToAngles(current_event)
             if prev_event:
                 self._addVelocity(prev_event, current_event)
+        return current_event
 
     def _convertToMonoAveraged(self, prev_event, current_event):
         mono_evt = []
@@ -596,17 +617,15 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
                                 binoc_field_names.index(
                                     'right_%s' %
                                     (field))]))
-                elif status == 22:
-                    # both eyes have missing data, so use data from left eye
-                    # (does not really matter)
+                else:
+                    # both eyes have missing data (status 22), so use data
+                    # from left eye (does not really matter)
                     mono_evt.append(
                         float(
                             current_event[
                                 binoc_field_names.index(
                                     'left_%s' %
                                     (field))]))
-                else:
-                    ValueError('Unknown Sample Status: %d' % (status))
         mono_evt[self.io_event_fields.index(
             'type')] = EventConstants.MONOCULAR_EYE_SAMPLE
         if self.isValidSample(mono_evt):
@@ -627,6 +646,26 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
         elif evt_status == 22:  # both eye data missing
             return NO_EYE
 
+    def getEventSampleStats(self, event_samples):
+        """Return the EventSampleStats for the list of samples that make up
+        a parsed event."""
+        evt_sample_array = np.asarray(event_samples)
+        gx = self.io_event_ix('gaze_x')
+        gy = self.io_event_ix('gaze_y')
+        ps = self.io_event_ix('pupil_measure1')
+        vx = self.io_event_ix('velocity_x')
+        vy = self.io_event_ix('velocity_y')
+        vxy = self.io_event_ix('velocity_xy')
+        return EventSampleStats(evt_sample_array[:, gx].mean(),
+                                evt_sample_array[:, gy].mean(),
+                                evt_sample_array[:, ps].mean(),
+                                evt_sample_array[:, vx].mean(),
+                                evt_sample_array[:, vy].mean(),
+                                evt_sample_array[:, vxy].mean(),
+                                evt_sample_array[:, vx].max(),
+                                evt_sample_array[:, vy].max(),
+                                evt_sample_array[:, vxy].max())
+
     def createFixationStartEventArray(self, sample):
         return [sample[self.io_event_ix('experiment_id')],
                 sample[self.io_event_ix('session_id')],
@@ -667,8 +706,7 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
             self,
             sample,
             existing_start_event,
-            event_samples):
-        evt_sample_array = np.asarray(event_samples)
+            stats):
         vx = self.io_event_ix('velocity_x')
         vy = self.io_event_ix('velocity_y')
         vxy = self.io_event_ix('velocity_xy')
@@ -728,31 +766,28 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
                 sample[vx],
                 sample[vy],
                 sample[vxy],
-                evt_sample_array[:, gx].mean(),  # average_gaze_x,
-                evt_sample_array[:, gy].mean(),  # average_gaze_y,
+                stats.average_gaze_x,
+                stats.average_gaze_y,
+                0.0,
+                0.0,
+                0.0,
                 0.0,
                 0.0,
+                stats.average_pupil_measure1,
+                # average_pupil_measure1_type,
+                sample[self.io_event_ix('pupil_measure1_type')],
+                0.0,
                 0.0,
                 0.0,
                 0.0,
-                evt_sample_array[
-            :,
-            self.io_event_ix('pupil_measure1')].mean(),
-            # average_pupil_measure1,
-            # average_pupil_measure1_type,
-            sample[self.io_event_ix('pupil_measure1_type')],
-            0.0,
-            0.0,
-            0.0,
-            0.0,
-            evt_sample_array[:, vx].mean(),  # average_velocity_x,
-            evt_sample_array[:, vy].mean(),  # average_velocity_y,
-            evt_sample_array[:, vxy].mean(),  # average_velocity_xy,
-            evt_sample_array[:, vx].max(),  # peak_velocity_x,
-            evt_sample_array[:, vy].max(),  # peak_velocity_y,
-            evt_sample_array[:, vxy].max(),  # peak_velocity_xy,
-            sample[self.io_event_ix('status')]
-        ]
+                stats.average_velocity_x,
+                stats.average_velocity_y,
+                stats.average_velocity_xy,
+                stats.peak_velocity_x,
+                stats.peak_velocity_y,
+                stats.peak_velocity_xy,
+                sample[self.io_event_ix('status')]
+                ]
 
     ################### Saccade Event Types ##########################
 
@@ -796,8 +831,7 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
             self,
             sample,
             existing_start_event,
-            event_samples):
-        evt_sample_array = np.asarray(event_samples)
+            stats):
         gx = self.io_event_ix('gaze_x')
         gy = self.io_event_ix('gaze_y')
         x1 = existing_start_event[gx]
@@ -825,7 +859,7 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
                     'time')] - existing_start_event[self.io_event_ix('time')],
                 xDiff,
                 yDiff,
-                rad2deg(arctan(yDiff, xDiff)),
+                np.rad2deg(np.arctan2(yDiff, xDiff)),
                 existing_start_event[gx],
                 existing_start_event[gy],
                 0.0,
@@ -866,12 +900,12 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
                 sample[vx],
                 sample[vy],
                 sample[vxy],
-                evt_sample_array[:, vx].mean(),  # average_velocity_x,
-                evt_sample_array[:, vy].mean(),  # average_velocity_y,
-                evt_sample_array[:, vxy].mean(),  # average_velocity_xy,
-                evt_sample_array[:, vx].max(),  # peak_velocity_x,
-                evt_sample_array[:, vy].max(),  # peak_velocity_y,
-                evt_sample_array[:, vxy].max(),  # peak_velocity_xy,
+                stats.average_velocity_x,
+                stats.average_velocity_y,
+                stats.average_velocity_xy,
+                stats.peak_velocity_x,
+                stats.peak_velocity_y,
+                stats.peak_velocity_xy,
                 sample[self.io_event_ix('status')]
                 ]
 
@@ -897,7 +931,7 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
             self,
             sample,
             existing_start_event,
-            event_samples):
+            stats):
         return [
             sample[
                 self.io_event_ix('experiment_id')], sample[
@@ -911,3 +945,535 @@ class EyeTrackerEventParser(eventfilters.DeviceEventFilter):
                                         self.io_event_ix('time')] - existing_start_event[
                                             self.io_event_ix('time')], sample[
                                                 self.io_event_ix('status')]]
+
+
+####################### Block / Array Based Parser ##########################
+
+def _float64Dtype(dtype):
+    """Return a copy of the numpy dtype with any float32 fields widened to
+    float64, so values keep the precision they have in iohub event lists."""
+    return np.dtype([(name, 'f8' if dtype[name] == np.float32 else
+                      dtype[name].str) for name in dtype.names])
+
+
+_slidingWindows = eventfilters._slidingWindows
+
+
+class _BlockFieldFilter(object):
+    """Adds blocks of field values to a MovingWindowFilter instance using
+    its filterValues method, keeping track of which samples of the filtered
+    stream the returned values are for."""
+
+    def __init__(self, field_filter):
+        self._field_filter = field_filter
+        self.length = field_filter._filtering_buffer.max_size
+        self.knot = field_filter._active_index
+        # number of samples added after a sample before it is filtered
+        self.delay = self.length - 1 - self.knot
+        # number of filtered values returned so far
+        self.count = 0
+
+    def add(self, values):
+        """Add a block of values to the filter window, returning the filtered
+        values for each sample whose window is now complete. The first
+        filtered value returned is for sample index self.knot +
+        self.count (before the call) of the filtered stream."""
+        filtered = self._field_filter.filterValues(values)
+        self.count += len(filtered)
+        return filtered
+
+    def clear(self):
+        self._field_filter.clear()
+        self.count = 0
+
+
+def _adaptiveVelocityThresholds(velocities, history, count, blen,
+                                max_windows=256):
+    """Vectorised version of EyeTrackerEventParser's adaptive velocity
+    threshold calculation.
+
+    velocities are the sample velocities to add, history the last
+    min(count, blen) positive velocities previously added and count the
+    number of positive velocities previously added.
+
+    Returns (thresholds, history, count); thresholds is NaN for samples
+    with a velocity <= 0 or that were added before blen positive
+    velocities were available, matching the per sample parser.
+    """
+    thresholds = np.full(len(velocities), np.nan)
+    positive = np.flatnonzero(velocities > 0.0)
+    series = np.concatenate((history, velocities[positive]))
+    # global index of each new positive velocity in the positive stream
+    gindex = count + np.arange(len(positive))
+    full = np.flatnonzero(gindex >= blen)
+    # window i ends at the series element of positive velocity full[i]
+    ends = len(history) + full
+    for c in range(0, len(full), max_windows):
+        cends = ends[c:c + max_windows]
+        windows = _slidingWindows(series, blen)[cends - blen + 1]
+        PT = windows.min(axis=1) + windows.std(axis=1) * 3.0
+        active = np.arange(len(windows))
+        while len(active):
+            w = windows[active]
+            below = w < PT[active][:, np.newaxis]
+            n = below.sum(axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.where(below, w, 0.0).sum(axis=1) / n
+                std = np.sqrt(np.where(below, (w - mean[:, np.newaxis]) ** 2,
+                                       0.0).sum(axis=1) / n)
+            newPT = mean + 3.0 * std
+            PTd = np.abs(newPT - PT[active])
+            PT[active] = newPT
+            # NaN differences end the loop, as in the per sample version
+            active = active[PTd >= 1.0]
+        thresholds[positive[full[c:c + max_windows]]] = PT
+    count += len(positive)
+    history = series[max(0, len(series) - blen):]
+    return thresholds, history, count
+
+
+class EyeTrackerBlockEventParser(EyeTrackerEventParser):
+    """Eye sample event parser that processes blocks of samples using numpy
+    arrays instead of one sample at a time.
+
+    The conversion to monocular samples, position to visual angle
+    conversion, missing data interpolation, velocity calculation, field
+    filtering, adaptive velocity threshold and sample categorisation steps
+    are all done for a whole block of samples at once. Output events are
+    the same as those of EyeTrackerEventParser when PassThroughFilter
+    position and velocity filters are used.
+
+    When other filters are used a sample is output once
+    both its position and velocity filtering are complete, and missing
+    data is interpolated between the unfiltered positions of the valid
+    samples either side of the missing data period, so results can
+    differ slightly from EyeTrackerEventParser.
+
+    In addition to the EyeTrackerEventParser kwargs, block_size gives the
+    number of input samples that are collected before they are processed.
+    By default samples are processed every 10 msec.
+    """
+
+    def __init__(self, **kwargs):
+        EyeTrackerEventParser.__init__(self, **kwargs)
+        if not getattr(self, 'block_size', None):
+            self.block_size = max(1, int(kwargs.get('sampling_rate') * 0.01))
+        self._vthresh_history_len = len(self.adaptive_x_vthresh_buffer)
+        self._position_filters = [_BlockFieldFilter(self.x_position_filter),
+                                  _BlockFieldFilter(self.y_position_filter)]
+        self._velocity_filters = [_BlockFieldFilter(self.x_velocity_filter),
+                                  _BlockFieldFilter(self.y_velocity_filter),
+                                  _BlockFieldFilter(self.xy_velocity_filter)]
+        pos_filter = self._position_filters[0]
+        if pos_filter.length == 1:
+            # filtered positions are the float32 input positions.
+            self._filteredPosition = lambda a: a.astype(
+                np.float32).astype(np.float64)
+        else:
+            self._filteredPosition = lambda a: a
+        self._input_dtype = None
+        self._mono_dtype = None
+        self._clearBlockState()
+
+    def _clearBlockState(self):
+        self._pending_invalid = None
+        self._stream = None
+        self._stream_base = 0
+        self._stream_count = 0
+        self._velocity_prev = None
+        self._last_valid = None
+        self._x_vthresh_history = np.empty(0)
+        self._y_vthresh_history = np.empty(0)
+        self._last_category = None
+        self._last_parsed_sample = None
+        self._open_event = None
+        for field_filter in self._position_filters + self._velocity_filters:
+            field_filter.clear()
+
+    def reset(self):
+        EyeTrackerEventParser.reset(self)
+        self._clearBlockState()
+
+    def _addInputEvent(self, evt):
+        self._input_events.append(evt)
+        if len(self._input_events) >= self.block_size:
+            self.process()
+
+    def process(self):
+        """Parse the block of input samples collected so far."""
+        in_events = self.getInputEvents()
+        if in_events:
+            if self.sample_type is None:
+                self.initializeForSampleType(in_events[0])
+            in_samples = np.array([tuple(e) for e in in_events],
+                                  dtype=self._input_dtype)
+            for e in self.processBlock(in_samples):
+                self.addOutputEvent(e)
+        self.clearInputEvents()
+
+    def initializeForSampleType(self, in_evt):
+        EyeTrackerEventParser.initializeForSampleType(self, in_evt)
+        in_type = in_evt[DeviceEvent.EVENT_TYPE_ID_INDEX]
+        self._input_dtype = _float64Dtype(
+            EventConstants.getClass(in_type).NUMPY_DTYPE)
+        self._mono_dtype = _float64Dtype(self.io_sample_class.NUMPY_DTYPE)
+
+    def processBlock(self, in_samples):
+        """Parse a numpy structured array of eye samples (binocular or
+        monocular, using the sample event class NUMPY_DTYPE field names),
+        returning the list of output events, in iohub event list form, that
+        can be created so far.
+
+        Samples with missing data are output as soon as they are
+        processed, followed by the parsed events and valid samples in
+        time order.
+        """
+        if self.sample_type is None:
+            self.initializeForSampleType(in_samples[0])
+        samples = self._toMonoArray(in_samples)
+        valid = self._validSampleMask(samples)
+        output = [list(s) for s in samples[~valid].tolist()]
+
+        if self._pending_invalid is not None:
+            samples = np.concatenate((self._pending_invalid, samples))
+            valid = np.concatenate((np.zeros(len(self._pending_invalid),
+                                             dtype=bool), valid))
+            self._pending_invalid = None
+        valid_ix = np.flatnonzero(valid)
+        if len(valid_ix) == 0:
+            self._keepInvalidRun(samples)
+            return output
+        start_ix = 0
+        if self._last_valid is None and valid_ix[0] > 0:
+            # Discard invalid samples that occurred prior to the first
+            # valid sample.
+            self._keepInvalidRun(samples[:valid_ix[0]])
+            start_ix = valid_ix[0]
+        if valid_ix[-1] + 1 < len(samples):
+            self._pending_invalid = samples[valid_ix[-1] + 1:]
+        stream = samples[start_ix:valid_ix[-1] + 1]
+        stream_valid = valid[start_ix:valid_ix[-1] + 1]
+
+        self._interpolateMissingData(stream, stream_valid)
+        self._filterStream(stream)
+        output.extend(self._parseEmitted(self._emitFilteredSamples()))
+        return output
+
+    def _keepInvalidRun(self, samples):
+        if self._last_valid is None:
+            if len(samples):
+                last = samples[-1]
+                self._velocity_prev = (last['time'], last['angle_x'],
+                                       last['angle_y'])
+        else:
+            self._pending_invalid = samples
+
+    def _validSampleMask(self, samples):
+        if self._input_dtype.names == self._mono_dtype.names:
+            return samples['status'] == 0
+        return samples['status'] != 22
+
+    def _toMonoArray(self, in_samples):
+        mono = np.zeros(len(in_samples), dtype=self._mono_dtype)
+        in_names = in_samples.dtype.names
+        if in_names == self._mono_dtype.names:
+            mono[...] = in_samples
+        else:
+            status = in_samples['status']
+            for field in self._mono_dtype.names:
+                if field in in_names:
+                    mono[field] = in_samples[field]
+                elif field == 'eye':
+                    mono[field] = LEFT_EYE
+                elif field.endswith('_type'):
+                    mono[field] = in_samples['left_%s' % (field)]
+                else:
+                    lfv = in_samples['left_%s' % (field)].astype(np.float64)
+                    rfv = in_samples['right_%s' % (field)].astype(np.float64)
+                    # status 20 is right eye data only; for status 22 (both
+                    # eyes missing) left eye data is used.
+                    mono[field] = np.where(status == 0, (lfv + rfv) / 2.0,
+                                           np.where(status == 20, rfv, lfv))
+            mono['type'] = MONOCULAR_EYE_SAMPLE
+        valid = self._validSampleMask(mono)
+        mono['angle_x'][valid], mono['angle_y'][valid] = self.pix2deg(
+            mono['gaze_x'][valid], mono['gaze_y'][valid])
+        return mono
+
+    def _interpolateMissingData(self, stream, valid):
+        """Linearly interpolate angle and pupil values of missing data
+        samples in place, from the last valid sample before to the first
+        valid sample after each missing data period."""
+        invalid = np.flatnonzero(~valid)
+        if len(invalid) == 0:
+            self._last_valid = self._lastValidValues(stream)
+            return
+        index = np.arange(len(stream))
+        prev_valid = np.maximum.accumulate(np.where(valid, index, -1))
+        next_valid = np.minimum.accumulate(
+            np.where(valid, index, len(stream))[::-1])[::-1]
+        prev_valid = prev_valid[invalid]
+        next_valid = next_valid[invalid]
+        run_index = invalid - prev_valid
+        run_div = next_valid - prev_valid
+        # only the first block of samples has no last valid sample, and it
+        # starts with a valid sample.
+        last_valid = self._last_valid or (np.nan, np.nan, np.nan)
+        for field, last_value in zip(('angle_x', 'angle_y', 'pupil_measure1'),
+                                     last_valid):
+            values = stream[field]
+            starts = values[prev_valid]
+            if field != 'pupil_measure1':
+                starts = self._filteredPosition(starts)
+            starts[prev_valid < 0] = last_value
+            # same calculation as numpy.linspace
+            step = (values[next_valid] - starts) / run_div
+            values[invalid] = run_index * step + starts
+        self._last_valid = self._lastValidValues(stream)
+
+    def _lastValidValues(self, stream):
+        last = stream[-1:]
+        return (self._filteredPosition(last['angle_x'])[0],
+                self._filteredPosition(last['angle_y'])[0],
+                last['pupil_measure1'][0])
+
+    def _filterStream(self, stream):
+        """Calculate velocities for, and filter, a block of continuous (valid
+        or interpolated) samples. Samples are added to the stream of samples
+        waiting for output, with the filtered values of any earlier samples
+        waiting for output updated."""
+        pos_filter = self._position_filters[0]
+        filtered_pos = [f.add(stream[field]) for f, field in
+                        zip(self._position_filters, ('angle_x', 'angle_y'))]
+        # Positions used for the velocity of the following sample. These
+        # are the filtered positions when filtering does not delay samples.
+        prev_x = stream['angle_x'].copy()
+        prev_y = stream['angle_y'].copy()
+        if pos_filter.delay == 0 and len(filtered_pos[0]):
+            prev_x[-len(filtered_pos[0]):] = filtered_pos[0]
+            prev_y[-len(filtered_pos[1]):] = filtered_pos[1]
+
+        times = stream['time']
+        if self._velocity_prev is None:
+            first = 1
+            ptime, px, py = times[:-1], prev_x[:-1], prev_y[:-1]
+        else:
+            first = 0
+            ptime = np.concatenate(([self._velocity_prev[0]], times[:-1]))
+            px = np.concatenate(([self._velocity_prev[1]], prev_x[:-1]))
+            py = np.concatenate(([self._velocity_prev[2]], prev_y[:-1]))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dt = times[first:] - ptime
+            vx = np.abs(stream['angle_x'][first:] - px) / dt
+            vy = np.abs(stream['angle_y'][first:] - py) / dt
+            stream['velocity_x'][first:] = vx
+            stream['velocity_y'][first:] = vy
+            stream['velocity_xy'][first:] = np.hypot(vx, vy)
+        self._velocity_prev = (times[-1], prev_x[-1], prev_y[-1])
+
+        filtered_vel = [f.add(stream[field]) for f, field in
+                        zip(self._velocity_filters,
+                            ('velocity_x', 'velocity_y', 'velocity_xy'))]
+
+        if self._stream is None or len(self._stream) == 0:
+            self._stream = stream.copy()
+        else:
+            self._stream = np.concatenate((self._stream, stream))
+        self._stream_count += len(stream)
+
+        fields = ('angle_x', 'angle_y', 'velocity_x', 'velocity_y',
+                  'velocity_xy')
+        field_filters = self._position_filters + self._velocity_filters
+        for field, field_filter, filtered in zip(fields, field_filters,
+                                                 filtered_pos + filtered_vel):
+            if len(filtered):
+                end = field_filter.knot + field_filter.count - self._stream_base
+                self._stream[field][end - len(filtered):end] = filtered
+
+    def _emitFilteredSamples(self):
+        """Remove and return the samples waiting for output that have had
+        all field filtering done."""
+        pos_filter = self._position_filters[0]
+        vel_filter = self._velocity_filters[-1]
+        emit_end = min(vel_filter.knot + vel_filter.count,
+                       pos_filter.knot + pos_filter.count)
+        if emit_end <= self._stream_base:
+            return self._stream[:0]
+        # samples before the velocity filter knot are never returned by the
+        # filter, so they are dropped.
+        emit_start = max(0, vel_filter.knot - self._stream_base)
+        emitted = self._stream[emit_start:emit_end - self._stream_base]
+        self._stream = self._stream[emit_end - self._stream_base:]
+        self._stream_base = emit_end
+        return emitted
+
+    def _parseEmitted(self, emitted):
+        """Add adaptive velocity thresholds to the filtered samples, categorise
+        them and return the valid samples together with any eye events
+        started or ended by the samples, in output order."""
+        if len(emitted) == 0:
+            return []
+        valid = self._validSampleMask(emitted)
+        blen = self._vthresh_history_len
+        for field, tfield, hist_attr, count_attr in (
+                ('velocity_x', 'raw_x', '_x_vthresh_history',
+                 'x_vthresh_buffer_index'),
+                ('velocity_y', 'raw_y', '_y_vthresh_history',
+                 'y_vthresh_buffer_index')):
+            thresholds, history, count = _adaptiveVelocityThresholds(
+                emitted[field][valid], getattr(self, hist_attr),
+                getattr(self, count_attr), blen)
+            emitted[tfield][valid] = thresholds
+            setattr(self, hist_attr, history)
+            setattr(self, count_attr, count)
+
+        # 0 == 'MIS', 1 == 'FIX', 2 == 'SAC'
+        categories = np.zeros(len(emitted), dtype=np.int8)
+        categories[valid] = 1
+        categories[valid & ((emitted['velocity_x'] >= emitted['raw_x']) |
+                            (emitted['velocity_y'] >= emitted['raw_y']))] = 2
+
+        if self._last_category is None:
+            last_category = categories[0]
+        else:
+            last_category = self._last_category
+        transitions = np.flatnonzero(
+            categories != np.concatenate(([last_category], categories[:-1])))
+        # The first run is empty if the first sample starts a new event.
+        run_starts = np.concatenate(([0], transitions))
+        run_counts = np.diff(np.concatenate((run_starts, [len(emitted)])))
+        nonempty = run_counts > 0
+        sums = dict()
+        peaks = dict()
+        for f in ('gaze_x', 'gaze_y', 'pupil_measure1', 'velocity_x',
+                  'velocity_y', 'velocity_xy'):
+            sums[f] = np.zeros(len(run_starts))
+            sums[f][nonempty] = np.add.reduceat(emitted[f],
+                                                run_starts[nonempty])
+        for f in ('velocity_x', 'velocity_y', 'velocity_xy'):
+            peaks[f] = np.full(len(run_starts), -np.inf)
+            peaks[f][nonempty] = np.maximum.reduceat(emitted[f],
+                                                     run_starts[nonempty])
+        run_stats = [dict(count=run_counts[r],
+                          sums=dict((f, v[r]) for f, v in sums.items()),
+                          peaks=dict((f, v[r]) for f, v in peaks.items()))
+                     for r in range(len(run_starts))]
+        open_event = self._open_event
+        if open_event:
+            # The first run continues the run of the event left open by the
+            # last block.
+            first_run = run_stats[0]
+            first_run['count'] += open_event['count']
+            for f, v in open_event['sums'].items():
+                first_run['sums'][f] += v
+            for f, v in open_event['peaks'].items():
+                first_run['peaks'][f] = max(first_run['peaks'][f], v)
+            first_run['start'] = open_event['start']
+
+        samples = [list(s) for s in emitted.tolist()]
+        valid = valid.tolist()
+        output = []
+        run = 0
+        transitions = set(transitions.tolist())
+        for i, sample in enumerate(samples):
+            if i in transitions:
+                ended = run_stats[run]
+                run += 1
+                end_sample = samples[i - 1] if i else self._last_parsed_sample
+                if 'start' in ended:
+                    output.append(self._createEndEvent(
+                        categories[i - 1] if i else self._last_category,
+                        end_sample, ended))
+                started = run_stats[run]
+                started['start'] = sample
+                output.append(self._createStartEvent(categories[i], sample))
+            if valid[i]:
+                output.append(sample)
+
+        last_run = run_stats[-1]
+        self._open_event = last_run if 'start' in last_run else None
+        self._last_category = categories[-1]
+        self._last_parsed_sample = samples[-1]
+        return output
+
+    def _createStartEvent(self, category, sample):
+        if category == 0:
+            return self.createBlinkStartEventArray(sample)
+        if category == 1:
+            return self.createFixationStartEventArray(sample)
+        return self.createSaccadeStartEventArray(sample)
+
+    def _createEndEvent(self, category, sample, run):
+        count = run['count']
+        sums = run['sums']
+        peaks = run['peaks']
+        stats = EventSampleStats(sums['gaze_x'] / count,
+                                 sums['gaze_y'] / count,
+                                 sums['pupil_measure1'] / count,
+                                 sums['velocity_x'] / count,
+                                 sums['velocity_y'] / count,
+                                 sums['velocity_xy'] / count,
+                                 peaks['velocity_x'],
+                                 peaks['velocity_y'],
+                                 peaks['velocity_xy'])
+        if category == 0:
+            return self.createBlinkEndEventArray(sample, run['start'], stats)
+        if category == 1:
+            return self.createFixationEndEventArray(sample, run['start'],
+                                                    stats)
+        return self.createSaccadeEndEventArray(sample, run['start'], stats)
+
+
+def _addEyeEventClassMappings():
+    """Make sure the eye sample and event classes can be looked up using
+    EventConstants.getClass() outside of the iohub server process."""
+    if EventConstants._classes and MONOCULAR_EYE_SAMPLE in \
+            EventConstants._classes:
+        return
+    from .. import eye_events
+    class_mappings = dict()
+    for cname in dir(eye_events):
+        event_class = getattr(eye_events, cname)
+        if getattr(event_class, 'EVENT_TYPE_ID', None) and \
+                getattr(event_class, 'NUMPY_DTYPE', None) is not None:
+            class_mappings[cname] = event_class
+    EventConstants.addClassMappings(
+        [c.EVENT_TYPE_ID for c in class_mappings.values()], class_mappings)
+
+
+def parseEyeSamples(samples, display_device, sampling_rate,
+                    block_size=5000, **kwargs):
+    """Parse a numpy structured array of eye samples offline, for example a
+    BinocularEyeSampleEvent or MonocularEyeSampleEvent table read from an
+    iohub DataStore hdf5 file.
+
+    Samples from different sessions are parsed separately. Returns a dict
+    with the event type id of each output event type as the key and a
+    numpy structured array of the events, using the event class
+    NUMPY_DTYPE, as the value. Output monocular samples have the adaptive
+    velocity thresholds stored in the raw_x and raw_y fields.
+
+    Any other kwargs are passed to EyeTrackerBlockEventParser.
+    """
+    _addEyeEventClassMappings()
+    events = dict()
+    if 'session_id' in samples.dtype.names:
+        session_ids = np.unique(samples['session_id'])
+    else:
+        session_ids = [None]
+    for session_id in session_ids:
+        if session_id is None:
+            session_samples = samples
+        else:
+            session_samples = samples[samples['session_id'] == session_id]
+        session_samples = session_samples[
+            np.argsort(session_samples['time'], kind='mergesort')]
+        parser = EyeTrackerBlockEventParser(display_device=display_device,
+                                            sampling_rate=sampling_rate,
+                                            **kwargs)
+        for b in range(0, len(session_samples), block_size):
+            for e in parser.processBlock(session_samples[b:b + block_size]):
+                events.setdefault(e[DeviceEvent.EVENT_TYPE_ID_INDEX],
+                                  []).append(tuple(e))
+    return dict((etype, np.array(elist, dtype=EventConstants.getClass(
+        etype).NUMPY_DTYPE)) for etype, elist in events.items())
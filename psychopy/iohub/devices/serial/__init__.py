@@ -309,6 +309,13 @@ class Serial(Device):
             returned = returned.decode('utf-8')
         return returned
 		
+    def _getPollFileDescriptor(self):
+        try:
+            # Only POSIX serial ports have a fileno().
+            return self._serial.fileno()
+        except Exception:
+            return None
+
     def closeSerial(self):
         if self._serial:
             self._serial.close()
@@ -5,8 +5,11 @@
 from __future__ import division, absolute_import
 
 import struct
+import threading
+from collections import deque
 from weakref import proxy
 
+import numpy as np
 from gevent import sleep, Greenlet
 import msgpack
 try:
@@ -18,7 +21,7 @@ except ImportError:
               "This may cause issues for iohub.")
 
 from .devices import Computer
-from .errors import print2err, printExceptionDetailsToStdErr
+from .errors import print2err, printExceptionDetailsToStdErr, ioHubError
 from .util import NumPyRingBuffer as RingBuffer
 
 MAX_PACKET_SIZE = 64 * 1024
@@ -122,11 +125,43 @@ class UDPClientConnection(SocketConnection):
 
 ##### TIME SYNC CLASS ######
 
+# Fields of the time sync accuracy metrics returned by TimeSyncState.update()
+# and stored in the DataStore time_sync table.
+TIME_SYNC_METRICS_DTYPE = np.dtype([('time', 'f8'),
+                                    ('offset', 'f8'),
+                                    ('drift', 'f8'),
+                                    ('residual', 'f8'),
+                                    ('min_rtt', 'f8'),
+                                    ('median_rtt', 'f8'),
+                                    ('probe_count', 'u4'),
+                                    ('fit_count', 'u4')])
+
+
+def theilSenFit(x, y):
+    """Returns the (slope, intercept) of the Theil-Sen estimator of the line
+    y = intercept + slope * x. The slope is the median of the slopes between
+    all pairs of points, so is not affected by up to ~29% outlier points.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    i, j = np.triu_indices(len(x), 1)
+    dx = x[j] - x[i]
+    nonzero = dx != 0
+    if not nonzero.any():
+        return 0.0, float(np.median(y))
+    slope = float(np.median((y[j] - y[i])[nonzero] / dx[nonzero]))
+    return slope, float(np.median(y - slope * x))
+
 
 class ioHubTimeSyncConnection(UDPClientConnection):
     """A special purpose version of the UDPClientConnection class which has the
     only job of sending and receiving time sync rmessage requests and responses
-    with a remote ioHub Server instance."""
+    with a remote ioHub Server instance.
+
+    Time sync requests are sent in bursts of sync_batch_size probes, without
+    waiting for the reply to each probe before sending the next. Each probe
+    has an id that the remote ioHub Server returns with its reply.
+    """
 
     def __init__(self, remote_address):
         self.remote_iohub_address = tuple(remote_address)
@@ -141,46 +176,71 @@ class ioHubTimeSyncConnection(UDPClientConnection):
             timeout=1)
 
         self.sync_batch_size = 5
+        self._next_probe_id = 0
 
-    def sync(self):
-        sync_count = self.sync_batch_size
-        sync_data = ['SYNC_REQ', ]
+    def syncProbes(self, count=None):
+        """Send a burst of count (default sync_batch_size) time sync probes and
+        wait for the replies.
 
-        feed = self.feed
-        unpack = self.unpack
+        Returns numpy arrays (local_times, remote_times, rtts) for the probes
+        that were replied to; local_times are half way between the sending of
+        a probe and the receipt of its reply and rtts are the round trip
+        times of the probes.
+        """
+        if count is None:
+            count = self.sync_batch_size
+        getTime = Computer.getTime
         pack = self.pack
-
+        sendto = self.sock.sendto
         recvfrom = self.sock.recvfrom
         rcvBufferLength = self._rcvBufferLength
-
         remote_address = self.remote_iohub_address
-        sendto = self.sock.sendto
-
-        min_delay = 1000.0
-        min_local_time = 0.0
-        min_remote_time = 0.0
-
-        while sync_count > 0:
-            # send sync request
-            sync_start = Computer.getTime()
-            sendto(pack(sync_data), remote_address)
-            sync_start2 = Computer.getTime()
-
-            # get reply
-            feed(recvfrom(rcvBufferLength)[0])
-            _, remote_time = unpack()
-            sync_end = Computer.getTime()
-            rtt = sync_end - (sync_start + sync_start2) / 2.0
 
-            old_delay = min_delay
-            min_delay = min(min_delay, rtt)
-
-            if old_delay != min_delay:
-                min_local_time = (sync_end + sync_start) / 2.0
-                min_remote_time = remote_time
-            sync_count = sync_count - 1
+        first_id = self._next_probe_id
+        self._next_probe_id += count
+        send_times = np.empty(count)
+        recv_times = np.full(count, np.nan)
+        remote_times = np.full(count, np.nan)
+        for i in range(count):
+            data = pack(['SYNC_REQ', first_id + i])
+            send_times[i] = getTime()
+            sendto(data, remote_address)
+
+        received = 0
+        while received < count:
+            try:
+                data = recvfrom(rcvBufferLength)[0]
+            except Exception: # pylint: disable=broad-except
+                # timeout; the remaining probes or replies were lost.
+                break
+            recv_time = getTime()
+            self.feed(data)
+            reply = self.unpack()
+            if len(reply) < 3:
+                continue
+            i = reply[2] - first_id
+            # ignore late replies to probes of a previous burst
+            if 0 <= i < count and np.isnan(recv_times[i]):
+                recv_times[i] = recv_time
+                remote_times[i] = reply[1]
+                received += 1
+
+        replied = ~np.isnan(recv_times)
+        send_times = send_times[replied]
+        recv_times = recv_times[replied]
+        return ((send_times + recv_times) / 2.0, remote_times[replied],
+                recv_times - send_times)
 
-        return min_delay, min_local_time, min_remote_time
+    def sync(self):
+        """Send a burst of time sync probes, returning the (round trip time,
+        local time, remote time) of the probe with the smallest round trip
+        time."""
+        local_times, remote_times, rtts = self.syncProbes()
+        if len(rtts) == 0:
+            raise ioHubError('No time sync replies received from {0}.'.format(
+                self.remote_iohub_address))
+        i = rtts.argmin()
+        return rtts[i], local_times[i], remote_times[i]
 
 
 class ioHubTimeGreenSyncManager(Greenlet):
@@ -228,23 +288,9 @@ class ioHubTimeGreenSyncManager(Greenlet):
     def _sync(self, calc_drift_and_offset=True):
         try:
             if self._sync_socket:
-                r = self._sync_socket.sync()
-                min_delay, min_local_time, min_remote_time = r
-                sync_state_target = self.sync_state_target
-                sync_state_target.RTTs.append(min_delay)
-                sync_state_target.L_times.append(min_local_time)
-                sync_state_target.R_times.append(min_remote_time)
-
-                if calc_drift_and_offset is True:
-                    l1 = sync_state_target.L_times[-2]
-                    l2 = sync_state_target.L_times[-1]
-                    r1 = sync_state_target.R_times[-2]
-                    r2 = sync_state_target.R_times[-1]
-                    self.sync_state_target.drifts.append((r2 - r1) / (l2 - l1))
-
-                    l = sync_state_target.L_times[-1]
-                    r = sync_state_target.R_times[-1]
-                    self.sync_state_target.offsets = (r - l)
+                self.sync_state_target.addProbes(
+                    *self._sync_socket.syncProbes(),
+                    update_model=calc_drift_and_offset)
         except Exception: # pylint: disable=broad-except
             return False
         return True
@@ -269,23 +315,9 @@ class ioHubTimeSyncManager(object):
 
     def sync(self, calc_drift_and_offset=True):
         if self._sync_socket:
-            r = self._sync_socket.sync()
-            min_delay, min_local_time, min_remote_time = r
-            sync_state_target = self.sync_state_target
-            sync_state_target.RTTs.append(min_delay)
-            sync_state_target.L_times.append(min_local_time)
-            sync_state_target.R_times.append(min_remote_time)
-
-            if calc_drift_and_offset is True:
-                l1 = sync_state_target.L_times[-2]
-                l2 = sync_state_target.L_times[-1]
-                r1 = sync_state_target.R_times[-2]
-                r2 = sync_state_target.R_times[-1]
-                self.sync_state_target.drifts.append((r2 - r1) / (l2 - l1))
-
-                l = sync_state_target.L_times[-1]
-                r = sync_state_target.R_times[-1]
-                self.sync_state_target.offsets = (r - l)
+            return self.sync_state_target.addProbes(
+                *self._sync_socket.syncProbes(),
+                update_model=calc_drift_and_offset)
 
     def close(self):
         if self._sync_socket:
@@ -296,23 +328,127 @@ class ioHubTimeSyncManager(object):
         self.close()
 
 
+class ioHubTimeSyncService(threading.Thread):
+    """Keeps a TimeSyncState up to date with a remote ioHub Server by sending
+    a burst of time sync probes every interval seconds from a background
+    thread, for use outside of the ioHub Server process.
+
+    If metrics_callback is given, it is called with the accuracy metrics
+    dict returned by TimeSyncState.addProbes() after each burst; for example
+    ioHubConnection.addTimeSyncMetrics stores them in the DataStore.
+    """
+
+    def __init__(self, remote_address, sync_state=None, interval=0.2,
+                 burst_size=8, metrics_callback=None):
+        threading.Thread.__init__(self, name='ioHubTimeSyncService')
+        self.daemon = True
+        if sync_state is None:
+            sync_state = TimeSyncState()
+        self.sync_state = sync_state
+        self.interval = interval
+        self.metrics_callback = metrics_callback
+        self._sync_socket = ioHubTimeSyncConnection(remote_address)
+        self._sync_socket.sync_batch_size = burst_size
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                metrics = self.sync_state.addProbes(
+                    *self._sync_socket.syncProbes())
+                if metrics and self.metrics_callback:
+                    self.metrics_callback(metrics)
+            except Exception: # pylint: disable=broad-except
+                printExceptionDetailsToStdErr()
+            self._stop_event.wait(self.interval)
+        self._sync_socket.close()
+
+    def stop(self, timeout=None):
+        """Stop the service, waiting up to timeout seconds for the service
+        thread to exit."""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+
 class TimeSyncState(object):
     """Container class used by an ioHubSyncManager to hold the data necessary
     to calculate the current time base offset and drift between an ioHub Server
-    and a ioHubRemoteEventSubscriber client."""
-    RTTs = RingBuffer(10)
-    L_times = RingBuffer(10)
-    R_times = RingBuffer(10)
-    drifts = RingBuffer(20)
-    offsets = RingBuffer(20)
+    and a ioHubRemoteEventSubscriber client.
+
+    remote_time = offset + drift * local_time is fit, using the Theil-Sen
+    estimator, to the lowest round trip time probe of each of the last
+    window_size probe bursts. Using one probe per burst means the fit
+    covers a longer period, and the low round trip time probe is the one
+    least affected by network and scheduling delays.
+    """
+
+    def __init__(self, window_size=256):
+        self.RTTs = RingBuffer(10)
+        self.L_times = RingBuffer(10)
+        self.R_times = RingBuffer(10)
+        self.drifts = RingBuffer(20)
+        self.offsets = RingBuffer(20)
+        self._window_local = deque(maxlen=window_size)
+        self._window_offset = deque(maxlen=window_size)
+        self._window_rtt = deque(maxlen=window_size)
+        self._probe_count = 0
+        # offset = ref_offset + slope * (local_time - ref_local)
+        self._ref_local = 0.0
+        self._ref_offset = 0.0
+        self._slope = 0.0
+        self.metrics = None
+
+    def addProbes(self, local_times, remote_times, rtts, update_model=True):
+        """Add the results of a burst of time sync probes, as returned by
+        ioHubTimeSyncConnection.syncProbes(). Returns the accuracy metrics of
+        the updated model as a dict with the TIME_SYNC_METRICS_DTYPE fields,
+        or None if the model was not updated."""
+        if len(rtts) == 0:
+            return None
+        self._probe_count += len(rtts)
+        i = np.argmin(rtts)
+        self.RTTs.append(rtts[i])
+        self.L_times.append(local_times[i])
+        self.R_times.append(remote_times[i])
+        self._window_local.append(local_times[i])
+        self._window_offset.append(remote_times[i] - local_times[i])
+        self._window_rtt.append(rtts[i])
+        if update_model:
+            return self.update()
+        return None
+
+    def update(self):
+        """Fit the drift model to the current window of probes, returning
+        the accuracy metrics dict."""
+        local_times = np.asarray(self._window_local)
+        offsets = np.asarray(self._window_offset)
+        rtts = np.asarray(self._window_rtt)
+        ref_local = np.median(local_times)
+        slope, ref_offset = theilSenFit(local_times - ref_local, offsets)
+        self._ref_local, self._ref_offset, self._slope = (ref_local,
+                                                          ref_offset, slope)
+        residuals = offsets - (ref_offset + slope * (local_times - ref_local))
+        self.drifts.append(self.getDrift())
+        self.offsets.append(self.getOffset())
+        now = local_times[-1]
+        self.metrics = dict(time=now,
+                            offset=self.local2RemoteTime(now) - now,
+                            drift=self.getDrift(),
+                            residual=float(np.median(np.abs(residuals))),
+                            min_rtt=float(rtts.min()),
+                            median_rtt=float(np.median(rtts)),
+                            probe_count=self._probe_count,
+                            fit_count=len(local_times))
+        return self.metrics
 
     def getDrift(self):
         """Current drift between two time bases."""
-        return self.drifts.mean()
+        return 1.0 + self._slope
 
     def getOffset(self):
-        """Current offset between two time bases."""
-        return self.offsets.mean()
+        """Current offset between two time bases, at local time 0."""
+        return self._ref_offset - self._slope * self._ref_local
 
     def getAccuracy(self):
         """Current accuracy of the time synchronization, as calculated as the.
@@ -324,14 +460,19 @@ class TimeSyncState(object):
         return self.RTTs.mean() / 2.0
 
     def local2RemoteTime(self, local_time=None):
-        """Converts a local time (sec.msec format) to the corresponding remote
-        computer time, using the current offset and drift measures."""
+        """Converts a local time (sec.msec format), or a numpy array of local
+        times, to the corresponding remote computer time, using the current
+        offset and drift measures."""
         if local_time is None:
             local_time = Computer.getTime()
-        return self.getDrift() * local_time + self.getOffset()
+        local_time = np.asanyarray(local_time, dtype=np.float64)
+        return local_time + self._ref_offset + self._slope * (
+            local_time - self._ref_local)
 
     def remote2LocalTime(self, remote_time):
-        """Converts a remote computer time (sec.msec format) to the
-        corresponding local time, using the current offset and drift
-        measures."""
-        return (remote_time - self.getOffset()) / self.getDrift()
+        """Converts a remote computer time (sec.msec format), or a numpy
+        array of remote times, to the corresponding local time, using the
+        current offset and drift measures."""
+        remote_time = np.asanyarray(remote_time, dtype=np.float64)
+        return (remote_time - self._ref_offset +
+                self._slope * self._ref_local) / (1.0 + self._slope)
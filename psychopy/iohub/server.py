@@ -8,11 +8,14 @@ from past.builtins import xrange
 
 import os
 import sys
+import math
+from bisect import bisect_left
 from operator import itemgetter
 from collections import deque, OrderedDict
 
 import msgpack
 import gevent
+import gevent.select
 from gevent.server import DatagramServer
 from gevent import Greenlet
 
@@ -75,7 +78,12 @@ class udpServer(DatagramServer):
         # print2err(">> Rx Packet: {}, {}".format(request, replyTo))
         request_type = unicode(request.pop(0), 'utf-8') # convert bytes to string for compatibility
         if request_type == 'SYNC_REQ':
-            self.sendResponse(['SYNC_REPLY', getTime()], replyTo)
+            if request:
+                # return the probe id of pipelined time sync requests
+                self.sendResponse(['SYNC_REPLY', getTime(), request[0]],
+                                  replyTo)
+            else:
+                self.sendResponse(['SYNC_REPLY', getTime()], replyTo)
             return True
         elif request_type == 'PING':
             _ = request.pop(0) #client time
@@ -424,6 +432,22 @@ class udpServer(DatagramServer):
             return dsfile.extendConditionVariableTable(exp_id, sess_id, data)
         return False
 
+    def getDeviceMonitorStats(self, reset=False):
+        """Returns a list of the DeviceMonitor.getStats() dicts of the
+        polled devices, optionally resetting the statistics."""
+        stats = []
+        for monitor in self.iohub.deviceMonitors:
+            stats.append(monitor.getStats())
+            if reset:
+                monitor.resetStats()
+        return stats
+
+    def addTimeSyncMetrics(self, metrics):
+        dsfile = self.iohub.dsfile
+        if dsfile:
+            return dsfile.addTimeSyncMetrics(metrics)
+        return False
+
     def clearEventBuffer(self, clear_device_level_buffers=False):
         """
 
@@ -483,24 +507,162 @@ class udpServer(DatagramServer):
             sys.exit(1)
 
 
+# Upper bin edges (sec) of the DeviceMonitor poll cost and latency histograms.
+# The last bin counts values above the last edge.
+POLL_HISTOGRAM_EDGES = (0.00001, 0.00002, 0.00005, 0.0001, 0.0002, 0.0005,
+                        0.001, 0.002, 0.005, 0.01, 0.02, 0.05)
+
+
 class DeviceMonitor(Greenlet):
-    def __init__(self, device, sleep_interval):
+    """Calls device._poll() every sleep_interval sec.
+
+    If min_interval and max_interval are given, the interval between polls
+    adapts to the rate the device is adding native events, between the two
+    limits: devices are polled at about POLLS_PER_EVENT times their recent
+    event rate. The event rate estimate rises immediately with a burst of
+    events and decays with a RATE_TIME_CONSTANT sec time constant, and the
+    interval grows by at most IDLE_GROWTH after each poll that finds no
+    events, so idle devices use little CPU time while bursts are polled
+    at the faster rate straight away.
+
+    If the device returns a file descriptor from _getPollFileDescriptor(),
+    the device is polled as soon as the descriptor is readable (but not
+    within min_interval sec of the last poll), and at least every
+    max_interval sec.
+
+    getStats() returns the poll count, event count and poll cost (duration
+    of _poll()) and latency (time past the scheduled poll time, or past the
+    time a file descriptor was found to be readable) histograms.
+    """
+    POLLS_PER_EVENT = 2.0
+    IDLE_GROWTH = 1.5
+    RATE_TIME_CONSTANT = 0.5
+
+    def __init__(self, device, sleep_interval, min_interval=None,
+                 max_interval=None):
         Greenlet.__init__(self)
         self.device = device
         self.sleep_interval = sleep_interval
+        if min_interval is None:
+            min_interval = sleep_interval
+        if max_interval is None:
+            max_interval = max(sleep_interval, min_interval)
+        self.min_interval = max(0.0001, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.adaptive = self.min_interval < self.max_interval
+        self.event_rate = 0.0
         self.running = False
+        self.resetStats()
+
+    def resetStats(self):
+        nbins = len(POLL_HISTOGRAM_EDGES) + 1
+        self.poll_count = 0
+        self.event_count = 0
+        self.fd_wakeups = 0
+        self.total_poll_cost = 0.0
+        self.max_poll_cost = 0.0
+        self.cost_histogram = [0] * nbins
+        self.latency_histogram = [0] * nbins
+
+    def _nextInterval(self, interval, events, dt):
+        """Returns the interval until the next poll of an adaptive monitor,
+        given the current interval and the number of events found by the
+        last poll, dt sec after the poll before it."""
+        if dt > 0:
+            rate = events / dt
+            if rate > self.event_rate:
+                # respond to bursts of events immediately
+                self.event_rate = rate
+            else:
+                alpha = 1.0 - math.exp(-dt / self.RATE_TIME_CONSTANT)
+                self.event_rate += alpha * (rate - self.event_rate)
+        if self.event_rate > 0:
+            rate_interval = 1.0 / (self.event_rate * self.POLLS_PER_EVENT)
+        else:
+            rate_interval = self.max_interval
+        if events == 0:
+            rate_interval = min(rate_interval, interval * self.IDLE_GROWTH)
+        return min(self.max_interval, max(self.min_interval, rate_interval))
 
-    def _run(self):
+    def _getFileDescriptor(self):
+        try:
+            return self.device._getPollFileDescriptor()
+        except Exception:
+            return None
+
+    def _run(self): # pylint: disable=method-hidden
         self.running = True
         ctime = Computer.getTime
+        device = self.device
+        edges = POLL_HISTOGRAM_EDGES
+        min_sleep = min(0.001, self.min_interval)
+        interval = self.sleep_interval
+        fd = self._getFileDescriptor()
+        last_poll = due = ctime()
         while self.running is True:
             stime = ctime()
-            self.device._poll()
-            i = self.sleep_interval - (ctime() - stime)
-            if i > 0.001:
-                gevent.sleep(i)
-            else:
-                gevent.sleep(0.001)
+            latency = stime - due
+            event_count = device._native_event_count
+            device._poll()
+            etime = ctime()
+            cost = etime - stime
+            new_events = device._native_event_count - event_count
+            self.poll_count += 1
+            self.event_count += new_events
+            self.total_poll_cost += cost
+            if cost > self.max_poll_cost:
+                self.max_poll_cost = cost
+            # Histograms are reset by resetStats() while the monitor runs.
+            cost_histogram = self.cost_histogram
+            latency_histogram = self.latency_histogram
+            cost_histogram[bisect_left(edges, cost)] += 1
+            latency_histogram[bisect_left(edges, max(0.0, latency))] += 1
+            if self.adaptive:
+                interval = self._nextInterval(interval, new_events,
+                                              stime - last_poll)
+            last_poll = stime
+
+            if fd is not None:
+                try:
+                    readable = gevent.select.select([fd], [], [],
+                                                    self.max_interval)[0]
+                except Exception:
+                    # fall back to timed polling
+                    fd = None
+                else:
+                    wake_time = ctime()
+                    wait = 0.0
+                    if readable:
+                        self.fd_wakeups += 1
+                        # _poll() may not read all the data available (e.g.
+                        # a Serial device not reporting events), leaving the
+                        # fd readable, so still wait for min_interval
+                        wait = max(min_sleep,
+                                   self.min_interval - (wake_time - stime))
+                        gevent.sleep(wait)
+                    due = wake_time + wait
+                    continue
+            wait = max(min_sleep, interval - (etime - stime))
+            due = etime + wait
+            gevent.sleep(wait)
+
+    def getStats(self):
+        """Returns a dict of the poll statistics of the monitor."""
+        polls = self.poll_count
+        return dict(device=getattr(self.device, 'name', None),
+                    adaptive=self.adaptive,
+                    file_descriptor=self._getFileDescriptor() is not None,
+                    min_interval=self.min_interval,
+                    max_interval=self.max_interval,
+                    event_rate=self.event_rate,
+                    poll_count=polls,
+                    event_count=self.event_count,
+                    fd_wakeups=self.fd_wakeups,
+                    mean_poll_cost=self.total_poll_cost / polls if polls else 0.0,
+                    max_poll_cost=self.max_poll_cost,
+                    histogram_edges=list(POLL_HISTOGRAM_EDGES),
+                    poll_cost_histogram=list(self.cost_histogram),
+                    latency_histogram=list(self.latency_histogram))
 
     def __del__(self):
         self.device = None
@@ -818,10 +980,16 @@ class ioServer(object):
             self.log('Device Instance Created: %s' % (dev_cls_name,))
 
             if 'device_timer' in dev_conf:
-                interval = dev_conf['device_timer'].get('interval', 0.001)
-                dPoller = DeviceMonitor(dev_instance, interval)
+                dev_timer = dev_conf['device_timer']
+                interval = dev_timer.get('interval', 0.001)
+                dPoller = DeviceMonitor(dev_instance, interval,
+                                        dev_timer.get('min_interval'),
+                                        dev_timer.get('max_interval'))
                 self.deviceMonitors.append(dPoller)
                 ltxt = '%s timer period: %.3f' % (dev_cls_name, interval)
+                if dPoller.adaptive:
+                    ltxt += ' (adaptive: %.4f - %.4f)' % (
+                        dPoller.min_interval, dPoller.max_interval)
                 self.log(ltxt)
 
             monitor_evt_ids = []
@@ -238,13 +238,33 @@ class NumPyRingBuffer(object):
         removes the currently oldest element from the start of the array.
 
         :param numpy.dtype element: An element to add to the RingBuffer.
-        :returns None:
+        :returns numpy.dtype: The element removed from the RingBuffer, or None if the RingBuffer was not full.
 
         """
         i = self._index
+        removed = None
+        if i >= self.max_size:
+            removed = self._npa[i % self.max_size]
         self._npa[i % self.max_size] = element
         self._npa[(i % self.max_size) + self.max_size] = element
         self._index += 1
+        return removed
+
+    def extend(self, elements):
+        """Add each element of the sequence elements to the end of the
+        RingBuffer. Only the last max_size elements need to be copied into the
+        RingBuffer, so this is faster than calling append for each element.
+
+        :param numpy.array elements: The elements to add to the RingBuffer.
+        :returns None:
+
+        """
+        skipped = len(elements) - self.max_size
+        if skipped > 0:
+            self._index += skipped
+            elements = elements[skipped:]
+        for element in elements:
+            self.append(element)
 
     def getElements(self):
         """Return the numpy array being used by the RingBuffer, the length of
@@ -256,6 +276,8 @@ class NumPyRingBuffer(object):
         :returns numpy.array: The array of data elements that make up the Ring Buffer.
 
         """
+        if self._index < self.max_size:
+            return self._npa[:self._index]
         return self._npa[
             self._index %
             self.max_size:(
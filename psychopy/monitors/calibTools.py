@@ -19,6 +19,7 @@ from past.utils import old_div
 from builtins import object
 from .calibData import wavelength_5nm, juddVosXYZ1976_5nm, cones_SmithPokorny
 from psychopy import __version__, logging, hardware, constants
+from psychopy.tools import colorspacetools
 
 try:
     import serial
@@ -26,10 +27,14 @@ try:
 except Exception:
     haveSerial = False
 import os
+import re
 import time
 import glob
+import json
+import hashlib
 import pickle
 import sys
+from collections import OrderedDict
 from copy import deepcopy, copy
 
 import numpy as np
@@ -66,6 +71,19 @@ if isinstance(monitorFolder, bytes):
 if not os.path.isdir(monitorFolder):
     os.makedirs(monitorFolder)
 
+# Decoded calibrations, keyed by (file name, calibration name, hash), so that
+# creating a Monitor again (e.g. for each Window) doesn't parse them again.
+_calibCache = {}
+# Calibration indexes of monitor .json files, keyed by file name.
+_calibIndexCache = {}
+CALIB_INDEX_VERSION = 1
+# Gamma tables, interpolators and color conversion matrices computed from
+# calibrations, keyed by the calibration values they were computed from, so
+# they are shared by all Monitors using a calibration and are recomputed if
+# the calibration changes.
+_computedCache = OrderedDict()
+_computedCacheSize = 32
+
 
 class Monitor(object):
     """Creates a monitor object for storing calibration details.
@@ -116,7 +134,9 @@ class Monitor(object):
         self.autoLog = autoLog
         self.currentCalib = currentCalib or {}
         self.currentCalibName = strFromDate(time.mktime(time.localtime()))
-        self.calibs = {}
+        self._calibs = {}
+        self._calibIndex = {}
+        self._calibFileName = None
         self.calibNames = []
         self._gammaInterpolator = None
         self._gammaInterpolator2 = None
@@ -386,7 +406,8 @@ class Monitor(object):
             if nm is None:
                 return None
             else:
-                return makeDKL2RGB(nm, power)
+                return self._computed('dkl_rgb', (nm, power),
+                                      makeDKL2RGB, nm, power).copy()
         else:
             return self.currentCalib['dkl_rgb']
 
@@ -403,7 +424,8 @@ class Monitor(object):
             if nm is None:
                 return None
             else:
-                return makeLMS2RGB(nm, power)
+                return self._computed('lms_rgb', (nm, power),
+                                      makeLMS2RGB, nm, power).copy()
         else:
             return self.currentCalib['lms_rgb']
 
@@ -423,10 +445,32 @@ class Monitor(object):
         """
         return self.currentCalib['usebits']
 
+    @property
+    def calibs(self):
+        """Dict of all the calibrations of this monitor, keyed by name.
+
+        Calibrations are loaded from disk when first needed, so accessing
+        this loads any that have not been used yet.
+        """
+        # NB loading one can add or remove others (if the file has changed)
+        for calibName in list(self._calibs):
+            if calibName in self._calibs:
+                self._getCalib(calibName)
+        return self._calibs
+
+    @calibs.setter
+    def calibs(self, calibs):
+        self._calibs = calibs
+        self._calibIndex = {}
+
     # other (admin functions)
     def _loadAll(self):
         """Fetches the calibrations for this monitor from disk, storing them
         as self.calibs
+
+        With JSON files, only the names of the calibrations are read, from
+        the index of the file (see :func:`getCalibIndex`), and each
+        calibration is loaded when it is first used.
         """
         if constants.PY3:
             ext = ".json"
@@ -438,18 +482,59 @@ class Monitor(object):
             self.calibNames = []
         else:
             if ext==".json":
-                with open(thisFileName, 'r') as thisFile:
-                    self.calibs = json_tricks.load(thisFile, ignore_comments=False,
-                                                   encoding='utf-8', preserve_order=False)
+                self._calibFileName = thisFileName
+                index = getCalibIndex(thisFileName)
+                if index is None:
+                    self._loadAllJSON()
+                else:
+                    self._calibIndex = dict(
+                        (entry['name'], entry) for entry in index['calibs'])
+                    self._calibs = dict.fromkeys(self._calibIndex)
             else:
                 with open(thisFileName, 'rb') as thisFile:
                     self.calibs = pickle.load(thisFile)
-            self.calibNames = sorted(self.calibs)
+            self.calibNames = sorted(self._calibs)
             
             if not constants.PY3:  # saving for future (not needed if we are IN future!)
                 # save JSON copies of our calibrations
                 self._saveJSON()
 
+    def _loadAllJSON(self):
+        """Loads all the calibrations from the JSON file, keeping any
+        already loaded and dropping any not loaded that are no longer in
+        the file."""
+        with open(self._calibFileName, 'rb') as thisFile:
+            calibs = json_tricks.loads(thisFile.read().decode('utf-8'),
+                                       ignore_comments=False,
+                                       preserve_order=False)
+        for calibName, calib in list(calibs.items()):
+            if self._calibs.get(calibName) is None:
+                self._calibs[calibName] = calib
+        for calibName, calib in list(self._calibs.items()):
+            if calib is None:
+                del self._calibs[calibName]
+                if calibName in self.calibNames:
+                    self.calibNames.remove(calibName)
+        self._calibIndex = {}
+
+    def _getCalib(self, calibName):
+        """Returns the named calibration, loading it if needed."""
+        calib = self._calibs[calibName]
+        if calib is None:
+            calib = _loadIndexedCalib(self._calibFileName,
+                                      self._calibIndex[calibName])
+            if calib is None:
+                # the file changed since it was indexed
+                self._loadAllJSON()
+                if calibName not in self._calibs:
+                    raise KeyError("Calibration %r of monitor %r is no "
+                                   "longer in %s" % (calibName, self.name,
+                                                     self._calibFileName))
+                calib = self._calibs[calibName]
+            else:
+                self._calibs[calibName] = calib
+        return calib
+
     def newCalib(self, calibName=None, width=None,
                  distance=None, gamma=None, notes=None, useBits=False,
                  verbose=True):
@@ -461,7 +546,7 @@ class Monitor(object):
             calibName = strFromDate(dateTime)
         # add to the list of calibrations
         self.calibNames.append(calibName)
-        self.calibs[calibName] = {}
+        self._calibs[calibName] = {}
 
         self.setCurrent(calibName)
         # populate with some default values:
@@ -511,7 +596,7 @@ class Monitor(object):
             return False
 
         # do the import
-        self.currentCalib = self.calibs[self.currentCalibName]
+        self.currentCalib = self._getCalib(self.currentCalibName)
         return self.currentCalibName
 
     def delCalib(self, calibName):
@@ -520,7 +605,7 @@ class Monitor(object):
         """
         # remove from our list
         self.calibNames.remove(calibName)
-        self.calibs.pop(calibName)
+        self._calibs.pop(calibName)
         if self.currentCalibName == calibName:
             self.setCurrent(-1)
         return 1
@@ -560,7 +645,9 @@ class Monitor(object):
         with open(thisFileName, 'w') as outfile:
             json_tricks.dump(self.calibs, outfile, indent=2,
                              allow_nan=True)
-
+        # index the new file so the next Monitor() loads it lazily
+        self._calibFileName = thisFileName
+        getCalibIndex(thisFileName)
 
     def copyCalib(self, calibName=None):
         """Stores the settings for the current calibration settings as
@@ -570,43 +657,69 @@ class Monitor(object):
             calibName = strFromDate(time.mktime(time.localtime()))
         # add to the list of calibrations
         self.calibNames.append(calibName)
-        self.calibs[calibName] = deepcopy(self.currentCalib)
+        self._calibs[calibName] = deepcopy(self.currentCalib)
         self.setCurrent(calibName)
 
+    def _computed(self, kind, sources, func, *args):
+        """Returns func(*args), from the cache of values computed from
+        calibrations if it was computed before from the same sources
+        (calibration values).
+        """
+        key = (kind, _fingerprint(*sources))
+        if key in _computedCache:
+            value = _computedCache.pop(key)
+        else:
+            value = func(*args)
+            while len(_computedCache) >= _computedCacheSize:
+                _computedCache.popitem(last=False)
+        _computedCache[key] = value  # most recently used last
+        return value
+
+    def _makeGammaInterpolators(self):
+        lumsPre = np.array(self.getLumsPre(), dtype=float)
+        if self.autoLog:
+            logging.info('Creating linear interpolation for gamma')
+        interpolators = []
+        # each of these interpolators is a function!
+        levelsPre = old_div(self.getLevelsPre(), 255.0)
+        for gun in range(4):
+            # scale to 0:1
+            lumsPre[gun, :] = (old_div((lumsPre[gun, :] - lumsPre[gun, 0]),
+                               (lumsPre[gun, -1] - lumsPre[gun, 0])))
+            interpolators.append(
+                interpolate.interp1d(lumsPre[gun, :],
+                                     levelsPre,
+                                     kind='linear'))
+        return interpolators
+
     def linearizeLums(self, desiredLums, newInterpolators=False,
-                      overrideGamma=None):
+                      overrideGamma=None, useLUT=False):
         """lums should be uncalibrated luminance values (e.g. a linear ramp)
         ranging 0:1
+
+        If useLUT is True the values are looked up in the table of
+        :func:`~psychopy.monitors.Monitor.getGammaLUT` (to within 1/65535 of
+        the desired luminance), which is much faster for many values.
         """
+        if useLUT:
+            return self._lookupLums(desiredLums, overrideGamma)
         linMethod = self.getLinearizeMethod()
         desiredLums = np.asarray(desiredLums)
         output = desiredLums * 0.0  # needs same size as input
 
         # gamma interpolation
         if linMethod == 3:
-            lumsPre = copy(self.getLumsPre())
-            if self._gammaInterpolator is not None and not newInterpolators:
-                pass  # we already have an interpolator
+            lumsPre = self.getLumsPre()
+            if lumsPre is not None and newInterpolators:
+                self._gammaInterpolator = self._makeGammaInterpolators()
             elif lumsPre is not None:
-                if self.autoLog:
-                    logging.info('Creating linear interpolation for gamma')
-                # we can make an interpolator
-                self._gammaInterpolator = []
-                self._gammaInterpolator2 = []
-                # each of these interpolators is a function!
-                levelsPre = old_div(self.getLevelsPre(), 255.0)
-                for gun in range(4):
-                    # scale to 0:1
-                    lumsPre[gun, :] = (old_div((lumsPre[gun, :] - lumsPre[gun, 0]),
-                                       (lumsPre[gun, -1] - lumsPre[gun, 0])))
-                    self._gammaInterpolator.append(
-                        interpolate.interp1d(lumsPre[gun, :],
-                                             levelsPre,
-                                             kind='linear'))
-                    # interpFunc = Interpolation.InterpolatingFunction(
-                    #    (lumsPre[gun,:],), levelsPre)
-                    # polyFunc = interpFunc.fitPolynomial(3)
-                    # self._gammaInterpolator2.append( [polyFunc.coeff])
+                # use the interpolators made for these luminance
+                # measurements, if any
+                self._gammaInterpolator = self._computed(
+                    'gammaInterpolator', (lumsPre, self.getLevelsPre()),
+                    self._makeGammaInterpolators)
+            elif self._gammaInterpolator is not None:
+                pass  # we already have an interpolator
             else:
                 # no way to do this! Calibrate the monitor
                 logging.error("Can't do a gamma interpolation on your "
@@ -668,12 +781,93 @@ class Monitor(object):
         return output
 
     def lineariseLums(self, desiredLums, newInterpolators=False,
-                      overrideGamma=None):
+                      overrideGamma=None, useLUT=False):
         """Equivalent of :func:`~psychopy.monitors.Monitor.linearizeLums`.
         """
         return self.linearizeLums(desiredLums=desiredLums,
                                   newInterpolators=newInterpolators,
-                                  overrideGamma=overrideGamma)
+                                  overrideGamma=overrideGamma,
+                                  useLUT=useLUT)
+
+    def getGammaLUT(self, bits=16, overrideGamma=None):
+        """Returns a table of the linearized values for 2**bits evenly
+        spaced luminances from 0 to 1, as a (2**bits, 4) float32 array with
+        columns for the luminance (all guns) and the R, G and B guns.
+
+        The table is computed with
+        :func:`~psychopy.monitors.Monitor.linearizeLums` the first time it
+        is needed for the current calibration, and shared by all monitors
+        with the same gamma calibration. It is recomputed if the
+        calibration changes.
+        """
+        calib = self.currentCalib
+        sources = (bits, overrideGamma, self.getLinearizeMethod(),
+                   calib.get('gamma'), self.getGammaGrid(),
+                   self.getLumsPre(), self.getLevelsPre())
+        return self._computed('gammaLUT', sources, self._makeGammaLUT,
+                              bits, overrideGamma)
+
+    def _makeGammaLUT(self, bits, overrideGamma):
+        levels = np.linspace(0.0, 1.0, 2**bits)
+        lut = np.empty((2**bits, 4), dtype=np.float32)
+        lut[:, 0] = self.linearizeLums(levels, overrideGamma=overrideGamma)
+        lut[:, 1:] = self.linearizeLums(np.tile(levels, (3, 1)).T,
+                                        overrideGamma=overrideGamma)
+        return lut
+
+    def _lookupLums(self, desiredLums, overrideGamma=None):
+        lut = self.getGammaLUT(overrideGamma=overrideGamma)
+        desiredLums = np.asarray(desiredLums, dtype=float)
+        indices = np.rint(np.clip(desiredLums, 0.0, 1.0) *
+                          (len(lut) - 1)).astype(np.intp)
+        if desiredLums.ndim > 1:
+            return lut[indices, np.arange(1, 4)].astype(float)
+        else:
+            return lut[indices, 0].astype(float)
+
+    def colorsToRGB(self, colors, colorSpace='rgb', linearize=False):
+        """Converts an array of colors (Nx3, or a single color) to the
+        PsychoPy rgb space (-1:1), using the color calibration of the
+        monitor.
+
+        This converts many colors at once (e.g. the colors of an
+        ElementArrayStim) using conversion matrices cached for the current
+        calibration. If linearize is True the rgb values are also gamma
+        corrected using the table of
+        :func:`~psychopy.monitors.Monitor.getGammaLUT`.
+
+        colorSpace can be 'rgb', 'rgb255', 'dkl', 'lms' or 'hsv'.
+        """
+        colors = np.asarray(colors, dtype=float)
+        if colorSpace == 'rgb':
+            rgb = colors
+        elif colorSpace == 'rgb255':
+            rgb = colors / 127.5 - 1
+        elif colorSpace == 'dkl':
+            rgb = colorspacetools.dkl2rgb(colors, self._colorMatrix('dkl'))
+        elif colorSpace == 'lms':
+            rgb = colorspacetools.lms2rgb(colors, self._colorMatrix('lms'))
+        elif colorSpace == 'hsv':
+            rgb = colorspacetools.hsv2rgb(colors)
+        else:
+            raise ValueError("Can't convert colorSpace %s to rgb" %
+                             colorSpace)
+        if linearize:
+            rgbShape = np.shape(rgb)
+            rgb = self._lookupLums((np.reshape(rgb, (-1, 3)) + 1) / 2.0)
+            rgb = np.reshape(rgb * 2 - 1, rgbShape)
+        return rgb
+
+    def _colorMatrix(self, colorSpace):
+        """The DKL or LMS to RGB matrix, or None if the monitor is not
+        color calibrated (as for Window.dkl_rgb and Window.lms_rgb)."""
+        if colorSpace == 'dkl':
+            matrix = self.getDKL_RGB()
+        else:
+            matrix = self.getLMS_RGB()
+        if matrix is None or np.all(np.asarray(matrix) == 1):
+            return None
+        return np.asarray(matrix, dtype=float)
 
 
 class GammaCalculator(object):
@@ -1165,6 +1359,138 @@ def getAllMonitors():
     return monitorList
 
 
+_whitespace = re.compile(r'[ \t\n\r]*')
+
+
+def _scanCalibFile(data):
+    """Returns the name, byte offset and length of each item in the JSON
+    object saved by Monitor.save(), as well as its calibDate.
+    """
+    # Structural JSON characters are ASCII and never part of a multi-byte
+    # UTF-8 character, so decoding as latin-1 keeps character offsets the
+    # same as byte offsets while finding where each item starts and ends.
+    text = data.decode('latin-1')
+    decoder = json.JSONDecoder()
+    ws = _whitespace.match
+    pos = ws(text, 0).end()
+    if text[pos] != '{':
+        raise ValueError('Calibration file is not a JSON object')
+    pos = ws(text, pos + 1).end()
+    entries = []
+    while text[pos] != '}':
+        keyStart = pos
+        _, pos = decoder.raw_decode(text, pos)
+        calibName = json.loads(data[keyStart:pos].decode('utf-8'))
+        pos = ws(text, pos).end()
+        if text[pos] != ':':
+            raise ValueError('Expected : at byte %i' % pos)
+        start = pos = ws(text, pos + 1).end()
+        value, pos = decoder.raw_decode(text, pos)
+        calibDate = None
+        if isinstance(value, dict):
+            calibDate = value.get('calibDate')
+            if not isinstance(calibDate, (int, float)):
+                calibDate = None
+        entries.append({'name': calibName,
+                        'calibDate': calibDate,
+                        'offset': start,
+                        'length': pos - start,
+                        'hash': hashlib.sha1(data[start:pos]).hexdigest()})
+        pos = ws(text, pos).end()
+        if text[pos] == ',':
+            pos = ws(text, pos + 1).end()
+        elif text[pos] != '}':
+            raise ValueError('Expected , or } at byte %i' % pos)
+    return entries
+
+
+def getCalibIndex(fileName):
+    """Get the index of the calibrations in a monitor calibration JSON file.
+
+    The index lists the name, date, SHA1 hash, byte offset and length of
+    each calibration in the file, so that a single calibration can be read
+    without parsing the others. It is kept in a `.idx` file next to the
+    calibration file and rebuilt if the calibration file has changed since
+    it was indexed (e.g. saved by an older version of PsychoPy).
+
+    Returns the index as a dict, with the list of calibrations as
+    `calibs`, or None if the file could not be indexed.
+    """
+    try:
+        stat = os.stat(fileName)
+    except OSError:
+        return None
+    index = _calibIndexCache.get(fileName)
+    if index is not None and index['size'] == stat.st_size and \
+            index['mtime'] == stat.st_mtime:
+        return index
+    indexFileName = os.path.splitext(fileName)[0] + '.idx'
+    try:
+        with open(indexFileName, 'r') as indexFile:
+            index = json.load(indexFile)
+        if index.get('version') != CALIB_INDEX_VERSION or \
+                index['size'] != stat.st_size or \
+                index['mtime'] != stat.st_mtime:
+            index = None
+    except (IOError, OSError, ValueError, KeyError):
+        index = None
+    if index is None:
+        try:
+            with open(fileName, 'rb') as calibFile:
+                data = calibFile.read()
+            index = {'version': CALIB_INDEX_VERSION,
+                     'size': stat.st_size,
+                     'mtime': stat.st_mtime,
+                     'calibs': _scanCalibFile(data)}
+        except (IOError, OSError, ValueError, IndexError):
+            return None
+        try:
+            with open(indexFileName, 'w') as indexFile:
+                json.dump(index, indexFile, indent=1)
+        except (IOError, OSError):
+            # e.g. a read-only shared monitor folder; keep it in memory
+            pass
+    _calibIndexCache[fileName] = index
+    return index
+
+
+def _loadIndexedCalib(fileName, entry):
+    """Returns a copy of the calibration described by the index entry,
+    or None if the file no longer matches the index."""
+    key = (fileName, entry['name'], entry['hash'])
+    calib = _calibCache.get(key)
+    if calib is None:
+        try:
+            with open(fileName, 'rb') as calibFile:
+                calibFile.seek(entry['offset'])
+                data = calibFile.read(entry['length'])
+        except (IOError, OSError):
+            return None
+        if hashlib.sha1(data).hexdigest() != entry['hash']:
+            _calibIndexCache.pop(fileName, None)
+            return None
+        calib = json_tricks.loads(data.decode('utf-8'),
+                                  ignore_comments=False,
+                                  preserve_order=False)
+        _calibCache[key] = calib
+    # monitors modify their current calibration, so don't share the cached one
+    return deepcopy(calib)
+
+
+def _fingerprint(*values):
+    """SHA1 hash of a sequence of calibration values (numbers, arrays or
+    None)."""
+    sha = hashlib.sha1()
+    for value in values:
+        if value is None:
+            sha.update(b'None;')
+        else:
+            value = np.ascontiguousarray(value, dtype=float)
+            sha.update(str(value.shape).encode('ascii'))
+            sha.update(value.tobytes())
+    return sha.hexdigest()
+
+
 def gammaFun(xx, minLum, maxLum, gamma, eq=1, a=None, b=None, k=None):
     """Returns gamma-transformed luminance values.
     y = gammaFun(x, minLum, maxLum, gamma)
@@ -7,14 +7,20 @@ from builtins import object
 import os
 import sys
 import platform
+import re
 from psychopy.constants import PY3
-from pkg_resources import parse_version
+
+
+def _versionTuple(version):
+    # (major, minor, micro) of a version string, without having to import
+    # pkg_resources (which is slow) when psychopy is imported
+    return tuple(int(n) for n in re.findall(r'\d+', version)[:3])
 
 
 try:
     import configobj
     if (PY3 and sys.version_info.minor >= 7 and
-            parse_version(configobj.__version__) < parse_version('5.1.0')):
+            _versionTuple(configobj.__version__) < (5, 1, 0)):
         raise ImportError('Installed configobj does not support Python 3.7+')
     _haveConfigobj = True
 except ImportError:
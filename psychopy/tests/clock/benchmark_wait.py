@@ -0,0 +1,62 @@
+"""Benchmark the wake-up error and CPU use of core.wait().
+
+Compares wait() with a guard band measured by clock.calibrateSleep() against
+the previous behaviour of sleeping until 0.2 s before the end of the period
+and polling the clock for the rest, for a range of durations. For each, the
+median, 99th percentile and max wake-up error (how late the wait returned)
+and the CPU time used as a percentage of the time waited are reported.
+
+The benchmark is not run as part of the test suite.
+
+command-line usage:
+python psychopy/tests/clock/benchmark_wait.py [repeats]
+"""
+from __future__ import division, print_function
+
+import sys
+import time
+
+import numpy as np
+
+from psychopy import clock
+from psychopy.clock import getTime
+
+
+def _oldWait(secs, hogCPUperiod=0.2):
+    if secs > hogCPUperiod:
+        time.sleep(secs - hogCPUperiod)
+        secs = hogCPUperiod
+    t0 = getTime()
+    while (getTime() - t0) < secs:
+        pass
+
+
+def _measure(func, duration, repeats):
+    errors = np.empty(repeats)
+    cpu0 = time.process_time()
+    wall0 = getTime()
+    for i in range(repeats):
+        t0 = getTime()
+        func(duration)
+        errors[i] = getTime() - t0 - duration
+    cpu = (time.process_time() - cpu0) / (getTime() - wall0)
+    return errors, cpu
+
+
+def run(repeats=50, durations=(0.001, 0.005, 0.02, 0.1, 0.5)):
+    print('sleep guard band: %.3f ms' % (clock.calibrateSleep() * 1000))
+    print('%-8s %-10s %10s %10s %10s %6s' % (
+        'wait', '', 'median ms', '99% ms', 'max ms', 'cpu'))
+    for duration in durations:
+        n = max(3, min(repeats, int(5 / duration)))
+        for label, func in (('old', _oldWait), ('new', clock.wait)):
+            errors, cpu = _measure(func, duration, n)
+            print('%-8s %-10s %10.3f %10.3f %10.3f %5.0f%%' % (
+                '%g s' % duration if label == 'old' else '', label,
+                np.median(errors) * 1000,
+                np.percentile(errors, 99) * 1000,
+                errors.max() * 1000, cpu * 100))
+
+
+if __name__ == '__main__':
+    run(*[int(a) for a in sys.argv[1:2]])
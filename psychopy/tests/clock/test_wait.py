@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Tests for the precision of psychopy.clock.wait and PrecisionPeriod
+"""
+import time
+
+import pytest
+
+from psychopy import clock
+from psychopy.clock import (wait, waitUntil, getTime, calibrateSleep,
+                            PrecisionPeriod)
+
+
+def setup_module(module):
+    # do what the first wait() does before its period starts (measure the
+    # sleep overshoot, as creating a Window also does, and import core) so
+    # that the tests timing wait() from outside don't include it
+    calibrateSleep()
+    from psychopy import core
+
+
+def test_calibrateSleep():
+    guard = calibrateSleep(nSamples=10)
+    assert clock.MIN_SLEEP_GUARD <= guard <= clock.MAX_SLEEP_GUARD
+    assert clock.getSleepGuard() == guard
+
+
+@pytest.mark.parametrize('duration', [0.0005, 0.005, 0.05])
+def test_waitPrecision(duration):
+    t0 = getTime()
+    wait(duration)
+    elapsed = getTime() - t0
+    assert elapsed >= duration
+    assert elapsed - duration < 0.005
+
+
+def test_firstWaitPrecision(monkeypatch):
+    # the first wait calibrates before working out its deadline, so the
+    # calibration does not make it overshoot
+    monkeypatch.setattr(clock, '_sleepGuard', None)
+    deadlines = []
+
+    def recordDeadline(deadline, hogCPUperiod=None):
+        deadlines.append(deadline)
+        waitUntil(deadline, hogCPUperiod)
+
+    monkeypatch.setattr(clock, 'waitUntil', recordDeadline)
+    wait(0.0005)
+    assert clock.getSleepGuard() is not None
+    assert 0 <= getTime() - deadlines[0] < 0.005
+
+
+def test_waitUntil():
+    deadline = getTime() + 0.02
+    waitUntil(deadline)
+    assert 0 <= getTime() - deadline < 0.005
+    # a deadline in the past returns straight away
+    t0 = getTime()
+    waitUntil(t0 - 1)
+    assert getTime() - t0 < 0.001
+
+
+def test_waitSleepsMostOfTheTime():
+    duration = 0.3
+    cpu0 = time.process_time()
+    wait(duration)
+    # the old wait() polled the clock for the final 0.2 s
+    assert time.process_time() - cpu0 < duration / 2
+
+
+def test_waitHogCPUperiod():
+    duration = 0.05
+    cpu0 = time.process_time()
+    wait(duration, hogCPUperiod=duration)
+    # polling the clock for the whole period uses (nearly) all of it
+    assert time.process_time() - cpu0 > duration / 2
+
+
+def test_precisionPeriod():
+    period = PrecisionPeriod()
+    assert period.lastError is None
+    assert period.getStats()['mean'] is None
+    for i in range(5):
+        period.start(0.01)
+        assert period.complete() == 1
+    period.start(0.001)
+    wait(0.005)
+    assert period.complete() == 0
+
+    stats = period.getStats()
+    assert stats['count'] == 5
+    assert stats['overruns'] == 1
+    assert 0 <= stats['median'] <= stats['max'] < 0.005
+    assert period.lastError == period.errors[-1]
+    assert period.overruns[0] > 0.003
+
+    period.reset()
+    assert period.getStats()['count'] == 0
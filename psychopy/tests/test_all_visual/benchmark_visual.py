@@ -0,0 +1,200 @@
+"""Benchmark the CPU time per frame of drawing visual stimuli.
+
+Each stimulus is drawn to a Window for a number of frames at several sizes
+(texture resolutions, numbers of elements or dots, lengths of text, numbers
+of vertices), updated each frame where that is how it is usually used (e.g.
+drifting gratings, dynamic noise, changing text). The time taken to update
+and draw the stimulus, and to flip the Window, is measured for each frame.
+
+No interactive or fullscreen window is needed, so it can be run headless
+under software OpenGL on a virtual display, e.g. Xvfb (as on Travis) or Xorg
+with the dummy driver configured in psychopy/tests/dummy_xorg.conf:
+
+    Xorg -noreset -config psychopy/tests/dummy_xorg.conf :99 &
+    DISPLAY=:99 python psychopy/tests/test_all_visual/benchmark_visual.py
+
+The results can be saved as JSON and compared with a baseline saved by a
+previous run: stimuli which take longer per frame than in the baseline (by
+more than the tolerance) are listed as regressions, and the script exits
+with status 1.
+
+The benchmark is not run as part of the test suite.
+
+command-line usage:
+python psychopy/tests/test_all_visual/benchmark_visual.py [--frames N]
+    [--out results.json] [--baseline baseline.json] [--tolerance 0.25]
+"""
+from __future__ import division, print_function
+
+import argparse
+import sys
+import timeit
+
+import numpy as np
+
+import pyglet.gl as GL
+
+from psychopy import visual, logging
+from psychopy.tests import utils
+from psychopy.tools import gltools
+
+_rng = np.random.RandomState(0)
+_words = ('the quick brown fox jumps over a lazy dog while five boxing '
+          'wizards jump quickly ').split()
+
+
+def _makeText(nChars, seed=0):
+    rng = np.random.RandomState(seed)
+    text = ''
+    while len(text) < nChars:
+        text += _words[rng.randint(len(_words))] + ' '
+    return text[:nChars]
+
+
+def _circle(nVertices, radius=150):
+    angles = np.linspace(0, 2 * np.pi, nVertices, endpoint=False)
+    return np.column_stack([np.cos(angles), np.sin(angles)]) * radius
+
+
+def _changeText(stim, frameN):
+    stim.text = stim.texts[frameN % 2]
+
+
+def _makeTextStim(win, nChars, useGlyphAtlas=False):
+    stim = visual.TextStim(win, text=_makeText(nChars), height=12,
+                           wrapWidth=480, useGlyphAtlas=useGlyphAtlas,
+                           autoLog=False)
+    stim.texts = [_makeText(nChars, seed=1), _makeText(nChars, seed=2)]
+    return stim
+
+
+def _makeTextBox(win, nChars):
+    stim = visual.TextBox(win, text=_makeText(nChars), font_size=12,
+                          font_color=(1, 1, 1, 1), size=(480, 480),
+                          units='pix', grid_horz_justification='left')
+    stim.texts = [_makeText(nChars, seed=1), _makeText(nChars, seed=2)]
+    return stim
+
+
+# (stimulus, size parameter, sizes, make(win, size), update(stim, frameN))
+stimuli = [
+    ('GratingStim', 'texRes', (64, 256, 1024),
+     lambda win, n: visual.GratingStim(
+         win, tex='sin', mask='gauss', texRes=n, size=256, sf=0.02,
+         autoLog=False),
+     lambda stim, frameN: setattr(stim, 'phase', frameN * 0.01)),
+    ('ElementArrayStim', 'nElements', (100, 1000, 10000),
+     lambda win, n: visual.ElementArrayStim(
+         win, nElements=n, sizes=8, elementTex='sin', elementMask='gauss',
+         xys=_rng.uniform(-240, 240, (n, 2)), autoLog=False),
+     lambda stim, frameN: setattr(stim, 'oris', stim.oris + 1)),
+    ('DotStim', 'nDots', (100, 1000, 10000),
+     lambda win, n: visual.DotStim(
+         win, nDots=n, fieldSize=480, dotSize=2, speed=2, autoLog=False),
+     None),  # the dots are moved by draw()
+    ('TextStim', 'nChars', (10, 100, 1000), _makeTextStim, None),
+    ('TextStim, changing text', 'nChars', (10, 100, 1000), _makeTextStim,
+     _changeText),
+    ('TextStim glyph atlas, changing text', 'nChars', (10, 100, 1000),
+     lambda win, n: _makeTextStim(win, n, useGlyphAtlas=True), _changeText),
+    ('TextBox', 'nChars', (10, 100, 1000), _makeTextBox, None),
+    ('TextBox, changing text', 'nChars', (10, 100, 1000), _makeTextBox,
+     lambda stim, frameN: stim.setText(stim.texts[frameN % 2])),
+    ('ShapeStim', 'nVertices', (4, 100, 1000),
+     lambda win, n: visual.ShapeStim(
+         win, vertices=_circle(n), fillColor='white', autoLog=False),
+     lambda stim, frameN: setattr(stim, 'ori', frameN)),
+    ('NoiseStim, dynamic noise', 'texRes', (64, 256, 512),
+     lambda win, n: visual.NoiseStim(
+         win, noiseType='Binary', noiseElementSize=4, size=256, texRes=n,
+         autoLog=False),
+     lambda stim, frameN: stim.updateNoise()),
+    ('ImageStim', 'imageSize', (64, 256, 1024),
+     lambda win, n: visual.ImageStim(
+         win, image=_rng.uniform(-1, 1, (n, n)), size=256, autoLog=False),
+     None),
+]
+
+
+def _timeFrames(win, stim, update, nFrames, warmUp=10):
+    """Returns the times taken to update and draw `stim` and to flip the
+    Window, for each frame
+    """
+    drawTimes = []
+    flipTimes = []
+    for frameN in range(warmUp + nFrames):
+        start = timeit.default_timer()
+        if update is not None:
+            update(stim, frameN)
+        if stim is not None:
+            stim.draw()
+        drawn = timeit.default_timer()
+        win.flip()
+        if frameN >= warmUp:
+            drawTimes.append(drawn - start)
+            flipTimes.append(timeit.default_timer() - drawn)
+    return drawTimes, flipTimes
+
+
+def run(nFrames=200, outFile=None, baseline=None, tolerance=0.25):
+    logging.console.setLevel(logging.ERROR)
+    win = visual.Window((512, 512), units='pix', allowGUI=False,
+                        waitBlanking=False, autoLog=False)
+    results = {}
+    try:
+        drawTimes, flipTimes = _timeFrames(win, None, None, nFrames)
+        results['Window.flip'] = utils.timingStats(flipTimes)
+        print('%-44s %10s %10s' % ('', 'draw msec', 'flip msec'))
+        print('%-44s %10s %10.3f' % (
+            'Window.flip (empty)', '', np.median(flipTimes) * 1000))
+        for stimName, param, sizes, make, update in stimuli:
+            for size in sizes:
+                name = '%s %s=%d' % (stimName, param, size)
+                try:
+                    stim = make(win, size)
+                    drawTimes, flipTimes = _timeFrames(win, stim, update,
+                                                       nFrames)
+                except Exception as err:
+                    print('%-44s failed: %s' % (name, err))
+                    continue
+                results[name] = utils.timingStats(drawTimes)
+                results[name]['flipMedian'] = float(np.median(flipTimes))
+                print('%-44s %10.3f %10.3f' % (
+                    name, results[name]['median'] * 1000,
+                    results[name]['flipMedian'] * 1000))
+                del stim
+        renderer = gltools.getString(GL.GL_RENDERER)
+    finally:
+        win.close()
+
+    if outFile:
+        utils.saveBenchmarks(outFile, results, info={
+            'benchmark': 'visual', 'frames': nFrames,
+            'renderer': renderer})
+        print('saved %s' % outFile)
+    regressions = []
+    if baseline:
+        regressions = utils.compareBenchmarks(results, baseline, tolerance)
+        for name, metric, baseValue, value in regressions:
+            print('REGRESSION %s: %.3f msec per frame (baseline %.3f msec)'
+                  % (name, value * 1000, baseValue * 1000))
+        if not regressions:
+            print('no regressions (tolerance %d%%)' % (tolerance * 100))
+    return results, regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark drawing visual stimuli')
+    parser.add_argument('--frames', type=int, default=200,
+                        help='frames to draw for each stimulus')
+    parser.add_argument('--out', help='save the results to this JSON file')
+    parser.add_argument('--baseline',
+                        help='compare with the results in this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='increase in time per frame (as a proportion) '
+                             'reported as a regression')
+    args = parser.parse_args()
+    results, regressions = run(args.frames, args.out, args.baseline,
+                               args.tolerance)
+    sys.exit(1 if regressions else 0)
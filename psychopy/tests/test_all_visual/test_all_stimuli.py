@@ -485,6 +485,29 @@ class _baseVisualTest(object):
             utils.compareScreenshot('blend_add_%s.png' %self.contextName,
                                     win, crit=20)
 
+    def test_text_glyphAtlas(self):
+        # text drawn from the glyph atlas should look like the pyglet Label
+        win = self.win
+        if win.winType == 'pygame':
+            pytest.skip("the glyph atlas is only used with pyglet windows")
+        for bold in (False, True):
+            frames = []
+            sizes = []
+            for useGlyphAtlas in (False, True):
+                stim = visual.TextStim(win, text='Glyph atlas', ori=15,
+                                       height=0.25*self.scaleFactor,
+                                       alignText='left', bold=bold,
+                                       color=[0.5, 1.0, 1.0],
+                                       useGlyphAtlas=useGlyphAtlas)
+                stim.text = 'Glyph\natlas\t123 wrapped over lines'
+                stim.draw()
+                frames.append(
+                    numpy.asarray(win._getFrame(buffer='back'), float))
+                sizes.append(stim.boundingBox)
+                win.flip()
+            assert sizes[0] == sizes[1]
+            assert numpy.abs(frames[0] - frames[1]).mean() < 1
+
     def test_mov(self):
         win = self.win
         if self.win.winType == 'pygame':
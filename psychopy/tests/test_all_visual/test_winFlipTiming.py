@@ -2,6 +2,7 @@
 
 from builtins import object
 from psychopy import visual, clock
+from psychopy.tools.frametools import FrameProfiler, PROFILE_SECTIONS
 import pytest
 import numpy as np
 
@@ -94,3 +95,28 @@ class Test_WinFlipTiming(object):
 
 if __name__ == "__main__":
     pytest.main(__file__)
+
+    def test_frameProfilerError(self):
+        """a section that raises is still ended, so the profiler records
+        the following frames as normal
+        """
+        profiler = FrameProfiler()
+        self.win.frameProfiler = profiler
+        failed = []
+
+        def failOnce():
+            if not failed:
+                failed.append(True)
+                raise ValueError('callOnFlip error')
+
+        try:
+            self.win.callOnFlip(failOnce)
+            with pytest.raises(ValueError):
+                self.win.flip()
+            self.win.flip()  # calls failOnce again, without an error
+        finally:
+            self.win.frameProfiler = None
+        records = profiler.getRecords()
+        sections = np.array([PROFILE_SECTIONS[i] for i in records['section']])
+        assert list(records['frame'][sections == 'flip']) == [1, 2]
+        assert list(records['frame'][sections == 'callOnFlip']) == [1, 2]
@@ -0,0 +1,119 @@
+"""Benchmark compiling the Builder demos to Python and JS scripts.
+
+For each target, reports the total time to compile all the demos from
+scratch, to compile them again when nothing has changed, and to compile them
+again after editing one component in each, when only the code for the edited
+Routine needs to be written again. The time to deep copy the experiments (as
+writeScript used to before writing each script) is also given.
+
+The demos are copied to a temporary folder and compiled there, so that the
+files written for PsychoJS (index.html, resources/) don't end up in the
+demos folder.
+
+The benchmark is not run as part of the test suite.
+
+command-line usage:
+python psychopy/tests/test_app/test_builder/benchmark_compile.py [repeats]
+"""
+from __future__ import division, print_function
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+from contextlib import contextmanager
+from copy import deepcopy
+
+import psychopy
+from psychopy import experiment, logging
+
+demosDir = os.path.join(os.path.dirname(psychopy.__file__), 'demos', 'builder')
+
+
+@contextmanager
+def _quiet():
+    stdout = sys.stdout
+    sys.stdout = io.StringIO()
+    try:
+        yield
+    finally:
+        sys.stdout = stdout
+
+
+def _loadDemos(folder):
+    exps = []
+    fileNames = []
+    for root, dirs, files in os.walk(folder):
+        fileNames.extend(os.path.join(root, f) for f in files
+                         if f.endswith('.psyexp'))
+    for fileName in sorted(fileNames):
+        exp = experiment.Experiment()
+        exp.loadFromXML(fileName)
+        exps.append((fileName, exp))
+    return exps
+
+
+def _editOneComponent(exp):
+    for routine in exp.routines.values():
+        for component in routine:
+            if 'startVal' in component.params:
+                param = component.params['startVal']
+                param.val = '0.0' if param.val != '0.0' else '0.5'
+                return
+
+
+def _timeCompile(exps, target, edit=False, clear=False):
+    total = 0
+    for fileName, exp in exps:
+        if edit:
+            _editOneComponent(exp)
+        if clear:
+            exp.clearFragmentCache()
+        start = timeit.default_timer()
+        try:
+            with _quiet():
+                exp.writeScript(expPath=fileName, target=target)
+        except Exception:
+            continue  # demos which can't be compiled for this target
+        total += timeit.default_timer() - start
+    return total
+
+
+def _timeDeepCopy(exps):
+    start = timeit.default_timer()
+    for fileName, exp in exps:
+        deepcopy(exp)
+    return timeit.default_timer() - start
+
+
+def run(repeats=3):
+    logging.console.setLevel(logging.CRITICAL)
+    tempDir = tempfile.mkdtemp()
+    try:
+        _run(os.path.join(tempDir, 'builder'), repeats)
+    finally:
+        shutil.rmtree(tempDir)
+
+
+def _run(folder, repeats):
+    shutil.copytree(demosDir, folder)
+    exps = _loadDemos(folder)
+    print('%d demos' % len(exps))
+    print('  %-36s %8.1f msec' % (
+        'deep copy (as done previously)',
+        min(_timeDeepCopy(exps) for _ in range(repeats)) * 1000))
+    for target in ('PsychoPy', 'PsychoJS'):
+        print(target)
+        for label, kwargs in (
+                ('first compile', dict(clear=True)),
+                ('recompile, no changes', {}),
+                ('recompile, one component edited', dict(edit=True))):
+            print('  %-36s %8.1f msec' % (
+                label, min(_timeCompile(exps, target, **kwargs)
+                           for _ in range(repeats)) * 1000))
+
+
+if __name__ == '__main__':
+    run(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,86 @@
+"""Benchmark listing the resource files of an experiment.
+
+Makes an experiment with a conditions file listing thousands of image files
+(and a Routine with components using some of them), then times
+Experiment.getResourceFiles without the cache of conditions files and with
+the paths checked one at a time (as done previously), the first call in a
+session, and calls again (e.g. for each script compiled or each sync), when
+only the files need to be checked.
+
+The benchmark is not run as part of the test suite.
+
+command-line usage:
+python psychopy/tests/test_app/test_builder/benchmark_resources.py [images]
+"""
+from __future__ import division, print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+from psychopy import experiment, logging
+from psychopy.experiment import _experiment
+from psychopy.experiment.components.image import ImageComponent
+
+
+def _makeExperiment(folder, nImages):
+    imageNames = ['image%05d.png' % i for i in range(nImages)]
+    for imageName in imageNames:
+        open(os.path.join(folder, imageName), 'w').close()
+    with open(os.path.join(folder, 'conditions.csv'), 'w') as f:
+        f.write('image,label\n')
+        for imageName in imageNames:
+            f.write('%s,%s\n' % (imageName, imageName[:-4]))
+    exp = experiment.Experiment()
+    exp.filename = os.path.join(folder, 'benchmark.psyexp')
+    exp.addRoutine(routineName='trial')
+    routine = exp.routines['trial']
+    exp.flow.addRoutine(routine, 0)
+    for i in range(min(nImages, 100)):
+        image = ImageComponent(exp=exp, parentName='trial',
+                               name='image%d' % i, image=imageNames[i])
+        routine.addComponent(image)
+    loop = experiment.loops.TrialHandler(exp=exp, name='trials',
+                                         conditionsFile='conditions.csv')
+    exp.flow.addLoop(loop, 0, 2)
+    return exp
+
+
+def _timeResources(exp, clearCache=False, threads=True):
+    threshold = _experiment.statPoolThreshold
+    if not threads:
+        _experiment.statPoolThreshold = float('inf')
+    if clearCache:
+        _experiment._conditionsCache.clear()
+    try:
+        start = timeit.default_timer()
+        nFiles = len(exp.getResourceFiles())
+        return timeit.default_timer() - start, nFiles
+    finally:
+        _experiment.statPoolThreshold = threshold
+
+
+def run(nImages=5000, repeats=5):
+    logging.console.setLevel(logging.CRITICAL)
+    folder = tempfile.mkdtemp()
+    try:
+        exp = _makeExperiment(folder, nImages)
+        duration, nFiles = _timeResources(exp, clearCache=True)
+        print('%d images, %d resources' % (nImages, nFiles))
+        print('  %-36s %8.1f msec' % ('first call', duration * 1000))
+        for label, kwargs in (
+                ('no cache, serial (as done previously)',
+                 dict(clearCache=True, threads=False)),
+                ('cached, serial', dict(threads=False)),
+                ('cached, threads', {})):
+            print('  %-36s %8.1f msec' % (label, min(
+                _timeResources(exp, **kwargs)[0]
+                for _ in range(repeats)) * 1000))
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    run(*[int(a) for a in sys.argv[1:2]])
@@ -529,3 +529,114 @@ class TestDisabledComponents(object):
 
         # Original routine should be unchanged.
         assert self.text in self.routine
+
+    def test_consecutive_disabled_components_are_not_written_to_script(self):
+        for name in ('text1', 'text2'):
+            text = TextComponent(exp=self.exp, parentName='Test Routine',
+                                 name=name)
+            text.params['disabled'].val = True
+            self.routine.addComponent(text)
+        script = self.exp.writeScript()
+        assert 'visual.TextStim' not in script
+        assert len(self.routine) == 2
+
+
+class TestIncrementalCompile(object):
+    def setup(self):
+        self.exp = psychopy.experiment.Experiment()
+        for routineName in ('first', 'second'):
+            self.exp.addRoutine(routineName=routineName)
+            routine = self.exp.routines[routineName]
+            self.exp.flow.addRoutine(routine, len(self.exp.flow))
+            text = TextComponent(exp=self.exp, parentName=routineName,
+                                 name=routineName + 'Text')
+            routine.addComponent(text)
+
+    def _writeScript(self, tmpdir, target, clearCache=False):
+        if clearCache:
+            self.exp.clearFragmentCache()
+        expPath = str(tmpdir.join('test.psyexp'))
+        return self.exp.writeScript(expPath=expPath, target=target)
+
+    @pytest.mark.parametrize('target', ['PsychoPy', 'PsychoJS'])
+    def test_recompile_is_unchanged(self, tmpdir, target):
+        script = self._writeScript(tmpdir, target)
+        assert self.exp._fragmentCache
+        assert self._writeScript(tmpdir, target) == script
+        assert self._writeScript(tmpdir, target, clearCache=True) == script
+
+    @pytest.mark.parametrize('target', ['PsychoPy', 'PsychoJS'])
+    def test_recompile_after_edit(self, tmpdir, target):
+        self._writeScript(tmpdir, target)
+        cached = dict(self.exp._fragmentCache)
+        text = self.exp.routines['second'].getComponentFromName('secondText')
+        text.params['text'].val = 'edited'
+        script = self._writeScript(tmpdir, target)
+        assert 'edited' in script
+        # only the code for the edited routine was written again
+        for slot, fragment in self.exp._fragmentCache.items():
+            assert (fragment is cached[slot]) == (slot[0] == 'first')
+        assert self._writeScript(tmpdir, target, clearCache=True) == script
+
+    def test_compiling_does_not_change_params(self, tmpdir):
+        text = self.exp.routines['first'].getComponentFromName('firstText')
+        text.params['startVal'].val = ''
+        for target in ('PsychoPy', 'PsychoJS', 'PsychoPy'):
+            self._writeScript(tmpdir, target)
+            assert text.params['startVal'].val == ''
+
+    def test_transpile_params(self, tmpdir):
+        text = self.exp.routines['first'].getComponentFromName('firstText')
+        text.params['pos'].val = '(0.1, y)'
+        text.params['color'].val = '$colour'
+        assert self.exp.transpileParams() > 0
+        assert psychopy.experiment.py2js.transpilerCache.get(
+            'expression', 'colour') == 'colour'
+        script = self._writeScript(tmpdir, 'PsychoJS')
+        assert '[0.1, y]' in script
+
+
+class TestResourceFiles(object):
+    def setup(self):
+        self.exp = psychopy.experiment.Experiment()
+        self.exp.addRoutine(routineName='trial')
+        routine = self.exp.routines['trial']
+        self.exp.flow.addRoutine(routine, 0)
+        self.text = TextComponent(exp=self.exp, parentName='trial',
+                                  name='text')
+        routine.addComponent(self.text)
+        loop = psychopy.experiment.loops.TrialHandler(
+            exp=self.exp, name='trials', conditionsFile='conditions.csv')
+        self.exp.flow.addLoop(loop, 0, 2)
+
+    def _makeFiles(self, tmpdir):
+        self.exp.filename = str(tmpdir.join('test.psyexp'))
+        for fileName in ('a.png', 'b.png', 'c.png'):
+            tmpdir.join(fileName).write('')
+        # conditions with repeated files, a nested conditions file and a cycle
+        tmpdir.join('conditions.csv').write(
+            'image\na.png\nb.png\na.png\nmore.csv\n')
+        tmpdir.join('more.csv').write('image\nc.png\nconditions.csv\n')
+
+    def _relPaths(self):
+        return [thisFile['rel'] for thisFile in self.exp.getResourceFiles()]
+
+    def test_resources_listed_once(self, tmpdir):
+        self._makeFiles(tmpdir)
+        self.text.params['text'].val = 'b.png'
+        assert self._relPaths() == ['conditions.csv', 'a.png', 'b.png',
+                                    'more.csv', 'c.png']
+
+    def test_changed_conditions_are_loaded(self, tmpdir):
+        self._makeFiles(tmpdir)
+        assert 'c.png' in self._relPaths()
+        tmpdir.join('conditions.csv').write('image\nb.png\nmissing.png\n')
+        assert self._relPaths() == ['conditions.csv', 'b.png']
+
+    def test_many_paths(self, tmpdir, monkeypatch):
+        # paths are checked in a pool of threads
+        monkeypatch.setattr(psychopy.experiment._experiment,
+                            'statPoolThreshold', 1)
+        self._makeFiles(tmpdir)
+        assert self._relPaths() == ['conditions.csv', 'a.png', 'b.png',
+                                    'more.csv', 'c.png']
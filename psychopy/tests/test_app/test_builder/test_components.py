@@ -89,7 +89,8 @@ class TestComponents(object):
                    'next',
                    ]
         for field in dir(param):
-            if field.startswith("__"):
+            # methods (e.g. Param.getExpressionsJS) are not part of the profile
+            if field.startswith("__") or callable(getattr(param, field)):
                 ignore.append(field)
         fields = set(dir(param)).difference(ignore)
 
@@ -170,3 +171,51 @@ def test_flip_before_shutdown_in_settings_component():
     script = exp.writeScript()
 
     assert 'Flip one final time' in script
+
+
+@pytest.mark.components
+def test_components_index(tmpdir, monkeypatch):
+    from psychopy.experiment import components
+    fileName = str(tmpdir.join('componentsIndex.json'))
+    monkeypatch.setattr(components, 'componentsIndex',
+                        components.ComponentsIndex(fileName))
+    allComp = components.getComponents(fetchIcons=False)
+    assert os.path.isfile(fileName)
+
+    # a new session lists the components from the index, without importing
+    monkeypatch.setattr(components, 'componentsIndex',
+                        components.ComponentsIndex(fileName))
+    indexed = components.getComponents(fetchIcons=False)
+    assert list(indexed) == list(allComp)
+    assert 'TextComponent' in indexed
+    assert isinstance(indexed._components['TextComponent'], dict)
+    assert indexed.getCategories('TextComponent') == ['Stimuli']
+    for name in allComp:
+        assert indexed[name] is allComp[name]
+
+
+@pytest.mark.components
+def test_components_index_user_folder(tmpdir, monkeypatch):
+    from psychopy.experiment import components
+    monkeypatch.setattr(components, 'componentsIndex',
+                        components.ComponentsIndex())
+    monkeypatch.setattr(os.sys, 'path', list(os.sys.path))
+    userFolder = tmpdir.mkdir('indexTestCompts')
+    folder = userFolder.mkdir('indexTestCompts')
+    folder.join('__init__.py').write('')
+    code = ("from psychopy.experiment.components import BaseComponent\n"
+            "categories = ['Testing']\n"
+            "class FirstComponent(BaseComponent):\n"
+            "    pass\n")
+    folder.join('first.py').write(code)
+    userComps = components.getComponents(str(userFolder))
+    assert list(userComps) == ['FirstComponent']
+
+    # the folder is searched again when a component has been changed
+    folder.join('first.py').write(
+        code + "class SecondComponent(BaseComponent):\n"
+               "    categories = ['Testing']\n")
+    monkeypatch.delitem(os.sys.modules, 'indexTestCompts.first')
+    userComps = components.getComponents(str(userFolder))
+    assert sorted(userComps) == ['FirstComponent', 'SecondComponent']
+    assert userComps.getCategories('SecondComponent') == ['Testing']
@@ -0,0 +1,303 @@
+"""Benchmark the data and staircase handlers with synthetic designs.
+
+For each number of trials (by default 10**2 to 10**4, up to 10**6 given on
+the command line) and number of columns (of mixed types: ints, floats,
+strings and booleans) a design is generated and the time and peak memory
+(measured with tracemalloc) are reported for:
+
+  - importConditions from csv and xlsx files
+  - creating a TrialHandler, and running its trials adding data
+    (DataHandler.add), with TrialHandler and TrialHandler2
+  - ExperimentHandler.addData and nextEntry for each trial
+  - saveAsWideText, saveAsExcel and saveAsPickle
+  - updates of QuestHandler, PsiHandler and QuestPlusHandler
+
+Slow operations are only run up to a maximum number of trials. Each
+operation is timed without tracemalloc (which slows Python down), then run
+once more to measure its peak memory.
+
+The results can be saved as JSON to be compared between releases: given a
+baseline saved by a previous run, operations which got slower or use more
+memory (by more than the tolerance) are listed as regressions, and the
+script exits with status 1.
+
+The benchmark is not run as part of the test suite.
+
+command-line usage:
+python psychopy/tests/test_data/benchmark_data.py [--trials N [N ...]]
+    [--cols N [N ...]] [--repeats N] [--out results.json]
+    [--baseline baseline.json] [--tolerance 0.25]
+"""
+from __future__ import division, print_function
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from psychopy import data, logging
+from psychopy.tests import utils
+
+try:
+    import tracemalloc
+except ImportError:  # python 2
+    tracemalloc = None
+
+
+def _makeConditions(nConds, nCols, seed=0):
+    """A list of conditions with `nCols` columns of ints, floats, strings and
+    booleans
+    """
+    rng = np.random.RandomState(seed)
+    conditions = []
+    for condN in range(nConds):
+        cond = {}
+        for colN in range(nCols):
+            kind = colN % 4
+            if kind == 0:
+                cond['int%d' % colN] = int(rng.randint(100))
+            elif kind == 1:
+                cond['float%d' % colN] = float(rng.uniform())
+            elif kind == 2:
+                cond['str%d' % colN] = 'level%d' % rng.randint(10)
+            else:
+                cond['bool%d' % colN] = bool(rng.randint(2))
+        conditions.append(cond)
+    return conditions
+
+
+def _design(nTrials, nCols):
+    """Returns conditions and the number of repeats for `nTrials` trials"""
+    nConds = min(nTrials, 100)
+    return _makeConditions(nConds, nCols), nTrials // nConds
+
+
+def _makeConditionsFile(nTrials, nCols, folder, ext):
+    fileName = os.path.join(folder, 'conditions%d_%d%s' % (nTrials, nCols,
+                                                           ext))
+    if not os.path.isfile(fileName):
+        # written directly (not by a TrialHandler, which is much slower to
+        # save large designs)
+        conditions = pd.DataFrame(_makeConditions(nTrials, nCols))
+        if ext == '.csv':
+            conditions.to_csv(fileName, index=False)
+        else:
+            conditions.to_excel(fileName, index=False)
+    return fileName
+
+
+def _runTrials(trials):
+    rng = np.random.RandomState(0)
+    for trial in trials:
+        trials.addData('resp', int(rng.randint(2)))
+        trials.addData('rt', float(rng.uniform()))
+    return trials
+
+
+def _finishedTrials(nTrials, nCols, folder):
+    conditions, nReps = _design(nTrials, nCols)
+    trials = data.TrialHandler(conditions, nReps, autoLog=False)
+    return _runTrials(trials), folder
+
+
+def _experiment(nTrials, nCols, folder):
+    conditions, nReps = _design(nTrials, nCols)
+    exp = data.ExperimentHandler(
+        name='benchmark', dataFileName=os.path.join(folder, 'benchmark'),
+        savePickle=False, saveWideText=False, autoLog=False)
+    trials = data.TrialHandler(conditions, nReps, autoLog=False)
+    exp.addLoop(trials)
+    return exp, trials
+
+
+def _runExperiment(args):
+    exp, trials = args
+    rng = np.random.RandomState(0)
+    for trial in trials:
+        exp.addData('resp', int(rng.randint(2)))
+        exp.addData('rt', float(rng.uniform()))
+        exp.nextEntry()
+    return exp
+
+
+def _finishedExperiment(nTrials, nCols, folder):
+    exp = _runExperiment(_experiment(nTrials, nCols, folder))
+    return exp, folder
+
+
+def _runStaircase(stairs):
+    rng = np.random.RandomState(0)
+    for intensity in stairs:
+        # a simulated observer with a threshold of 0.5
+        stairs.addResponse(int(rng.uniform() < 1 / (1 + np.exp(
+            (0.5 - intensity) * 10))))
+    return stairs
+
+
+def _runQuestPlus(stairs):
+    rng = np.random.RandomState(0)
+    for intensity in stairs:
+        stairs.addResponse('Yes' if rng.uniform() < 1 / (1 + np.exp(
+            (0.5 - intensity) * 10)) else 'No')
+    return stairs
+
+
+# (operation, maximum number of trials, setup(nTrials, nCols, folder) which
+# isn't timed, and the operation, given the result of setup)
+operations = [
+    ('importConditions csv', 10 ** 6,
+     lambda n, cols, folder: _makeConditionsFile(n, cols, folder, '.csv'),
+     data.importConditions),
+    ('importConditions xlsx', 10 ** 4,
+     lambda n, cols, folder: _makeConditionsFile(n, cols, folder, '.xlsx'),
+     data.importConditions),
+    ('TrialHandler()', 10 ** 6,
+     lambda n, cols, folder: _design(n, cols),
+     lambda design: data.TrialHandler(design[0], design[1],
+                                      autoLog=False)),
+    ('TrialHandler trials with addData', 10 ** 5,
+     lambda n, cols, folder: data.TrialHandler(*_design(n, cols),
+                                               autoLog=False),
+     _runTrials),
+    ('TrialHandler2 trials with addData', 10 ** 5,
+     lambda n, cols, folder: data.TrialHandler2(*_design(n, cols),
+                                                autoLog=False),
+     _runTrials),
+    ('ExperimentHandler addData/nextEntry', 10 ** 6, _experiment,
+     _runExperiment),
+    ('TrialHandler.saveAsWideText', 10 ** 4, _finishedTrials,
+     lambda args: args[0].saveAsWideText(
+         os.path.join(args[1], 'trials.tsv'), appendFile=False)),
+    ('TrialHandler.saveAsExcel', 10 ** 4, _finishedTrials,
+     lambda args: args[0].saveAsExcel(
+         os.path.join(args[1], 'trials.xlsx'), appendFile=False)),
+    ('TrialHandler.saveAsPickle', 10 ** 5, _finishedTrials,
+     lambda args: args[0].saveAsPickle(
+         os.path.join(args[1], 'trials'), fileCollisionMethod='overwrite')),
+    ('ExperimentHandler.saveAsWideText', 10 ** 6, _finishedExperiment,
+     lambda args: args[0].saveAsWideText(
+         os.path.join(args[1], 'exp.csv'), appendFile=False)),
+    ('ExperimentHandler.saveAsPickle', 10 ** 6, _finishedExperiment,
+     lambda args: args[0].saveAsPickle(
+         os.path.join(args[1], 'exp'), fileCollisionMethod='overwrite')),
+    ('QuestHandler updates', 10 ** 4,
+     lambda n, cols, folder: data.QuestHandler(
+         0.5, 0.2, pThreshold=0.63, gamma=0.01, nTrials=n, minVal=0,
+         maxVal=1, autoLog=False),
+     _runStaircase),
+    ('PsiHandler updates', 10 ** 3,
+     lambda n, cols, folder: data.PsiHandler(
+         nTrials=n, intensRange=[0.1, 1], alphaRange=[0.1, 1],
+         betaRange=[0.1, 3], intensPrecision=0.01, alphaPrecision=0.01,
+         betaPrecision=0.1, delta=0.01),
+     _runStaircase),
+    ('QuestPlusHandler updates', 10 ** 3,
+     lambda n, cols, folder: data.QuestPlusHandler(
+         nTrials=n, intensityVals=np.linspace(0.05, 1, 20),
+         thresholdVals=np.linspace(0.05, 1, 20), slopeVals=[3.5],
+         lowerAsymptoteVals=[0.5], lapseRateVals=[0.01],
+         stimScale='linear'),
+     _runQuestPlus),
+]
+
+# the staircases don't use the columns of a design
+_staircases = ('QuestHandler updates', 'PsiHandler updates',
+               'QuestPlusHandler updates')
+
+
+def _measure(setup, func, repeats):
+    """Returns the times taken by `func(setup())` and its peak memory"""
+    times = []
+    for repeat in range(repeats):
+        args = setup()
+        start = timeit.default_timer()
+        func(args)
+        times.append(timeit.default_timer() - start)
+    stats = utils.timingStats(times)
+    stats['peakMemory'] = None
+    if tracemalloc is not None:
+        args = setup()
+        tracemalloc.start()
+        try:
+            func(args)
+            stats['peakMemory'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return stats
+
+
+def run(trialCounts=(100, 1000, 10000), colCounts=(4, 16), repeats=3,
+        outFile=None, baseline=None, tolerance=0.25):
+    logging.console.setLevel(logging.ERROR)
+    folder = tempfile.mkdtemp()
+    results = {}
+    print('%-58s %10s %10s' % ('', 'msec', 'peak MB'))
+    try:
+        for opName, maxTrials, setup, func in operations:
+            for nTrials in trialCounts:
+                if nTrials > maxTrials:
+                    continue
+                for nCols in colCounts:
+                    if opName in _staircases:
+                        name = '%s trials=%d' % (opName, nTrials)
+                        if name in results:
+                            continue
+                    else:
+                        name = '%s trials=%d cols=%d' % (opName, nTrials,
+                                                         nCols)
+                    try:
+                        stats = _measure(
+                            lambda: setup(nTrials, nCols, folder), func,
+                            repeats)
+                    except Exception as err:
+                        print('%-58s failed: %s' % (name, err))
+                        break
+                    results[name] = stats
+                    peak = ('%10.2f' % (stats['peakMemory'] / 1e6)
+                            if stats['peakMemory'] is not None else '')
+                    print('%-58s %10.2f %s' % (
+                        name, stats['median'] * 1000, peak))
+    finally:
+        shutil.rmtree(folder)
+
+    if outFile:
+        utils.saveBenchmarks(outFile, results, info={
+            'benchmark': 'data', 'repeats': repeats})
+        print('saved %s' % outFile)
+    regressions = []
+    if baseline:
+        regressions = utils.compareBenchmarks(
+            results, baseline, tolerance, metrics=('median', 'peakMemory'))
+        for name, metric, baseValue, value in regressions:
+            print('REGRESSION %s: %s %g (baseline %g)'
+                  % (name, metric, value, baseValue))
+        if not regressions:
+            print('no regressions (tolerance %d%%)' % (tolerance * 100))
+    return results, regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark the data and staircase handlers')
+    parser.add_argument('--trials', type=int, nargs='+',
+                        default=[100, 1000, 10000],
+                        help='numbers of trials in the designs')
+    parser.add_argument('--cols', type=int, nargs='+', default=[4, 16],
+                        help='numbers of columns in the designs')
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='times to repeat each operation')
+    parser.add_argument('--out', help='save the results to this JSON file')
+    parser.add_argument('--baseline',
+                        help='compare with the results in this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='increase in time or memory (as a proportion) '
+                             'reported as a regression')
+    args = parser.parse_args()
+    results, regressions = run(args.trials, args.cols, args.repeats,
+                               args.out, args.baseline, args.tolerance)
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,148 @@
+"""Benchmark polling the keyboard buffer every frame, as Builder scripts do.
+
+A simulated device produces key presses (mostly keys that aren't being
+listened for, with occasional responses) while a frame loop calls
+getKeys(keyList, waitRelease=False) once per frame, as the code generated for
+a Keyboard component does. The time per frame is compared between the ring
+buffer of hardware.keyboard._KeyBuffer and the previous implementation,
+which built KeyPress objects for all events and looped through them on every
+call.
+
+The benchmark is not run as part of the test suite.
+
+command-line usage:
+python psychopy/tests/test_hardware/benchmark_keyboard.py [frames]
+"""
+from __future__ import division, print_function
+
+import sys
+import timeit
+from collections import deque
+
+import numpy as np
+
+from psychopy.hardware import keyboard
+from psychopy.hardware.keyboard import KeyPress, _KeyBuffer
+
+_codes = {name: code for code, name in keyboard.keyNames.items()}
+
+
+class _SimulatedDevice(object):
+    """Produces the events queued for each frame"""
+
+    def __init__(self):
+        self.evts = deque()
+
+    def queueFrame(self, evts):
+        self.evts.extend(evts)
+
+    def flush(self):
+        return len(self.evts)
+
+    def queue_get_event(self):
+        return self.evts.popleft(), len(self.evts) - 1
+
+
+class _OldKeyBuffer(object):
+    """The key buffer as implemented before the ring buffer"""
+
+    def __init__(self, dev):
+        self.dev = dev
+        self._evts = deque()
+        self._keys = []
+        self._keysStillDown = []
+
+    def _flushEvts(self):
+        while self.dev.flush():
+            evt, remaining = self.dev.queue_get_event()
+            key = {}
+            key['keycode'] = int(evt['Keycode'])
+            key['down'] = bool(evt['Pressed'])
+            key['time'] = evt['Time']
+            self._evts.append(key)
+
+    def getKeys(self, keyList=[], waitRelease=True, clear=True):
+        self._processEvts()
+        if not keyList and not waitRelease:
+            keyPresses = deque(self._keys)
+            if clear:
+                self._keys = deque()
+                self._keysStillDown = deque()
+            return keyPresses
+        keyPresses = deque()
+        for keyPress in self._keys:
+            if waitRelease and not keyPress.duration:
+                continue
+            if keyList and keyPress.name not in keyList:
+                continue
+            keyPresses.append(keyPress)
+        if clear:
+            for key in keyPresses:
+                self._keys.remove(key)
+        return keyPresses
+
+    def _processEvts(self):
+        self._flushEvts()
+        evts = deque(self._evts)
+        self._evts.clear()
+        for evt in evts:
+            if evt['down']:
+                newKey = KeyPress(code=evt['keycode'], tDown=evt['time'])
+                self._keys.append(newKey)
+                self._keysStillDown.append(newKey)
+            else:
+                for key in self._keysStillDown:
+                    if key.code == evt['keycode']:
+                        key.duration = evt['time'] - key.tDown
+                        self._keysStillDown.remove(key)
+                        break
+
+
+def _simulateEvents(nFrames, pressesPerFrame, seed=0):
+    """Returns a list of the events for each frame"""
+    rng = np.random.RandomState(seed)
+    others = [name for name in _codes if name not in ('space', 'escape')]
+    frames = [[] for _ in range(nFrames)]
+    nPresses = rng.poisson(pressesPerFrame, nFrames)
+    for frame, n in enumerate(nPresses):
+        for i in range(n):
+            if rng.uniform() < 0.05:
+                name = 'space'
+            else:
+                name = others[rng.randint(len(others))]
+            t = frame / 60 + rng.uniform(0, 1 / 60)
+            frames[frame].append(
+                {'Keycode': _codes[name], 'Pressed': 1, 'Time': t})
+            release = min(frame + rng.randint(1, 10), nFrames - 1)
+            frames[release].append(
+                {'Keycode': _codes[name], 'Pressed': 0, 'Time': t + 0.1})
+    return frames
+
+
+def _timeFrames(buffer, dev, frames):
+    keyList = ['space', 'escape']
+    nResponses = 0
+    start = timeit.default_timer()
+    for evts in frames:
+        dev.queueFrame(evts)
+        nResponses += len(buffer.getKeys(keyList, waitRelease=False))
+    return (timeit.default_timer() - start) / len(frames), nResponses
+
+
+def run(nFrames=3000, rates=(0, 0.1, 1)):
+    print('%d frames, getKeys(keyList, waitRelease=False) every frame'
+          % nFrames)
+    for rate in rates:
+        frames = _simulateEvents(nFrames, rate)
+        dev = _SimulatedDevice()
+        oldTime, oldResponses = _timeFrames(_OldKeyBuffer(dev), dev, frames)
+        dev = _SimulatedDevice()
+        newTime, newResponses = _timeFrames(
+            _KeyBuffer(keyboard.defaultBufferSize, -1, dev=dev), dev, frames)
+        assert oldResponses == newResponses
+        print('  %4.1f presses/frame: old %8.1f usec/frame, '
+              'new %8.1f usec/frame' % (rate, oldTime * 1e6, newTime * 1e6))
+
+
+if __name__ == '__main__':
+    run(*[int(a) for a in sys.argv[1:2]])
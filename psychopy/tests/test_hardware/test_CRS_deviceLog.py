@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""Tests for parsing Bits# status logs and Display++ touch logs with
+psychopy.hardware.crs.devicelog, using a fake serial port that replays
+status and touch streams.
+"""
+from __future__ import division
+
+import threading
+
+import numpy as np
+import pytest
+
+from psychopy.hardware.crs.devicelog import (StatusLog, TouchLog, RecordList,
+                                             extractStatusEvents,
+                                             extractTouchEvents,
+                                             segmentTouches, STATUS_DTYPE)
+
+
+def _statusStream(nSamples=5000, seed=3):
+    """Returns a status stream as the Bits# sends it (bytes) and the inputs
+    it reports."""
+    rng = np.random.RandomState(seed)
+    DIN = np.ones((nSamples, 10), dtype=int)
+    IR = np.ones((nSamples, 6), dtype=int)
+    trigIn = np.zeros(nSamples, dtype=int)
+    # occasional presses of each input lasting a few samples
+    for states in (DIN, IR, trigIn[:, np.newaxis]):
+        for j in range(states.shape[1]):
+            for start in rng.randint(0, nSamples, 8):
+                states[start:start + rng.randint(1, 50), j] = 1 - states[
+                    start, j]
+    ADC = np.cumsum(rng.normal(0, 0.2, (nSamples, 6)), axis=0)
+    times = np.arange(nSamples) / 1000.
+    lines = []
+    for i in range(nSamples):
+        values = [i, '%.6f' % times[i], trigIn[i]] + list(DIN[i]) + \
+            list(IR[i]) + ['%.4f' % v for v in ADC[i]]
+        lines.append('#sample;' + ';'.join(str(v) for v in values) + ';')
+    stream = ('\r'.join(lines) + '\r').encode('utf-8')
+    return stream, DIN, IR, trigIn, np.round(ADC, 4)
+
+
+class FakeSerial(object):
+    """Replays a recorded stream in chunks of random sizes, as read() calls
+    on a serial port would return it."""
+
+    def __init__(self, stream, seed=0):
+        self.stream = stream
+        self.pos = 0
+        self.rng = np.random.RandomState(seed)
+
+    def read(self, timeout=0.1):
+        size = self.rng.randint(0, 700)
+        data = self.stream[self.pos:self.pos + size]
+        self.pos += size
+        return data
+
+
+def _oldExtractEvents(values, DINBase, IRBase, TrigInBase, ADCBase,
+                      threshold, mode):
+    """The events found by the sample by sample loop BitsSharp used."""
+    DINBase = [(DINBase >> j) & 1 for j in range(10)]
+    IRBase = [(IRBase >> j) & 1 for j in range(6)]
+    ADCBase = [ADCBase] * 6
+    TrigInBase = [TrigInBase]
+    events = []
+    for v in values:
+        for source, states, base in (('DIN', v['DIN'], DINBase),
+                                     ('IR', v['IR'], IRBase),
+                                     ('ADC', v['ADC'], ADCBase),
+                                     ('Trigger', [v['trigIn']],
+                                      TrigInBase)):
+            for j in range(len(states)):
+                if source == 'ADC':
+                    down = base[j] - states[j] > threshold
+                    up = states[j] - base[j] > threshold
+                else:
+                    down = states[j] == 0 and base[j] == 1
+                    up = states[j] == 1 and base[j] == 0
+                if down or up:
+                    direction = 'down' if down else 'up'
+                    if direction in mode:
+                        events.append((source, j, direction, v['time']))
+                    base[j] = states[j]
+    return events
+
+
+def _readAll(port, log):
+    while port.pos < len(port.stream):
+        log.feed(port.read())
+    log.finish()
+
+
+def test_statusLog():
+    stream, DIN, IR, trigIn, ADC = _statusStream()
+    log = StatusLog()
+    _readAll(FakeSerial(stream), log)
+    records = log.getRecords()
+    assert records.dtype == STATUS_DTYPE
+    assert len(records) == len(DIN)
+    assert np.array_equal(records['sample'], np.arange(len(DIN)))
+    assert np.array_equal(records['DIN'], DIN)
+    assert np.array_equal(records['IR'], IR)
+    assert np.array_equal(records['trigIn'], trigIn)
+    assert np.allclose(records['ADC'], ADC)
+    assert np.array_equal(records['DWORD'], DIN.dot(2 ** np.arange(10)))
+    assert log.nSkipped == 0
+
+
+def test_statusLogSkipsOtherData():
+    stream, DIN, _, _, _ = _statusStream(100)
+    stream = (b'$touch;1;2;3\r#sample;garbled\r' + stream[:-1] +
+              b'\r#sample;2;bogus')
+    log = StatusLog()
+    _readAll(FakeSerial(stream), log)
+    assert len(log) == 100
+    assert log.nSkipped == 2  # the incomplete last line is ignored
+
+
+def test_statusLogRingBuffer():
+    stream, DIN, _, _, _ = _statusStream(3000)
+    log = StatusLog(maxRecords=1000)
+    _readAll(FakeSerial(stream), log)
+    assert log.count == 3000
+    records = log.getRecords()
+    assert len(records) == 1000
+    assert np.array_equal(records['sample'], np.arange(2000, 3000))
+    assert np.array_equal(records['DIN'], DIN[2000:])
+
+
+def test_statusLogTakeRecords():
+    # records are taken while the log is fed from another thread, as
+    # BitsSharp does while status logging runs, and none are lost
+    stream, DIN, _, _, _ = _statusStream(20000)
+    log = StatusLog(maxRecords=len(DIN))
+    port = FakeSerial(stream)
+    reader = threading.Thread(target=_readAll, args=(port, log))
+    reader.start()
+    taken = []
+    while reader.is_alive():
+        taken.append(log.takeRecords())
+    reader.join()
+    taken.append(log.takeRecords())
+    samples = np.concatenate([records['sample'] for records in taken])
+    assert np.array_equal(samples, np.arange(len(DIN)))
+    assert len(log) == 0
+
+
+@pytest.mark.parametrize('mode', [['up', 'down'], ['down'], ['Up']])
+def test_extractStatusEvents(mode):
+    stream, _, _, _, _ = _statusStream(3000)
+    log = StatusLog()
+    _readAll(FakeSerial(stream), log)
+    records = log.getRecords()
+    kwargs = dict(DINBase=0b1111111111, IRBase=0b111111, TrigInBase=0,
+                  ADCBase=0, threshold=1.5)
+    events = extractStatusEvents(records, mode=mode, **kwargs)
+    values = RecordList(records, lambda r: r)
+    expected = _oldExtractEvents(values, mode=[m.lower() for m in mode],
+                                 **kwargs)
+    assert len(events) == len(expected)
+    assert [tuple(e) for e in events.tolist()] == expected
+    assert set(events['source']) == {'DIN', 'IR', 'ADC', 'Trigger'}
+
+
+def test_recordList():
+    stream, _, _, _, _ = _statusStream(10)
+    log = StatusLog()
+    log.feed(stream)
+    values = RecordList(log.getRecords(), lambda r: int(r['sample']))
+    assert len(values) == 10
+    assert values[3] == 3
+    assert list(values[2:5]) == [2, 3, 4]
+    assert list(values) == list(range(10))
+    assert values.records['sample'][3] == 3
+    # still a list that can be changed, as the status values used to be
+    assert isinstance(values, list)
+    values.append(10)
+    values[0] = -1
+    assert values[-2:] == [9, 10]
+    assert values[0] == -1
+
+
+def _touchStream(nTouches=500, seed=5):
+    """Returns a touch stream as the Display++ sends it (bytes) and the
+    time, x, y and touched values it reports."""
+    rng = np.random.RandomState(seed)
+    rows = []
+    t = 0.0
+    for _ in range(nTouches):
+        x, y = rng.randint(0, 1920), rng.randint(0, 1080)
+        for _ in range(rng.randint(1, 200)):  # finger jitter and drags
+            rows.append((t, x, y, 1))
+            t += 0.001
+            x += rng.randint(-3, 4)
+            y += rng.randint(-3, 4)
+        rows.append((t, x, y, 0))
+        t += rng.uniform(0.01, 0.5)
+    rows = np.array(rows)
+    stream = ''.join('$touch;%.4f;%d;%d;%d\r' % tuple(row) for row in rows)
+    return stream.encode('utf-8'), rows
+
+
+def _oldTouchEvents(rows, distance, t, types):
+    """The touches found by the loop DisplayPlusPlusTouch used."""
+    rT = rX = rY = -999999
+    rType = 'None'
+    events = []
+    for i, (time, x, y, touched) in enumerate(rows):
+        direction = 'touched' if touched == 1 else 'released'
+        dist = ((x - rX) ** 2.0 + (y - rY) ** 2.0) ** 0.5
+        if ((dist > distance and time - rT > t) or
+                (rType != direction and direction in types)):
+            events.append(i)
+            rT, rX, rY, rType = time, x, y, direction
+    return events
+
+
+def test_touchLog():
+    stream, rows = _touchStream()
+    log = TouchLog()
+    _readAll(FakeSerial(stream[:-1]), log)  # last report not terminated
+    records = log.getRecords()
+    assert len(records) == len(rows)
+    assert np.allclose(records['time'], rows[:, 0], atol=1e-4)
+    assert np.array_equal(records['x'], rows[:, 1])
+    assert np.array_equal(records['y'], rows[:, 2])
+    assert np.array_equal(records['touched'], rows[:, 3] == 1)
+
+
+def test_touchLogFinishLocked():
+    # finish() parses the last report under the lock, like feed()
+    stream, rows = _touchStream(5)
+    log = TouchLog()
+    log.feed(stream[:-1])
+    finisher = threading.Thread(target=log.finish)
+    with log._lock:
+        finisher.start()
+        finisher.join(0.1)
+        assert finisher.is_alive()
+    finisher.join()
+    assert len(log) == len(rows)
+
+
+@pytest.mark.parametrize('distance, t, types', [
+    (10, 0.1, ['touched', 'released']),
+    (2, 0.001, 'touched'),
+    (50, 0.0, ['released'])])
+def test_extractTouchEvents(distance, t, types):
+    stream, rows = _touchStream()
+    log = TouchLog()
+    log.feed(stream)
+    records = log.getRecords()
+    events = extractTouchEvents(records, distance, t, types)
+    assert list(events) == _oldTouchEvents(records.tolist(), distance, t,
+                                           types)
+
+
+def test_segmentTouches():
+    stream, rows = _touchStream(100000 // 100)
+    log = TouchLog()
+    log.feed(stream)
+    records = log.getRecords()
+    events = segmentTouches(records)
+    assert (events['type'] == 'down').sum() == 1000
+    assert (events['type'] == 'up').sum() == 1000
+    assert np.all(events['touched'][events['type'] == 'up'] == False)
+    moves = events[events['type'] == 'move']
+    assert len(moves) > 0
+    # with a large distance threshold only presses and releases are left
+    events = segmentTouches(records, distance=10)
+    assert (events['type'] == 'move').sum() < len(moves)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Tests for the key press buffer of psychopy.hardware.keyboard, using a
+simulated device in place of the psychtoolbox keyboard queue
+"""
+from collections import deque
+
+import numpy as np
+import pytest
+
+from psychopy.hardware import keyboard
+from psychopy.hardware.keyboard import _KeyBuffer, KeyPress
+
+_codes = {name: code for code, name in keyboard.keyNames.items()}
+
+
+class _FakeDevice(object):
+    """Has the calls of a psychtoolbox hid.Keyboard used by _KeyBuffer"""
+
+    def __init__(self):
+        self.evts = deque()
+
+    def press(self, name, t, duration=None):
+        self.evts.append({'Keycode': _codes[name], 'Pressed': 1, 'Time': t})
+        if duration is not None:
+            self.release(name, t + duration)
+
+    def release(self, name, t):
+        self.evts.append({'Keycode': _codes[name], 'Pressed': 0, 'Time': t})
+
+    def flush(self):
+        return len(self.evts)
+
+    def queue_get_event(self):
+        return self.evts.popleft(), len(self.evts) - 1
+
+
+def _makeBuffer(bufferSize=100):
+    dev = _FakeDevice()
+    return dev, _KeyBuffer(bufferSize, -1, dev=dev)
+
+
+def test_getKeys():
+    dev, buffer = _makeBuffer()
+    dev.press('a', 1.0, 0.25)
+    dev.press('b', 2.0)
+    keys = buffer.getKeys(waitRelease=False, clear=False)
+    assert [k.name for k in keys] == ['a', 'b']
+    assert isinstance(keys[0], KeyPress)
+    assert keys[0].tDown == 1.0 and keys[0].duration == 0.25
+    assert keys[1].duration is None
+    # only released keys, and clearing only those returned
+    assert buffer.getKeys() == deque(['a'])
+    assert buffer.getKeys(waitRelease=False) == deque(['b'])
+    assert len(buffer.getKeys(waitRelease=False)) == 0
+
+
+def test_getKeysKeyList():
+    dev, buffer = _makeBuffer()
+    for i, name in enumerate(['a', 'space', 'b', 'space', 'escape']):
+        dev.press(name, i, 0.1)
+    assert list(buffer.getKeys(['space', 'escape'])) == [
+        'space', 'space', 'escape']
+    assert list(buffer.getKeys(['space', 'escape'])) == []
+    assert list(buffer.getKeys()) == ['a', 'b']
+
+
+def test_getKeysKeyName():
+    # a single key name is not taken as a list of one-letter key names
+    dev, buffer = _makeBuffer()
+    for i, name in enumerate(['s', 'space', 'a', 'e']):
+        dev.press(name, i, 0.1)
+    assert list(buffer.getKeys('space')) == ['space']
+    assert list(buffer.getKeys('space')) == []
+    assert list(buffer.getKeys()) == ['s', 'a', 'e']
+
+
+def test_release():
+    dev, buffer = _makeBuffer()
+    dev.press('a', 1.0)
+    dev.press('a', 2.0)
+    assert len(buffer.getKeys()) == 0
+    dev.release('a', 2.5)
+    dev.release('b', 2.6)  # pressed before the buffer was read
+    keys = buffer.getKeys(waitRelease=False)
+    # the oldest press of the key is the one released
+    assert [k.duration for k in keys] == [1.5, None]
+    # releases are still recorded for keys that were returned while down
+    dev.press('c', 3.0)
+    assert buffer.getKeys(waitRelease=False)[0].duration is None
+    dev.release('c', 3.5)
+    dev.press('c', 4.0, 0.5)
+    assert [k.tDown for k in buffer.getKeys()] == [4.0]
+
+
+def test_bufferFull():
+    dev, buffer = _makeBuffer(bufferSize=10)
+    for i in range(25):
+        dev.press('a', i, 0.5)
+    keys = buffer.getKeys()
+    # the oldest presses are dropped
+    assert [k.tDown for k in keys] == list(range(15, 25))
+    assert all(k.duration == 0.5 for k in keys)
+
+
+def test_clear():
+    dev, buffer = _makeBuffer()
+    dev.press('a', 1.0)
+    buffer.flush()
+    buffer.clear()
+    dev.release('a', 1.5)
+    dev.press('b', 2.0, 0.5)
+    assert list(buffer.getKeys()) == ['b']
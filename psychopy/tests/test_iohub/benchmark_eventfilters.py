@@ -0,0 +1,110 @@
+"""Benchmark the iohub event field filters at a 2 kHz sample rate.
+
+Compares the incremental filters in psychopy.iohub.devices.eventfilters with
+versions that recalculate the filtered value from the whole window for every
+value added (as the filters used to), adding values one at a time and in
+chunks with filterValues(). Also compares copying events for filters using
+copy.deepcopy() with the list copy now used by Device._handleEvent.
+
+The benchmark is not run as part of the test suite.
+
+command-line usage:
+python psychopy/tests/test_iohub/benchmark_eventfilters.py [seconds of data]
+"""
+from __future__ import division, print_function
+
+import copy
+import sys
+import timeit
+
+import numpy as np
+
+from psychopy.iohub.devices import eventfilters
+
+SAMPLE_RATE = 2000
+
+
+class RecalculatedMovingWindowFilter(eventfilters.MovingWindowFilter):
+    def filteredValue(self):
+        return self._filtering_buffer.mean()
+
+
+class RecalculatedMedianFilter(eventfilters.MedianFilter):
+    def filteredValue(self):
+        return np.median(self._filtering_buffer.getElements())
+
+
+class RecalculatedWeightedAverageFilter(eventfilters.WeightedAverageFilter):
+    def filteredValue(self):
+        return np.convolve(self._filtering_buffer.getElements(),
+                           self._weights, 'valid')
+
+
+def _filterPairs(length):
+    weights = np.hanning(length + 2)[1:-1]
+    return [('MovingWindowFilter', eventfilters.MovingWindowFilter,
+             RecalculatedMovingWindowFilter, dict(length=length,
+                                                  knot_pos='center')),
+            ('MedianFilter', eventfilters.MedianFilter,
+             RecalculatedMedianFilter, dict(length=length, knot_pos='center')),
+            ('WeightedAverageFilter', eventfilters.WeightedAverageFilter,
+             RecalculatedWeightedAverageFilter, dict(weights=weights,
+                                                     knot_pos='center'))]
+
+
+def _timeAdd(filter_class, kwargs, values):
+    field_filter = filter_class(**kwargs)
+    add = field_filter.add
+    start = timeit.default_timer()
+    for v in values:
+        add(v)
+    return timeit.default_timer() - start
+
+
+def _timeChunks(filter_class, kwargs, values, chunk_size):
+    field_filter = filter_class(**kwargs)
+    start = timeit.default_timer()
+    for i in range(0, len(values), chunk_size):
+        field_filter.filterValues(values[i:i + chunk_size])
+    return timeit.default_timer() - start
+
+
+def _report(name, duration, count):
+    usec = duration / count * 1e6
+    print('  %-38s %8.2f usec / sample  %6.1f%% of 2 kHz budget' %
+          (name, usec, usec / (1e6 / SAMPLE_RATE) * 100))
+
+
+def run(seconds=30.0):
+    count = int(seconds * SAMPLE_RATE)
+    values = (np.cumsum(np.random.RandomState(0).normal(0, 1.0, count)) +
+              500.0).astype(np.float32)
+    print('%d samples (%.0f sec at %d Hz)' % (count, seconds, SAMPLE_RATE))
+    for length in (5, 15, 51):
+        print('\nwindow length %d' % length)
+        for name, filter_class, recalc_class, kwargs in _filterPairs(length):
+            _report(name + ' recalculated', _timeAdd(recalc_class, kwargs,
+                                                     values), count)
+            _report(name + ' incremental', _timeAdd(filter_class, kwargs,
+                                                    values), count)
+            _report(name + ' filterValues(100)', _timeChunks(
+                filter_class, kwargs, values, 100), count)
+    for name, filter_class, kwargs in (
+            ('SavitzkyGolayFilter', eventfilters.SavitzkyGolayFilter,
+             dict(length=15, polyorder=3)),
+            ('OneEuroFilter', eventfilters.OneEuroFilter,
+             dict(min_cutoff=1.0, beta=0.01, rate=SAMPLE_RATE))):
+        print()
+        _report(name, _timeAdd(filter_class, kwargs, values), count)
+
+    # a BinocularEyeSampleEvent sized event list
+    event = [0.0] * 50
+    print('\nevent copy for each filter')
+    _report('copy.deepcopy(e)', timeit.timeit(
+        lambda: copy.deepcopy(event), number=count), count)
+    _report('list(e)', timeit.timeit(lambda: list(event), number=count),
+            count)
+
+
+if __name__ == '__main__':
+    run(*[float(a) for a in sys.argv[1:2]])
@@ -0,0 +1,102 @@
+""" Test DataStore event table indexing and interval based event access.
+"""
+from __future__ import division
+
+import shutil
+import tempfile
+
+import numpy as np
+import pytest
+
+tables = pytest.importorskip('tables')
+
+from psychopy.iohub.datastore import DataStoreFile
+from psychopy.iohub.datastore.util import ExperimentDataAccessUtility
+from psychopy.iohub.devices.experiment import MessageEvent
+
+
+def _createDataStore(folder, sessions=2, trials=5, msgsPerTrial=10):
+    dsfile = DataStoreFile('events.hdf5', folder, 'a',
+                           dict(multiple_sessions=True))
+    dsfile.updateDataStoreStructure(object(), dict(MessageEvent=MessageEvent))
+    dsfile.createOrUpdateExperimentEntry([0, 'test', 'test', '', '1.0', 0])
+    cv_dtype = [('trial', 'i4'), ('start', 'f8'), ('end', 'f8')]
+    intervals = []
+    event_id = 0
+    for s in range(sessions):
+        session_id = dsfile.createExperimentSessionEntry(
+            dict(code='s%d' % s, name='', comments='', user_variables='{}'))
+        dsfile.initConditionVariableTable(dsfile.active_experiment_id,
+                                          session_id, cv_dtype)
+        events = []
+        for t in range(trials):
+            start = t * 10.0
+            end = start + 5.0
+            intervals.append((session_id, start, end))
+            dsfile.extendConditionVariableTable(
+                dsfile.active_experiment_id, session_id, [t, start, end])
+            for m in range(msgsPerTrial):
+                etime = start + m
+                event_id += 1
+                events.append((dsfile.active_experiment_id, session_id, 0,
+                               event_id, MessageEvent.EVENT_TYPE_ID,
+                               etime, etime, etime, 0.0, 0.0, 0, 0.0,
+                               b'', b'msg'))
+        dsfile.TABLES[MessageEvent.IOHUB_DATA_TABLE].append(
+            np.array(events, dtype=MessageEvent.NUMPY_DTYPE))
+    dsfile.close()
+    return intervals
+
+
+class TestExperimentDataAccessUtility(object):
+
+    def setup_class(self):
+        self.folder = tempfile.mkdtemp(prefix='psychopy-tests-iohub')
+        self.intervals = _createDataStore(self.folder)
+
+    def teardown_class(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_indexesCreatedOnClose(self):
+        dau = ExperimentDataAccessUtility(self.folder, 'events.hdf5')
+        table = dau.getEventTable(MessageEvent.EVENT_TYPE_ID)
+        for cname in ('time', 'session_id', 'type'):
+            col = getattr(table.cols, cname)
+            assert col.is_indexed and col.index.is_csi
+        dau.close()
+
+    def test_getEventsForIntervals(self):
+        dau = ExperimentDataAccessUtility(self.folder, 'events.hdf5')
+        sessions, starts, ends = zip(*self.intervals)
+        results = dau.getEventsForIntervals('MessageEvent', starts, ends,
+                                            sessions,
+                                            ['session_id', 'time'])
+        allEvents = dau.getEventTable('MessageEvent').read()
+        for (sid, start, end), events in zip(self.intervals, results):
+            mask = ((allEvents['session_id'] == sid) &
+                    (allEvents['time'] >= start) & (allEvents['time'] < end))
+            assert np.array_equal(events['time'], allEvents['time'][mask])
+            assert len(events) == 5
+            assert np.all(events['session_id'] == sid)
+        dau.close()
+
+    def test_getTrialEvents(self):
+        dau = ExperimentDataAccessUtility(self.folder, 'events.hdf5')
+        cvfilter = dict(SESSION_ID=(' in ', [1, 2]))
+        trials = dau.getTrialEvents(MessageEvent.EVENT_TYPE_ID, 'start',
+                                    'end', ['time'],
+                                    conditionVariablesFilter=cvfilter)
+        assert len(trials) == len(self.intervals)
+        for trial in trials:
+            times = trial.events['time']
+            assert len(times) == 5
+            assert times.min() >= trial.condition_set.start
+            assert times.max() < trial.condition_set.end
+        dau.close()
+
+    def test_createIndexesReadOnly(self):
+        from psychopy.iohub.datastore.util import ExperimentDataAccessException
+        dau = ExperimentDataAccessUtility(self.folder, 'events.hdf5')
+        with pytest.raises(ExperimentDataAccessException):
+            dau.createIndexes()
+        dau.close()
@@ -0,0 +1,119 @@
+""" Test adaptive iohub DeviceMonitor polling.
+"""
+import os
+
+import gevent
+import pytest
+
+from psychopy.iohub.server import DeviceMonitor, POLL_HISTOGRAM_EDGES
+
+
+class _PolledDevice(object):
+    name = 'polled'
+
+    def __init__(self, fd=None):
+        self._native_event_count = 0
+        self.fd = fd
+        self.events = 0
+        self.polls = 0
+
+    def _poll(self):
+        self.polls += 1
+        self._native_event_count += self.events
+        if self.fd is not None and self.events:
+            os.read(self.fd, 1024)
+
+    def _getPollFileDescriptor(self):
+        return self.fd
+
+
+def _runMonitor(monitor, duration):
+    monitor.start()
+    gevent.sleep(duration)
+    monitor.running = False
+    monitor.join(1.0)
+
+
+def test_fixedInterval():
+    monitor = DeviceMonitor(_PolledDevice(), 0.005)
+    assert not monitor.adaptive
+    _runMonitor(monitor, 0.2)
+    stats = monitor.getStats()
+    assert 20 <= stats['poll_count'] <= 45
+    assert sum(stats['poll_cost_histogram']) == stats['poll_count']
+    assert sum(stats['latency_histogram']) == stats['poll_count']
+    assert len(stats['latency_histogram']) == len(POLL_HISTOGRAM_EDGES) + 1
+
+
+def test_nextInterval():
+    monitor = DeviceMonitor(_PolledDevice(), 0.01, 0.001, 0.05)
+    assert monitor.adaptive
+    interval = 0.01
+    # idle polls back off to max_interval
+    for _ in range(20):
+        interval = monitor._nextInterval(interval, 0, interval)
+    assert interval == pytest.approx(0.05)
+    # a burst of events drops the interval to min_interval
+    interval = monitor._nextInterval(interval, 50, interval)
+    assert interval == pytest.approx(0.001)
+    # a steady 100 Hz event rate is polled at about 200 Hz
+    for _ in range(500):
+        interval = monitor._nextInterval(interval, 1, 0.01)
+    assert interval == pytest.approx(0.005, rel=0.05)
+
+
+def test_adaptivePolling():
+    device = _PolledDevice()
+    monitor = DeviceMonitor(device, 0.002, 0.001, 0.05)
+    _runMonitor(monitor, 0.3)
+    idle_polls = monitor.getStats()['poll_count']
+    # a fixed 1 msec monitor would have polled ~300 times
+    assert idle_polls < 60
+
+    device.events = 1
+    monitor = DeviceMonitor(device, 0.002, 0.001, 0.05)
+    _runMonitor(monitor, 0.3)
+    stats = monitor.getStats()
+    assert stats['poll_count'] > 2 * idle_polls
+    assert stats['event_count'] == stats['poll_count']
+
+
+def test_fileDescriptorWakeup():
+    read_fd, write_fd = os.pipe()
+    try:
+        device = _PolledDevice(read_fd)
+        monitor = DeviceMonitor(device, 0.01, 0.002, 0.5)
+        monitor.start()
+        gevent.sleep(0.05)
+        polls = device.polls
+        device.events = 1
+        for _ in range(5):
+            os.write(write_fd, b'x')
+            gevent.sleep(0.01)
+        monitor.running = False
+        os.write(write_fd, b'x')
+        monitor.join(1.0)
+        # each write wakes the monitor before max_interval has passed
+        assert device.polls - polls >= 5
+        stats = monitor.getStats()
+        assert stats['fd_wakeups'] >= 5
+        assert stats['file_descriptor']
+        assert sum(stats['latency_histogram']) == stats['poll_count']
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+def test_fileDescriptorNotRead():
+    # a device whose _poll() leaves its fd readable is still only polled
+    # every min_interval
+    read_fd, write_fd = os.pipe()
+    try:
+        device = _PolledDevice(read_fd)
+        os.write(write_fd, b'x')
+        monitor = DeviceMonitor(device, 0.01)
+        _runMonitor(monitor, 0.1)
+        assert 5 <= device.polls <= 20
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
@@ -0,0 +1,136 @@
+""" Test the iohub event field filters.
+"""
+import numpy as np
+import pytest
+
+from psychopy.iohub.devices import eventfilters
+from psychopy.iohub.util import NumPyRingBuffer
+
+
+def _values(n=500, seed=5):
+    rng = np.random.RandomState(seed)
+    values = np.cumsum(rng.normal(0, 5.0, n)) + 100.0
+    return values.astype(np.float32)
+
+
+def _filters():
+    return [eventfilters.MovingWindowFilter(length=5, knot_pos='center'),
+            eventfilters.MovingWindowFilter(length=4, knot_pos='latest'),
+            eventfilters.MedianFilter(length=5, knot_pos='center'),
+            eventfilters.MedianFilter(length=4, knot_pos=0),
+            eventfilters.WeightedAverageFilter(weights=(1, 2, 3, 2, 1),
+                                               knot_pos='center'),
+            eventfilters.SavitzkyGolayFilter(length=7, polyorder=2),
+            eventfilters.PassThroughFilter()]
+
+
+def _windowValue(field_filter, window):
+    if isinstance(field_filter, eventfilters.PassThroughFilter):
+        return window[0]
+    if isinstance(field_filter, eventfilters.MedianFilter):
+        return np.median(window)
+    if isinstance(field_filter, eventfilters.WeightedAverageFilter):
+        return np.convolve(window, field_filter._weights, 'valid')[0]
+    return window.mean()
+
+
+@pytest.mark.parametrize('field_filter', _filters())
+def test_incrementalFilteredValue(field_filter):
+    values = _values()
+    length = field_filter._filtering_buffer.max_size
+    for i, v in enumerate(values):
+        result = field_filter.add(v)
+        if i + 1 < length:
+            assert result is None
+            continue
+        window = values[i + 1 - length:i + 1]
+        assert np.isclose(result[1], _windowValue(field_filter, window),
+                          rtol=1e-5)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 64, 1000])
+def test_filterValues(chunk_size):
+    values = _values()
+    for field_filter, chunked_filter in zip(_filters(), _filters()):
+        expected = [r[1] for r in (field_filter.add(v) for v in values) if r]
+        filtered = np.concatenate(
+            [chunked_filter.filterValues(values[i:i + chunk_size])
+             for i in range(0, len(values), chunk_size)])
+        assert np.allclose(filtered, np.asarray(expected, dtype=np.float64),
+                           rtol=1e-5)
+        # add() continues from the state left by filterValues()
+        assert np.isclose(chunked_filter.add(1.0)[1],
+                          field_filter.add(1.0)[1], rtol=1e-5)
+
+
+def test_medianFilterNaN():
+    median_filter = eventfilters.MedianFilter(length=3, knot_pos='center')
+    results = [median_filter.add(v) for v in (1.0, np.nan, 2.0, 3.0, 4.0,
+                                               5.0)]
+    assert [np.isnan(r[1]) for r in results[2:]] == [True, True, False, False]
+    assert results[-1][1] == 4.0
+
+
+def test_movingWindowFilterNaN():
+    # a NaN value only affects the windows it is in
+    window_filter = eventfilters.MovingWindowFilter(length=3,
+                                                    knot_pos='center')
+    results = [window_filter.add(v) for v in (1.0, 2.0, np.nan, 4.0, 5.0,
+                                               6.0, 7.0, 8.0)]
+    filtered = [r[1] for r in results[2:]]
+    assert all(np.isnan(filtered[:3]))
+    assert filtered[3:] == [5.0, 6.0, 7.0]
+    window_filter.add(np.inf)
+    assert np.isinf(window_filter.add(9.0)[1])
+    assert [window_filter.add(v)[1] for v in (1.0, 2.0)] == [np.inf, 4.0]
+
+
+def test_movingWindowFilterEvents():
+    event_filter = eventfilters.MovingWindowFilter(length=3, knot_pos='center',
+                                                   inplace=True)
+    event_filter._event_field_index = 1
+    event_filter._events = eventfilters.deque(maxlen=3)
+    events = [[i, float(i * i)] for i in range(5)]
+    results = [event_filter.add(e) for e in events]
+    assert results[:2] == [None, None]
+    filtered_event, filtered_value = results[2]
+    assert filtered_event is events[1]
+    assert filtered_value == pytest.approx((0.0 + 1.0 + 4.0) / 3)
+    assert events[1][1] == filtered_value
+
+
+def test_savitzkyGolayPolynomial():
+    # a quadratic is unchanged by a polyorder 2 filter
+    t = np.arange(50, dtype=np.float64)
+    values = 0.5 * t ** 2 - 3 * t + 2
+    sg_filter = eventfilters.SavitzkyGolayFilter(length=7, polyorder=2,
+                                                 knot_pos=5)
+    filtered = sg_filter.filterValues(values)
+    assert np.allclose(filtered, values[5:len(values) - 1], rtol=1e-4)
+
+
+def test_oneEuroFilter():
+    one_euro = eventfilters.OneEuroFilter(min_cutoff=1.0, beta=0.05,
+                                          rate=1000.0)
+    assert one_euro.add(10.0)[1] == 10.0
+    filtered = one_euro.filterValues(np.full(100, 10.0))
+    assert np.all(filtered == 10.0)
+    noisy = 10.0 + np.random.RandomState(1).normal(0, 1.0, 2000)
+    filtered = one_euro.filterValues(noisy)
+    assert filtered[500:].std() < noisy[500:].std() / 2
+    # a fast step is followed more quickly with a larger beta
+    slow = eventfilters.OneEuroFilter(min_cutoff=1.0, beta=0.0)
+    fast = eventfilters.OneEuroFilter(min_cutoff=1.0, beta=1.0)
+    step = np.concatenate((np.zeros(10), np.full(20, 100.0)))
+    assert fast.filterValues(step)[-1] > slow.filterValues(step)[-1]
+
+
+def test_ringBufferGetElements():
+    buffer = NumPyRingBuffer(4)
+    assert buffer.append(1) is None
+    buffer.append(2)
+    assert list(buffer.getElements()) == [1, 2]
+    buffer.extend(np.arange(3, 10))
+    assert list(buffer.getElements()) == [6, 7, 8, 9]
+    assert buffer.append(10) == 6
+    assert list(buffer.getElements()) == [7, 8, 9, 10]
@@ -0,0 +1,127 @@
+""" Test the block based eye sample event parser against the per sample
+parser.
+"""
+import numpy as np
+import pytest
+
+from psychopy.iohub.constants import EventConstants
+from psychopy.iohub.devices import DeviceEvent
+from psychopy.iohub.devices.eyetracker.filters import parser
+from psychopy.iohub.devices.eyetracker.eye_events import \
+    BinocularEyeSampleEvent
+
+DISPLAY = dict(mm_size=dict(width=500.0, height=280.0),
+               pixel_res=(1920, 1080), eye_distance=550.0)
+RATE = 500
+# parser kwargs; a short threshold history so saccades are detected.
+KWARGS = dict(display_device=DISPLAY, sampling_rate=RATE,
+              adaptive_vel_thresh_history=0.2)
+# event fields that are set by addOutputEvent.
+SKIP_FIELDS = (DeviceEvent.EVENT_ID_INDEX, DeviceEvent.EVENT_FILTER_ID_INDEX)
+
+
+def _binocularSamples(n=3000, seed=3):
+    rng = np.random.RandomState(seed)
+    samples = np.zeros(n, dtype=BinocularEyeSampleEvent.NUMPY_DTYPE)
+    samples['type'] = EventConstants.BINOCULAR_EYE_SAMPLE
+    samples['session_id'] = 1
+    times = np.arange(n) / float(RATE) + 10.0
+    samples['time'] = times
+    samples['device_time'] = times
+    samples['logged_time'] = times
+    # fixations at random positions joined by fast moves
+    x = np.zeros(n)
+    y = np.zeros(n)
+    i = 0
+    while i < n:
+        fix_len = rng.randint(60, 200)
+        x[i:i + fix_len] = rng.uniform(-800, 800)
+        y[i:i + fix_len] = rng.uniform(-450, 450)
+        i += fix_len
+    x += rng.normal(0, 2.0, n)
+    y += rng.normal(0, 2.0, n)
+    for eye in ('left', 'right'):
+        samples[eye + '_gaze_x'] = x + rng.normal(0, 1.0, n)
+        samples[eye + '_gaze_y'] = y + rng.normal(0, 1.0, n)
+        samples[eye + '_pupil_measure1'] = 4.0 + rng.normal(0, 0.1, n)
+    # blinks, and periods with only one eye tracked
+    for start, length, status in ((500, 40, 22), (900, 5, 2), (1300, 7, 20),
+                                  (1700, 60, 22), (2200, 1, 22),
+                                  (2990, 10, 22)):
+        samples['status'][start:start + length] = status
+    samples['status'][:3] = 22
+    return samples
+
+
+def _perSampleOutput(samples):
+    ref_parser = parser.EyeTrackerEventParser(**KWARGS)
+    output = []
+    for s in samples.tolist():
+        ref_parser._addInputEvent(list(s))
+        # copy, as missing data samples are interpolated in place later
+        output.extend(list(e) for e in ref_parser._removeOutputEvents())
+    return output
+
+
+def _byType(events):
+    # Missing data samples in a block are output before the valid samples of
+    # the block, so compare events of each type in time order.
+    by_type = dict()
+    for e in sorted(events, key=lambda e: e[DeviceEvent.EVENT_HUB_TIME_INDEX]):
+        fields = [v for i, v in enumerate(e) if i not in SKIP_FIELDS]
+        by_type.setdefault(e[DeviceEvent.EVENT_TYPE_ID_INDEX], []).append(
+            np.array(fields, dtype=float))
+    return by_type
+
+
+def setup_module():
+    parser._addEyeEventClassMappings()
+
+
+@pytest.mark.parametrize('block_size', [1, 37, 5000])
+def test_blockParserMatchesPerSampleParser(block_size):
+    samples = _binocularSamples()
+    expected = _byType(_perSampleOutput(samples))
+    assert EventConstants.SACCADE_END in expected
+    assert EventConstants.BLINK_END in expected
+
+    block_parser = parser.EyeTrackerBlockEventParser(**KWARGS)
+    output = []
+    for b in range(0, len(samples), block_size):
+        output.extend(block_parser.processBlock(samples[b:b + block_size]))
+    found = _byType(output)
+
+    assert sorted(found.keys()) == sorted(expected.keys())
+    for etype, events in expected.items():
+        assert len(found[etype]) == len(events), EventConstants.getName(etype)
+        for e, f in zip(events, found[etype]):
+            assert np.allclose(e, f, rtol=1e-6, atol=1e-6, equal_nan=True)
+
+
+def test_onlineBlockParser():
+    samples = _binocularSamples(1000)
+    block_parser = parser.EyeTrackerBlockEventParser(block_size=10, **KWARGS)
+    output = []
+    for s in samples.tolist():
+        block_parser._addInputEvent(list(s))
+        output.extend(block_parser._removeOutputEvents())
+    expected = _perSampleOutput(samples)
+    assert len(output) == len(expected)
+    event_ids = [e[DeviceEvent.EVENT_ID_INDEX] for e in output]
+    assert event_ids == sorted(event_ids)
+
+
+def test_parseEyeSamples():
+    samples = _binocularSamples()
+    samples = np.concatenate((samples, samples))
+    samples['session_id'][len(samples) // 2:] = 2
+    events = parser.parseEyeSamples(samples, DISPLAY, RATE, block_size=512,
+                                    adaptive_vel_thresh_history=0.2)
+    expected = _byType(_perSampleOutput(samples[:len(samples) // 2]))
+    for etype, event_list in expected.items():
+        assert len(events[etype]) == 2 * len(event_list)
+        assert events[etype].dtype == \
+            EventConstants.getClass(etype).NUMPY_DTYPE
+    fixations = events[EventConstants.FIXATION_END]
+    assert np.all(fixations['duration'] >= 0)
+    assert np.all(np.diff(fixations['time'][fixations['session_id'] == 1]) > 0)
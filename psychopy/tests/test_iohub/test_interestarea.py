@@ -0,0 +1,69 @@
+""" Test vectorised interest area hit testing.
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip('shapely')
+pd = pytest.importorskip('pandas')
+
+from psychopy.iohub.datastore.pandas import interestarea
+from psychopy.iohub.datastore.pandas.interestarea import (
+    Circle, Ellipse, Rectangle, InterestAreaSet)
+
+
+def _areas():
+    return [Circle('circle', [0, 0], 200),
+            Rectangle('rect', -300, -100, 100, 300),
+            Ellipse('ellipse', [250, 250], 50, 120, 30)]
+
+
+def _samples(n=2000, seed=1):
+    rng = np.random.RandomState(seed)
+    return pd.DataFrame(dict(x_position=rng.uniform(-400, 400, n),
+                             y_position=rng.uniform(-400, 400, n)))
+
+
+def _expected(area, df):
+    return np.array([area.contains((x, y)) for x, y in
+                     zip(df.x_position, df.y_position)], dtype=bool)
+
+
+@pytest.mark.parametrize('vectorized', [True, False])
+def test_containsPoints(vectorized, monkeypatch):
+    if not vectorized:
+        monkeypatch.setattr(interestarea, '_vectorized_contains', None)
+    df = _samples()
+    for area in _areas():
+        hits = area.containsPoints(df.x_position.values, df.y_position.values)
+        assert np.array_equal(hits, _expected(area, df))
+        assert len(area.filter(df)) == hits.sum()
+
+
+@pytest.mark.parametrize('grid_size', [0, 1, 4, 16])
+def test_InterestAreaSet_classify(grid_size):
+    df = _samples()
+    areas = _areas()
+    expected = np.zeros(len(df), dtype=np.int32)
+    for area in reversed(areas):
+        expected[_expected(area, df)] = area.ia_id
+
+    ia_set = InterestAreaSet(areas, grid_size=grid_size)
+    assert np.array_equal(ia_set.classify(df.x_position, df.y_position),
+                          expected)
+
+    labelled = ia_set.label(df)
+    assert np.array_equal(labelled['ia_id'].values, expected)
+    names = dict((a.ia_id, a.name) for a in areas)
+    for ia_id, ia_name in zip(labelled['ia_id'], labelled['ia_name']):
+        assert names.get(ia_id) == ia_name or (ia_id == 0 and ia_name is None)
+    assert len(ia_set.filter(df)) == np.count_nonzero(expected)
+
+
+def test_InterestAreaSet_manyAreas():
+    df = _samples(5000)
+    areas = [Rectangle(None, x, y, x + 40, y + 40)
+             for x in range(-400, 400, 100) for y in range(-400, 400, 100)]
+    indexed = InterestAreaSet(areas)
+    unindexed = InterestAreaSet(areas, grid_size=0)
+    assert np.array_equal(indexed.classify(df.x_position, df.y_position),
+                          unindexed.classify(df.x_position, df.y_position))
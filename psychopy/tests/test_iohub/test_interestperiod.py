@@ -0,0 +1,100 @@
+""" Test vectorised interest period find, filter and label.
+"""
+import numpy as np
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from psychopy.iohub.datastore.pandas.interestperiod import (
+    MessageBasedIP, ConditionVariableBasedIP)
+
+
+def _indexed(df):
+    return df.set_index(['experiment_id', 'session_id'])
+
+
+def _sessions(n_sessions=3, n_trials=4, n_samples=200):
+    rng = np.random.RandomState(2)
+    messages = []
+    samples = []
+    trials = []
+    event_id = 0
+    for session_id in range(1, n_sessions + 1):
+        for trial in range(n_trials):
+            start = trial * 10.0 + session_id
+            end = start + 4.0
+            trials.append(dict(experiment_id=1, session_id=session_id,
+                               TRIAL_START=start, TRIAL_END=end))
+            for text, t in (('TRIAL_START', start), ('TRIAL_END', end)):
+                event_id += 1
+                messages.append(dict(experiment_id=1, session_id=session_id,
+                                     time=t, event_id=event_id, text=text))
+        times = np.sort(rng.uniform(0, n_trials * 10.0 + 5, n_samples))
+        for t in times:
+            samples.append(dict(experiment_id=1, session_id=session_id,
+                                time=t, x=rng.uniform()))
+    return (_indexed(pd.DataFrame(messages)), _indexed(pd.DataFrame(samples)),
+            _indexed(pd.DataFrame(trials)))
+
+
+def _expected_ip_id_nums(ip, samples):
+    ips = ip.ip_df
+    expected = []
+    for (key, t) in zip(samples.index, samples['time']):
+        session_ips = ips.loc[[key]]
+        match = session_ips[(session_ips['start_time'] <= t) &
+                            (session_ips['end_time'] >= t)]
+        expected.append(match['ip_id_num'].iloc[0] if len(match) else np.nan)
+    return np.array(expected, dtype=float)
+
+
+@pytest.mark.parametrize('use_messages', [True, False])
+def test_find_filter_label(use_messages):
+    messages, samples, trials = _sessions()
+    if use_messages:
+        ip = MessageBasedIP(message_df=messages)
+    else:
+        ip = ConditionVariableBasedIP(source_df=trials,
+                                      start_col_name='TRIAL_START',
+                                      end_col_name='TRIAL_END')
+    assert len(ip.ip_df) == len(trials)
+    expected = _expected_ip_id_nums(ip, samples)
+    in_ip = ~np.isnan(expected)
+
+    labelled = ip.label(samples)
+    assert len(labelled) == len(samples)
+    assert np.array_equal(labelled['ip_id_num'].values, expected,
+                          equal_nan=True)
+
+    filtered = ip.filter(samples)
+    assert np.array_equal(filtered['time'].values,
+                          samples['time'].values[in_ip])
+    assert np.array_equal(filtered['ip_id_num'].values, expected[in_ip])
+    assert (filtered['ip_name'] == ip.name).all()
+
+    found = ip.find(samples)
+    assert len(found) == in_ip.sum()
+    assert set(zip(found['time'], found['ip_id_num'])) == \
+        set(zip(filtered['time'], filtered['ip_id_num']))
+    found = found.sort_values('time')
+    assert np.array_equal(found['time'].values,
+                          np.sort(samples['time'].values[in_ip]))
+
+    with_cols = ip.filter(samples, ip_cols='start_time')
+    assert (with_cols['time'] >= with_cols['start_time']).all()
+
+
+def test_find_overlapping():
+    messages, samples, trials = _sessions(n_sessions=1, n_trials=2)
+    # second period overlaps the first
+    trials['TRIAL_END'] = trials['TRIAL_START'] + 15.0
+    ip = ConditionVariableBasedIP(source_df=trials,
+                                  start_col_name='TRIAL_START',
+                                  end_col_name='TRIAL_END')
+    found = ip.find(samples)
+    for ip_id_num, (start, end) in zip(
+            ip.ip_df['ip_id_num'],
+            zip(ip.ip_df['start_time'], ip.ip_df['end_time'])):
+        ip_rows = found[found['ip_id_num'] == ip_id_num]
+        times = samples['time']
+        assert len(ip_rows) == ((times >= start) & (times <= end)).sum()
@@ -0,0 +1,170 @@
+""" Test iohub time sync drift and offset estimation against a local time sync
+responder process, and against a simulated remote clock.
+"""
+import multiprocessing
+import socket
+import time
+
+import msgpack
+import numpy as np
+import pytest
+
+from psychopy import clock
+from psychopy.iohub import net
+from psychopy.iohub.devices import Computer
+
+OFFSET = 12.5
+DRIFT = 1.0 + 200e-6
+
+
+def _responder(port_queue, zero_time, offset, drift, lost_probe):
+    # Replies to SYNC_REQ probes with a remote time of
+    # offset + drift * (local iohub time), dropping the lost_probe'th probe.
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    port_queue.put(sock.getsockname()[1])
+    unpacker = msgpack.Unpacker(use_list=True, raw=False)
+    count = 0
+    while True:
+        data, address = sock.recvfrom(net.MAX_PACKET_SIZE)
+        unpacker.feed(data)
+        request = unpacker.unpack()
+        if request[0] == 'STOP':
+            break
+        count += 1
+        if count == lost_probe:
+            continue
+        remote_time = offset + drift * (clock.getTime() - zero_time)
+        sock.sendto(msgpack.packb(['SYNC_REPLY', remote_time] + request[1:]),
+                    address)
+    sock.close()
+
+
+class _SimulatedConnection(object):
+    # Has the syncProbes() of an ioHubTimeSyncConnection, with a simulated
+    # local clock and a remote clock of offset + drift * (local time), and
+    # random (but seeded) network delays, so results don't depend on the
+    # timing of the machine running the tests.
+
+    def __init__(self, offset, drift, seed=0):
+        self.offset = offset
+        self.drift = drift
+        self.rng = np.random.RandomState(seed)
+        self.time = 0.0
+
+    def syncProbes(self, count=8):
+        send_times = self.time + 20e-6 * np.arange(count)
+        # each way takes 50 usec, plus a delay that is sometimes long
+        out_delays = 50e-6 + self.rng.exponential(30e-6, count)
+        back_delays = 50e-6 + self.rng.exponential(30e-6, count)
+        remote_times = self.offset + self.drift * (send_times + out_delays)
+        recv_times = send_times + out_delays + back_delays
+        self.time = recv_times.max()
+        return ((send_times + recv_times) / 2.0, remote_times,
+                recv_times - send_times)
+
+    def wait(self, secs):
+        self.time += secs
+
+
+@pytest.fixture()
+def responder():
+    ctx = multiprocessing.get_context('spawn')
+    port_queue = ctx.Queue()
+    proc = ctx.Process(target=_responder, args=(
+        port_queue, clock.monotonicClock.getLastResetTime(), OFFSET, DRIFT, 3))
+    proc.start()
+    address = ('127.0.0.1', port_queue.get(timeout=30))
+    yield address
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.sendto(msgpack.packb(['STOP']), address)
+    sock.close()
+    proc.join(10)
+    if proc.is_alive():
+        proc.terminate()
+
+
+def test_theilSenFit():
+    x = np.arange(50.0)
+    y = 3.0 + 0.5 * x
+    y[[5, 17, 30]] += 100.0
+    slope, intercept = net.theilSenFit(x, y)
+    assert slope == pytest.approx(0.5)
+    assert intercept == pytest.approx(3.0)
+
+
+def test_syncProbes(responder):
+    connection = net.ioHubTimeSyncConnection(responder)
+    connection.sock.settimeout(0.25)
+    try:
+        local_times, remote_times, rtts = connection.syncProbes(8)
+        # the third probe was not replied to
+        assert len(rtts) == 7
+        assert np.all(rtts >= 0)
+        expected = OFFSET + DRIFT * local_times
+        assert np.all(np.abs(remote_times - expected) <= rtts / 2 + 1e-3)
+        rtt, local_time, remote_time = connection.sync()
+        assert remote_time == pytest.approx(OFFSET + DRIFT * local_time,
+                                            abs=rtt / 2 + 1e-3)
+    finally:
+        connection.close()
+
+
+def test_timeSyncState():
+    state = net.TimeSyncState(window_size=64)
+    connection = _SimulatedConnection(OFFSET, DRIFT)
+    start = connection.time
+    metrics = None
+    for _ in range(40):
+        metrics = state.addProbes(*connection.syncProbes(8))
+        connection.wait(0.5)
+    span = connection.time - start
+
+    assert metrics['fit_count'] == 40
+    assert set(metrics) == set(net.TIME_SYNC_METRICS_DTYPE.names)
+    # each offset fitted is out by at most half the RTT of its probe
+    maxError = np.max(state._window_rtt) / 2
+    assert state.getDrift() == pytest.approx(DRIFT, abs=4 * maxError / span)
+    now = connection.time
+    assert state.local2RemoteTime(now) == pytest.approx(
+        OFFSET + DRIFT * now, abs=maxError)
+
+    local_times = now + np.linspace(-1, 1, 11)
+    remote_times = state.local2RemoteTime(local_times)
+    assert remote_times.shape == local_times.shape
+    assert np.allclose(state.remote2LocalTime(remote_times), local_times,
+                       rtol=0, atol=1e-9)
+    assert np.ndim(state.remote2LocalTime(remote_times[0])) == 0
+
+
+def test_timeSyncService(responder):
+    metrics = []
+    service = net.ioHubTimeSyncService(responder, interval=0.01,
+                                       burst_size=4,
+                                       metrics_callback=metrics.append)
+    service._sync_socket.sock.settimeout(0.25)
+    service.start()
+    try:
+        deadline = time.time() + 10
+        while len(metrics) < 5 and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        service.stop(timeout=5)
+    assert not service.is_alive()
+    assert len(metrics) >= 5
+    assert metrics[-1]['fit_count'] == service.sync_state.metrics['fit_count']
+    # the remote clock is known to within the RTTs of the probes used (the
+    # fit covers a short time, so its drift adds up to about the same again)
+    state = service.sync_state
+    now = Computer.getTime()
+    assert state.local2RemoteTime(now) == pytest.approx(
+        OFFSET + DRIFT * now, abs=np.max(state._window_rtt) + 1e-3)
+
+
+def test_timeSyncStateInstances():
+    # the probe history is not shared between TimeSyncState instances
+    first = net.TimeSyncState()
+    second = net.TimeSyncState()
+    first.addProbes(np.array([1.0]), np.array([2.0]), np.array([0.001]))
+    assert len(second.RTTs) == 0
+    assert first.getOffset() == pytest.approx(1.0)
@@ -100,6 +100,28 @@ class _baseTest(object):
         event._onPygletMouseRelease(0, 0, LEFT | MIDDLE | RIGHT, None, emulated=True)
         assert not any(event.mouseButtons)
 
+    def test_mouse_trajectory(self):
+        if self.win.winType == 'pygame':
+            pytest.skip()  # no motion events recorded with pygame
+        m = event.Mouse(win=self.win)
+        m.startTrajectory()
+        w, h = self.win.size
+        # emulated motion from the centre to the top right of the window
+        for i in range(1, 11):
+            event._onPygletMouseMotion(w / 2 + i * w / 20, h / 2 + i * h / 20,
+                                       w / 20, h / 20)
+        event._onPygletMouseDrag(w, h, 0, 0, LEFT, None)
+        m.stopTrajectory()
+        event._onPygletMouseMotion(0, 0, -w, -h)  # no longer recorded
+
+        trajectory = m.getTrajectory(clear=True)
+        assert len(trajectory) == 12  # starting position and 11 events
+        assert np.allclose(trajectory['x'][1:], np.linspace(0.1, 1, 10).tolist() + [1])
+        assert np.allclose(trajectory['y'][1:], trajectory['x'][1:])
+        assert list(trajectory['leftButton']) == [0] * 11 + [1]
+        assert np.all(np.diff(trajectory['time']) >= 0)
+        assert len(m.getTrajectory()) == 0
+
     def test_mouse_clock(self):
         x, y = 0, 0
         scroll_x, scroll_y = 1, 1
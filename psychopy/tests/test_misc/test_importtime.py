@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Tests that `import psychopy` stays fast, by importing subpackages (and
+finding the git sha) only when they are first used.
+
+Each import is timed in a new interpreter with `python -X importtime`, which
+reports the cumulative time taken to import every module.
+"""
+from __future__ import division
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import psychopy
+
+# generous budgets (in seconds) for the cumulative import time of each module,
+# so the tests catch regressions (e.g. an eager import of a heavy dependency)
+# rather than differences between machines
+importBudgets = {
+    'psychopy': 1.0,
+    'psychopy.visual': 5.0,
+    'psychopy.iohub': 2.0,
+}
+
+# modules which `import psychopy` must not load
+lazyModules = ['pkg_resources',
+               'psychopy.tools.versionchooser',
+               'psychopy.visual',
+               'psychopy.sound',
+               'psychopy.hardware',
+               'psychopy.iohub']
+
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 7),
+                                reason="lazy imports need Python 3.7+")
+
+
+def _importTimes(statement):
+    """Run `statement` in a new interpreter and return the cumulative import
+    time (in seconds) of each module, and the output of the statement.
+    """
+    env = dict(os.environ)
+    rootDir = os.path.dirname(os.path.dirname(psychopy.__file__))
+    env['PYTHONPATH'] = os.pathsep.join(
+        [rootDir] + [p for p in [env.get('PYTHONPATH')] if p])
+    proc = subprocess.Popen([sys.executable, '-X', 'importtime',
+                             '-c', statement],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            env=env, universal_newlines=True)
+    out, err = proc.communicate()
+    assert proc.returncode == 0, err
+    times = {}
+    for line in err.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            cumulative = int(fields[1])
+        except ValueError:
+            continue  # the header
+        times[fields[2].strip()] = cumulative / 1e6
+    return times, out
+
+
+def test_importPsychopyIsLazy():
+    modules = ", ".join(repr(m) for m in lazyModules)
+    times, out = _importTimes(
+        "import sys, psychopy\n"
+        "print([m for m in [{}] if m in sys.modules])\n"
+        "print('__git_sha__' in vars(psychopy))".format(modules))
+    loaded, gitShaFound = out.splitlines()[-2:]
+    assert loaded == '[]'
+    assert gitShaFound == 'False'
+    assert times['psychopy'] < importBudgets['psychopy']
+
+
+def test_lazyAttributes():
+    # subpackages and attributes are still found when first used
+    assert psychopy.tools.__name__ == 'psychopy.tools'
+    assert callable(psychopy.useVersion)
+    assert psychopy.__git_sha__
+    with pytest.raises(AttributeError):
+        psychopy.notASubpackage
+
+
+@pytest.mark.parametrize('module', sorted(importBudgets))
+def test_importBudget(module):
+    try:
+        times, out = _importTimes("import " + module)
+    except AssertionError as err:
+        pytest.skip("can't import {}: {}".format(module, err))
+    assert times[module] < importBudgets[module]
+
+
+@pytest.mark.parametrize('statement', ['import psychopy.clock',
+                                       'from psychopy import core',
+                                       'from psychopy import clock',
+                                       'import psychopy.logging',
+                                       'import psychopy.tools.frametools'])
+def test_importModuleFirst(statement):
+    # modules can be imported before anything else in psychopy has been
+    # loaded (e.g. clock and logging, which import each other)
+    times, out = _importTimes(statement)
+    assert times
@@ -0,0 +1,103 @@
+"""Benchmark loading monitor calibrations, as done when opening a Window.
+
+Saves a monitor with many calibrations, each with measured gamma and
+spectral data, then compares parsing the whole calibration file (as Monitor
+used to) with creating a Monitor from the calibration index, both the first
+time in a session and again (e.g. for a second Window). If a display is
+available, the startup time of a Window using the monitor is also reported.
+
+The benchmark is not run as part of the test suite.
+
+command-line usage:
+python psychopy/tests/test_monitors/benchmark_monitor.py [calibrations]
+"""
+from __future__ import division, print_function
+
+import glob
+import os
+import sys
+import timeit
+import uuid
+
+import numpy as np
+
+from psychopy.monitors import calibTools
+
+
+def _makeMonitor(name, nCalibs):
+    rng = np.random.RandomState(0)
+    mon = calibTools.Monitor(name, width=40, distance=57)
+    defaultCalibName = mon.currentCalibName
+    for i in range(nCalibs):
+        mon.newCalib('calib%04d' % i, width=40, distance=57)
+        mon.setLevelsPre(np.linspace(0, 255, 256))
+        mon.setLumsPre(rng.uniform(0, 100, (4, 256)))
+        mon.setSpectra(np.arange(380, 781), rng.uniform(0, 1, (3, 401)))
+        mon.setLineariseMethod(1)
+    mon.delCalib(defaultCalibName)
+    mon.save()
+    return mon
+
+
+def _timeOldLoad(fileName):
+    start = timeit.default_timer()
+    with open(fileName, 'rb') as f:
+        calibs = calibTools.json_tricks.loads(f.read().decode('utf-8'),
+                                              preserve_order=False)
+    calibs[sorted(calibs)[-1]]
+    return timeit.default_timer() - start
+
+
+def _timeMonitor(name, clearCaches):
+    if clearCaches:
+        calibTools._calibCache.clear()
+        calibTools._calibIndexCache.clear()
+    start = timeit.default_timer()
+    calibTools.Monitor(name)
+    return timeit.default_timer() - start
+
+
+def _timeWindow(name):
+    try:
+        from psychopy import visual
+        start = timeit.default_timer()
+        win = visual.Window((200, 200), monitor=name, autoLog=False)
+        duration = timeit.default_timer() - start
+        win.close()
+        return duration
+    except Exception as err:
+        print('  Window not available: %s' % err)
+
+
+def run(nCalibs=200, repeats=5):
+    name = 'benchmark_%s' % uuid.uuid4().hex
+    fileName = os.path.join(calibTools.monitorFolder, name + '.json')
+    try:
+        _makeMonitor(name, nCalibs)
+        print('%d calibrations, %.1f MB' %
+              (nCalibs, os.path.getsize(fileName) / 1e6))
+        # remove the index saved with the file so it is built on first use
+        os.remove(os.path.join(calibTools.monitorFolder, name + '.idx'))
+        calibTools._calibIndexCache.clear()
+        print('  %-36s %8.1f msec' % (
+            'first Monitor() (builds index)',
+            _timeMonitor(name, clearCaches=True) * 1000))
+        for label, func in (
+                ('parse whole file', lambda: _timeOldLoad(fileName)),
+                ('Monitor() from index file',
+                 lambda: _timeMonitor(name, clearCaches=True)),
+                ('Monitor() in same session',
+                 lambda: _timeMonitor(name, clearCaches=False))):
+            print('  %-36s %8.1f msec' % (
+                label, min(func() for _ in range(repeats)) * 1000))
+        windowTime = _timeWindow(name)
+        if windowTime is not None:
+            print('  %-36s %8.1f msec' % ('Window()', windowTime * 1000))
+    finally:
+        for f in glob.glob(os.path.join(calibTools.monitorFolder,
+                                        name + '.*')):
+            os.remove(f)
+
+
+if __name__ == '__main__':
+    run(*[int(a) for a in sys.argv[1:2]])
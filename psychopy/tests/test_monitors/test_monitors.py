@@ -2,6 +2,7 @@ import os
 import sys
 import glob
 import uuid
+from psychopy.monitors import calibTools
 from psychopy.monitors.calibTools import Monitor
 from psychopy.constants import PY3
 import numpy as np
@@ -94,5 +95,168 @@ def test_lineariseLums_method_1():
     assert np.allclose(r, desired_lums)
 
 
+@pytest.mark.monitors
+class TestCalibIndex(object):
+    def setup_class(self):
+        self.monitor_name = str(uuid.uuid4().hex)
+        self.fullname = os.path.join(calibTools.monitorFolder,
+                                     self.monitor_name)
+        mon = Monitor(self.monitor_name, width=40, distance=57)
+        defaultCalibName = mon.currentCalibName
+        for i, calibName in enumerate([u'first', u'caf\xe9', u'last']):
+            mon.newCalib(calibName, width=40 + i, distance=57)
+            mon.setGammaGrid(np.ones((4, 3)) * (i + 1))
+        mon.delCalib(defaultCalibName)
+        mon.save()
+
+    def teardown_class(self):
+        for f in glob.glob(self.fullname + '.*'):
+            os.remove(f)
+
+    def _reset(self):
+        calibTools._calibCache.clear()
+        calibTools._calibIndexCache.clear()
+
+    def test_index(self):
+        self._reset()
+        index = calibTools.getCalibIndex(self.fullname + '.json')
+        assert os.path.isfile(self.fullname + '.idx')
+        names = [entry['name'] for entry in index['calibs']]
+        assert sorted(names) == sorted([u'first', u'caf\xe9', u'last'])
+
+    def test_lazyLoad(self):
+        self._reset()
+        mon = Monitor(self.monitor_name)
+        # only the current (last) calibration has been loaded
+        assert mon.currentCalibName == u'last'
+        loaded = [name for name, calib in mon._calibs.items()
+                  if calib is not None]
+        assert loaded == [u'last']
+        assert mon.getWidth() == 42
+        mon.setCurrent(u'caf\xe9')
+        assert mon.getWidth() == 41
+        assert np.all(mon.getGammaGrid()[:, :3] == 2)
+        # all calibrations are loaded if asked for
+        assert len(mon.calibs) == 3
+        assert all(calib is not None for calib in mon.calibs.values())
+
+    def test_cachedCalibsAreCopies(self):
+        mon1 = Monitor(self.monitor_name)
+        mon1.setWidth(10)
+        mon2 = Monitor(self.monitor_name)
+        assert mon2.getWidth() == 42
+
+    def test_staleIndex(self):
+        mon = Monitor(self.monitor_name)
+        mon.setCurrent(u'first')
+        mon.setWidth(30)
+        # the file is saved without updating the index, as by an older
+        # version of PsychoPy
+        with open(self.fullname + '.json', 'w') as f:
+            calibTools.json_tricks.dump(mon.calibs, f, indent=2)
+        self._reset()
+        assert Monitor(self.monitor_name).currentCalib['width'] == 42
+        mon2 = Monitor(self.monitor_name)
+        mon2.setCurrent(u'first')
+        assert mon2.getWidth() == 30
+
+    def test_calibAddedToFile(self):
+        mon = Monitor(self.monitor_name)
+        # the file is changed (adding a calibration) after it was indexed
+        with open(self.fullname + '.json', 'rb') as f:
+            calibs = calibTools.json_tricks.loads(f.read().decode('utf-8'))
+        calibs[u'added'] = dict(calibs[u'last'], width=50)
+        calibs[u'first']['width'] = 35
+        with open(self.fullname + '.json', 'w') as f:
+            calibTools.json_tricks.dump(calibs, f, indent=2)
+        self._reset()
+        assert sorted(mon.calibs) == sorted([u'first', u'caf\xe9', u'last',
+                                             u'added'])
+        assert mon.calibs[u'first']['width'] == 35
+
+    def test_calibRemovedFromFile(self):
+        mon = Monitor(self.monitor_name)
+        # a calibration is removed from the file after it was indexed
+        with open(self.fullname + '.json', 'rb') as f:
+            calibs = calibTools.json_tricks.loads(f.read().decode('utf-8'))
+        del calibs[u'caf\xe9']
+        calibs[u'first']['width'] = 36
+        with open(self.fullname + '.json', 'w') as f:
+            calibTools.json_tricks.dump(calibs, f, indent=2)
+        self._reset()
+        with pytest.raises(KeyError, match='no longer in'):
+            mon.setCurrent(u'caf\xe9')
+        assert u'caf\xe9' not in mon.calibNames
+        assert mon.setCurrent(u'first') == u'first'
+        assert mon.getWidth() == 36
+        assert sorted(mon.calibs) == sorted(calibs)
+        assert all(calib is not None for calib in mon.calibs.values())
+
+
+@pytest.mark.monitors
+def test_gammaLUT():
+    m = Monitor(name='foo')
+    m.setGammaGrid([[0, 100, 2.2], [0, 30, 2.0], [0, 60, 2.1], [0, 10, 2.4]])
+    lums = np.linspace(0, 1, 1001)
+    rgbLums = np.tile(lums, (3, 1)).T
+    lut = m.getGammaLUT()
+    assert lut.shape == (65536, 4)
+    # the table is shared by monitors with the same calibration
+    m2 = Monitor(name='foo')
+    m2.setGammaGrid(m.getGammaGrid())
+    assert m2.getGammaLUT() is lut
+    for desired in (lums, rgbLums):
+        exact = m.linearizeLums(desired)
+        assert np.allclose(m.linearizeLums(desired, useLUT=True), exact,
+                           atol=1e-3)
+    # changing the calibration makes a new table
+    m.setGammaGrid([[0, 100, 1.0], [0, 30, 1.0], [0, 60, 1.0], [0, 10, 1.0]])
+    assert m.getGammaLUT() is not lut
+    assert np.allclose(m.linearizeLums(rgbLums, useLUT=True), rgbLums,
+                       atol=1e-4)
+
+
+@pytest.mark.monitors
+def test_gammaLUTInterpolated():
+    m = Monitor(name='foo')
+    m.setLineariseMethod(3)
+    levels = np.linspace(0, 255, 8)
+    m.setLevelsPre(levels)
+    m.setLumsPre(np.array([(levels / 255.) ** g * 50 + 1
+                           for g in (2.0, 2.1, 2.2, 2.3)]))
+    lums = np.linspace(0, 1, 1001)
+    exact = m.linearizeLums(lums)
+    assert np.allclose(m.linearizeLums(lums, useLUT=True), exact, atol=1e-3)
+
+
+@pytest.mark.monitors
+def test_colorsToRGB():
+    from psychopy.tools import colorspacetools
+    m = Monitor(name='foo')
+    nm = np.arange(380, 781, 5)
+    power = np.array([np.exp(-((nm - peak) / 30.) ** 2)
+                      for peak in (610, 545, 450)])
+    m.setSpectra(nm, power)
+    dkl_rgb = m.getDKL_RGB()
+    assert m.getDKL_RGB() is not dkl_rgb  # copies of the cached matrix
+    assert np.array_equal(m.getDKL_RGB(), dkl_rgb)
+    rng = np.random.RandomState(1)
+    dkl = np.column_stack([rng.uniform(-90, 90, 500),
+                           rng.uniform(0, 360, 500),
+                           rng.uniform(0, 1, 500)])
+    assert np.allclose(m.colorsToRGB(dkl, 'dkl'),
+                       colorspacetools.dkl2rgb(dkl, dkl_rgb))
+    lms = rng.uniform(-1, 1, (500, 3))
+    assert np.allclose(m.colorsToRGB(lms, 'lms'),
+                       colorspacetools.lms2rgb(lms, m.getLMS_RGB()))
+    assert np.allclose(m.colorsToRGB([255, 0, 127.5], 'rgb255'), [1, -1, 0])
+    # with a linear gamma, linearizing doesn't change the colors
+    m.setGammaGrid(np.ones((4, 3)) * [0, 1, 1])
+    rgb = rng.uniform(-1, 1, (500, 3))
+    assert np.allclose(m.colorsToRGB(rgb, linearize=True), rgb, atol=1e-4)
+    with pytest.raises(ValueError):
+        m.colorsToRGB(rgb, 'named')
+
+
 if __name__ == '__main__':
     pytest.main()
@@ -48,4 +48,95 @@ class Test_PY2JS_Compile(object):
         for idx, expr in enumerate(input):
             # check whether direct match or at least a match when spaces removed
             assert (py2js.expression2js(expr) == output[idx] or
-            py2js.expression2js(expr).replace(" ", "") == output[idx].replace(" ", ""))
\ No newline at end of file
+            py2js.expression2js(expr).replace(" ", "") == output[idx].replace(" ", ""))
+
+    def test_addVariableDeclarations(self):
+        program = ("function first() {\n"
+                   "  msg = 'hello';\n"
+                   "  if (t > 1) {\n"
+                   "    count = 0;\n"
+                   "  }\n"
+                   "  return Scheduler.Event.NEXT;\n"
+                   "}\n"
+                   "\n"
+                   "function second() {\n"
+                   "  return function () {\n"
+                   "    msg = 'bye';\n"
+                   "    frameN = -1;\n"
+                   "  };\n"
+                   "}\n"
+                   "\n"
+                   "function third() {\n"
+                   "  return Scheduler.Event.NEXT;\n"
+                   "}\n")
+        expected = ("\n"
+                    "var msg;\n"
+                    "var count;\n"
+                    "function first() {\n"
+                    "  msg = 'hello';\n"
+                    "  if (t > 1) {\n"
+                    "    count = 0;\n"
+                    "  }\n"
+                    "  return Scheduler.Event.NEXT;\n"
+                    "}\n"
+                    "\n"
+                    "\n"
+                    "var frameN;\n"
+                    "function second() {\n"
+                    "  return function () {\n"
+                    "    msg = 'bye';\n"
+                    "    frameN = -1;\n"
+                    "  };\n"
+                    "}\n"
+                    "\n"
+                    "\n"
+                    "function third() {\n"
+                    "  return Scheduler.Event.NEXT;\n"
+                    "}\n")
+        assert py2js.addVariableDeclarations(program, 'test.js') == expected
+        # the same when the program is given in segments (and cached)
+        split = program.index('function second')
+        for repeat in range(2):
+            segments = [program[:split], program[split:]]
+            assert py2js.addVariableDeclarations(segments,
+                                                 'test.js') == expected
+
+    def test_addVariableDeclarationsError(self):
+        program = "function first() {\n  msg = 'hello' 'bye';\n}\n"
+        assert py2js.addVariableDeclarations(program, 'test.js') == program
+        assert py2js.addVariableDeclarations([program[:5], program[5:]],
+                                             'test.js') == program
+
+    def test_transpilerCache(self, tmpdir):
+        fileName = str(tmpdir.join('py2jsCache.json'))
+        cache = py2js.TranspilerCache(maxSize=3, fileName=fileName)
+        for expr in ['a', 'b', 'c']:
+            cache.put('expression', expr, expr.upper())
+        assert cache.get('expression', 'a') == 'A'
+        # 'b' is now the least recently used, so is removed
+        cache.put('expression', 'd', 'D')
+        assert cache.get('expression', 'b') is None
+        assert len(cache) == 3
+        cache.save()
+        # translations are shared with a new session...
+        cache = py2js.TranspilerCache(fileName=fileName)
+        assert cache.get('expression', 'd') == 'D'
+        assert cache.get('code', 'd') is None
+        # ...but only with the same version
+        cache = py2js.TranspilerCache(fileName=fileName)
+        cache.version = 'other'
+        assert cache.get('expression', 'd') is None
+
+    def test_expressions2js(self, monkeypatch):
+        monkeypatch.setattr(py2js, 'transpilerCache',
+                            py2js.TranspilerCache())
+        exprs = ['sin(t)', '(3, 4)', 't*5', 'sin(t)']
+        expected = [py2js.expression2js(expr) for expr in exprs]
+        py2js.transpilerCache.clear()
+        assert py2js.expressions2js(exprs) == expected
+        assert len(py2js.transpilerCache) == 3
+        # with a pool of processes
+        py2js.transpilerCache.clear()
+        monkeypatch.setattr(py2js, 'poolThreshold', 1)
+        assert py2js.expressions2js(exprs, processes=2) == expected
+        assert py2js.transpilerCache.get('expression', 't*5') == expected[2]
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""Tests for psychopy.tools.frametools
+"""
+
+import json
+import numpy as np
+
+from psychopy.tools.frametools import (FrameProfiler, PROFILE_SECTIONS,
+                                       FrameIntervalRecorder, FRAME_DROPPED)
+
+
+class _Stim(object):
+    def __init__(self, name):
+        self.name = name
+
+
+def _drawFrames(profiler, nFrames, stims):
+    def onFlip():
+        pass
+
+    for _ in range(nFrames):
+        profiler.beginFrame()
+        for stim in stims:
+            profiler.begin('draw', stim)
+            profiler.end()
+        profiler.begin('flip')
+        profiler.end()
+        profiler.begin('callOnFlip', onFlip)
+        profiler.end()
+        profiler.endFrame()
+
+
+def test_frameProfiler():
+    profiler = FrameProfiler()
+    stims = [_Stim('fixation'), _Stim('target')]
+    _drawFrames(profiler, 10, stims)
+    records = profiler.getRecords()
+    # 4 sections per frame, and a script section for each frame but the first
+    assert len(records) == 10 * 4 + 9
+    assert np.all(np.diff(records['start']) >= 0)
+    assert np.all(records['cpuTime'] >= 0)
+    assert np.all(np.isnan(records['gpuTime']))
+    names = [profiler.names[i] for i in records['name'][:4]]
+    assert names == ['fixation', 'target', '', 'onFlip']
+    draws = records[records['section'] == PROFILE_SECTIONS.index('draw')]
+    assert len(draws) == 20
+
+    frames, totals = profiler.getFrameTotals()
+    assert list(frames) == list(range(1, 11))
+    assert totals.shape == (10, len(PROFILE_SECTIONS))
+    assert np.allclose(totals.sum(), records['cpuTime'].sum())
+
+
+def test_frameProfilerRingBuffer():
+    profiler = FrameProfiler(maxRecords=25)
+    _drawFrames(profiler, 20, [_Stim('stim')])
+    records = profiler.getRecords()
+    assert len(records) == 25
+    # the most recent records are kept, in order
+    assert records['frame'][-1] == 20
+    assert np.all(np.diff(records['start']) >= 0)
+
+
+def test_saveChromeTrace(tmpdir):
+    profiler = FrameProfiler()
+    _drawFrames(profiler, 3, [_Stim('stim')])
+    fileName = str(tmpdir.join('trace.json'))
+    profiler.saveChromeTrace(fileName)
+    with open(fileName) as f:
+        trace = json.load(f)
+    events = [e for e in trace['traceEvents'] if e['ph'] == 'X']
+    assert len(events) == len(profiler.getRecords())
+    assert events[0]['ts'] == 0
+    assert set(e['cat'] for e in events) == {
+        'script', 'draw', 'flip', 'callOnFlip'}
+    assert all(e['tid'] == 0 for e in events)
+
+
+def _intervals(n=5000, seed=7):
+    rng = np.random.RandomState(seed)
+    intervals = rng.normal(1 / 60., 0.0005, n)
+    intervals[::97] *= 2  # dropped frames
+    return intervals
+
+
+def test_frameIntervalRecorder():
+    intervals = _intervals()
+    recorder = FrameIntervalRecorder(chunkSize=1000)
+    for i, interval in enumerate(intervals):
+        recorder.trial = i // 100
+        recorder.append(interval, dropped=interval > 0.025)
+    assert len(recorder) == len(intervals)
+    assert np.array_equal(np.array(recorder), intervals)
+    assert np.array_equal(recorder[-7:], intervals[-7:])
+    assert np.array_equal(recorder.getLast(1500), intervals[-1500:])
+    assert recorder[3] == intervals[3]
+    assert list(recorder)[:3] == list(intervals[:3])
+
+    records = recorder.getRecords()
+    dropped = (records['flags'] & FRAME_DROPPED) > 0
+    assert np.array_equal(dropped, intervals > 0.025)
+    assert recorder.nDropped == dropped.sum()
+    assert records['trial'][-1] == (len(intervals) - 1) // 100
+
+    assert np.isclose(recorder.mean, intervals.mean())
+    assert np.isclose(recorder.std, intervals.std(ddof=1))
+    assert recorder.min == intervals.min()
+    assert recorder.max == intervals.max()
+    for q in (1, 50, 95, 99.5):
+        assert abs(recorder.percentile(q) - np.percentile(intervals, q)) <= \
+            recorder.binWidth
+    stats = recorder.getStats()
+    assert stats['count'] == len(intervals)
+
+    recorder.clear()
+    assert len(recorder) == 0
+    assert np.isnan(recorder.mean)
+
+
+def test_frameIntervalRecorderBounded(tmpdir):
+    intervals = _intervals(2500)
+    recorder = FrameIntervalRecorder(chunkSize=256, maxIntervals=1000,
+                                     memmapDir=str(tmpdir))
+    recorder.extend(intervals)
+    assert 1000 <= len(recorder) < 1000 + 256
+    assert np.array_equal(np.array(recorder), intervals[-len(recorder):])
+    # statistics still include all frames
+    assert recorder.count == len(intervals)
+    assert np.isclose(recorder.mean, intervals.mean())
+
+
+def test_frameIntervalRecorderSave(tmpdir):
+    intervals = _intervals(300)
+    recorder = FrameIntervalRecorder()
+    recorder.extend(intervals)
+    npyFile = str(tmpdir.join('intervals.npy'))
+    recorder.save(npyFile)
+    assert np.array_equal(np.load(npyFile), intervals)
+    recorder.save(npyFile, records=True)
+    assert np.array_equal(np.load(npyFile)['interval'], intervals)
+    # text files are written as by saveFrameIntervals previously
+    logFile = str(tmpdir.join('intervals.log'))
+    recorder.save(logFile)
+    with open(logFile) as f:
+        assert f.read() == str(list(intervals.tolist()))[1:-1]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""Tests for psychopy.tools.mousetools
+"""
+
+import numpy as np
+
+from psychopy.tools.mousetools import (TrajectoryRecorder, MOUSE_LEFT,
+                                       MOUSE_RIGHT)
+
+
+def test_trajectoryRecorder():
+    recorder = TrajectoryRecorder(initialSize=4)
+    for i in range(100):
+        recorder.append(i, -i, buttons=MOUSE_LEFT if i % 2 else 0, t=i / 1000.)
+    assert len(recorder) == 100
+    records = recorder.getRecords()
+    assert np.array_equal(records['x'], np.arange(100))
+    assert np.array_equal(records['y'], -np.arange(100))
+    assert np.array_equal(records['t'], np.arange(100) / 1000.)
+    assert np.array_equal(records['buttons'][:4], [0, 1, 0, 1])
+    # the records returned are a copy
+    records['x'][:] = 0
+    assert recorder.getRecords()['x'][1] == 1
+
+    assert len(recorder.getRecords(clear=True)) == 100
+    assert len(recorder) == 0
+    recorder.append(1, 2)
+    assert recorder.getRecords()['t'][0] > 0
+
+
+def test_makeTrajectory():
+    buttons = np.array([0, MOUSE_LEFT, MOUSE_LEFT | MOUSE_RIGHT], np.uint8)
+    pos = np.array([[0, 0], [0.5, 0.25], [1, 0.5]])
+    trajectory = TrajectoryRecorder.makeTrajectory([0, 1, 2], pos, buttons)
+    assert list(trajectory['x']) == [0, 0.5, 1]
+    assert list(trajectory['y']) == [0, 0.25, 0.5]
+    assert list(trajectory['leftButton']) == [0, 1, 1]
+    assert list(trajectory['midButton']) == [0, 0, 0]
+    assert list(trajectory['rightButton']) == [0, 0, 1]
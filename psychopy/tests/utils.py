@@ -7,6 +7,9 @@ import os.path
 import shutil
 import numpy as np
 import io
+import json
+import platform
+import time
 from psychopy import logging
 
 try:
@@ -241,3 +244,74 @@ def skip_under_travis(fn=None):
             skip(msg)
     else:
         return fn
+
+
+def timingStats(times):
+    """Summarise the durations (in seconds) of repeated runs of a benchmark,
+    as a dict of their median, mean, min and max, and the number of runs
+    """
+    times = np.asarray(times, dtype=float)
+    return {'median': float(np.median(times)),
+            'mean': float(np.mean(times)),
+            'min': float(np.min(times)),
+            'max': float(np.max(times)),
+            'n': int(len(times))}
+
+
+def benchmarkInfo():
+    """Returns a dict describing the versions and system the benchmarks were
+    run with, to be saved with the results
+    """
+    import psychopy
+    return {'psychopyVersion': psychopy.__version__,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S')}
+
+
+def saveBenchmarks(fileName, results, info=None):
+    """Save the results of benchmarks as a JSON file, which can be compared
+    with later results (see `compareBenchmarks`)
+
+    `results` is a dict of {name: {metric: value}} for each benchmark
+    (e.g. as given by `timingStats`) and `info` is added to the description
+    of the system (from `benchmarkInfo`).
+    """
+    report = {'info': benchmarkInfo(), 'results': results}
+    report['info'].update(info or {})
+    with io.open(fileName, 'w', encoding='utf-8') as f:
+        f.write(u"{}".format(json.dumps(report, indent=1, sort_keys=True)))
+
+
+def loadBenchmarks(fileName):
+    """Returns the results saved to a file by `saveBenchmarks`
+    """
+    with io.open(fileName, 'r', encoding='utf-8') as f:
+        return json.load(f)['results']
+
+
+def compareBenchmarks(results, baseline, tolerance=0.25, metrics=('median',)):
+    """Compare the results of benchmarks with a baseline (the results or the
+    name of a file saved by `saveBenchmarks`)
+
+    Returns a list of (name, metric, baseline value, value) for each of the
+    `metrics` of each benchmark which is higher (worse) than in the baseline
+    by more than `tolerance` (as a proportion of the baseline value).
+    Benchmarks which aren't in both results are ignored.
+    """
+    if not isinstance(baseline, dict):
+        baseline = loadBenchmarks(baseline)
+    regressions = []
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        for metric in metrics:
+            value = results[name].get(metric)
+            baseValue = baseline[name].get(metric)
+            if value is None or not baseValue:
+                continue
+            if value > baseValue * (1 + tolerance):
+                regressions.append((name, metric, baseValue, value))
+    return regressions
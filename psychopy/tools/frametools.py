@@ -0,0 +1,506 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Tools for recording what happens during each frame drawn by a window,
+and the intervals between frames.
+
+"""
+
+# Part of the PsychoPy library
+# Copyright (C) 2002-2018 Jonathan Peirce (C) 2019 Open Science Tools Ltd.
+# Distributed under the terms of the GNU General Public License (GPL).
+
+__all__ = ['FrameProfiler',
+           'PROFILE_SECTIONS',
+           'PROFILE_RECORD_DTYPE',
+           'FrameIntervalRecorder',
+           'FRAME_RECORD_DTYPE',
+           'FRAME_DROPPED']
+
+import os
+import json
+import numpy as np
+from past.builtins import basestring
+from psychopy.clock import getTime
+
+# Sections of a frame timed by the profiler. `script` is the time between the
+# end of one `Window.flip()` call and the start of the next, `draw` the
+# `draw()` of each stimulus drawn with `autoDraw`, `blit` the copy of the
+# framebuffer object to the back buffer, `flip` the buffer swap and wait for
+# the vertical blank, `callOnFlip` each function registered with
+# `Window.callOnFlip()` and `log` the messages registered with
+# `Window.logOnFlip()`.
+PROFILE_SECTIONS = ('script', 'draw', 'blit', 'flip', 'callOnFlip', 'log')
+
+PROFILE_RECORD_DTYPE = np.dtype([('frame', np.int64),
+                                 ('section', np.uint8),
+                                 ('name', np.uint32),
+                                 ('start', np.float64),
+                                 ('cpuTime', np.float64),
+                                 ('gpuTime', np.float64)])
+
+
+class FrameProfiler(object):
+    """Records the CPU and, optionally, GPU time taken by each stimulus
+    drawn, and the other sections of each frame, by a window.
+
+    Records are kept in a ring buffer of `maxRecords` entries so profiling
+    can be left on for a whole session, keeping only the most recent frames.
+
+    Parameters
+    ----------
+    maxRecords : int
+        Number of records to keep. Each frame has one record per stimulus
+        drawn, per `callOnFlip` function and one for each other section.
+    gpuTiming : bool
+        Also measure the time spent executing the OpenGL commands of each
+        section on the GPU, using timer query objects. Requires an OpenGL
+        context supporting `GL_TIME_ELAPSED` queries. GPU times are read one
+        frame after they were recorded, so the GPU is not stalled.
+
+    Examples
+    --------
+    Profile the frames drawn by a window and save a trace that can be viewed
+    with Chrome's `chrome://tracing` page::
+
+        win.frameProfiler = FrameProfiler(gpuTiming=True)
+        ...  # draw some frames
+        win.frameProfiler.saveChromeTrace('frames.json')
+
+    """
+    def __init__(self, maxRecords=65536, gpuTiming=False):
+        self.maxRecords = int(maxRecords)
+        self.gpuTiming = gpuTiming
+        self._records = np.zeros((self.maxRecords,), dtype=PROFILE_RECORD_DTYPE)
+        self._queryPool = []
+        self._pendingQueries = []
+        self.reset()
+
+    def reset(self):
+        """Clear all records."""
+        self._resolveQueries()
+        self._count = 0
+        self._names = []
+        self._nameIndex = {}
+        self.frame = 0
+        self._lastFrameEnd = None
+        self._section = None
+
+    def _getNameIndex(self, name):
+        if name is None:
+            name = ''
+        elif not isinstance(name, basestring):
+            name = getattr(name, 'name', None) or \
+                getattr(name, '__name__', None) or type(name).__name__
+        try:
+            return self._nameIndex[name]
+        except KeyError:
+            self._nameIndex[name] = index = len(self._names)
+            self._names.append(name)
+            return index
+
+    def _getQuery(self):
+        from psychopy.tools import gltools
+        if self._queryPool:
+            return self._queryPool.pop()
+        return gltools.createQueryObject()
+
+    def _resolveQueries(self):
+        if not self._pendingQueries:
+            return
+        from psychopy.tools import gltools
+        oldest = self._count - self.maxRecords
+        for recordNum, query in self._pendingQueries:
+            value = gltools.getQuery(query)
+            if recordNum >= oldest:
+                self._records[recordNum % self.maxRecords]['gpuTime'] = \
+                    value * 1e-9
+            self._queryPool.append(query)
+        del self._pendingQueries[:]
+
+    def _addRecord(self, section, name, start, cpuTime):
+        self._records[self._count % self.maxRecords] = (
+            self.frame, section, self._getNameIndex(name), start, cpuTime,
+            np.nan)
+        self._count += 1
+        return self._count - 1
+
+    def beginFrame(self):
+        """Called at the start of `Window.flip()`. Records the `script` time
+        since the end of the previous flip and reads the GPU times of the
+        previous frame."""
+        now = getTime()
+        self._resolveQueries()
+        self.frame += 1
+        if self._lastFrameEnd is not None:
+            self._addRecord(0, None, self._lastFrameEnd,
+                            now - self._lastFrameEnd)
+
+    def endFrame(self):
+        """Called at the end of `Window.flip()`."""
+        self._lastFrameEnd = getTime()
+
+    def begin(self, section, name=None):
+        """Start timing a section of the frame.
+
+        Parameters
+        ----------
+        section : str
+            One of `PROFILE_SECTIONS`.
+        name : str or object
+            Name of what is being timed. Objects are named by their `name`
+            or `__name__` attribute, or their type.
+
+        """
+        query = None
+        if self.gpuTiming:
+            query = self._getQuery()
+            from psychopy.tools import gltools
+            gltools.beginQuery(query)
+        self._section = (PROFILE_SECTIONS.index(section), name, query,
+                         getTime())
+
+    def end(self):
+        """Stop timing the section started by the last call to `begin()`."""
+        now = getTime()
+        section, name, query, start = self._section
+        self._section = None
+        recordNum = self._addRecord(section, name, start, now - start)
+        if query is not None:
+            from psychopy.tools import gltools
+            gltools.endQuery(query)
+            self._pendingQueries.append((recordNum, query))
+
+    def getRecords(self):
+        """Get the records currently held, oldest first.
+
+        Returns
+        -------
+        ndarray
+            Structured array with `PROFILE_RECORD_DTYPE` fields: the `frame`
+            number, index of the `section` in `PROFILE_SECTIONS`, index of
+            the `name` in `names`, `start` time, `cpuTime` and `gpuTime` in
+            seconds. `gpuTime` is `nan` if it was not measured.
+
+        """
+        self._resolveQueries()
+        if self._count <= self.maxRecords:
+            return self._records[:self._count].copy()
+        first = self._count % self.maxRecords
+        return np.concatenate((self._records[first:], self._records[:first]))
+
+    @property
+    def names(self):
+        """Names of the stimuli and functions timed, indexed by the `name`
+        field of the records."""
+        return list(self._names)
+
+    def getFrameTotals(self):
+        """Get the total CPU time of each section type for each frame.
+
+        Returns
+        -------
+        tuple
+            Array of frame numbers and an array of shape
+            `(nFrames, len(PROFILE_SECTIONS))` of the total time spent in each
+            section during each frame.
+
+        """
+        records = self.getRecords()
+        frames, frameIndex = np.unique(records['frame'], return_inverse=True)
+        totals = np.zeros((len(frames), len(PROFILE_SECTIONS)))
+        np.add.at(totals, (frameIndex, records['section']), records['cpuTime'])
+        return frames, totals
+
+    def saveChromeTrace(self, fileName):
+        """Save the records in the Chrome trace event JSON format, which can
+        be opened with `chrome://tracing` or https://ui.perfetto.dev.
+
+        CPU times are shown in a `CPU` thread, and GPU times, if measured, in
+        a `GPU` thread starting at the same time as the CPU section.
+
+        Parameters
+        ----------
+        fileName : str
+            File to write.
+
+        """
+        records = self.getRecords()
+        names = self._names
+        t0 = records['start'][0] if len(records) else 0.0
+        events = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': 0,
+             'args': {'name': 'CPU'}},
+            {'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': 1,
+             'args': {'name': 'GPU'}}]
+        for record in records.tolist():
+            frame, section, name, start, cpuTime, gpuTime = record
+            event = {'name': names[name] or PROFILE_SECTIONS[section],
+                     'cat': PROFILE_SECTIONS[section],
+                     'ph': 'X',
+                     'ts': round((start - t0) * 1e6, 3),
+                     'dur': round(cpuTime * 1e6, 3),
+                     'pid': 0,
+                     'tid': 0,
+                     'args': {'frame': frame}}
+            events.append(event)
+            if not np.isnan(gpuTime):
+                event = dict(event, tid=1, dur=round(gpuTime * 1e6, 3))
+                events.append(event)
+        with open(fileName, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+# Per frame record kept by FrameIntervalRecorder.
+FRAME_RECORD_DTYPE = np.dtype([('interval', np.float64),
+                               ('flags', np.uint8),
+                               ('trial', np.int32)])
+
+# FrameIntervalRecorder flags
+FRAME_DROPPED = 1
+
+
+class FrameIntervalRecorder(object):
+    """Records frame intervals, with per-frame flags and trial numbers, in
+    preallocated chunks of a numpy structured array.
+
+    Compared with appending to a list, recording takes 13 bytes per frame
+    rather than a Python float object and a list entry, the mean, standard
+    deviation (jitter), range and (to within `binWidth`) percentiles of the
+    intervals are kept up to date as frames are added, and intervals can be
+    saved to a binary `.npy` file.
+
+    The recorder behaves like a sequence of intervals, so code using the
+    list previously held by `Window.frameIntervals` keeps working.
+
+    Parameters
+    ----------
+    chunkSize : int
+        Number of frames in each preallocated chunk.
+    maxIntervals : int or None
+        If given, the oldest chunk is discarded once more than
+        `maxIntervals` frames have been recorded. The statistics still
+        include all frames since the last `clear()`.
+    memmapDir : str or None
+        Directory to create each chunk in as a memory mapped `.npy` file,
+        for very long recordings. By default chunks are held in memory.
+    binWidth : float
+        Width, in seconds, of the histogram bins used for percentiles.
+    maxBinned : float
+        Intervals above this many seconds are counted in a single overflow
+        bin of the percentile histogram.
+
+    """
+    def __init__(self, chunkSize=16384, maxIntervals=None, memmapDir=None,
+                 binWidth=0.00005, maxBinned=0.2):
+        self.chunkSize = int(chunkSize)
+        self.maxIntervals = maxIntervals
+        self.memmapDir = memmapDir
+        self.binWidth = binWidth
+        self._nBins = int(np.ceil(maxBinned / binWidth))
+        #: Trial number stored with each frame recorded.
+        self.trial = 0
+        self._fileCount = 0
+        self.clear()
+
+    def clear(self):
+        """Remove all intervals and reset the statistics."""
+        self._chunks = []
+        self._chunk = None
+        self._index = self.chunkSize
+        self._length = 0
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.nDropped = 0
+        self._histogram = np.zeros((self._nBins + 1,), dtype=np.int64)
+
+    def _newChunk(self):
+        if self.memmapDir:
+            fileName = os.path.join(self.memmapDir, 'frameIntervals_%05d.npy'
+                                    % self._fileCount)
+            self._fileCount += 1
+            chunk = np.lib.format.open_memmap(
+                fileName, mode='w+', dtype=FRAME_RECORD_DTYPE,
+                shape=(self.chunkSize,))
+        else:
+            chunk = np.zeros((self.chunkSize,), dtype=FRAME_RECORD_DTYPE)
+        self._chunks.append(chunk)
+        self._chunk = chunk
+        self._index = 0
+        if self.maxIntervals is not None:
+            while (len(self._chunks) > 1 and
+                   self._length - self.chunkSize >= self.maxIntervals):
+                del self._chunks[0]
+                self._length -= self.chunkSize
+
+    def append(self, interval, dropped=False, flags=0):
+        """Add the interval of a frame.
+
+        Parameters
+        ----------
+        interval : float
+            Frame interval in seconds.
+        dropped : bool
+            Whether the frame was dropped; sets the `FRAME_DROPPED` flag.
+        flags : int
+            Other flag bits to store with the frame.
+
+        """
+        if self._index == self.chunkSize:
+            self._newChunk()
+        if dropped:
+            flags |= FRAME_DROPPED
+            self.nDropped += 1
+        self._chunk[self._index] = (interval, flags, self.trial)
+        self._index += 1
+        self._length += 1
+        # Welford's online mean and variance
+        self._count += 1
+        delta = interval - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (interval - self._mean)
+        if interval < self.min:
+            self.min = interval
+        if interval > self.max:
+            self.max = interval
+        self._histogram[min(int(interval / self.binWidth), self._nBins)] += 1
+
+    def extend(self, intervals):
+        """Add the intervals of several frames."""
+        for interval in intervals:
+            self.append(float(interval))
+
+    def __len__(self):
+        return self._length
+
+    def getRecords(self):
+        """Get the frame records currently held, oldest first, as a structured
+        array with `interval`, `flags` and `trial` fields."""
+        if not self._chunks:
+            return np.zeros((0,), dtype=FRAME_RECORD_DTYPE)
+        records = list(self._chunks[:-1]) + [self._chunk[:self._index]]
+        return np.concatenate(records)
+
+    def getIntervals(self):
+        """Get the frame intervals currently held, oldest first."""
+        return self.getRecords()['interval']
+
+    def getLast(self, n):
+        """Get the last `n` (or fewer, if fewer are held) frame intervals."""
+        n = min(n, self._length)
+        result = []
+        for chunk in reversed(self._chunks):
+            end = self._index if chunk is self._chunk else self.chunkSize
+            take = min(n, end)
+            result.insert(0, chunk['interval'][end - take:end])
+            n -= take
+            if n == 0:
+                break
+        if not result:
+            return np.zeros((0,))
+        return np.concatenate(result)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice) and key.step is None and \
+                key.stop is None and key.start is not None and key.start < 0:
+            return self.getLast(-key.start)
+        return self.getIntervals()[key]
+
+    def __iter__(self):
+        return iter(self.getIntervals().tolist())
+
+    def __array__(self, dtype=None):
+        intervals = self.getIntervals()
+        if dtype is not None:
+            intervals = intervals.astype(dtype)
+        return intervals
+
+    def tolist(self):
+        return self.getIntervals().tolist()
+
+    def __repr__(self):
+        return '<FrameIntervalRecorder %d frames>' % len(self)
+
+    @property
+    def count(self):
+        """Number of frames included in the statistics."""
+        return self._count
+
+    @property
+    def mean(self):
+        """Mean frame interval."""
+        return self._mean if self._count else np.nan
+
+    @property
+    def std(self):
+        """Standard deviation (jitter) of the frame intervals."""
+        if self._count < 2:
+            return np.nan
+        return np.sqrt(self._m2 / (self._count - 1))
+
+    def percentile(self, q):
+        """Estimate the `q` th percentile(s) of the frame intervals from a
+        histogram updated as frames are recorded.
+
+        Parameters
+        ----------
+        q : float or array_like
+            Percentile(s), 0 to 100.
+
+        Returns
+        -------
+        float or ndarray
+            Estimated interval(s), to within `binWidth`. Percentiles falling
+            among the intervals longer than `maxBinned` return `max`.
+
+        """
+        if not self._count:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        cumulative = np.cumsum(self._histogram)
+        rank = np.asarray(q, dtype=np.float64) / 100.0 * self._count
+        bins = np.searchsorted(cumulative, rank, side='left')
+        bins = np.minimum(bins, self._nBins)
+        below = np.where(bins > 0, cumulative[bins - 1], 0)
+        inBin = self._histogram[bins]
+        fraction = np.where(inBin > 0, (rank - below) / np.maximum(inBin, 1),
+                            0.0)
+        values = (bins + fraction) * self.binWidth
+        values = np.where(bins == self._nBins, self.max, values)
+        values = np.clip(values, self.min, self.max)
+        return values if np.ndim(q) else float(values)
+
+    def getStats(self):
+        """Get a dict of the frame interval statistics."""
+        p50, p95, p99 = self.percentile([50, 95, 99])
+        return dict(count=self._count,
+                    mean=self.mean,
+                    std=self.std,
+                    min=self.min if self._count else np.nan,
+                    max=self.max if self._count else np.nan,
+                    median=p50,
+                    p95=p95,
+                    p99=p99,
+                    nDropped=self.nDropped)
+
+    def save(self, fileName, records=False):
+        """Save the frame intervals currently held.
+
+        Parameters
+        ----------
+        fileName : str
+            File to write. Files ending in `.npy` are written in the numpy
+            binary format, others as comma-separated text as written by
+            earlier versions of `Window.saveFrameIntervals()`.
+        records : bool
+            Save the `flags` and `trial` fields of each frame as well as the
+            intervals. Only used for `.npy` files.
+
+        """
+        if fileName.endswith('.npy'):
+            np.save(fileName, self.getRecords() if records
+                    else self.getIntervals())
+        else:
+            with open(fileName, 'w') as f:
+                f.write(', '.join(map(repr, self.getIntervals().tolist())))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Tools for recording the trajectory of the mouse from its motion events.
+
+"""
+
+# Part of the PsychoPy library
+# Copyright (C) 2002-2018 Jonathan Peirce (C) 2019 Open Science Tools Ltd.
+# Distributed under the terms of the GNU General Public License (GPL).
+
+__all__ = ['TrajectoryRecorder',
+           'TRAJECTORY_RECORD_DTYPE',
+           'TRAJECTORY_DTYPE',
+           'MOUSE_LEFT',
+           'MOUSE_MIDDLE',
+           'MOUSE_RIGHT']
+
+import numpy as np
+from psychopy.clock import getTime
+
+# flags for the buttons held down during a motion event (as used by pyglet)
+MOUSE_LEFT = 1
+MOUSE_MIDDLE = 2
+MOUSE_RIGHT = 4
+
+# motion events as recorded: the time the event was received and the
+# position in pixels, as given by the window backend
+TRAJECTORY_RECORD_DTYPE = np.dtype([('t', np.float64),
+                                    ('x', np.float64),
+                                    ('y', np.float64),
+                                    ('buttons', np.uint8)])
+
+# trajectories as returned by `Mouse.getTrajectory()`, with the same names as
+# the data stored by the Builder Mouse component
+TRAJECTORY_DTYPE = np.dtype([('time', np.float64),
+                             ('x', np.float64),
+                             ('y', np.float64),
+                             ('leftButton', np.uint8),
+                             ('midButton', np.uint8),
+                             ('rightButton', np.uint8)])
+
+
+class TrajectoryRecorder(object):
+    """Records the position of the mouse for every motion event received by
+    a window, so trajectories have the resolution of the mouse events rather
+    than the frame rate.
+
+    Records are kept in a preallocated array which doubles in size whenever
+    it is full, so appending a record doesn't create any Python objects.
+    Positions are stored as given by the window backend and converted to
+    other units, for the whole trajectory at once, when retrieved (see
+    :meth:`psychopy.event.Mouse.getTrajectory`).
+
+    Parameters
+    ----------
+    initialSize : int
+        Number of records to allocate space for initially.
+
+    Examples
+    --------
+    Usually a recorder is created by :meth:`~psychopy.event.Mouse`, but the
+    records can also be added directly::
+
+        recorder = TrajectoryRecorder()
+        recorder.append(x, y, buttons=MOUSE_LEFT)
+        records = recorder.getRecords(clear=True)
+        speed = np.hypot(np.diff(records['x']), np.diff(records['y']))
+
+    """
+    def __init__(self, initialSize=1024):
+        self._records = np.zeros((max(int(initialSize), 1),),
+                                 dtype=TRAJECTORY_RECORD_DTYPE)
+        self._count = 0
+
+    def append(self, x, y, buttons=0, t=None):
+        """Add a record of the mouse at position `x`, `y` with `buttons`
+        (flags `MOUSE_LEFT`, `MOUSE_MIDDLE`, `MOUSE_RIGHT`) held down, at
+        time `t` (by default now).
+        """
+        if t is None:
+            t = getTime()
+        count = self._count
+        if count == len(self._records):
+            self._grow()
+        self._records[count] = (t, x, y, buttons)
+        self._count = count + 1
+
+    def _grow(self):
+        records = np.zeros((len(self._records) * 2,),
+                           dtype=TRAJECTORY_RECORD_DTYPE)
+        records[:self._count] = self._records[:self._count]
+        self._records = records
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        """Remove all records (keeping the space allocated for them)."""
+        self._count = 0
+
+    def getRecords(self, clear=False):
+        """Returns a copy of the records as a structured array with fields
+        `t`, `x`, `y` and `buttons` (see `TRAJECTORY_RECORD_DTYPE`), and
+        optionally clears them.
+        """
+        records = self._records[:self._count].copy()
+        if clear:
+            self.clear()
+        return records
+
+    @staticmethod
+    def makeTrajectory(times, pos, buttons):
+        """Combine arrays of times, (N, 2) positions and button flags into
+        a structured array with the fields of `TRAJECTORY_DTYPE`.
+        """
+        trajectory = np.zeros((len(times),), dtype=TRAJECTORY_DTYPE)
+        trajectory['time'] = times
+        trajectory['x'] = pos[:, 0]
+        trajectory['y'] = pos[:, 1]
+        trajectory['leftButton'] = (buttons & MOUSE_LEFT) > 0
+        trajectory['midButton'] = (buttons & MOUSE_MIDDLE) > 0
+        trajectory['rightButton'] = (buttons & MOUSE_RIGHT) > 0
+        return trajectory
+
+    def __repr__(self):
+        return '<%s: %d records>' % (type(self).__name__, self._count)
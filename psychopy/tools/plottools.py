@@ -14,13 +14,18 @@ from __future__ import absolute_import, print_function
 def plotFrameIntervals(intervals):
     """Plot a histogram of the frame intervals.
 
-    Where `intervals` is either a filename to a file, saved by
+    Where `intervals` is either a filename to a file (text or .npy), saved by
     Window.saveFrameIntervals, or simply a list (or array) of frame intervals
 
     """
     from pylab import hist, show, plot
 
-    if type(intervals) == str:
+    if type(intervals) == str and intervals.endswith('.npy'):
+        import numpy
+        intervals = numpy.load(intervals)
+        if intervals.dtype.names:
+            intervals = intervals['interval']
+    elif type(intervals) == str:
         f = open(intervals, 'r')
         intervals = eval("[%s]" % (f.readline()))
     #    hist(intervals, int(len(intervals)/10))
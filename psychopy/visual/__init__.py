@@ -22,13 +22,37 @@ from psychopy.visual.backends import gamma
 from .basevisual import BaseVisualStim
 # non-private helpers
 from .helpers import pointInPolygon, polygonsOverlap
-from .image import ImageStim
-from .text import TextStim
-from .form import Form
-from .button import ButtonStim
-from .brush import Brush
-# window, should always be loaded first
-from .window import Window, getMsPerFrame, openWindows
+
+# the window and common stimuli, with the modules they are in. With Python
+# 3.7+ these are imported when first used (by __getattr__), so the window
+# backend (pyglet and OpenGL) isn't loaded until it is needed
+_lazyAttributes = {'ImageStim': 'image',
+                   'TextStim': 'text',
+                   'Form': 'form',
+                   'ButtonStim': 'button',
+                   'Brush': 'brush',
+                   'Window': 'window',
+                   'getMsPerFrame': 'window',
+                   'openWindows': 'window'}
+if sys.version_info >= (3, 7):
+    import importlib
+
+    def __getattr__(name):
+        if name in _lazyAttributes:
+            module = importlib.import_module(
+                'psychopy.visual.' + _lazyAttributes[name])
+            globals()[name] = value = getattr(module, name)
+            return value
+        raise AttributeError("module {!r} has no attribute {!r}"
+                             .format(__name__, name))
+else:
+    from .image import ImageStim
+    from .text import TextStim
+    from .form import Form
+    from .button import ButtonStim
+    from .brush import Brush
+    # window, should always be loaded first
+    from .window import Window, getMsPerFrame, openWindows
 
 # needed for backwards-compatibility
 
@@ -102,3 +126,7 @@ try:
     lazy_import(globals(), lazyImports)
 except Exception:
     exec(lazyImports)
+
+# `from psychopy.visual import *` also imports the attributes loaded lazily
+__all__ = [name for name in list(globals()) if not name.startswith('_')]
+__all__.extend(name for name in _lazyAttributes if name not in __all__)
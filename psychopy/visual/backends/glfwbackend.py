@@ -358,6 +358,7 @@ class GLFWBackend(BaseBackend):
         # called.
         glfw.set_mouse_button_callback(self.winHandle, event._onGLFWMouseButton)
         glfw.set_scroll_callback(self.winHandle, event._onGLFWMouseScroll)
+        glfw.set_cursor_pos_callback(self.winHandle, event._onGLFWMouseMove)
         glfw.set_key_callback(self.winHandle, event._onGLFWKey)
         glfw.set_char_mods_callback(self.winHandle, event._onGLFWText)
 
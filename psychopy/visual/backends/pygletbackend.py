@@ -240,6 +240,8 @@ class PygletBackend(BaseBackend):
         self.winHandle.on_mouse_press = event._onPygletMousePress
         self.winHandle.on_mouse_release = event._onPygletMouseRelease
         self.winHandle.on_mouse_scroll = event._onPygletMouseWheel
+        self.winHandle.on_mouse_motion = event._onPygletMouseMotion
+        self.winHandle.on_mouse_drag = event._onPygletMouseDrag
         if not win.allowGUI:
             # make mouse invisible. Could go further and make it 'exclusive'
             # (but need to alter x,y handling then)
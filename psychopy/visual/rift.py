@@ -1922,7 +1922,8 @@ class Rift(window.Window):
             if self.recordFrameIntervalsJustTurnedOn:  # don't do anything
                 self.recordFrameIntervalsJustTurnedOn = False
             else:  # past the first frame since turned on
-                self.frameIntervals.append(deltaT)
+                self._frameIntervals.append(
+                    deltaT, deltaT > self.refreshThreshold)
                 if deltaT > self.refreshThreshold:
                     self.nDroppedFrames += 1
                     if self.nDroppedFrames < reportNDroppedFrames:
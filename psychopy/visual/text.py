@@ -12,6 +12,7 @@ from __future__ import absolute_import, division, print_function
 
 from builtins import str
 import os
+import re
 import glob
 import warnings
 
@@ -32,6 +33,7 @@ import psychopy.event
 # (JWP has no idea why!)
 from psychopy.tools.monitorunittools import cm2pix, deg2pix, convertToPix
 from psychopy.tools.attributetools import attributeSetter, setAttribute
+from psychopy.tools import gltools
 from psychopy.visual.basevisual import (BaseVisualStim, ColorMixin,
     ContainerMixin)
 
@@ -72,6 +74,115 @@ defaultWrapWidth = {'cm': 15.0,
                     'pix': 500,
                     'pixels': 500}
 
+# characters where a line of text can be wrapped
+_whitespace = u' \u200b\t'
+# characters which start a new line of text
+_newlines = re.compile(u'[\n\u2028\u2029]')
+
+
+def _layoutGlyphs(text, font, width, alignText='center', anchorHoriz='center',
+                  anchorVert='center', tabWidth=50):
+    """Lay out `text` in lines wrapped at `width` pixels, as a multiline
+    pyglet.text.Label would, using the glyphs (and their advances) of a
+    pyglet `font`.
+
+    pyglet renders each glyph only once, into textures shared by all the
+    text drawn with that font, so this only needs to look up the glyphs.
+
+    Returns the vertices of the glyphs as an array with a row of x, y and
+    (3D) texture coordinates for each corner of each glyph (to be drawn as
+    GL_QUADS), the textures to bind as a list of (texture, first vertex,
+    number of vertices), and the width and height of the content.
+    """
+    ascent, descent = font.ascent, font.descent
+    lineHeight = ascent - descent
+    lines = []  # (line width, [(x, glyph), ...])
+    paragraphs = _newlines.split(text) if text else []
+    for paragraphN, paragraph in enumerate(paragraphs):
+        clusters = pyglet.font.base.get_grapheme_clusters(paragraph)
+        glyphs = font.get_glyphs(paragraph)
+        line = []
+        committed = False  # has whitespace been added to the line?
+        word = []  # glyphs of the word being added, and their offsets
+        wordStart = wordWidth = x = 0
+        eolWhitespace = 0
+        for char, glyph in zip(clusters, glyphs):
+            if char in _whitespace:
+                line.extend((wordStart + offset, g) for offset, g in word)
+                word = []
+                advance = glyph.advance
+                if char == u'\t':
+                    tabStop = ((x // tabWidth) + 1) * tabWidth
+                    advance += int(tabStop - x - glyph.advance)
+                committed = True
+                x += advance
+                eolWhitespace += advance
+                wordStart, wordWidth = x, 0
+                continue
+            if committed and x + glyph.advance >= width:
+                # wrap the line before this word
+                lines.append((wordStart - eolWhitespace, line))
+                line = []
+                committed = False
+                wordStart, x = 0, wordWidth
+            word.append((wordWidth, glyph))
+            wordWidth += glyph.advance
+            x += glyph.advance
+            eolWhitespace = 0
+        line.extend((wordStart + offset, g) for offset, g in word)
+        if paragraphN < len(paragraphs) - 1:
+            x -= eolWhitespace  # only lines ending in a newline are trimmed
+        lines.append((x, line))
+
+    contentWidth = max([lineWidth for lineWidth, line in lines] or [0])
+    contentHeight = len(lines) * lineHeight
+    if anchorHoriz == 'left':
+        left = 0
+    elif anchorHoriz == 'right':
+        left = -width
+    else:
+        left = -(width // 2)
+    if anchorVert == 'top':
+        top = 0
+    elif anchorVert == 'bottom':
+        top = contentHeight
+    elif anchorVert == 'baseline':
+        top = ascent
+    elif len(lines) == 1:
+        top = ascent // 2 - descent // 4  # looks more centered
+    else:
+        top = contentHeight // 2
+
+    quads = []
+    for lineN, (lineWidth, line) in enumerate(lines):
+        if alignText == 'left' or lineWidth > width:
+            lineX = left
+        elif alignText == 'right':
+            lineX = left + width - lineWidth
+        else:
+            lineX = left + (width - lineWidth) // 2
+        y = top - ascent - lineN * lineHeight
+        for x, glyph in line:
+            x0, y0, x1, y1 = glyph.vertices
+            x0, x1 = int(x0 + lineX + x), int(x1 + lineX + x)
+            y0, y1 = int(y0 + y), int(y1 + y)
+            t = tuple(glyph.tex_coords)
+            quads.append((glyph.owner,
+                          ((x0, y0) + t[0:3], (x1, y0) + t[3:6],
+                           (x1, y1) + t[6:9], (x0, y1) + t[9:12])))
+    # the glyphs are usually all in one texture but, if not, group them so
+    # each texture is only bound once
+    quads.sort(key=lambda quad: quad[0].id)
+    textures = []
+    for quadN, (texture, corners) in enumerate(quads):
+        if textures and textures[-1][0].id == texture.id:
+            textures[-1][2] += 4
+        else:
+            textures.append([texture, quadN * 4, 4])
+    vertices = numpy.array([corners for texture, corners in quads],
+                           dtype=numpy.float32).reshape((-1, 5))
+    return vertices, textures, contentWidth, contentHeight
+
 
 class TextStim(BaseVisualStim, ColorMixin, ContainerMixin):
     """Class of text stimuli to be displayed in a
@@ -104,6 +215,7 @@ class TextStim(BaseVisualStim, ColorMixin, ContainerMixin):
                  flipHoriz=False,
                  flipVert=False,
                  languageStyle='LTR',
+                 useGlyphAtlas=False,
                  name=None,
                  autoLog=None):
         """
@@ -120,7 +232,7 @@ class TextStim(BaseVisualStim, ColorMixin, ContainerMixin):
         unchanged shapes are as fast as usual. This includes ``pos``,
         ``opacity`` etc.
 
-        The following attribute can only be set at initialization (see
+        The following attributes can only be set at initialization (see
         further down for a list of attributes which can be changed after
         initialization):
 
@@ -141,6 +253,17 @@ class TextStim(BaseVisualStim, ColorMixin, ContainerMixin):
                 in their isolated form. May also be applied in other scripts,
                 such as Farsi or Urdu, that use Arabic-style alphabets.
 
+        **useGlyphAtlas**
+            If True, the text is drawn from the glyphs of the font, which are
+            rendered only once into textures shared by all the text using
+            that font (and size), rather than by a new pyglet Label each time
+            the text changes. Setting the text then only lays out the glyphs
+            and writes their vertices to a small buffer, which is much faster
+            for text changing on every frame (e.g. counters or RSVP). The
+            text looks the same, and its color and opacity can also be
+            changed without setting the text again. Only used with pyglet
+            and glfw windows.
+
         :Parameters:
 
         """
@@ -179,7 +302,13 @@ class TextStim(BaseVisualStim, ColorMixin, ContainerMixin):
         self.__dict__['flipHoriz'] = flipHoriz
         self.__dict__['flipVert'] = flipVert
         self.__dict__['languageStyle'] = languageStyle
+        self.__dict__['useGlyphAtlas'] = (
+            useGlyphAtlas and win.winType in ["pyglet", "glfw"])
         self._pygletTextObj = None
+        self._atlasFont = None
+        self._atlasVBO = None
+        self._atlasTextures = []
+        self._atlasContentSize = (0, 0)
         self.__dict__['pos'] = numpy.array(pos, float)
         # deprecated attributes
         if alignVert:
@@ -238,6 +367,8 @@ class TextStim(BaseVisualStim, ColorMixin, ContainerMixin):
     def __del__(self):
         if GL:  # because of pytest fail otherwise
             GL.glDeleteLists(self._listID, 1)
+            if self._atlasVBO is not None:
+                gltools.deleteVBO(self._atlasVBO)
 
     @attributeSetter
     def height(self, height):
@@ -279,6 +410,11 @@ class TextStim(BaseVisualStim, ColorMixin, ContainerMixin):
             self._font = pyglet.font.load(font, int(self._heightPix),
                                           dpi=72, italic=self.italic,
                                           bold=self.bold)
+            if self.useGlyphAtlas:
+                # the same size as the font of a pyglet Label
+                self._atlasFont = pyglet.font.load(
+                    font, int(self._heightPix*0.75), dpi=96,
+                    italic=self.italic, bold=self.bold)
             self.__dict__['font'] = font
         else:
             if font is None or len(font) == 0:
@@ -361,7 +497,9 @@ class TextStim(BaseVisualStim, ColorMixin, ContainerMixin):
 
             self.__dict__['text'] = text
 
-        if self.useShaders:
+        if self.useGlyphAtlas:
+            self._setTextGlyphAtlas()
+        elif self.useShaders:
             self._setTextShaders(text)
         else:
             self._setTextNoShaders(text)
@@ -379,6 +517,7 @@ class TextStim(BaseVisualStim, ColorMixin, ContainerMixin):
         if self.win.winType in ["pyglet", "glfw"]:
             self._pygletTextObj = pyglet.text.Label(
                 self.text, self.font, int(self._heightPix*0.75),
+                bold=self.bold, italic=self.italic,
                 anchor_x=self.anchorHoriz,
                 anchor_y=self.anchorVert,  # the point we rotate around
                 align=self.alignText,
@@ -416,6 +555,51 @@ class TextStim(BaseVisualStim, ColorMixin, ContainerMixin):
         self._needSetText = False
         self._needUpdate = True
 
+    def _setTextGlyphAtlas(self):
+        """Lay out the text with the glyphs of the font and write their
+        vertices to the vertex buffer of the stimulus
+        """
+        vertices, self._atlasTextures, w, h = _layoutGlyphs(
+            self.text or '', self._atlasFont, self._wrapWidthPix,
+            alignText=self.alignText, anchorHoriz=self.anchorHoriz,
+            anchorVert=self.anchorVert)
+        if self._atlasVBO is None:
+            self._atlasVBO = gltools.createVBO(vertices,
+                                               usage=GL.GL_DYNAMIC_DRAW)
+        else:
+            # replace the contents of the buffer we have
+            GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self._atlasVBO.name)
+            GL.glBufferData(GL.GL_ARRAY_BUFFER, vertices.nbytes,
+                            vertices.ctypes.data_as(ctypes.c_void_p),
+                            GL.GL_DYNAMIC_DRAW)
+            GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+            self._atlasVBO.size = vertices.nbytes
+            self._atlasVBO.shape = vertices.shape
+        self._atlasContentSize = (w, h)
+        self.width = self._wrapWidthPix
+        self._fontHeightPix = None  # as for a pyglet Label
+        self._needSetText = False
+        self._needUpdate = True
+
+    def _drawGlyphAtlas(self):
+        """Draw the glyphs in the vertex buffer, with the textures bound
+        and the color set already
+        """
+        if not self._atlasTextures:
+            return  # no text
+        gltools.setVertexAttribPointer(GL.GL_VERTEX_ARRAY, self._atlasVBO,
+                                       size=2, offset=0, legacy=True)
+        gltools.setVertexAttribPointer(GL.GL_TEXTURE_COORD_ARRAY,
+                                       self._atlasVBO, size=3, offset=2,
+                                       legacy=True)
+        for texture, first, count in self._atlasTextures:
+            GL.glBindTexture(texture.target, texture.id)
+            GL.glDrawArrays(GL.GL_QUADS, first, count)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        gltools.disableVertexAttribArray(GL.GL_VERTEX_ARRAY, legacy=True)
+        gltools.disableVertexAttribArray(GL.GL_TEXTURE_COORD_ARRAY,
+                                         legacy=True)
+
     def _updateListShaders(self):
         """Only used with pygame text - pyglet handles all from the draw()
         """
@@ -508,6 +692,7 @@ class TextStim(BaseVisualStim, ColorMixin, ContainerMixin):
         if self.win.winType in ["pyglet", "glfw"]:
             self._pygletTextObj = pyglet.text.Label(
                 self.text, self.font, int(self._heightPix*0.75),
+                bold=self.bold, italic=self.italic,
                 anchor_x=self.anchorHoriz,
                 anchor_y=self.anchorVert,  # the point we rotate around
                 align=self.alignText,
@@ -760,7 +945,9 @@ class TextStim(BaseVisualStim, ColorMixin, ContainerMixin):
         NOTE: currently always returns the size in pixels
         (this will change to return in stimulus units)
         """
-        if hasattr(self._pygletTextObj, 'content_width'):
+        if self.useGlyphAtlas:
+            w, h = self._atlasContentSize
+        elif hasattr(self._pygletTextObj, 'content_width'):
             w, h = (self._pygletTextObj.content_width,
                     self._pygletTextObj.content_height)
         else:
@@ -827,6 +1014,11 @@ class TextStim(BaseVisualStim, ColorMixin, ContainerMixin):
                 GL.glGetUniformLocation(self.win._progSignedTexFont, b"rgb"),
                 desiredRGB[0], desiredRGB[1], desiredRGB[2])
 
+        elif self.useGlyphAtlas:  # the glyphs are only alpha textures
+            desiredRGB = self._getDesiredRGB(
+                self.rgb, self.colorSpace, self.contrast)
+            GL.glColor4f(desiredRGB[0], desiredRGB[1],
+                         desiredRGB[2], self.opacity)
         else:  # color is set in texture, so set glColor to white
             GL.glColor4f(1, 1, 1, 1)
 
@@ -846,7 +1038,10 @@ class TextStim(BaseVisualStim, ColorMixin, ContainerMixin):
             GL.glEnable(GL.GL_TEXTURE_2D)
             # then allow pyglet to bind and use texture during drawing
 
-            self._pygletTextObj.draw()
+            if self.useGlyphAtlas:
+                self._drawGlyphAtlas()
+            else:
+                self._pygletTextObj.draw()
             GL.glDisable(GL.GL_TEXTURE_2D)
         else:
             # for pygame we should (and can) use a drawing list
@@ -26,7 +26,7 @@ from collections import deque
 from psychopy.contrib.lazy_import import lazy_import
 from psychopy import colors
 import math
-from psychopy.clock import monotonicClock
+from psychopy.clock import monotonicClock, getSleepGuard
 
 # try to find avbin (we'll overload pyglet's load_library tool and then
 # add some paths)
@@ -84,6 +84,7 @@ from psychopy.tools.arraytools import val2array
 from psychopy.tools.monitorunittools import convertToPix
 import psychopy.tools.viewtools as viewtools
 import psychopy.tools.gltools as gltools
+from psychopy.tools.frametools import FrameIntervalRecorder
 from .text import TextStim
 from .grating import GratingStim
 from .helpers import setColor
@@ -529,8 +530,11 @@ class Window(object):
         # Be able to omit the long timegap that follows each time turn it off
         self.recordFrameIntervalsJustTurnedOn = False
         self.nDroppedFrames = 0
-        self.frameIntervals = []
+        self._frameIntervals = FrameIntervalRecorder()
         self._frameTimes = deque(maxlen=1000)  # 1000 keeps overhead low
+        # set to a psychopy.tools.frametools.FrameProfiler to time the
+        # sections of each flip()
+        self.frameProfiler = None
 
         self._toDraw = []
         self._toDrawDepths = []
@@ -556,6 +560,9 @@ class Window(object):
         else:
             self.monitorFramePeriod = 1.0 / 60  # assume a flat panel?
         self.refreshThreshold = self.monitorFramePeriod * 1.2
+        # measure how late time.sleep() wakes up now rather than during the
+        # first (timed) core.wait()
+        getSleepGuard()
         openWindows.append(self)
 
         self.autoLog = autoLog
@@ -695,6 +702,28 @@ class Window(object):
         self.__dict__['recordFrameIntervals'] = value
         self.frameClock.reset()
 
+    @property
+    def frameIntervals(self):
+        """Frame intervals recorded while
+        :py:attr:`~Window.recordFrameIntervals` is `True`.
+
+        A :class:`~psychopy.tools.frametools.FrameIntervalRecorder`, which
+        can be used like the list of intervals it replaces (`len()`,
+        indexing, iteration and `numpy.array()`), and also keeps the
+        statistics of the intervals (`mean`, `std`, `percentile()`) and a
+        flag for each dropped frame. Setting it to a list replaces the
+        recorded intervals with the list values.
+
+        """
+        return self._frameIntervals
+
+    @frameIntervals.setter
+    def frameIntervals(self, value):
+        if value is self._frameIntervals:
+            return
+        self._frameIntervals.clear()
+        self._frameIntervals.extend(value)
+
     def setRecordFrameIntervals(self, value=True, log=None):
         """Usually you can use 'stim.attribute = value' syntax instead,
         but use this method if you need to suppress the log message.
@@ -703,7 +732,8 @@ class Window(object):
 
     def saveFrameIntervals(self, fileName=None, clear=True):
         """Save recorded screen frame intervals to disk, as comma-separated
-        values.
+        values, or in the numpy binary format if `fileName` ends with
+        `.npy`.
 
         Parameters
         ----------
@@ -717,13 +747,10 @@ class Window(object):
         """
         if not fileName:
             fileName = 'lastFrameIntervals.log'
-        if len(self.frameIntervals):
-            intervalStr = str(self.frameIntervals)[1:-1]
-            f = open(fileName, 'w')
-            f.write(intervalStr)
-            f.close()
+        if len(self._frameIntervals):
+            self._frameIntervals.save(fileName)
         if clear:
-            self.frameIntervals = []
+            self._frameIntervals.clear()
             self.frameClock.reset()
 
     def _setCurrent(self):
@@ -937,9 +964,21 @@ class Window(object):
             win.flip(clearBuffer=False)
 
         """
+        profiler = self.frameProfiler
+        if profiler is not None:
+            profiler.beginFrame()
+
         if self._toDraw:
-            for thisStim in self._toDraw:
-                thisStim.draw()
+            if profiler is None:
+                for thisStim in self._toDraw:
+                    thisStim.draw()
+            else:
+                for thisStim in self._toDraw:
+                    profiler.begin('draw', thisStim)
+                    try:
+                        thisStim.draw()
+                    finally:
+                        profiler.end()
         else:
             self.backend.setCurrent()
 
@@ -961,99 +1000,123 @@ class Window(object):
 
         flipThisFrame = self._startOfFlip()
         if self.useFBO and flipThisFrame:
-            self.draw3d = False  # disable 3d drawing
-            self._prepareFBOrender()
-            # need blit the framebuffer object to the actual back buffer
+            if profiler is not None:
+                profiler.begin('blit')
+            try:
+                self.draw3d = False  # disable 3d drawing
+                self._prepareFBOrender()
+                # need blit the framebuffer object to the actual back buffer
+
+                # unbind the framebuffer as the render target
+                GL.glBindFramebufferEXT(GL.GL_FRAMEBUFFER_EXT, 0)
+                GL.glDisable(GL.GL_BLEND)
+                stencilOn = self.stencilTest
+                self.stencilTest = False
 
-            # unbind the framebuffer as the render target
-            GL.glBindFramebufferEXT(GL.GL_FRAMEBUFFER_EXT, 0)
-            GL.glDisable(GL.GL_BLEND)
-            stencilOn = self.stencilTest
-            self.stencilTest = False
+                if self.bits is not None:
+                    self.bits._prepareFBOrender()
 
-            if self.bits is not None:
-                self.bits._prepareFBOrender()
-
-            # before flipping need to copy the renderBuffer to the
-            # frameBuffer
-            GL.glActiveTexture(GL.GL_TEXTURE0)
-            GL.glEnable(GL.GL_TEXTURE_2D)
-            GL.glBindTexture(GL.GL_TEXTURE_2D, self.frameTexture)
-            GL.glColor3f(1.0, 1.0, 1.0)  # glColor multiplies with texture
-            GL.glColorMask(True, True, True, True)
+                # before flipping need to copy the renderBuffer to the
+                # frameBuffer
+                GL.glActiveTexture(GL.GL_TEXTURE0)
+                GL.glEnable(GL.GL_TEXTURE_2D)
+                GL.glBindTexture(GL.GL_TEXTURE_2D, self.frameTexture)
+                GL.glColor3f(1.0, 1.0, 1.0)  # glColor multiplies with texture
+                GL.glColorMask(True, True, True, True)
 
-            self._renderFBO()
+                self._renderFBO()
 
-            GL.glEnable(GL.GL_BLEND)
-            self._finishFBOrender()
+                GL.glEnable(GL.GL_BLEND)
+                self._finishFBOrender()
+            finally:
+                if profiler is not None:
+                    profiler.end()
 
         # call this before flip() whether FBO was used or not
         self._afterFBOrender()
 
-        self.backend.swapBuffers(flipThisFrame)
-
-        if self.useFBO and flipThisFrame:
-            # set rendering back to the framebuffer object
-            GL.glBindFramebufferEXT(
-                GL.GL_FRAMEBUFFER_EXT, self.frameBuffer)
-            GL.glReadBuffer(GL.GL_COLOR_ATTACHMENT0_EXT)
-            GL.glDrawBuffer(GL.GL_COLOR_ATTACHMENT0_EXT)
-            # set to no active rendering texture
-            GL.glActiveTexture(GL.GL_TEXTURE0)
-            GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
-            if stencilOn:
-                self.stencilTest = True
-
-        # rescale, reposition, & rotate
-        GL.glMatrixMode(GL.GL_MODELVIEW)
-        GL.glLoadIdentity()
-        if self.viewScale is not None:
-            GL.glScalef(self.viewScale[0], self.viewScale[1], 1)
-            absScaleX = abs(self.viewScale[0])
-            absScaleY = abs(self.viewScale[1])
-        else:
-            absScaleX, absScaleY = 1, 1
-
-        if self.viewPos is not None:
-            # here we must use normalised units in _viewPosNorm,
-            # see the corresponding attributeSetter above
-            normRfPosX = self._viewPosNorm[0] / absScaleX
-            normRfPosY = self._viewPosNorm[1] / absScaleY
-
-            GL.glTranslatef(normRfPosX, normRfPosY, 0.0)
-
-        if self.viewOri:  # float
-            # the logic below for flip is partially correct, but does not
-            # handle a nonzero viewPos
-            flip = 1
+        if profiler is not None:
+            profiler.begin('flip')
+        try:
+            self.backend.swapBuffers(flipThisFrame)
+
+            if self.useFBO and flipThisFrame:
+                # set rendering back to the framebuffer object
+                GL.glBindFramebufferEXT(
+                    GL.GL_FRAMEBUFFER_EXT, self.frameBuffer)
+                GL.glReadBuffer(GL.GL_COLOR_ATTACHMENT0_EXT)
+                GL.glDrawBuffer(GL.GL_COLOR_ATTACHMENT0_EXT)
+                # set to no active rendering texture
+                GL.glActiveTexture(GL.GL_TEXTURE0)
+                GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+                if stencilOn:
+                    self.stencilTest = True
+
+            # rescale, reposition, & rotate
+            GL.glMatrixMode(GL.GL_MODELVIEW)
+            GL.glLoadIdentity()
             if self.viewScale is not None:
-                _f = self.viewScale[0] * self.viewScale[1]
-                if _f < 0:
-                    flip = -1
-            GL.glRotatef(flip * self.viewOri, 0.0, 0.0, -1.0)
-
-        # reset returned buffer for next frame
-        self._endOfFlip(clearBuffer)
-
-        # waitBlanking
-        if self.waitBlanking and flipThisFrame:
-            GL.glBegin(GL.GL_POINTS)
-            GL.glColor4f(0, 0, 0, 0)
-            if sys.platform == 'win32' and self.glVendor.startswith('ati'):
-                pass
+                GL.glScalef(self.viewScale[0], self.viewScale[1], 1)
+                absScaleX = abs(self.viewScale[0])
+                absScaleY = abs(self.viewScale[1])
             else:
-                # this corrupts text rendering on win with some ATI cards :-(
-                GL.glVertex2i(10, 10)
-            GL.glEnd()
-            GL.glFinish()
-
-        # get timestamp
-        self._frameTime = now = logging.defaultClock.getTime()
-        self._frameTimes.append(self._frameTime)
+                absScaleX, absScaleY = 1, 1
+
+            if self.viewPos is not None:
+                # here we must use normalised units in _viewPosNorm,
+                # see the corresponding attributeSetter above
+                normRfPosX = self._viewPosNorm[0] / absScaleX
+                normRfPosY = self._viewPosNorm[1] / absScaleY
+
+                GL.glTranslatef(normRfPosX, normRfPosY, 0.0)
+
+            if self.viewOri:  # float
+                # the logic below for flip is partially correct, but does not
+                # handle a nonzero viewPos
+                flip = 1
+                if self.viewScale is not None:
+                    _f = self.viewScale[0] * self.viewScale[1]
+                    if _f < 0:
+                        flip = -1
+                GL.glRotatef(flip * self.viewOri, 0.0, 0.0, -1.0)
+
+            # reset returned buffer for next frame
+            self._endOfFlip(clearBuffer)
+
+            # waitBlanking
+            if self.waitBlanking and flipThisFrame:
+                GL.glBegin(GL.GL_POINTS)
+                GL.glColor4f(0, 0, 0, 0)
+                if (sys.platform == 'win32' and
+                        self.glVendor.startswith('ati')):
+                    pass
+                else:
+                    # this corrupts text rendering on win with some ATI
+                    # cards :-(
+                    GL.glVertex2i(10, 10)
+                GL.glEnd()
+                GL.glFinish()
+
+            # get timestamp
+            self._frameTime = now = logging.defaultClock.getTime()
+            self._frameTimes.append(self._frameTime)
+        finally:
+            if profiler is not None:
+                profiler.end()
 
         # run other functions immediately after flip completes
-        for callEntry in self._toCall:
-            callEntry['function'](*callEntry['args'], **callEntry['kwargs'])
+        if profiler is None:
+            for callEntry in self._toCall:
+                callEntry['function'](*callEntry['args'],
+                                      **callEntry['kwargs'])
+        else:
+            for callEntry in self._toCall:
+                profiler.begin('callOnFlip', callEntry['function'])
+                try:
+                    callEntry['function'](*callEntry['args'],
+                                          **callEntry['kwargs'])
+                finally:
+                    profiler.end()
         del self._toCall[:]
 
         # do bookkeeping
@@ -1065,7 +1128,8 @@ class Window(object):
             if self.recordFrameIntervalsJustTurnedOn:  # don't do anything
                 self.recordFrameIntervalsJustTurnedOn = False
             else:  # past the first frame since turned on
-                self.frameIntervals.append(deltaT)
+                self._frameIntervals.append(
+                    deltaT, deltaT > self.refreshThreshold)
                 if deltaT > self.refreshThreshold:
                     self.nDroppedFrames += 1
                     if self.nDroppedFrames < reportNDroppedFrames:
@@ -1078,17 +1142,27 @@ class Window(object):
                                         "about them!")
 
         # log events
-        for logEntry in self._toLog:
-            # {'msg':msg, 'level':level, 'obj':copy.copy(obj)}
-            logging.log(msg=logEntry['msg'],
-                        level=logEntry['level'],
-                        t=now,
-                        obj=logEntry['obj'])
+        profileLog = profiler is not None and self._toLog
+        if profileLog:
+            profiler.begin('log')
+        try:
+            for logEntry in self._toLog:
+                # {'msg':msg, 'level':level, 'obj':copy.copy(obj)}
+                logging.log(msg=logEntry['msg'],
+                            level=logEntry['level'],
+                            t=now,
+                            obj=logEntry['obj'])
+        finally:
+            if profileLog:
+                profiler.end()
         del self._toLog[:]
 
         # keep the system awake (prevent screen-saver or sleep)
         platform_specific.sendStayAwake()
 
+        if profiler is not None:
+            profiler.endFrame()
+
         #    If self.waitBlanking is True, then return the time that
         # GL.glFinish() returned, set as the 'now' variable. Otherwise
         # return None as before
@@ -2870,10 +2944,10 @@ class Window(object):
         self.recordFrameIntervals = True
         for frameN in range(nMaxFrames):
             self.flip()
-            if (len(self.frameIntervals) >= nIdentical and
-                    (numpy.std(self.frameIntervals[-nIdentical:]) <
-                     (threshold / 1000.0))):
-                rate = 1.0 / numpy.mean(self.frameIntervals[-nIdentical:])
+            lastIntervals = self._frameIntervals.getLast(nIdentical)
+            if (len(lastIntervals) >= nIdentical and
+                    (numpy.std(lastIntervals) < (threshold / 1000.0))):
+                rate = 1.0 / numpy.mean(lastIntervals)
                 if self.screen is None:
                     scrStr = ""
                 else:
@@ -2882,7 +2956,7 @@ class Window(object):
                     msg = 'Screen%s actual frame rate measured at %.2f'
                     logging.debug(msg % (scrStr, rate))
                 self.recordFrameIntervals = recordFrmIntsOrig
-                self.frameIntervals = []
+                self._frameIntervals.clear()
                 return rate
         # if we got here we reached end of maxFrames with no consistent value
         msg = ("Couldn't measure a consistent frame rate.\n"